@@ -9,6 +9,7 @@ from bson import ObjectId
 from app.core.database import get_database
 from app.core.security import get_current_user
 from app.schemas.detection import AlertResponse
+from app.services.alert_writer import alert_writer
 
 router = APIRouter()
 
@@ -63,6 +64,18 @@ async def get_alerts(
     return {"alerts": alerts, "total": total}
 
 
+@router.get("/writer/metrics")
+async def get_alert_writer_metrics():
+    """
+    Write-behind alert persistence metrics
+    
+    Returns:
+        Backend, pending / in-flight operations, written / failed / dropped counts,
+        batches and average batch size, retries, blocked writes and flush latency
+    """
+    return alert_writer.metrics()
+
+
 @router.get("/stats")
 async def get_alert_stats(
     days: int = Query(7, ge=1, le=365),
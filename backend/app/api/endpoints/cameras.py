@@ -0,0 +1,196 @@
+"""
+Camera endpoints - server-side camera ingestion and detection results
+"""
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import get_current_user
+from app.schemas.camera import CameraCreate
+from app.services.camera_inference import camera_inference
+from app.services.broadcast import broadcast_hub
+from app.api.endpoints.realtime import LatestFrameMailbox
+
+router = APIRouter()
+
+MJPEG_BOUNDARY = "frame"
+
+
+@router.get("/")
+async def list_cameras():
+    """
+    List cameras with connection state and inference statistics
+
+    "scheduler" shows whether the node is saturated; per camera, "fps" is the
+    achieved rate next to "target_fps" and the current "budget_fps".
+    """
+    cameras = camera_inference.list_cameras()
+    return {"cameras": cameras, "total": len(cameras), "scheduler": camera_inference.scheduler.stats()}
+
+
+@router.post("/", status_code=201)
+async def add_camera(
+    camera: CameraCreate,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Add a camera and start server-side detection on it
+
+    The stream is opened by the server; results are available from
+    GET /cameras/{camera_id}/detections and WS /cameras/ws/{camera_id}.
+    """
+    try:
+        return await run_in_threadpool(camera_inference.add_camera, **camera.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.get("/{camera_id}")
+async def get_camera(camera_id: str):
+    """Get one camera"""
+    camera = camera_inference.get_camera(camera_id)
+    if camera is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera
+
+
+@router.delete("/{camera_id}")
+async def remove_camera(
+    camera_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Stop detection on a camera and close its stream"""
+    # Joins the worker and capture threads - keep it off the event loop
+    if not await run_in_threadpool(camera_inference.remove_camera, camera_id):
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return {"message": "Camera removed"}
+
+
+@router.get("/{camera_id}/detections")
+async def get_camera_detections(camera_id: str):
+    """
+    Latest detection result of a camera
+
+    Returns:
+        {"camera_id", "seq", "timestamp", "width", "height", "detections",
+         "total_weapons", "processing_time", "fps"} or {"result": null}
+        before the first frame was processed
+    """
+    if camera_inference.get_camera(camera_id) is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+    return camera_inference.latest_result(camera_id) or {"camera_id": camera_id, "result": None}
+
+
+@router.websocket("/ws/{camera_id}")
+async def websocket_camera_detections(websocket: WebSocket, camera_id: str):
+    """
+    Push every new detection result of a camera
+
+    Slow clients only get the newest result (older unsent ones are dropped).
+    """
+    await websocket.accept()
+    loop = asyncio.get_running_loop()
+    mailbox = LatestFrameMailbox()
+
+    unsubscribe = camera_inference.subscribe(
+        camera_id, lambda result: loop.call_soon_threadsafe(mailbox.put, result)
+    )
+    if unsubscribe is None:
+        await websocket.send_json({"error": "Camera not found"})
+        await websocket.close(code=4404)
+        return
+
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            mailbox.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        latest = camera_inference.latest_result(camera_id)
+        if latest is not None:
+            mailbox.put(latest)
+        while True:
+            result = await mailbox.get()
+            if result is None:
+                break
+            await websocket.send_json({**result, "dropped_results": mailbox.dropped})
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        unsubscribe()
+        watcher.cancel()
+
+
+@router.get("/{camera_id}/mjpeg")
+async def stream_camera_mjpeg(camera_id: str):
+    """
+    Annotated live view as MJPEG (multipart/x-mixed-replace) - usable directly in <img src>
+
+    Frames are encoded once per processed frame and shared by all viewers;
+    a slow viewer skips to the newest frame.
+    """
+    viewer = broadcast_hub.subscribe(camera_id)
+    if viewer is None:
+        raise HTTPException(status_code=404, detail="Camera not found")
+
+    async def parts():
+        try:
+            while True:
+                item = await viewer.next()
+                if item is None:
+                    return
+                _, jpeg = item
+                yield (
+                    f"--{MJPEG_BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                    f"Content-Length: {len(jpeg)}\r\n\r\n"
+                ).encode() + jpeg + b"\r\n"
+        finally:
+            broadcast_hub.unsubscribe(viewer)
+
+    return StreamingResponse(
+        parts(),
+        media_type=f"multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}",
+        headers={"Cache-Control": "no-cache, no-store", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws/{camera_id}/video")
+async def websocket_camera_video(websocket: WebSocket, camera_id: str):
+    """
+    Annotated live view over WebSocket - one binary JPEG message per frame
+    (same shared encoding and drop-to-latest as the MJPEG stream)
+    """
+    await websocket.accept()
+    viewer = broadcast_hub.subscribe(camera_id)
+    if viewer is None:
+        await websocket.send_json({"error": "Camera not found"})
+        await websocket.close(code=4404)
+        return
+
+    async def watch_disconnect():
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            viewer.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        while True:
+            item = await viewer.next()
+            if item is None:
+                break
+            await websocket.send_bytes(item[1])
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        broadcast_hub.unsubscribe(viewer)
+        watcher.cancel()
@@ -1,20 +1,31 @@
 """
 Detection endpoints
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import cv2
+import json
 import numpy as np
 import os
 import time
-from typing import Optional
+import uuid
+from typing import Optional, Tuple
 from datetime import datetime
 
 from app.core.config import settings
+from app.core.media import ranged_file_response
 from app.core.security import get_current_user
 from app.services.detection_service import detection_service
+from app.services.inference_scheduler import inference_scheduler, QOS_INTERACTIVE
 from app.services.alert_service import telegram_alert
+from app.services.alert_writer import alert_writer
 from app.services.person_weapon_analyzer import person_weapon_analyzer
+from app.services.video_processing import process_video, OUTPUT_MODES, OUTPUT_TIMELINE, OUTPUT_SCAN
+from app.services.video_scan import SAMPLING_MODES
+from app.services.video_jobs import video_job_manager, TERMINAL_STATES
 from app.schemas.detection import DetectionResponse, Detection
 
 router = APIRouter()
@@ -59,9 +70,10 @@ async def detect_image(
     if image is None:
         raise HTTPException(status_code=400, detail="Invalid image file")
     
-    # Run detection
+    # Run detection (interactive class of the inference scheduler, off the event loop)
     try:
-        detections, processing_time, model_used = detection_service.detect(
+        detections, processing_time, model_used = await run_in_threadpool(
+            inference_scheduler.wrap(detection_service.detect, QOS_INTERACTIVE),
             image, model_type=model_type, conf_threshold=confidence
         )
     except Exception as e:
@@ -93,9 +105,6 @@ async def detect_image(
     
     # Save alerts to MongoDB for detected weapons
     if len(detections) > 0:
-        from app.core.database import get_database
-        db = get_database()
-        
         # === ANALYZE PERSON-WEAPON RELATIONSHIP ===
         # Detect persons in image
         person_detections = person_weapon_analyzer.detect_persons(image, conf_threshold=0.5)
@@ -124,8 +133,10 @@ async def detect_image(
         
         print(f"🔍 Image Analysis: {person_count} person(s), {len(detections)} weapon(s) - Status: {status_msg}")
         
+        # One batched write for all weapons (alert writer, no round trip per alert)
+        alert_docs = []
         for det in detections:
-            alert_data = {
+            alert_docs.append({
                 "weapon_class": det.class_name,
                 "confidence": det.confidence,
                 "danger_level": danger_level,
@@ -140,12 +151,9 @@ async def detect_image(
                     "y2": det.bbox.y2
                 },
                 "acknowledged": False
-            }
-            try:
-                await db.alerts.insert_one(alert_data)
-                print(f"✅ Alert saved: {det.class_name} ({danger_level})")
-            except Exception as e:
-                print(f"❌ Failed to save alert: {e}")
+            })
+        alert_ids = await alert_writer.write_many_async(alert_docs)
+        print(f"✅ {sum(1 for i in alert_ids if i is not None)} alert(s) queued ({danger_level})")
         
         # Send Telegram alert with annotated image (skip cooldown for uploads)
         telegram_alert.send_alert(
@@ -212,7 +220,8 @@ async def detect_image_with_pairing(
     
     # Run detection with pairing
     try:
-        pairs, processing_time, model_used = detection_service.detect_with_pairing(
+        pairs, processing_time, model_used = await run_in_threadpool(
+            inference_scheduler.wrap(detection_service.detect_with_pairing, QOS_INTERACTIVE),
             image, model_type=model_type, conf_threshold=confidence
         )
     except Exception as e:
@@ -287,12 +296,11 @@ async def detect_image_with_pairing(
     
     weapons_with_persons = sum(1 for p in pairs if p.status == "held_by_person")
     
-    # Auto-create alerts for high and medium danger detections
-    from app.core.database import get_database
-    db = get_database()
+    # Auto-create alerts for high and medium danger detections (one batched write)
+    alert_docs = []
     for pair in pairs:
         if pair.danger_level in ["high", "medium"]:
-            alert_data = {
+            alert_docs.append({
                 "weapon_class": pair.weapon.class_name,
                 "confidence": pair.weapon.confidence,
                 "status": pair.status,
@@ -302,11 +310,9 @@ async def detect_image_with_pairing(
                 "location": "Image Upload",
                 "timestamp": datetime.utcnow(),
                 "acknowledged": False
-            }
-            try:
-                await db.alerts.insert_one(alert_data)
-            except Exception as e:
-                print(f"Failed to create alert: {e}")
+            })
+    if alert_docs:
+        await alert_writer.write_many_async(alert_docs)
     
     return PairingDetectionResponse(
         pairs=pairs,
@@ -318,29 +324,24 @@ async def detect_image_with_pairing(
     )
 
 
-@router.post("/detect/video")
-async def detect_video(
-    file: UploadFile = File(...),
-    confidence: Optional[float] = Form(0.55),  # Increased default for faster/more accurate detection
-    model_type: Optional[str] = Form("yolo"),
-    # current_user: dict = Depends(get_current_user)  # Disabled for testing
-):
-    # Mock user for testing
-    current_user = {'user_id': 'test_user'}
+async def _save_uploaded_video(file: UploadFile, user_id: str, output: str = "video") -> Tuple[str, str, str]:
     """
-    Upload a video and run weapon detection frame-by-frame
+    Validate and save an uploaded video
     
     Args:
-        file: Video file (mp4, avi, etc.)
-        confidence: Confidence threshold (0.0-1.0)
-        model_type: "yolo" or "fasterrcnn"
-        
+        file: Uploaded video
+        user_id: Uploading user
+        output: Output mode ("video" or "timeline"), decides the result filename
+    
     Returns:
-        Processed video with bounding boxes
+        (input_path, output_path, output_filename)
     """
+    if output not in OUTPUT_MODES:
+        raise HTTPException(status_code=400, detail=f"output must be one of {', '.join(OUTPUT_MODES)}")
+    
     # Validate file size
     contents = await file.read()
-    max_size = 200 * 1024 * 1024  # 200MB limit
+    max_size = settings.MAX_VIDEO_UPLOAD_SIZE
     
     if len(contents) > max_size:
         raise HTTPException(
@@ -353,10 +354,13 @@ async def detect_video(
     
     # Generate unique filenames
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    user_id = current_user.get('user_id', 'unknown')
+    suffix = uuid.uuid4().hex[:6]
     
-    input_filename = f"{user_id}_{timestamp}_input.mp4"
-    output_filename = f"{user_id}_{timestamp}_output.mp4"
+    input_filename = f"{user_id}_{timestamp}_{suffix}_input.mp4"
+    if output == OUTPUT_TIMELINE:
+        output_filename = f"{user_id}_{timestamp}_{suffix}_timeline.jsonl"
+    else:
+        output_filename = f"{user_id}_{timestamp}_{suffix}_output.mp4"
     
     input_path = os.path.join(settings.UPLOAD_DIR, "videos", input_filename)
     output_path = os.path.join(settings.UPLOAD_DIR, "results", output_filename)
@@ -369,410 +373,242 @@ async def detect_video(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save video: {str(e)}")
     
-    # Process video
-    cap = None
-    out = None
+    return input_path, output_path, output_filename
+
+
+def _clamp_workers(workers: Optional[int]) -> int:
+    """Limit requested worker processes to the available cores (0 = all cores)"""
+    cpu_count = os.cpu_count() or 1
+    if not workers:
+        return cpu_count if workers == 0 else 1
+    return max(1, min(workers, cpu_count))
+
+
+def _scan_options(output: str, scan_interval: Optional[float], scan_sampling: Optional[str]) -> Optional[dict]:
+    """Validate scan-mode parameters (None for other output modes)"""
+    if output != OUTPUT_SCAN:
+        return None
+    if scan_sampling not in SAMPLING_MODES:
+        raise HTTPException(status_code=400, detail=f"scan_sampling must be one of {', '.join(SAMPLING_MODES)}")
+    if not scan_interval or scan_interval <= 0:
+        raise HTTPException(status_code=400, detail="scan_interval must be positive")
+    return {"interval_seconds": scan_interval, "sampling": scan_sampling}
+
+
+@router.post("/detect/video")
+async def detect_video(
+    file: UploadFile = File(...),
+    confidence: Optional[float] = Form(0.55),  # Increased default for faster/more accurate detection
+    model_type: Optional[str] = Form("yolo"),
+    workers: Optional[int] = Form(1),  # >1 = parallel chunked processing across processes
+    infer_every: Optional[int] = Form(1),  # Run inference every Nth output frame, carry boxes between
+    output: Optional[str] = Form("video"),  # "video" = annotated MP4, "timeline" = JSONL detection index, "scan"
+    scan_interval: Optional[float] = Form(2.0),  # Scan mode: seconds between coarse samples
+    scan_sampling: Optional[str] = Form("interval"),  # Scan mode: "interval" or "keyframes"
+    # current_user: dict = Depends(get_current_user)  # Disabled for testing
+):
+    # Mock user for testing
+    current_user = {'user_id': 'test_user'}
+    """
+    Upload a video and run weapon detection frame-by-frame
     
-    try:
-        # Open input video
-        cap = cv2.VideoCapture(input_path)
-        
-        if not cap.isOpened():
-            raise HTTPException(status_code=400, detail="Cannot open video file")
-        
-        # Get video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # OPTIMIZATION: Cap FPS to 30 for smoother processing if too high
-        output_fps = min(fps, 30)  # Max 30 FPS output for smooth playback
-        
-        print(f"📹 Video info: {width}x{height} @ {fps}fps -> output {output_fps}fps, {total_frames} frames")
-        
-        # Initialize video writer with mp4v codec
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(output_path, fourcc, output_fps, (width, height))
-        
-        if not out.isOpened():
-            raise HTTPException(
-                status_code=500, 
-                detail="Failed to initialize video writer"
-            )
-        
-        # Load detection model
-        model = detection_service.load_yolo_model()
-        
-        # Process frames with optimization
-        frame_count = 0
-        processed_count = 0
-        total_detections = 0
-        frames_with_weapons = 0
-        start_time = time.time()
-        best_detection_frame = None  # Store frame with most detections for alert
-        max_detections_in_frame = 0
-        best_frame_detections = []
-        
-        # OPTIMIZATION: Skip frames for faster processing
-        # Process every Nth frame (2 = 50% faster, 3 = 66% faster)
-        # REDUCED: Skip less frames for lower latency
-        skip_frames = 1  # Process all frames for smooth detection
-        
-        # AUTO-DETECT GRID: Check if this is a multi-camera grid (2x2, 3x3, etc.)
-        # Multi-cam videos usually have aspect ratio ~2:1 or black divider lines
-        aspect_ratio = width / height
-        is_grid_video = (1.8 < aspect_ratio < 2.2)  # Likely 2x2 grid
-        
-        grid_cols, grid_rows = (2, 2) if is_grid_video else (1, 1)
-        cell_width = width // grid_cols
-        cell_height = height // grid_rows
-        
-        if is_grid_video:
-            print(f"📹 Multi-camera grid detected: {grid_cols}x{grid_rows} layout")
-            print(f"   Each cell: {cell_width}x{cell_height}")
-        
-        print(f"🎬 Starting frame processing (processing ALL frames for smooth detection)...")
-        
-        while True:
-            ret, frame = cap.read()
-            
-            if not ret:
-                break  # End of video
-            
-            frame_count += 1
-            processed_count += 1
-            
-            # CRITICAL: Create FRESH copy - completely independent frame
-            # numpy array copy ensures no memory sharing with previous frames
-            frame_clean = frame.copy()
-            
-            # Force memory separation to prevent box persistence
-            frame_clean.setflags(write=True)
-            
-            # GRID PROCESSING: Detect each cell separately for multi-camera videos
-            all_detections = []
-            
-            if is_grid_video:
-                # Process each grid cell independently on CLEAN frame
-                for row in range(grid_rows):
-                    for col in range(grid_cols):
-                        # Extract cell region from clean frame
-                        x1 = col * cell_width
-                        y1 = row * cell_height
-                        x2 = x1 + cell_width
-                        y2 = y1 + cell_height
-                        
-                        cell = frame_clean[y1:y2, x1:x2]
-                        
-                        # Resize cell for FAST detection (smaller = faster)
-                        cell_resized = cv2.resize(cell, (416, 416))  # Reduced from 640x480
-                        
-                        # FAST Detect in this cell
-                        cell_results = model.predict(
-                            cell_resized, 
-                            conf=confidence, 
-                            verbose=False, 
-                            imgsz=416,  # Smaller input
-                            agnostic_nms=True  # Faster NMS
-                        )[0]
-                        
-                        # Scale detections back to cell coordinates
-                        scale_x = cell_width / 416
-                        scale_y = cell_height / 416
-                        
-                        for box in cell_results.boxes:
-                            cx1, cy1, cx2, cy2 = box.xyxy[0].cpu().numpy()
-                            
-                            # Transform to full frame coordinates
-                            box.xyxy[0][0] = cx1 * scale_x + x1
-                            box.xyxy[0][1] = cy1 * scale_y + y1
-                            box.xyxy[0][2] = cx2 * scale_x + x1
-                            box.xyxy[0][3] = cy2 * scale_y + y1
-                            
-                            all_detections.append(box)
-                
-                # Create pseudo results object
-                class PseudoResults:
-                    def __init__(self, boxes, names):
-                        self.boxes = boxes
-                        self.names = names
-                
-                weapon_results = PseudoResults(all_detections, model.names)
-                detections = all_detections
-            else:
-                # FIXED: Detect DIRECTLY on original frame - NO RESIZE, NO SCALE
-                # This eliminates coordinate misalignment completely
-                # YOLO will handle the resizing internally with correct coordinate mapping
-                weapon_results = model.predict(
-                    frame_clean,  # Use original frame directly
-                    conf=confidence,
-                    verbose=False, 
-                    imgsz=640,  # Model input size (handled internally)
-                    half=False,
-                    device='cpu',
-                    agnostic_nms=True,
-                    max_det=10  # Limit detections for speed
-                )[0]
-                
-                # No scaling needed - coordinates are already correct
-                detections = weapon_results.boxes
-            
-            # Count detections
-            if len(detections) > 0:
-                total_detections += len(detections)
-                frames_with_weapons += 1
-                
-                # Keep best frame for Telegram alert
-                if len(detections) > max_detections_in_frame:
-                    max_detections_in_frame = len(detections)
-                    best_detection_frame = frame.copy()
-                    best_frame_detections = []
-                    
-                    for box in detections:
-                        x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                        conf_val = float(box.conf)
-                        cls = int(box.cls)
-                        class_name = weapon_results.names[cls]
-                        
-                        # Store detection info for Telegram
-                        from app.schemas.detection import BBox
-                        det_obj = type('Detection', (), {
-                            'class_name': class_name,
-                            'confidence': conf_val,
-                            'bbox': BBox(x1=float(x1), y1=float(y1), x2=float(x2), y2=float(y2))
-                        })()
-                        best_frame_detections.append(det_obj)
-                
-                # Draw bounding boxes with EXACT coordinates (no lag, no offset)
-                for box in detections:
-                    # Get coordinates directly from detection
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    conf_val = float(box.conf)
-                    cls = int(box.cls)
-                    class_name = weapon_results.names[cls]
-                    
-                    # Clamp coordinates to frame boundaries
-                    x1_draw = max(0, int(x1))
-                    y1_draw = max(0, int(y1))
-                    x2_draw = min(width, int(x2))
-                    y2_draw = min(height, int(y2))
-                    
-                    # Draw red box IMMEDIATELY on THIS frame only
-                    cv2.rectangle(frame_clean, 
-                                (x1_draw, y1_draw), (x2_draw, y2_draw), 
-                                (0, 0, 255), 3)
-                    
-                    # Add label with class and confidence - use exact coordinates
-                    label = f"{class_name} {conf_val:.0%}"
-                    font_scale = 0.7 * (width / 1280)  # Scale font with video size
-                    thickness = max(1, int(2 * (width / 1280)))
-                    (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
-                    cv2.rectangle(frame_clean, (x1_draw, y1_draw - label_h - 10), 
-                                (x1_draw + label_w, y1_draw), (0, 0, 255), -1)
-                    cv2.putText(frame_clean, label, (x1_draw, y1_draw - 5),
-                              cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), thickness)
-            
-            # Clear detections list to prevent accumulation
-            detections = []
-            
-            # Add frame counter overlay on clean frame
-            cv2.putText(
-                frame_clean,
-                f"Frame: {frame_count}/{total_frames}",
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.7,
-                (255, 255, 255),
-                2
-            )
-            
-            # Write ONLY this frame to video (no persistence)
-            out.write(frame_clean)
-            
-            # Force flush to ensure frame is written immediately
-            cv2.waitKey(1)
-            
-            # Progress log every 30 frames
-            if frame_count % 30 == 0:
-                progress = (frame_count / total_frames) * 100
-                fps_current = processed_count / (time.time() - start_time) if processed_count > 0 else 0
-                print(f"   Progress: {progress:.1f}% ({frame_count}/{total_frames}) - {fps_current:.1f} fps")
-        
-        # Calculate processing stats
-        processing_time = time.time() - start_time
-        avg_fps = processed_count / processing_time if processing_time > 0 else 0
-        
-        print(f"✅ Processing complete!")
-        print(f"   Total frames: {frame_count}")
-        print(f"   Processed frames: {processed_count}")
-        print(f"   Frames with weapons: {frames_with_weapons}")
-        print(f"   Total detections: {total_detections}")
-        print(f"   Processing time: {processing_time:.2f}s ({avg_fps:.1f} fps)")
-        
-        # Save alert to MongoDB if weapons detected
-        if total_detections > 0:
-            from app.core.database import get_database
-            db = get_database()
-            
-            # Determine danger level based on frequency
-            detection_rate = frames_with_weapons / frame_count
-            if detection_rate > 0.5:
-                danger_level = "high"
-                status_msg = f"High Risk - Weapons in {detection_rate*100:.0f}% of frames"
-            elif detection_rate > 0.2:
-                danger_level = "medium"
-                status_msg = f"Multiple Detections - {frames_with_weapons} frames affected"
-            else:
-                danger_level = "low"
-                status_msg = f"Low Frequency - {total_detections} detections"
-            
-            alert_data = {
-                "weapon_class": "multiple",
-                "confidence": 0.0,  # Average not calculated here
-                "danger_level": danger_level,
-                "image_path": f"/api/v1/detection/video/result/{output_filename}",
-                "location": "Video Upload Detection",
-                "camera_id": f"video_{user_id}",
-                "timestamp": datetime.utcnow(),
-                "video_stats": {
-                    "total_frames": frame_count,
-                    "frames_with_weapons": frames_with_weapons,
-                    "total_detections": total_detections,
-                    "detection_rate": round(detection_rate * 100, 2)
-                },
-                "acknowledged": False
-            }
-            try:
-                await db.alerts.insert_one(alert_data)
-                print(f"✅ Video alert saved: {total_detections} detections ({danger_level})")
-            except Exception as e:
-                print(f"❌ Failed to save video alert: {e}")
-            
-            # Send Telegram alert with best detection frame
-            if best_detection_frame is not None and len(best_frame_detections) > 0:
-                # === ANALYZE PERSON-WEAPON IN BEST FRAME ===
-                person_detections = person_weapon_analyzer.detect_persons(best_detection_frame, conf_threshold=0.5)
-                person_count = len(person_detections)
-                
-                # Convert detections for analyzer
-                weapon_dicts = []
-                for det in best_frame_detections:
-                    weapon_dicts.append({
-                        'label': det.class_name,
-                        'confidence': det.confidence,
-                        'bbox': [int(det.bbox.x1), int(det.bbox.y1), int(det.bbox.x2), int(det.bbox.y2)]
-                    })
-                
-                analyzed_weapons = person_weapon_analyzer.analyze_weapon_person_relationship(
-                    weapon_dicts,
-                    person_detections
-                )
-                
-                # Update status with person analysis
-                _, analyzed_status = person_weapon_analyzer.determine_overall_threat(
-                    analyzed_weapons,
-                    person_count
-                )
-                
-                # Annotate the best frame with persons and weapons
-                alert_frame = best_detection_frame.copy()
-                
-                # Draw persons in green
-                for person in person_detections:
-                    px1, py1, px2, py2 = person['bbox']
-                    cv2.rectangle(alert_frame, (px1, py1), (px2, py2), (0, 255, 0), 2)
-                    cv2.putText(alert_frame, f"Person {person['confidence']:.2f}", 
-                               (px1, py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-                # Draw weapons in red
-                for i, det in enumerate(best_frame_detections):
-                    x1, y1 = int(det.bbox.x1), int(det.bbox.y1)
-                    x2, y2 = int(det.bbox.x2), int(det.bbox.y2)
-                    
-                    cv2.rectangle(alert_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    
-                    # Get status from analysis
-                    status = analyzed_weapons[i].get('status', 'unknown') if i < len(analyzed_weapons) else 'unknown'
-                    status_text = person_weapon_analyzer.get_status_vietnamese(status)
-                    
-                    label = f"{det.class_name} {det.confidence:.0%}"
-                    cv2.putText(alert_frame, label, (x1, y1 - 25),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
-                    cv2.putText(alert_frame, status_text, (x1, y1 - 10),
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
-                
-                print(f"🎬 Video Analysis: {person_count} person(s) in best frame - {analyzed_status}")
-                
-                telegram_alert.send_alert(
-                    camera_id=f"video_{user_id}",
-                    image=alert_frame,
-                    message=f"{analyzed_status} (Video)",
-                    detections=best_frame_detections,
-                    skip_cooldown=True
-                )
-        
-        # Cleanup
-        cap.release()
-        out.release()
-        
-        # Remove input video to save space
-        try:
-            os.remove(input_path)
-        except:
-            pass
-        
-        # Return result
-        return {
-            "status": "success",
-            "video_url": f"/api/v1/detection/video/result/{output_filename}",
-            "stats": {
-                "total_frames": frame_count,
-                "frames_with_weapons": frames_with_weapons,
-                "total_detections": total_detections,
-                "processing_time_seconds": round(processing_time, 2),
-                "average_fps": round(avg_fps, 1),
-                "video_duration_seconds": round(frame_count / fps, 2),
-                "resolution": f"{width}x{height}",
-                "fps": fps
-            },
-            "message": f"Processed {frame_count} frames. Found weapons in {frames_with_weapons} frames."
-        }
+    Blocks until the whole video is processed. Use POST /jobs for long videos.
+    
+    Args:
+        file: Video file (mp4, avi, etc.)
+        confidence: Confidence threshold (0.0-1.0)
+        model_type: "yolo" or "fasterrcnn"
+        workers: Number of worker processes (>1 splits the video into parallel chunks)
+        infer_every: Run inference on every Nth output frame and carry boxes over in between
+        output: "video" for an annotated MP4, "timeline" for a JSONL detection index
+            (timestamps, boxes, track IDs) to overlay on the original video client-side,
+            "scan" for a sparse search that only returns the intervals with weapons
+        scan_interval: Scan mode - seconds between coarse samples
+        scan_sampling: Scan mode - "interval" or "keyframes"
         
+    Returns:
+        Processed video with bounding boxes (or timeline_url and track summary, or hits)
+    """
+    user_id = current_user.get('user_id', 'unknown')
+    scan_options = _scan_options(output, scan_interval, scan_sampling)
+    input_path, output_path, output_filename = await _save_uploaded_video(file, user_id, output)
+    
+    # Process video (blocking pipeline runs off the event loop)
+    try:
+        return await run_in_threadpool(
+            process_video, input_path, output_path, output_filename, user_id, confidence,
+            workers=_clamp_workers(workers), infer_every=max(1, infer_every or 1), output=output,
+            scan_options=scan_options
+        )
     except Exception as e:
-        # Clean up on error
+        raise HTTPException(status_code=500, detail=f"Video processing failed: {str(e)}")
+    finally:
+        # Remove input video to save space
         if os.path.exists(input_path):
             try:
                 os.remove(input_path)
             except PermissionError:
                 pass
-        if os.path.exists(output_path):
-            try:
-                os.remove(output_path)
-            except PermissionError:
-                pass
-        raise HTTPException(status_code=500, detail=f"Video processing failed: {str(e)}")
+
+
+@router.post("/jobs", status_code=202)
+async def submit_video_job(
+    file: UploadFile = File(...),
+    confidence: Optional[float] = Form(0.55),
+    model_type: Optional[str] = Form("yolo"),
+    workers: Optional[int] = Form(1),
+    infer_every: Optional[int] = Form(1),
+    output: Optional[str] = Form("video"),
+    scan_interval: Optional[float] = Form(2.0),
+    scan_sampling: Optional[str] = Form("interval"),
+    # current_user: dict = Depends(get_current_user)  # Disabled for testing
+):
+    # Mock user for testing
+    current_user = {'user_id': 'test_user'}
+    """
+    Upload a video and queue it for background processing
+    
+    Returns immediately with a job ID. Poll GET /jobs/{job_id} or subscribe to
+    GET /jobs/{job_id}/events (SSE) or /jobs/{job_id}/ws for progress.
+    """
+    user_id = current_user.get('user_id', 'unknown')
+    scan_options = _scan_options(output, scan_interval, scan_sampling)
+    input_path, output_path, output_filename = await _save_uploaded_video(file, user_id, output)
+    
+    job = video_job_manager.submit(
+        input_path, output_path, output_filename, user_id,
+        confidence=confidence, model_type=model_type, workers=_clamp_workers(workers),
+        infer_every=max(1, infer_every or 1), output=output, scan_options=scan_options
+    )
+    return {
+        "job_id": job["job_id"],
+        "state": job["state"],
+        "status_url": f"/api/v1/detection/jobs/{job['job_id']}",
+        "events_url": f"/api/v1/detection/jobs/{job['job_id']}/events"
+    }
+
+
+@router.get("/jobs")
+async def list_video_jobs(limit: int = Query(50, ge=1, le=200)):
+    """List recent video jobs"""
+    return {"jobs": video_job_manager.list_jobs(limit)}
+
+
+@router.get("/jobs/{job_id}")
+async def get_video_job(job_id: str):
+    """
+    Get job state, percent complete, current fps and ETA
+    
+    The result (same payload as POST /detect/video) is included once completed.
+    """
+    job = video_job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return jsonable_encoder(job)
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_video_job(job_id: str):
+    """Cancel a queued or running job"""
+    if video_job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if not video_job_manager.cancel(job_id):
+        raise HTTPException(status_code=409, detail="Job is not active")
+    return {"job_id": job_id, "message": "Cancellation requested"}
+
+
+async def _job_updates(job_id: str, interval: float = 0.5):
+    """Yield the job every time it changes, until it reaches a terminal state"""
+    last = None
+    while True:
+        job = video_job_manager.get(job_id)
+        if job is None:
+            return
+        if job != last:
+            last = job
+            yield jsonable_encoder(job)
+        if job["state"] in TERMINAL_STATES:
+            return
+        await asyncio.sleep(interval)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_video_job_events(job_id: str):
+    """Server-Sent Events stream of job progress"""
+    if video_job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        async for job in _job_updates(job_id):
+            yield f"data: {json.dumps(job)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/jobs/{job_id}/ws")
+async def websocket_video_job(websocket: WebSocket, job_id: str):
+    """WebSocket stream of job progress (closes when the job finishes)"""
+    await websocket.accept()
+    try:
+        if video_job_manager.get(job_id) is None:
+            await websocket.send_json({"error": "Job not found"})
+            return
+        async for job in _job_updates(job_id):
+            await websocket.send_json(job)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        try:
+            await websocket.close()
+        except RuntimeError:
+            pass
 
 
 @router.get("/video/result/{filename}")
-async def get_processed_video(filename: str):
+async def get_processed_video(filename: str, request: Request):
     """
     Download or stream processed video
     
+    Supports Range requests (206 Partial Content) so players can seek without
+    downloading the whole file, and ETag / If-None-Match revalidation (304).
+    
     Args:
         filename: Name of the processed video file
         
     Returns:
-        Video file
+        Video file (or the requested byte range)
     """
-    file_path = os.path.join(settings.UPLOAD_DIR, "results", filename)
+    file_path = os.path.join(settings.UPLOAD_DIR, "results", os.path.basename(filename))
     
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Video not found")
     
+    return ranged_file_response(request, file_path, "video/mp4", filename=filename)
+
+
+@router.get("/timeline/{filename}")
+async def get_video_timeline(filename: str):
+    """
+    Download a detection timeline (JSON Lines, one record per changed frame)
+    
+    Args:
+        filename: Name of the timeline file
+        
+    Returns:
+        Timeline file
+    """
+    file_path = os.path.join(settings.UPLOAD_DIR, "results", os.path.basename(filename))
+    
+    if not filename.endswith(".jsonl") or not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Timeline not found")
+    
     return FileResponse(
         file_path,
-        media_type="video/mp4",
+        media_type="application/x-ndjson",
         filename=filename
     )
 
@@ -807,12 +643,24 @@ async def delete_processed_video(
 
 
 @router.get("/video/{filename}")
-async def get_video_file(filename: str):
+async def get_video_file(filename: str, request: Request):
     """Serve processed video file (legacy endpoint)"""
-    file_path = os.path.join(settings.UPLOAD_DIR, filename)
+    file_path = os.path.join(settings.UPLOAD_DIR, os.path.basename(filename))
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="Video not found")
-    return FileResponse(file_path, media_type="video/mp4")
+    return ranged_file_response(request, file_path, "video/mp4")
+
+
+@router.get("/scheduler/metrics")
+async def get_inference_scheduler_metrics():
+    """
+    Inference scheduler metrics per priority class (live, camera, interactive, batch)
+    
+    Returns:
+        Requests, waiting / running calls, queueing delay (avg, p95, max ms),
+        model time and its recent share vs. the guaranteed minimum share
+    """
+    return inference_scheduler.stats()
 
 
 @router.get("/models")
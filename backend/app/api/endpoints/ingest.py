@@ -0,0 +1,112 @@
+"""
+Edge ingest endpoints - detection events from cameras that run the model on the device
+"""
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.core.security import get_current_user, decode_access_token
+from app.schemas.edge import EdgeBatch
+from app.services.edge_ingest import edge_ingestor, STATUS_ACCEPTED, STATUS_DUPLICATE, STATUS_REJECTED
+
+router = APIRouter()
+
+
+def summarize(results: List[dict]) -> dict:
+    """Per-event results plus counts per status"""
+    return {
+        "accepted": sum(1 for r in results if r["status"] == STATUS_ACCEPTED),
+        "duplicates": sum(1 for r in results if r["status"] == STATUS_DUPLICATE),
+        "rejected": sum(1 for r in results if r["status"] == STATUS_REJECTED),
+        "results": results,
+    }
+
+
+def validation_errors(error: ValidationError, limit: int = 5) -> List[str]:
+    """Short messages for the first errors (without echoing base64 images back)"""
+    return [f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()[:limit]]
+
+
+@router.post("/events")
+async def ingest_events(
+    batch: EdgeBatch,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Ingest a batch of detection events from edge devices
+
+    Each event is one inferred frame of a camera: its detections (empty for
+    a heartbeat), optionally with evidence crops per detection, a snapshot of
+    the frame and device-side person boxes for pairing. Events go through the
+    incident / alert pipeline of the live sources (camera "edge_<camera_id>").
+
+    Retrying a batch is safe: events already ingested come back as
+    "duplicate". An event is acknowledged once it is "accepted" or "duplicate";
+    "rejected" events (stale, malformed) should not be resent unchanged.
+
+    Returns:
+        {"accepted", "duplicates", "rejected", "results": [{"event_id", "camera_id", "status", ...}]}
+    """
+    results = await run_in_threadpool(edge_ingestor.ingest, batch.events, current_user["user_id"])
+    return summarize(results)
+
+
+@router.get("/stats")
+async def get_ingest_stats():
+    """Edge ingest counters and per camera device / last seen time"""
+    return edge_ingestor.stats()
+
+
+@router.websocket("/ws")
+async def ingest_websocket(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None)
+):
+    """
+    Stream detection events from an edge device
+
+    Client sends one event or {"events": [...]} per text message (same schema
+    as POST /events) and gets the same summary back for each message. The
+    open incidents of the cameras seen on the socket are closed when it
+    disconnects.
+
+    Args:
+        token: Access token of the device account (required)
+    """
+    try:
+        payload = decode_access_token(token) if token else {}
+    except HTTPException:
+        payload = {}
+    device = payload.get("sub")
+    if device is None:
+        await websocket.close(code=1008)
+        return
+
+    await websocket.accept()
+    cameras = set()
+    print(f"✅ Edge device connected: {device}")
+
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                data = json.loads(text)
+                batch = EdgeBatch.model_validate(data if isinstance(data, dict) and "events" in data
+                                                 else {"events": [data]})
+            except json.JSONDecodeError:
+                await websocket.send_json({"error": "Invalid JSON"})
+                continue
+            except ValidationError as e:
+                await websocket.send_json({"error": "Invalid events", "details": validation_errors(e)})
+                continue
+
+            results = await run_in_threadpool(edge_ingestor.ingest, batch.events, device)
+            cameras.update(r["camera_id"] for r in results if r["status"] == STATUS_ACCEPTED)
+            await websocket.send_json(summarize(results))
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        edge_ingestor.close_cameras(cameras)
+        print(f"🔌 Edge device disconnected: {device}")
@@ -1,194 +1,189 @@
 """
 WebSocket endpoint for realtime weapon detection
-OPTIMIZED: Non-blocking alerts with threading
+OPTIMIZED: Non-blocking alerts through a bounded alert worker pool
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-import cv2
 import numpy as np
 import base64
 import json
+import re
 import time
-import threading
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import asyncio
-from datetime import datetime
-from pathlib import Path
+from starlette.concurrency import run_in_threadpool
 
+from app.core.config import settings
 from app.core.security import get_current_user_ws
-from app.services.detection_service import detection_service
-from app.services.alert_service import telegram_alert
-from app.services.person_weapon_analyzer import person_weapon_analyzer
-from app.core.database import get_database
+from app.services.realtime_protocol import (
+    decode_frame, decode_channel_frame, encode_detections, encode_error, ProtocolError
+)
+from app.services.frame_decode import FrameDecoder
+from app.services.detection_delta import DeltaEncoder
+from app.services.inference_scheduler import QOS_LIVE
+from app.services.realtime_detection import (
+    detect_frame, detect_frames, incident_detections, incident_aggregator, submit_incident_events, alert_pool
+)
 
 router = APIRouter()
 
-# Snapshot directory
-SNAPSHOT_DIR = Path("runs/alerts_snapshots")
-SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+# YOLO input size (detect_with_yolo downscales to this anyway)
+REALTIME_DECODE_SIZE = 640
 
+# JSON response modes: full detection list, or only changes (see detection_delta.py)
+RESPONSE_FULL = "full"
+RESPONSE_DELTA = "delta"
 
-# === ALERT COOLDOWN TRACKING ===
-alert_cooldowns = {}  # {client_id: last_alert_timestamp}
-ALERT_COOLDOWN_SECONDS = 0  # 0 = No cooldown, send EVERY detection
+SESSION_MODEL_TYPES = ("yolo", "fasterrcnn")
+# Channel names end up in incident camera IDs and snapshot file names (same rule as camera IDs)
+SESSION_CHANNEL_NAME = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
 
 
-def can_send_alert(client_id: str) -> bool:
+def decode_json_frame(data: str, decoder: FrameDecoder) -> Tuple[np.ndarray, Tuple[float, float], Optional[int]]:
     """
-    Check if enough time has passed since last alert
+    Decode a legacy JSON text message {"frame": "<base64 or data URL>", "seq": optional int}
     
-    Args:
-        client_id: Unique client identifier
-        
     Returns:
-        bool: True if alert can be sent, False if on cooldown
+        (frame, scale, seq) - see FrameDecoder.decode for scale; seq is None
+        if the client did not number its frames
+    
+    Raises:
+        ValueError: With the error message to send back to the client
     """
-    current_time = time.time()
-    last_alert_time = alert_cooldowns.get(client_id, 0)
+    try:
+        message = json.loads(data)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON")
+    return decode_frame_message(message, decoder)
+
+
+def decode_frame_message(message, decoder: FrameDecoder) -> Tuple[np.ndarray, Tuple[float, float], Optional[int]]:
+    """decode_json_frame for an already parsed message"""
+    frame_data = message.get("frame") if isinstance(message, dict) else None
+    if not frame_data:
+        raise ValueError("No frame data")
     
-    if current_time - last_alert_time >= ALERT_COOLDOWN_SECONDS:
-        alert_cooldowns[client_id] = current_time
-        return True
-    return False
+    try:
+        # Remove data URL prefix if present
+        if "base64," in frame_data:
+            frame_data = frame_data.split("base64,")[1]
+        
+        frame_bytes = base64.b64decode(frame_data)
+        frame, scale = decoder.decode(frame_bytes)
+    except Exception as e:
+        raise ValueError(f"Frame decode failed: {str(e)}")
+    
+    if frame is None:
+        raise ValueError("Invalid frame data")
+    seq = message.get("seq")
+    return frame, scale, seq if isinstance(seq, int) else None
 
 
-def send_alert_background(client_id: str, frame: np.ndarray, detections: list):
+def parse_roi(roi) -> Optional[list]:
     """
-    Background thread function for sending alerts (non-blocking)
+    Parse an ROI given as "x,y,w,h" string or [x, y, w, h] list
     
-    ⚠️ This function runs in a separate thread to avoid blocking WebSocket
+    Returns:
+        [x, y, w, h] ints, or None if no ROI was given
     
-    Args:
-        client_id: Unique client identifier
-        frame: Video frame (already copied with frame.copy())
-        detections: List of weapon detections
+    Raises:
+        ValueError: If the ROI is malformed
     """
-    try:
-        # === DETECT PERSONS IN FRAME ===
-        person_detections = person_weapon_analyzer.detect_persons(frame, conf_threshold=0.5)
-        person_count = len(person_detections)
-        
-        # === ANALYZE WEAPON-PERSON RELATIONSHIP ===
-        weapon_dicts = []
-        for det in detections:
-            weapon_dicts.append({
-                'label': det.class_name,
-                'confidence': det.confidence,
-                'bbox': [int(det.bbox.x1), int(det.bbox.y1), int(det.bbox.x2), int(det.bbox.y2)]
-            })
-        
-        analyzed_weapons = person_weapon_analyzer.analyze_weapon_person_relationship(
-            weapon_dicts, 
-            person_detections
-        )
-        
-        # === DETERMINE OVERALL THREAT ===
-        danger_level, message = person_weapon_analyzer.determine_overall_threat(
-            analyzed_weapons,
-            person_count
-        )
-        
-        weapon_count = len(detections)
-        print(f"🔍 Analysis: {person_count} person(s), {weapon_count} weapon(s) - Status: {message}")
-        
-        # === SAVE SNAPSHOT IMAGE ===
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        snapshot_filename = f"alert_{client_id}_{timestamp}.jpg"
-        snapshot_path = SNAPSHOT_DIR / snapshot_filename
-        
-        # Draw detections on frame for snapshot
-        annotated_frame = frame.copy()
-        
-        # Draw persons in green
-        for person in person_detections:
-            px1, py1, px2, py2 = person['bbox']
-            cv2.rectangle(annotated_frame, (px1, py1), (px2, py2), (0, 255, 0), 2)
-            cv2.putText(annotated_frame, f"Person {person['confidence']:.2f}", 
-                       (px1, py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-        
-        # Draw weapons in red with status
-        for i, det in enumerate(detections):
-            x1, y1 = int(det.bbox.x1), int(det.bbox.y1)
-            x2, y2 = int(det.bbox.x2), int(det.bbox.y2)
-            
-            # Draw bounding box
-            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
-            
-            # Get status from analyzed weapons
-            status = analyzed_weapons[i].get('status', 'unknown') if i < len(analyzed_weapons) else 'unknown'
-            status_text = person_weapon_analyzer.get_status_vietnamese(status)
-            
-            # Draw label with status
-            label = f"{det.class_name} {det.confidence:.2f}"
-            cv2.putText(annotated_frame, label, (x1, y1 - 25),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
-            cv2.putText(annotated_frame, status_text, (x1, y1 - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
-        
-        # Save snapshot
-        cv2.imwrite(str(snapshot_path), annotated_frame)
-        print(f"📸 Snapshot saved: {snapshot_filename}")
-        
-        # === SAVE TO MONGODB (sync client for threading) ===
-        try:
-            from pymongo import MongoClient
-            from app.core.config import settings
-            
-            # Use sync MongoDB client in thread
-            sync_client = MongoClient(settings.MONGODB_URL)
-            sync_db = sync_client[settings.MONGODB_DB_NAME]
-            
-            # Get highest confidence detection
-            max_confidence = max(det.confidence for det in detections)
-            primary_weapon = max(detections, key=lambda d: d.confidence).class_name
-            weapon_types = list(set([det.class_name for det in detections]))
-            
-            # Get weapon statuses from analysis
-            weapon_statuses = [w.get('status', 'unknown') for w in analyzed_weapons]
-            held_count = sum(1 for s in weapon_statuses if s == 'held_by_person')
-            
-            alert_data = {
-                "weapon_class": primary_weapon,
-                "confidence": float(max_confidence),
-                "total_weapons": weapon_count,
-                "all_weapons": weapon_types,
-                "status": message,  # Use analyzed status message
-                "danger_level": danger_level,  # Use analyzed danger level
-                "location": "Realtime Detection",
-                "camera_id": client_id,
-                "image_path": f"/snapshots/{snapshot_filename}",
-                "timestamp": datetime.utcnow(),
-                "acknowledged": False,
-                "person_count": person_count,
-                "held_by_person": held_count > 0,
-                "weapon_statuses": weapon_statuses
-            }
-            
-            result = sync_db.alerts.insert_one(alert_data)
-            sync_client.close()
-            
-            print(f"💾 Alert saved to MongoDB: {result.inserted_id}")
-            
-        except Exception as db_error:
-            print(f"⚠️ MongoDB save failed: {db_error}")
-            # Continue even if DB save fails
-        
-        # === TELEGRAM ALERT ===
-        # Send EVERY detection immediately (skip cooldown)
-        telegram_alert.send_alert(
-            camera_id=client_id,
-            image=annotated_frame,  # Send annotated frame
-            message=message,
-            detections=detections,
-            skip_cooldown=True  # Always send, no cooldown
-        )
-        
-        print(f"✅ Alert triggered: {client_id} - {weapon_count} weapons - Danger: {danger_level}")
-        
-    except Exception as e:
-        print(f"❌ Alert failed (background): {e}")
-        import traceback
-        traceback.print_exc()
-        # Don't propagate error to main WebSocket loop
+    if roi is None or roi == "":
+        return None
+    parts = [int(p) for p in (roi.split(',') if isinstance(roi, str) else roi)]
+    if len(parts) != 4:
+        raise ValueError(f"ROI needs 4 values (x,y,w,h), got {len(parts)}")
+    return parts
+
+
+def scale_roi(roi_box: Optional[list], scale: Tuple[float, float]) -> Optional[list]:
+    """Map an ROI [x, y, w, h] given in original-frame pixels into decoded-frame pixels"""
+    if not roi_box or scale == (1.0, 1.0):
+        return roi_box
+    sx, sy = scale
+    x, y, w, h = roi_box
+    return [x / sx, y / sy, w / sx, h / sy]
+
+
+class LatestFrameMailbox:
+    """
+    Single-slot mailbox between the receive and inference tasks of one WebSocket
+    
+    put() never blocks: a newer frame replaces one that was not picked up yet
+    (latest frame wins), so a slow detector only ever sees the newest frame
+    and latency stays bounded instead of frames piling up in the socket.
+    """
+    
+    def __init__(self):
+        self._item = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+    
+    def put(self, item):
+        if self._item is not None:
+            self.dropped += 1
+        self._item = item
+        self.received += 1
+        self._event.set()
+    
+    async def get(self):
+        """Next (newest) item, or None once the mailbox is closed and empty"""
+        while self._item is None:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        item, self._item = self._item, None
+        return item
+    
+    def close(self):
+        self._closed = True
+        self._event.set()
+
+
+class ChannelMailbox:
+    """
+    LatestFrameMailbox with one slot per channel of a multiplexed session
+    
+    get_all() hands the inference task the newest frame of every channel
+    that has one - those frames become one batched model call.
+    """
+    
+    def __init__(self):
+        self._items: Dict[int, tuple] = {}
+        self._event = asyncio.Event()
+        self._closed = False
+        self.received: Dict[int, int] = {}
+        self.dropped: Dict[int, int] = {}
+    
+    def put(self, channel: int, item):
+        if channel in self._items:
+            self.dropped[channel] = self.dropped.get(channel, 0) + 1
+        self._items[channel] = item
+        self.received[channel] = self.received.get(channel, 0) + 1
+        self._event.set()
+    
+    def discard(self, channel: int):
+        """Forget a closed channel (including a frame not picked up yet)"""
+        self._items.pop(channel, None)
+        self.received.pop(channel, None)
+        self.dropped.pop(channel, None)
+    
+    async def get_all(self) -> Optional[Dict[int, tuple]]:
+        """{channel: newest item} of all channels with a pending frame, or None once closed and empty"""
+        while not self._items:
+            if self._closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        items, self._items = self._items, {}
+        return items
+    
+    def close(self):
+        self._closed = True
+        self._event.set()
 
 
 class ConnectionManager:
@@ -209,26 +204,52 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+@router.get("/alert-pool/metrics")
+async def get_alert_pool_metrics():
+    """
+    Realtime alert pool metrics
+    
+    Returns:
+        Queue depth, submitted / coalesced / dropped / processed / failed counts
+        and per-stage latency (queue_wait, analysis, snapshot, database, notify, total)
+    """
+    return alert_pool.metrics()
+
+
 @router.websocket("/ws/realtime-detect")
 async def websocket_realtime_detect(
     websocket: WebSocket,
     token: Optional[str] = Query(None),
     confidence: float = Query(0.5),
     model_type: str = Query("yolo"),
-    roi: Optional[str] = Query(None)  # NEW: ROI parameter "x,y,w,h"
+    roi: Optional[str] = Query(None),  # NEW: ROI parameter "x,y,w,h"
+    response_mode: str = Query(RESPONSE_FULL, pattern="^(full|delta)$")
 ):
     """
     WebSocket endpoint for realtime detection
     
-    OPTIMIZED: Non-blocking with threading for alerts
+    OPTIMIZED: Non-blocking alerts (bounded worker pool)
     NEW: ROI (Region of Interest) filtering support
     
-    Client sends: base64 encoded frame
-    Server sends: {
+    Client sends either:
+        - binary: 16-byte header (seq, timestamp, flags) + raw JPEG/WebP bytes
+          (see app/services/realtime_protocol.py), answered with packed binary detections
+        - text (legacy): {"frame": "<base64 data URL>", "seq": optional int}, answered with JSON
+    Server sends (JSON mode): {
+        "seq": int,                # sequence number of the answered frame
         "detections": [...],
         "processing_time": float,
-        "total_weapons": int
+        "total_weapons": int,
+        "dropped_frames": int      # frames replaced by newer ones before inference
     }
+    With response_mode=delta, JSON responses carry "ver" and
+    "add" / "upd" / "del" (or a full "objects" snapshot) instead of
+    "detections" - see app/services/detection_delta.py. The client may send
+    {"resync": true} to get a snapshot with the next response.
+    
+    Receiving and inference run as separate tasks joined by a single-slot
+    mailbox: when the client sends faster than frames can be processed, stale
+    frames are dropped and only the newest one is inferred.
     
     Args:
         roi: Optional ROI string in format "x,y,w,h" (e.g. "100,150,400,300")
@@ -242,10 +263,8 @@ async def websocket_realtime_detect(
     roi_box = None
     if roi:
         try:
-            parts = [int(p.strip()) for p in roi.split(',')]
-            if len(parts) == 4:
-                roi_box = parts  # [x, y, w, h]
-                print(f"🎯 ROI enabled for {client_id}: {roi_box}")
+            roi_box = parse_roi(roi)  # [x, y, w, h]
+            print(f"🎯 ROI enabled for {client_id}: {roi_box}")
         except Exception as e:
             print(f"⚠️ Invalid ROI format: {roi} - {e}")
             roi_box = None
@@ -256,119 +275,99 @@ async def websocket_realtime_detect(
     frame_count = 0
     last_fps_time = time.time()
     fps = 0
+    receiver = None
+    
+    mailbox = LatestFrameMailbox()
+    # JPEGs are decoded at the smallest 1/2, 1/4, 1/8 scale that still covers the model input
+    decoder = FrameDecoder(target_size=REALTIME_DECODE_SIZE)
+    delta_encoder = DeltaEncoder() if response_mode == RESPONSE_DELTA else None
+    
+    async def send_error(error: str, binary: bool, seq: int = 0, timestamp: float = 0.0):
+        if binary:
+            await websocket.send_bytes(encode_error(seq, timestamp, error))
+        else:
+            await manager.send_json(websocket, {
+                "error": error,
+                "seq": seq,
+                "detections": [],
+                "total_weapons": 0,
+                "dropped_frames": mailbox.dropped
+            })
+    
+    async def receive_frames():
+        # Reads as fast as the client sends; only the newest unprocessed frame is kept
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                text = message.get("text")
+                if delta_encoder is not None and text and len(text) < 64 and '"resync"' in text:
+                    # Control message - handled here so a newer frame cannot replace it
+                    delta_encoder.request_snapshot()
+                    continue
+                mailbox.put((message, time.time()))
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            mailbox.close()
     
     try:
         print(f"✅ WebSocket connected: {client_id}")
+        receiver = asyncio.create_task(receive_frames())
         
         while True:
-            # Receive frame from client
-            data = await websocket.receive_text()
+            item = await mailbox.get()
+            if item is None:
+                raise WebSocketDisconnect(1000)
+            message, received_at = item
+            
+            binary = message.get("bytes") is not None
+            seq, timestamp = mailbox.received - 1, 0.0
             
             try:
-                message = json.loads(data)
-                frame_data = message.get("frame")
-                
-                if not frame_data:
-                    await manager.send_json(websocket, {
-                        "error": "No frame data",
-                        "detections": [],
-                        "total_weapons": 0
-                    })
-                    continue
-                
-                # Decode base64 frame
-                try:
-                    # Remove data URL prefix if present
-                    if "base64," in frame_data:
-                        frame_data = frame_data.split("base64,")[1]
-                    
-                    frame_bytes = base64.b64decode(frame_data)
-                    nparr = np.frombuffer(frame_bytes, np.uint8)
-                    frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                    
+                # Decode frame (frames dropped from the mailbox are never decoded)
+                if binary:
+                    try:
+                        header, payload = decode_frame(message["bytes"])
+                    except ProtocolError as e:
+                        await send_error(str(e), binary)
+                        continue
+                    seq, timestamp = header.seq, header.timestamp
+                    frame, scale = await run_in_threadpool(decoder.decode, payload)
                     if frame is None:
-                        await manager.send_json(websocket, {
-                            "error": "Invalid frame data",
-                            "detections": [],
-                            "total_weapons": 0
-                        })
+                        await send_error("Invalid frame data", binary, seq, timestamp)
                         continue
-                        
-                except Exception as e:
-                    await manager.send_json(websocket, {
-                        "error": f"Frame decode failed: {str(e)}",
-                        "detections": [],
-                        "total_weapons": 0
-                    })
-                    continue
+                else:
+                    try:
+                        frame, scale, client_seq = await run_in_threadpool(
+                            decode_json_frame, message.get("text") or "", decoder
+                        )
+                    except ValueError as e:
+                        await send_error(str(e), binary, seq)
+                        continue
+                    if client_seq is not None:
+                        seq = client_seq
                 
-                # === WEAPON DETECTION ===
+                # === WEAPON DETECTION (worker thread - the receive task keeps draining the socket) ===
                 start_time = time.time()
                 
                 try:
-                    detections, _, model_used = detection_service.detect(
-                        frame, model_type=model_type, conf_threshold=confidence
+                    detections = await run_in_threadpool(
+                        detect_frame, frame, model_type, confidence, scale_roi(roi_box, scale)
                     )
                 except Exception as e:
                     print(f"❌ Detection error: {e}")
-                    await manager.send_json(websocket, {
-                        "error": f"Detection failed: {str(e)}",
-                        "detections": [],
-                        "total_weapons": 0
-                    })
+                    await send_error(f"Detection failed: {str(e)}", binary, seq, timestamp)
                     continue
                 
-                # === ROI FILTERING ===
-                original_count = len(detections)
-                if roi_box and original_count > 0:
-                    # Import weapon_detector for ROI filtering
-                    from app.services.weapon_detector import weapon_detector
-                    
-                    # Convert detections to format expected by weapon_detector
-                    det_dicts = [
-                        {
-                            "label": det.class_name,
-                            "confidence": det.confidence,
-                            "bbox": [det.bbox.x1, det.bbox.y1, det.bbox.x2, det.bbox.y2],
-                            "class_id": 0
-                        }
-                        for det in detections
-                    ]
-                    
-                    # Filter by ROI
-                    filtered_dicts = weapon_detector.filter_by_roi(det_dicts, roi_box)
-                    
-                    # Convert back to Detection objects
-                    from app.schemas.detection import Detection, BoundingBox
-                    detections = [
-                        Detection(
-                            class_name=d["label"],
-                            confidence=d["confidence"],
-                            bbox=BoundingBox(
-                                x1=d["bbox"][0],
-                                y1=d["bbox"][1],
-                                x2=d["bbox"][2],
-                                y2=d["bbox"][3]
-                            )
-                        )
-                        for d in filtered_dicts
-                    ]
-                    
-                    filtered_count = len(detections)
-                    if original_count > filtered_count:
-                        print(f"🎯 ROI Filter: {original_count} → {filtered_count} detections ({original_count - filtered_count} outside ROI)")
-                
                 processing_time = time.time() - start_time
                 
                 # === NON-BLOCKING ALERT LOGIC ===
-                # Send EVERY detection (no cooldown check)
-                if len(detections) > 0:
-                    # Always send alerts, regardless of danger level or cooldown
-                    threading.Thread(
-                        target=send_alert_background,
-                        args=(client_id, frame.copy(), detections),
-                        daemon=True
-                    ).start()
+                # Every frame goes through the aggregator (frames without detections close incidents);
+                # only incident open / escalation / close reach the alert pool
+                events = incident_aggregator.update(client_id, incident_detections(detections))
+                submit_incident_events(client_id, events, frame, detections)
                 
                 # Calculate FPS
                 frame_count += 1
@@ -379,41 +378,47 @@ async def websocket_realtime_detect(
                     last_fps_time = current_time
                 
                 # === IMMEDIATE RESPONSE (NO BLOCKING) ===
-                response = {
-                    "detections": [
-                        {
-                            "class_name": det.class_name,
-                            "confidence": det.confidence,
-                            "bbox": {
-                                "x1": det.bbox.x1,
-                                "y1": det.bbox.y1,
-                                "x2": det.bbox.x2,
-                                "y2": det.bbox.y2
-                            }
+                # Boxes mapped back from the reduced decode to the client's frame size
+                sx, sy = scale
+                detection_dicts = [
+                    {
+                        "class_name": det.class_name,
+                        "confidence": det.confidence,
+                        "bbox": {
+                            "x1": det.bbox.x1 * sx,
+                            "y1": det.bbox.y1 * sy,
+                            "x2": det.bbox.x2 * sx,
+                            "y2": det.bbox.y2 * sy
                         }
-                        for det in detections
-                    ],
-                    "processing_time": processing_time,
-                    "total_weapons": len(detections),
-                    "fps": round(fps, 1),
-                    "frame_count": frame_count
-                }
+                    }
+                    for det in detections
+                ]
                 
-                await manager.send_json(websocket, response)
+                if binary:
+                    await websocket.send_bytes(encode_detections(
+                        seq, timestamp, detection_dicts, processing_time, fps, frame_count, mailbox.dropped
+                    ))
+                else:
+                    if delta_encoder is not None:
+                        detection_fields = delta_encoder.encode(detection_dicts)
+                    else:
+                        detection_fields = {"detections": detection_dicts}
+                    await manager.send_json(websocket, {
+                        "seq": seq,
+                        **detection_fields,
+                        "processing_time": processing_time,
+                        "total_weapons": len(detections),
+                        "fps": round(fps, 1),
+                        "frame_count": frame_count,
+                        "dropped_frames": mailbox.dropped,
+                        "server_latency": round(time.time() - received_at, 4)
+                    })
                 
-            except json.JSONDecodeError:
-                await manager.send_json(websocket, {
-                    "error": "Invalid JSON",
-                    "detections": [],
-                    "total_weapons": 0
-                })
+            except (WebSocketDisconnect, RuntimeError):
+                raise
             except Exception as e:
                 print(f"❌ Frame processing error: {e}")
-                await manager.send_json(websocket, {
-                    "error": str(e),
-                    "detections": [],
-                    "total_weapons": 0
-                })
+                await send_error(str(e), binary, seq, timestamp)
                 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
@@ -422,9 +427,338 @@ async def websocket_realtime_detect(
         print(f"❌ WebSocket error: {e}")
         manager.disconnect(websocket)
     finally:
+        if receiver is not None:
+            receiver.cancel()
+        submit_incident_events(client_id, incident_aggregator.close_camera(client_id))
         try:
             if websocket in manager.active_connections:
                 manager.disconnect(websocket)
         except:
             pass
         print(f"🛑 WebSocket closed: {client_id}")
+
+
+@router.websocket("/ws/realtime-session")
+async def websocket_realtime_session(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None)
+):
+    """
+    Multiplexed realtime detection: many camera channels on one WebSocket
+    
+    A control-room client opens a channel per camera instead of a socket per
+    camera. Each channel has its own confidence, model, ROI and response mode;
+    the newest pending frame of every channel is detected in one batched model
+    call per model type, and incidents are tracked per channel.
+    
+    Client sends (text, JSON):
+        {"type": "open", "channel": "gate-1", "confidence": 0.5, "model_type": "yolo",
+         "roi": "x,y,w,h", "response_mode": "full"}     # also updates an open channel
+        {"type": "close", "channel": "gate-1"}
+        {"type": "resync", "channel": "gate-1"}          # delta mode: snapshot next
+        {"channel": "gate-1", "frame": "<base64 data URL>", "seq": optional int}
+    or binary MSG_CHANNEL_FRAME messages (header + channel number + JPEG/WebP,
+    see app/services/realtime_protocol.py), answered with MSG_CHANNEL_DETECTIONS.
+    
+    Server sends (JSON):
+        {"type": "opened", "channel": "gate-1", "channel_id": 0, ...settings}
+        {"type": "closed", "channel": "gate-1"}
+        {"type": "detections", "channel": "gate-1", "channel_id": 0, "seq": int,
+         "detections": [...] (or delta fields), "processing_time": float,
+         "batch_size": int, "total_weapons": int, "fps": float,
+         "frame_count": int, "dropped_frames": int, "server_latency": float}
+        {"type": "error", "channel": "gate-1" or null, "error": str}
+    
+    "channel" may be given as name or as channel_id in every client message.
+    """
+    await manager.connect(websocket)
+    
+    session_id = f"ws_{id(websocket)}_{int(time.time())}"
+    channels: Dict[int, dict] = {}    # channel_id -> state
+    channel_ids: Dict[str, int] = {}  # name -> channel_id
+    next_channel_id = 0
+    receiver = None
+    
+    mailbox = ChannelMailbox()
+    decoder = FrameDecoder(target_size=REALTIME_DECODE_SIZE)
+    send_lock = asyncio.Lock()  # Control replies (receive task) and results (inference task) share the socket
+    
+    async def send_json(data: dict):
+        async with send_lock:
+            await manager.send_json(websocket, data)
+    
+    async def send_bytes(data: bytes):
+        async with send_lock:
+            await websocket.send_bytes(data)
+    
+    async def send_error(error: str, channel: Optional[dict] = None, binary: bool = False,
+                         seq: int = 0, timestamp: float = 0.0):
+        if binary and channel is not None:
+            await send_bytes(encode_error(seq, timestamp, error, channel["id"]))
+        else:
+            await send_json({
+                "type": "error",
+                "channel": channel["name"] if channel else None,
+                "seq": seq,
+                "error": error,
+            })
+    
+    def find_channel(ref) -> Optional[dict]:
+        if isinstance(ref, int) and not isinstance(ref, bool):
+            return channels.get(ref)
+        if isinstance(ref, str):
+            channel_id = channel_ids.get(ref)
+            return channels.get(channel_id) if channel_id is not None else None
+        return None
+    
+    def close_channel(channel: dict):
+        del channels[channel["id"]]
+        del channel_ids[channel["name"]]
+        mailbox.discard(channel["id"])
+        submit_incident_events(channel["camera_id"], incident_aggregator.close_camera(channel["camera_id"]))
+    
+    async def open_channel(message: dict):
+        nonlocal next_channel_id
+        name = message.get("channel")
+        if not isinstance(name, str) or not SESSION_CHANNEL_NAME.match(name):
+            await send_error("Channel name must be 1-64 letters, digits, '_' or '-'")
+            return
+        channel = find_channel(name)
+        if channel is None and len(channels) >= settings.REALTIME_SESSION_MAX_CHANNELS:
+            await send_error(f"Too many channels (max {settings.REALTIME_SESSION_MAX_CHANNELS})")
+            return
+        
+        current = channel or {}
+        try:
+            confidence = float(message.get("confidence", current.get("confidence", 0.5)))
+            if not 0.0 <= confidence <= 1.0:
+                raise ValueError("confidence must be between 0 and 1")
+            model_type = message.get("model_type", current.get("model_type", "yolo"))
+            if model_type not in SESSION_MODEL_TYPES:
+                raise ValueError(f"model_type must be one of {', '.join(SESSION_MODEL_TYPES)}")
+            roi_box = parse_roi(message["roi"]) if "roi" in message else current.get("roi")
+            response_mode = message.get("response_mode", current.get("response_mode", RESPONSE_FULL))
+            if response_mode not in (RESPONSE_FULL, RESPONSE_DELTA):
+                raise ValueError("response_mode must be full or delta")
+        except (TypeError, ValueError) as e:
+            await send_error(f"Invalid channel settings: {e}", channel)
+            return
+        
+        if channel is None:
+            while next_channel_id in channels:  # Ids wrap at 0xFFFF - skip those of open channels
+                next_channel_id = (next_channel_id + 1) & 0xFFFF
+            channel = {
+                "id": next_channel_id,
+                "name": name,
+                "camera_id": f"{session_id}_{name}",  # Incidents / alerts are per channel
+                "frame_count": 0,
+                "last_fps_time": time.time(),
+                "fps": 0.0,
+                "delta": None,
+            }
+            next_channel_id = (next_channel_id + 1) & 0xFFFF
+            channels[channel["id"]] = channel
+            channel_ids[name] = channel["id"]
+            print(f"📺 Channel opened: {session_id} - {name} (#{channel['id']})")
+        if response_mode == RESPONSE_DELTA and channel["delta"] is None:
+            channel["delta"] = DeltaEncoder()
+        elif response_mode == RESPONSE_FULL:
+            channel["delta"] = None
+        channel.update(confidence=confidence, model_type=model_type, roi=roi_box, response_mode=response_mode)
+        
+        await send_json({
+            "type": "opened",
+            "channel": name,
+            "channel_id": channel["id"],
+            "confidence": confidence,
+            "model_type": model_type,
+            "roi": roi_box,
+            "response_mode": response_mode,
+        })
+    
+    async def handle_text(text: str, received_at: float):
+        # Parsed here (not in the worker) since the channel decides the mailbox slot
+        try:
+            message = json.loads(text)
+        except json.JSONDecodeError:
+            await send_error("Invalid JSON")
+            return
+        if not isinstance(message, dict):
+            await send_error("Message must be a JSON object")
+            return
+        
+        kind = message.get("type", "frame")
+        if kind == "open":
+            await open_channel(message)
+            return
+        channel = find_channel(message.get("channel"))
+        if channel is None:
+            await send_error(f"Unknown channel: {message.get('channel')}")
+        elif kind == "frame":
+            # Frames without "seq" are numbered per channel
+            mailbox.put(channel["id"], {"channel": channel, "binary": False, "data": message,
+                                        "received_at": received_at, "index": mailbox.received.get(channel["id"], 0)})
+        elif kind == "close":
+            close_channel(channel)
+            await send_json({"type": "closed", "channel": channel["name"]})
+            print(f"📺 Channel closed: {session_id} - {channel['name']}")
+        elif kind == "resync":
+            if channel["delta"] is not None:
+                channel["delta"].request_snapshot()
+        else:
+            await send_error(f"Unknown message type: {kind}", channel)
+    
+    async def receive_messages():
+        # Control messages are handled right away; frames go to the per-channel mailbox
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                received_at = time.time()
+                if message.get("bytes") is not None:
+                    try:
+                        header, channel_id, payload = decode_channel_frame(message["bytes"])
+                    except ProtocolError as e:
+                        await send_error(str(e))
+                        continue
+                    channel = channels.get(channel_id)
+                    if channel is None:
+                        await send_error(f"Unknown channel: {channel_id}")
+                        continue
+                    mailbox.put(channel_id, {"channel": channel, "binary": True, "data": (header, payload),
+                                             "received_at": received_at})
+                else:
+                    await handle_text(message.get("text") or "", received_at)
+        except (WebSocketDisconnect, RuntimeError):
+            pass
+        finally:
+            mailbox.close()
+    
+    def decode_round(items: list) -> list:
+        """Decode the frames of one round (worker thread); entries get "frame" / "scale" or "error" """
+        for entry in items:
+            if entry["binary"]:
+                header, payload = entry["data"]
+                entry["seq"], entry["timestamp"] = header.seq, header.timestamp
+                entry["frame"], entry["scale"] = decoder.decode(payload)
+                if entry["frame"] is None:
+                    entry["error"] = "Invalid frame data"
+                continue
+            seq = entry["data"].get("seq")
+            entry["seq"], entry["timestamp"] = seq if isinstance(seq, int) else entry["index"], 0.0
+            try:
+                entry["frame"], entry["scale"], _ = decode_frame_message(entry["data"], decoder)
+            except ValueError as e:
+                entry["error"] = str(e)
+        return items
+    
+    try:
+        print(f"✅ WebSocket session connected: {session_id}")
+        receiver = asyncio.create_task(receive_messages())
+        
+        while True:
+            pending = await mailbox.get_all()
+            if pending is None:
+                raise WebSocketDisconnect(1000)
+            items = list(pending.values())
+            
+            # Frames dropped from the mailbox are never decoded
+            await run_in_threadpool(decode_round, items)
+            
+            # One batched model call per model type (usually a single batch)
+            batches: Dict[str, list] = {}
+            for entry in items:
+                if "error" in entry:
+                    await send_error(entry["error"], entry["channel"], entry["binary"],
+                                     entry["seq"], entry["timestamp"])
+                else:
+                    batches.setdefault(entry["channel"]["model_type"], []).append(entry)
+            
+            for model_type, batch in batches.items():
+                start_time = time.time()
+                try:
+                    batch_detections = await run_in_threadpool(
+                        detect_frames,
+                        [entry["frame"] for entry in batch],
+                        model_type,
+                        [entry["channel"]["confidence"] for entry in batch],
+                        [scale_roi(entry["channel"]["roi"], entry["scale"]) for entry in batch],
+                        QOS_LIVE
+                    )
+                except Exception as e:
+                    print(f"❌ Session detection error: {e}")
+                    for entry in batch:
+                        await send_error(f"Detection failed: {str(e)}", entry["channel"], entry["binary"],
+                                         entry["seq"], entry["timestamp"])
+                    continue
+                processing_time = time.time() - start_time
+                
+                for entry, detections in zip(batch, batch_detections):
+                    channel, frame = entry["channel"], entry["frame"]
+                    if channels.get(channel["id"]) is not channel:
+                        continue  # Closed while the batch was running
+                    
+                    events = incident_aggregator.update(channel["camera_id"], incident_detections(detections))
+                    submit_incident_events(channel["camera_id"], events, frame, detections)
+                    
+                    channel["frame_count"] += 1
+                    if channel["frame_count"] % 30 == 0:
+                        current_time = time.time()
+                        elapsed = current_time - channel["last_fps_time"]
+                        channel["fps"] = 30 / elapsed if elapsed > 0 else 0
+                        channel["last_fps_time"] = current_time
+                    
+                    sx, sy = entry["scale"]
+                    detection_dicts = [
+                        {
+                            "class_name": det.class_name,
+                            "confidence": det.confidence,
+                            "bbox": {
+                                "x1": det.bbox.x1 * sx,
+                                "y1": det.bbox.y1 * sy,
+                                "x2": det.bbox.x2 * sx,
+                                "y2": det.bbox.y2 * sy
+                            }
+                        }
+                        for det in detections
+                    ]
+                    dropped = mailbox.dropped.get(channel["id"], 0)
+                    
+                    if entry["binary"]:
+                        await send_bytes(encode_detections(
+                            entry["seq"], entry["timestamp"], detection_dicts, processing_time, channel["fps"],
+                            channel["frame_count"], dropped, channel["id"]
+                        ))
+                    else:
+                        if channel["delta"] is not None:
+                            detection_fields = channel["delta"].encode(detection_dicts)
+                        else:
+                            detection_fields = {"detections": detection_dicts}
+                        await send_json({
+                            "type": "detections",
+                            "channel": channel["name"],
+                            "channel_id": channel["id"],
+                            "seq": entry["seq"],
+                            **detection_fields,
+                            "processing_time": processing_time,
+                            "batch_size": len(batch),
+                            "total_weapons": len(detections),
+                            "fps": round(channel["fps"], 1),
+                            "frame_count": channel["frame_count"],
+                            "dropped_frames": dropped,
+                            "server_latency": round(time.time() - entry["received_at"], 4)
+                        })
+    
+    except WebSocketDisconnect:
+        print(f"🔌 WebSocket session disconnected: {session_id}")
+    except Exception as e:
+        print(f"❌ WebSocket session error: {e}")
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        for channel in list(channels.values()):
+            close_channel(channel)
+        if websocket in manager.active_connections:
+            manager.disconnect(websocket)
+        print(f"🛑 WebSocket session closed: {session_id}")
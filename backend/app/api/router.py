@@ -2,7 +2,7 @@
 API Router - combines all endpoint routers
 """
 from fastapi import APIRouter
-from app.api.endpoints import auth, detection, alerts, realtime
+from app.api.endpoints import auth, detection, alerts, realtime, cameras, ingest
 
 api_router = APIRouter()
 
@@ -10,3 +10,5 @@ api_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 api_router.include_router(detection.router, prefix="/detection", tags=["Detection"])
 api_router.include_router(alerts.router, prefix="/alerts", tags=["Alerts"])
 api_router.include_router(realtime.router, prefix="/realtime", tags=["Realtime Detection"])
+api_router.include_router(cameras.router, prefix="/cameras", tags=["Cameras"])
+api_router.include_router(ingest.router, prefix="/ingest", tags=["Edge Ingest"])
@@ -43,6 +43,51 @@ class Settings(BaseModel):
     CONFIDENCE_THRESHOLD: float = 0.5
     IOU_THRESHOLD: float = 0.45
     MAX_UPLOAD_SIZE: int = 50 * 1024 * 1024  # 50 MB
+    MAX_VIDEO_UPLOAD_SIZE: int = 200 * 1024 * 1024  # 200 MB
+    
+    # Video jobs
+    VIDEO_JOB_WORKERS: int = int(os.getenv("VIDEO_JOB_WORKERS", "2"))
+    VIDEO_EVIDENCE_FRAMES: int = int(os.getenv("VIDEO_EVIDENCE_FRAMES", "3"))  # Top-K frames kept for alerts
+    VIDEO_CHECKPOINT_INTERVAL: float = float(os.getenv("VIDEO_CHECKPOINT_INTERVAL", "20"))  # Seconds of video per checkpoint
+    
+    # Realtime alerts
+    ALERT_WORKERS: int = int(os.getenv("ALERT_WORKERS", "2"))
+    ALERT_QUEUE_SIZE: int = int(os.getenv("ALERT_QUEUE_SIZE", "64"))  # Pending alerts (one per incident at most)
+    ALERT_WRITER_BACKEND: str = os.getenv("ALERT_WRITER_BACKEND", "pymongo")  # "pymongo", "motor" or "memory"
+    ALERT_WRITER_BATCH_SIZE: int = int(os.getenv("ALERT_WRITER_BATCH_SIZE", "100"))  # Alerts per insert_many
+    ALERT_WRITER_FLUSH_INTERVAL: float = float(os.getenv("ALERT_WRITER_FLUSH_INTERVAL", "0.5"))  # Max seconds buffered
+    ALERT_WRITER_MAX_PENDING: int = int(os.getenv("ALERT_WRITER_MAX_PENDING", "5000"))  # Producers block beyond this
+    INCIDENT_GAP_SECONDS: float = float(os.getenv("INCIDENT_GAP_SECONDS", "10"))  # Idle time that closes an incident
+    # Cameras per multiplexed socket - capped below the 65536 16-bit channel ids so a free id always exists
+    REALTIME_SESSION_MAX_CHANNELS: int = min(int(os.getenv("REALTIME_SESSION_MAX_CHANNELS", "16")), 0xFFFF)
+    
+    # Edge ingest (detections from cameras running the model themselves)
+    EDGE_MAX_EVENT_AGE_SECONDS: float = float(os.getenv("EDGE_MAX_EVENT_AGE_SECONDS", "300"))  # Older events are rejected
+    EDGE_MAX_CLOCK_SKEW_SECONDS: float = float(os.getenv("EDGE_MAX_CLOCK_SKEW_SECONDS", "30"))  # Allowed device clock lead
+    EDGE_DEDUPE_SIZE: int = int(os.getenv("EDGE_DEDUPE_SIZE", "10000"))  # Recent event IDs remembered for retries
+    
+    # Inference QoS: live > camera > interactive (uploads) > batch (video jobs)
+    INFERENCE_SLOTS: int = int(os.getenv("INFERENCE_SLOTS", "1"))  # Concurrent model calls
+    INFERENCE_MIN_SHARE_CAMERA: float = float(os.getenv("INFERENCE_MIN_SHARE_CAMERA", "0.2"))  # Guaranteed model time
+    INFERENCE_MIN_SHARE_INTERACTIVE: float = float(os.getenv("INFERENCE_MIN_SHARE_INTERACTIVE", "0.1"))
+    INFERENCE_MIN_SHARE_BATCH: float = float(os.getenv("INFERENCE_MIN_SHARE_BATCH", "0.1"))
+    
+    # Server-side cameras
+    CAMERA_INFERENCE_FPS: float = float(os.getenv("CAMERA_INFERENCE_FPS", "5"))  # Default inference rate per camera
+    CAMERA_BATCH_SIZE: int = int(os.getenv("CAMERA_BATCH_SIZE", "8"))  # Max camera frames per model call
+    BROADCAST_JPEG_QUALITY: int = int(os.getenv("BROADCAST_JPEG_QUALITY", "80"))  # Annotated viewer stream
+    BROADCAST_MAX_WIDTH: int = int(os.getenv("BROADCAST_MAX_WIDTH", "1280"))
+    CAPTURE_MODE: str = os.getenv("CAPTURE_MODE", "thread")  # "thread" or "process" (decode in capture processes)
+    CAPTURE_CAMERAS_PER_PROCESS: int = int(os.getenv("CAPTURE_CAMERAS_PER_PROCESS", "1"))
+    CAPTURE_MAX_WIDTH: int = int(os.getenv("CAPTURE_MAX_WIDTH", "0"))  # Downscale right after decode (0 = full size)
+    CAPTURE_RING_SLOTS: int = int(os.getenv("CAPTURE_RING_SLOTS", "4"))  # Shared-memory frames per camera
+    CLIP_PRE_ROLL_SECONDS: float = float(os.getenv("CLIP_PRE_ROLL_SECONDS", "10"))  # Incident clips
+    CLIP_POST_ROLL_SECONDS: float = float(os.getenv("CLIP_POST_ROLL_SECONDS", "10"))
+    CLIP_FPS: float = float(os.getenv("CLIP_FPS", "10"))
+    CLIP_BUFFER_MAX_MB: float = float(os.getenv("CLIP_BUFFER_MAX_MB", "32"))  # In-memory pre-roll cap per camera
+    CLIP_JPEG_QUALITY: int = int(os.getenv("CLIP_JPEG_QUALITY", "70"))
+    CLIP_MAX_WIDTH: int = int(os.getenv("CLIP_MAX_WIDTH", "960"))
+    CAPTURE_STALL_TIMEOUT: float = float(os.getenv("CAPTURE_STALL_TIMEOUT", "20"))  # Restart a hung capture process
     
     # Telegram
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -51,6 +96,7 @@ class Settings(BaseModel):
     # Paths
     UPLOAD_DIR: str = "uploads"
     SNAPSHOT_DIR: str = "runs/alerts_snapshots"
+    CLIP_DIR: str = "runs/alerts_clips"
 
 
 settings = Settings()
@@ -2,14 +2,18 @@
 MongoDB database connection and utilities
 """
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
 from typing import Optional
+import threading
 from .config import settings
 
 class Database:
     client: Optional[AsyncIOMotorClient] = None
     db = None
+    sync_client: Optional[MongoClient] = None
 
 db = Database()
+_sync_lock = threading.Lock()
 
 
 async def connect_to_mongo():
@@ -36,6 +40,9 @@ async def close_mongo_connection():
     if db.client:
         db.client.close()
         print("❌ Closed MongoDB connection")
+    if db.sync_client:
+        db.sync_client.close()
+        db.sync_client = None
 
 
 async def create_indexes():
@@ -51,6 +58,10 @@ async def create_indexes():
         await db.db.alerts.create_index("danger_level")
         await db.db.alerts.create_index("acknowledged")
         
+        # Video job indexes
+        await db.db.video_jobs.create_index("job_id", unique=True)
+        await db.db.video_jobs.create_index("state")
+        
         print("✅ Database indexes created")
     except Exception as e:
         print(f"⚠️  Failed to create indexes: {e}")
@@ -59,3 +70,17 @@ async def create_indexes():
 def get_database():
     """Get database instance"""
     return db.db
+
+
+def get_sync_database():
+    """
+    Get a shared synchronous database handle for worker threads
+    
+    MongoClient is thread-safe and pools connections, so one client is
+    shared by every background thread instead of opening one per task.
+    """
+    if db.sync_client is None:
+        with _sync_lock:
+            if db.sync_client is None:
+                db.sync_client = MongoClient(settings.MONGODB_URL, serverSelectionTimeoutMS=5000)
+    return db.sync_client[settings.MONGODB_DB_NAME]
@@ -0,0 +1,131 @@
+"""
+Media responses - File responses with HTTP Range and ETag support
+
+Starlette's FileResponse always sends the whole file, so a browser <video>
+element cannot seek without downloading everything first and re-validations
+re-download unchanged files. ranged_file_response() answers:
+
+    - If-None-Match matching the ETag      -> 304 Not Modified
+    - Range: bytes=a-b / a- / -n           -> 206 Partial Content (single range)
+    - unsatisfiable Range                  -> 416 with Content-Range: bytes */size
+    - anything else                        -> 200 with the whole file
+"""
+import os
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Strong validator from size and modification time (changes whenever the file is rewritten)"""
+    return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header
+
+    Returns:
+        (start, end) inclusive, or None if the header is malformed or asks for
+        several ranges (callers then send the whole file, as RFC 9110 allows)
+
+    Raises:
+        ValueError: If the range is well-formed but cannot be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    first, last = first.strip(), last.strip()
+    if not (first or last) or not (first.isdigit() or first == "") or not (last.isdigit() or last == ""):
+        return None
+
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("Range starts beyond the end of the file")
+    return start, min(end, size - 1)
+
+
+async def _iter_file(path: str, start: int, length: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = await f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: Optional[str] = None,
+    max_age: int = 3600
+) -> Response:
+    """
+    Serve a file with Range and conditional request support
+
+    Args:
+        request: Incoming request (Range, If-Range, If-None-Match headers)
+        path: File to serve (must exist)
+        media_type: Content type
+        filename: Sent as an inline Content-Disposition filename
+        max_age: Cache-Control max-age in seconds
+
+    Returns:
+        200, 206, 304 or 416 response
+    """
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = file_etag(stat)
+    headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": formatdate(stat.st_mtime, usegmt=True),
+        "cache-control": f"private, max-age={max_age}",
+    }
+    if filename:
+        headers["content-disposition"] = f'inline; filename="{filename}"'
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers.update({
+                "content-range": f"bytes {start}-{end}/{size}",
+                "content-length": str(length),
+            })
+            return StreamingResponse(_iter_file(path, start, length), status_code=206,
+                                     media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
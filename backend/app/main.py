@@ -4,6 +4,7 @@ FastAPI main application
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+import asyncio
 import os
 
 from app.core.config import settings
@@ -46,6 +47,10 @@ if os.path.exists(settings.UPLOAD_DIR):
 if os.path.exists(settings.SNAPSHOT_DIR):
     app.mount("/snapshots", StaticFiles(directory=settings.SNAPSHOT_DIR), name="snapshots")
 
+# Mount incident clips directory
+os.makedirs(settings.CLIP_DIR, exist_ok=True)
+app.mount("/clips", StaticFiles(directory=settings.CLIP_DIR), name="clips")
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
@@ -64,6 +69,10 @@ async def startup_event():
     # Connect to MongoDB
     await connect_to_mongo()
     
+    # Batched alert persistence (a Motor backend runs on this event loop)
+    from app.services.alert_writer import alert_writer
+    alert_writer.start(asyncio.get_running_loop())
+    
     # Preload YOLO model
     try:
         detection_service = DetectionService()
@@ -71,14 +80,38 @@ async def startup_event():
         print(f"✅ Loaded YOLO model from {settings.YOLO_MODEL_PATH}")
     except Exception as e:
         print(f"⚠️ Failed to preload YOLO model: {e}")
+    
+    # Start background video job workers (re-queues unfinished jobs)
+    from app.services.video_jobs import video_job_manager
+    video_job_manager.start()
+    
+    # Restore server-side cameras and their inference loops
+    from app.services.camera_inference import camera_inference
+    camera_inference.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Close connections on shutdown"""
     from app.core.database import close_mongo_connection
+    from app.services.video_jobs import video_job_manager
+    from app.services.realtime_detection import alert_pool
+    from app.services.camera_inference import camera_inference
+    from app.services.clip_recorder import clip_recorder
+    from app.services.alert_writer import alert_writer
+    print("🛑 Stopping camera inference...")
+    await asyncio.to_thread(camera_inference.stop)
+    print("🛑 Writing pending incident clips...")
+    await asyncio.to_thread(clip_recorder.stop)
     print("🛑 Stopping all camera streams...")
     stream_manager.stop_all()
+    print("🛑 Stopping video job workers...")
+    await asyncio.to_thread(video_job_manager.stop)
+    print("🛑 Stopping realtime alert workers...")
+    await asyncio.to_thread(alert_pool.stop)
+    print("🛑 Writing pending alerts...")
+    # In a thread: a Motor backend needs this event loop to finish the writes
+    await asyncio.to_thread(alert_writer.stop)
     await close_mongo_connection()
     print("🛑 Application shutdown")
 
@@ -99,7 +132,8 @@ async def health_check():
     return {
         "status": "healthy",
         "version": settings.VERSION,
-        "active_cameras": stream_manager.get_active_count()
+        "active_cameras": stream_manager.get_active_count(),
+        "capture_processes": stream_manager.list_capture_processes()
     }
 
 
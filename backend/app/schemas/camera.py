@@ -0,0 +1,16 @@
+"""
+Camera schemas for request/response validation
+"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class CameraCreate(BaseModel):
+    camera_id: str = Field(..., pattern="^[A-Za-z0-9_-]{1,64}$")
+    source: str = Field(..., min_length=1)  # RTSP/HTTP URL, file path or webcam index ("0")
+    name: Optional[str] = None  # Shown as the alert location
+    confidence: float = Field(default=0.5, ge=0.0, le=1.0)
+    model_type: str = Field(default="yolo", pattern="^(yolo|fasterrcnn)$")
+    roi: Optional[List[int]] = Field(default=None, min_length=4, max_length=4)  # [x, y, w, h]
+    target_fps: Optional[float] = Field(default=None, gt=0.0, le=30.0)
+    priority: int = Field(default=5, ge=0, le=10)  # Higher keeps its fps longer when the node is saturated
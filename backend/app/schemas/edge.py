@@ -0,0 +1,35 @@
+"""
+Edge ingest schemas for request/response validation
+"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+from app.schemas.detection import BoundingBox
+
+
+class EdgeDetection(BaseModel):
+    class_name: str = Field(..., min_length=1, max_length=64)
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    bbox: BoundingBox  # Pixels of the device frame (frame_width x frame_height)
+    crop: Optional[str] = Field(default=None, max_length=400_000)  # Base64 JPEG of the box region (evidence)
+
+
+class EdgePerson(BaseModel):
+    confidence: float = Field(..., ge=0.0, le=1.0)
+    bbox: BoundingBox
+
+
+class EdgeEvent(BaseModel):
+    event_id: str = Field(..., min_length=1, max_length=128)  # Unique per camera - retries are deduplicated
+    camera_id: str = Field(..., pattern="^[A-Za-z0-9_-]{1,64}$")
+    timestamp: float  # Unix time of the frame (device clock)
+    frame_width: int = Field(..., gt=0, le=8192)
+    frame_height: int = Field(..., gt=0, le=8192)
+    detections: List[EdgeDetection] = Field(default_factory=list, max_length=100)  # Empty = heartbeat
+    persons: Optional[List[EdgePerson]] = Field(default=None, max_length=100)  # Device-side person detections
+    snapshot: Optional[str] = Field(default=None, max_length=3_000_000)  # Base64 JPEG of the (downscaled) frame
+    location: Optional[str] = Field(default=None, max_length=128)  # Shown as the alert location
+
+
+class EdgeBatch(BaseModel):
+    events: List[EdgeEvent] = Field(..., min_length=1, max_length=500)
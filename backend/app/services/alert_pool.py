@@ -0,0 +1,227 @@
+"""
+Alert Worker Pool - Bounded, prioritized background processing of alerts
+
+Replaces one thread per alert with a fixed set of worker threads fed by a
+bounded priority queue:
+    - at most one pending alert per key (client/camera): a newer alert for the
+      same key replaces the pending one instead of queueing behind it
+    - when the queue is full the lowest-priority pending alert is dropped
+      (or the new one, if it ranks lowest)
+    - per-stage latency, queue depth, drops and coalescing are counted
+"""
+import heapq
+import itertools
+import threading
+import time
+import logging
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# handler(key, payload, mark) - call mark("stage") after each stage to time it
+AlertHandler = Callable[[str, Any, Callable[[str], None]], None]
+
+
+class _LatencyStats:
+    """Count / mean / p95 / max of a latency, p95 over the most recent samples"""
+
+    def __init__(self, window: int = 512):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self._recent.append(seconds)
+
+    def summary(self) -> dict:
+        recent = sorted(self._recent)
+        p95 = recent[min(len(recent) - 1, int(len(recent) * 0.95))] if recent else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 2) if self.count else 0.0,
+            "p95_ms": round(p95 * 1000, 2),
+            "max_ms": round(self.max * 1000, 2),
+        }
+
+
+class AlertWorkerPool:
+    """
+    Fixed-size worker pool for alert processing
+
+    Usage:
+        pool = AlertWorkerPool(handle_alert, num_workers=2, max_queue=64)
+        pool.submit(client_id, (frame, detections), priority=score)  # never blocks
+        pool.metrics()  # queue depth, drops, per-stage latency
+    """
+
+    def __init__(self, handler: AlertHandler, num_workers: int = 2, max_queue: int = 64, name: str = "alert"):
+        """
+        Initialize the pool (workers start on first submit)
+
+        Args:
+            handler: Called in a worker thread for every alert
+            num_workers: Number of worker threads
+            max_queue: Maximum number of pending alerts
+            name: Thread name prefix
+        """
+        self.handler = handler
+        self.num_workers = max(1, num_workers)
+        self.max_queue = max(1, max_queue)
+        self.name = name
+
+        self._heap: List[tuple] = []  # (-priority, seq, key) - may hold stale entries
+        self._pending: Dict[str, dict] = {}  # key -> task
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+        self._counters = {"submitted": 0, "coalesced": 0, "dropped": 0, "processed": 0, "failed": 0}
+        self._stages: Dict[str, _LatencyStats] = {}
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        with self._cond:
+            if self._workers:
+                return
+            self._stop_event.clear()
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker_loop, name=f"{self.name}-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        logger.info(f"✅ {self.name} workers started ({self.num_workers})")
+
+    def stop(self, timeout: float = 5):
+        """Stop the workers after the pending alerts are processed (or timeout expires)"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        deadline = time.time() + timeout
+        for worker in self._workers:
+            worker.join(timeout=max(0.0, deadline - time.time()))
+        self._workers = []
+        logger.info(f"✅ {self.name} workers stopped")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(self, key: str, payload: Any, priority: float = 0.0) -> bool:
+        """
+        Queue an alert without blocking
+
+        Args:
+            key: Coalescing key (client or camera id)
+            payload: Passed to the handler
+            priority: Higher is processed first and dropped last
+
+        Returns:
+            bool: False if the alert was dropped because the queue is full
+        """
+        if not self._workers:
+            self.start()
+
+        now = time.time()
+        with self._cond:
+            self._counters["submitted"] += 1
+            task = self._pending.get(key)
+            if task is not None:
+                # Replace the pending alert of this key; latency still counts from the first one
+                self._counters["coalesced"] += 1
+                task["payload"] = payload
+                if priority > task["priority"]:
+                    task["priority"] = priority
+                    task["seq"] = next(self._seq)
+                    heapq.heappush(self._heap, (-priority, task["seq"], key))
+                return True
+
+            if len(self._pending) >= self.max_queue:
+                lowest = min(self._pending.values(), key=lambda t: (t["priority"], -t["seq"]))
+                self._counters["dropped"] += 1
+                if lowest["priority"] >= priority:
+                    return False
+                del self._pending[lowest["key"]]
+
+            task = {"key": key, "payload": payload, "priority": priority,
+                    "seq": next(self._seq), "enqueued_at": now}
+            self._pending[key] = task
+            heapq.heappush(self._heap, (-priority, task["seq"], key))
+            if len(self._heap) > 4 * self.max_queue:
+                self._compact()
+            self._cond.notify()
+        return True
+
+    def metrics(self) -> dict:
+        with self._cond:
+            return {
+                "workers": len(self._workers),
+                "queue_depth": len(self._pending),
+                "max_queue": self.max_queue,
+                **self._counters,
+                "stages": {name: stats.summary() for name, stats in self._stages.items()},
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _compact(self):
+        """Drop heap entries of coalesced or evicted tasks (caller holds the lock)"""
+        self._heap = [entry for entry in self._heap
+                      if entry[2] in self._pending and self._pending[entry[2]]["seq"] == entry[1]]
+        heapq.heapify(self._heap)
+
+    def _next_task(self) -> Optional[dict]:
+        """Pop the highest-priority live task, waiting for one (None on stop with an empty queue)"""
+        with self._cond:
+            while True:
+                while self._heap:
+                    _, seq, key = heapq.heappop(self._heap)
+                    task = self._pending.get(key)
+                    if task is not None and task["seq"] == seq:
+                        del self._pending[key]
+                        return task
+                if self._stop_event.is_set():
+                    return None
+                self._cond.wait(timeout=1.0)
+
+    def _record(self, stage: str, seconds: float):
+        with self._cond:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = _LatencyStats()
+            stats.add(seconds)
+
+    def _worker_loop(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+
+            started = time.time()
+            self._record("queue_wait", started - task["enqueued_at"])
+            last = {"time": started}
+
+            def mark(stage: str):
+                now = time.time()
+                self._record(stage, now - last["time"])
+                last["time"] = now
+
+            try:
+                self.handler(task["key"], task["payload"], mark)
+                outcome = "processed"
+            except Exception as e:
+                logger.error(f"❌ Alert handler failed for {task['key']}: {e}", exc_info=True)
+                outcome = "failed"
+
+            self._record("total", time.time() - task["enqueued_at"])
+            with self._cond:
+                self._counters[outcome] += 1
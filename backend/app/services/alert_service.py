@@ -1,12 +1,14 @@
 """
 Telegram Alert Service
-Non-blocking alerts with threading and cooldown mechanism
+Non-blocking alerts with threading
+
+Deduplication is not done here: realtime alerts are grouped into incidents by
+app.services.incidents.IncidentAggregator before they reach this service.
 """
 import cv2
 import numpy as np
 import requests
 import threading
-import time
 from typing import List, Optional
 from datetime import datetime
 import io
@@ -20,7 +22,6 @@ class TelegramAlert:
     
     Features:
     - Non-blocking HTTP requests (runs in separate thread)
-    - Cooldown mechanism to prevent spam
     - Image encoding and upload
     - Error handling (doesn't crash main loop)
     
@@ -37,8 +38,6 @@ class TelegramAlert:
         """Initialize with bot token and chat ID from settings"""
         self.bot_token = settings.TELEGRAM_BOT_TOKEN
         self.chat_id = settings.TELEGRAM_CHAT_ID
-        self.cooldown_seconds = 10  # Minimum time between alerts
-        self.last_alert_time = {}  # {camera_id: timestamp}
         
         # Validate configuration
         if not self.bot_token or not self.chat_id:
@@ -48,24 +47,6 @@ class TelegramAlert:
             self.enabled = True
             print(f"✅ Telegram Alert Service initialized (chat_id: {self.chat_id})")
     
-    def _can_send_alert(self, camera_id: str) -> bool:
-        """
-        Check if enough time has passed since last alert
-        
-        Args:
-            camera_id: Unique camera identifier
-            
-        Returns:
-            bool: True if alert can be sent
-        """
-        current_time = time.time()
-        last_time = self.last_alert_time.get(camera_id, 0)
-        
-        if current_time - last_time >= self.cooldown_seconds:
-            self.last_alert_time[camera_id] = current_time
-            return True
-        return False
-    
     def _send_alert_worker(
         self, 
         camera_id: str, 
@@ -212,7 +193,8 @@ class TelegramAlert:
         image: np.ndarray, 
         message: str,
         detections: Optional[list] = None,
-        skip_cooldown: bool = False
+        skip_cooldown: bool = False,
+        blocking: bool = False
     ):
         """
         Send alert to Telegram (non-blocking)
@@ -220,27 +202,24 @@ class TelegramAlert:
         This method returns immediately and processes in background thread
         
         Args:
-            camera_id: Unique camera identifier (used for cooldown)
+            camera_id: Unique camera identifier
             image: OpenCV image (BGR format)
             message: Alert message text
             detections: List of detection objects (optional)
-            skip_cooldown: Skip cooldown check (for image/video uploads)
+            skip_cooldown: Kept for compatibility - deduplication happens upstream
+                in the incident aggregator
+            blocking: Send in the calling thread (for callers that already run
+                in a worker, e.g. the realtime alert pool)
             
         Returns:
-            None (runs in background thread)
+            None (runs in background thread unless blocking)
         """
         if not self.enabled:
             return
         
-        # Check cooldown (only for webcam/realtime)
-        if not skip_cooldown:
-            if not self._can_send_alert(camera_id):
-                remaining = self.cooldown_seconds - (time.time() - self.last_alert_time.get(camera_id, 0))
-                print(f"⏳ Alert on cooldown for {camera_id} ({remaining:.1f}s remaining)")
-                return
-        else:
-            # Update timestamp even when skipping cooldown
-            self.last_alert_time[camera_id] = time.time()
+        if blocking:
+            self._send_alert_worker(camera_id, image, message, list(detections) if detections else [])
+            return
         
         # Make a copy of the image to avoid race conditions
         image_copy = image.copy()
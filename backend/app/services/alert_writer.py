@@ -0,0 +1,452 @@
+"""
+Alert Writer - Write-behind, batched alert persistence
+
+Alert producers (image uploads, the realtime alert pool, video jobs) hand
+their documents to this writer instead of doing one database round trip per
+alert. write() returns at once with the alert's _id; a flusher thread writes
+the documents with insert_many(ordered=False):
+
+    - a batch is flushed once batch_size operations are pending or the
+      oldest one has waited flush_interval seconds
+    - pending operations are capped (max_pending): a full buffer blocks the
+      producer up to put_timeout (backpressure), after that the document is
+      dropped and counted
+    - _id is assigned on write, so a batch retried after a connection error
+      cannot insert a document twice (duplicate keys count as written)
+    - only connection errors are retried; a batch failing for any other
+      reason (e.g. a value BSON cannot encode) is written one document at a
+      time and the documents that still fail are dropped and counted
+    - alert updates (incident summary, clip status) go through the same queue
+      and never overtake the insert they refer to
+    - stop() writes what is still pending (application shutdown)
+
+Backends:
+    - PyMongoAlertBackend: shared synchronous client (default)
+    - MotorAlertBackend:   the application's async client, run on its event loop
+    - InMemoryAlertBackend: InMemoryDB, for running without MongoDB
+"""
+import asyncio
+import concurrent.futures
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import (
+    AutoReconnect, BulkWriteError, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError
+)
+
+from app.core.config import settings
+from app.core.database import get_database, get_sync_database
+from app.core.in_memory_db import InMemoryDB, in_memory_db
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+
+# Errors worth retrying: the database is unreachable, not the operation wrong
+TRANSIENT_ERRORS = (AutoReconnect, ConnectionFailure, NetworkTimeout, ServerSelectionTimeoutError)
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+class PyMongoAlertBackend:
+    """Alerts collection through the shared synchronous MongoClient"""
+
+    name = "pymongo"
+
+    def __init__(self, get_collection: Optional[Callable] = None):
+        self.get_collection = get_collection or (lambda: get_sync_database().alerts)
+
+    def insert_many(self, docs: List[dict]) -> Tuple[int, int]:
+        """
+        Insert documents (unordered: one bad document does not stop the rest)
+
+        Returns:
+            (written, failed) - duplicates of an earlier attempt count as written
+
+        Raises:
+            ConnectionFailure: Database unreachable (the batch is retried)
+            Exception: Anything else (e.g. InvalidDocument) - the batch is split
+        """
+        try:
+            self._run("insert_many", docs, ordered=False)
+            return len(docs), 0
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            failed = sum(1 for err in errors if err.get("code") != DUPLICATE_KEY)
+            for err in errors:
+                if err.get("code") != DUPLICATE_KEY:
+                    logger.warning(f"⚠️ Alert not saved: {err.get('errmsg')}")
+            return len(docs) - failed, failed
+
+    def update_many(self, query: dict, update: dict):
+        self._run("update_many", query, update)
+
+    def _run(self, method: str, *args, **kwargs):
+        return getattr(self.get_collection(), method)(*args, **kwargs)
+
+
+class MotorAlertBackend(PyMongoAlertBackend):
+    """Alerts collection through the application's Motor client (calls run on its event loop)"""
+
+    name = "motor"
+
+    def __init__(self, get_collection: Optional[Callable] = None, loop: Optional[asyncio.AbstractEventLoop] = None,
+                 timeout: float = 30.0):
+        super().__init__(get_collection or (lambda: get_database().alerts))
+        self.loop = loop  # Set by AlertWriter.start(loop)
+        self.timeout = timeout
+
+    def _run(self, method: str, *args, **kwargs):
+        # Both cases are retried like a lost connection: the loop may still come up / catch up
+        if self.loop is None:
+            raise ConnectionFailure("Motor alert backend has no event loop (call alert_writer.start(loop))")
+        coroutine = getattr(self.get_collection(), method)(*args, **kwargs)
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise NetworkTimeout(f"Motor {method} did not finish in {self.timeout:.0f}s")
+
+
+class InMemoryAlertBackend:
+    """InMemoryDB alerts list (no MongoDB needed)"""
+
+    name = "memory"
+
+    def __init__(self, db: InMemoryDB = in_memory_db):
+        self.db = db
+
+    def insert_many(self, docs: List[dict]) -> Tuple[int, int]:
+        existing = {alert.get("_id") for alert in self.db.alerts}
+        for doc in docs:
+            if str(doc["_id"]) not in existing:
+                self.db.alerts.append({**doc, "_id": str(doc["_id"])})
+        return len(docs), 0
+
+    def update_many(self, query: dict, update: dict):
+        for alert in self.db.alerts:
+            if all(alert.get(key) == value for key, value in query.items()):
+                alert.update(update.get("$set", {}))
+
+
+def create_backend(name: str):
+    """Backend by name: "pymongo", "motor" or "memory" """
+    backends = {"pymongo": PyMongoAlertBackend, "motor": MotorAlertBackend, "memory": InMemoryAlertBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown alert writer backend: {name}")
+    return backends[name]()
+
+
+# ----------------------------------------------------------------------
+# Writer
+# ----------------------------------------------------------------------
+
+class AlertWriter:
+    """
+    Buffers alert documents and writes them in batches from a background thread
+
+    Usage:
+        alert_id = alert_writer.write(alert_doc)               # worker threads
+        alert_ids = await alert_writer.write_many_async(docs)   # async endpoints
+        alert_writer.update({"incident_id": i}, {"$set": {...}})
+        alert_writer.stop()                                     # flush on shutdown
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_pending: int = 5000,
+        put_timeout: float = 1.0,
+        max_retry_delay: float = 10.0
+    ):
+        """
+        Initialize writer (the flusher thread starts on first write)
+
+        Args:
+            backend: PyMongoAlertBackend (default), MotorAlertBackend or InMemoryAlertBackend
+            batch_size: Documents per insert_many
+            flush_interval: Seconds a document may wait for its batch to fill
+            max_pending: Pending operations before producers are blocked
+            put_timeout: Seconds a producer waits for space before the document is dropped
+            max_retry_delay: Cap of the backoff between retries of a failed batch
+        """
+        self.backend = backend or PyMongoAlertBackend()
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(1, max_pending)
+        self.put_timeout = put_timeout
+        self.max_retry_delay = max_retry_delay
+
+        self._queue: deque = deque()  # (op, args, enqueued_at)
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._flush_requested = False
+        self._retry_at = 0.0
+        self._failures = 0  # Consecutive failed attempts
+
+        self._stats = {
+            "written": 0, "failed": 0, "dropped": 0, "updates": 0, "failed_updates": 0, "batches": 0,
+            "retries": 0, "blocked_writes": 0, "flush_seconds": 0.0, "max_flush_seconds": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start the flusher thread; loop is the event loop a Motor backend runs on"""
+        if loop is not None and isinstance(self.backend, MotorAlertBackend):
+            self.backend.loop = loop
+        with self._cond:
+            self._stopping = False
+            self._ensure_thread()
+
+    def write(self, doc: dict, timeout: Optional[float] = None) -> Optional[ObjectId]:
+        """
+        Queue one alert document
+
+        Returns:
+            The alert's _id, or None if the buffer stayed full for timeout
+            (default put_timeout) seconds and the alert was dropped
+        """
+        ids = self.write_many([doc], timeout)
+        return ids[0]
+
+    def write_many(self, docs: List[dict], timeout: Optional[float] = None) -> List[Optional[ObjectId]]:
+        """Queue several documents (write() for each); blocks while the buffer is full"""
+        deadline = time.time() + (self.put_timeout if timeout is None else timeout)
+        ids = []
+        with self._cond:
+            self._ensure_thread()
+            for doc in docs:
+                blocked = False
+                while len(self._queue) >= self.max_pending and not self._stopping:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    blocked = True
+                    self._cond.wait(remaining)
+                if blocked:
+                    self._stats["blocked_writes"] += 1
+                if len(self._queue) >= self.max_pending:
+                    self._stats["dropped"] += 1
+                    logger.error(f"❌ Alert writer buffer full - alert dropped ({doc.get('weapon_class')})")
+                    ids.append(None)
+                    continue
+                ids.append(self._enqueue(OP_INSERT, doc))
+        return ids
+
+    async def write_many_async(self, docs: List[dict]) -> List[Optional[ObjectId]]:
+        """write_many for async code: returns at once unless the buffer is full (then waits in a thread)"""
+        with self._cond:
+            if len(self._queue) + len(docs) <= self.max_pending:
+                self._ensure_thread()
+                return [self._enqueue(OP_INSERT, doc) for doc in docs]
+        return await asyncio.to_thread(self.write_many, docs)
+
+    def update(self, query: dict, update: dict):
+        """Queue an update_many of alerts (after every insert queued before it; never dropped)"""
+        with self._cond:
+            self._ensure_thread()
+            self._queue.append((OP_UPDATE, (query, update), time.time()))
+            self._cond.notify_all()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """
+        Write everything queued so far
+
+        Returns:
+            bool: False if operations were still pending after timeout
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            self._flush_requested = True
+            self._cond.notify_all()
+            while (self._queue or self._in_flight) and self._thread is not None and self._thread.is_alive():
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self._queue
+
+    def stop(self, timeout: float = 10.0):
+        """Flush pending operations and stop the flusher thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=timeout)
+        with self._cond:
+            if self._queue:
+                logger.error(f"❌ Alert writer stopped with {len(self._queue)} unwritten operation(s)")
+        logger.info(f"✅ Alert writer stopped ({self._stats['written']} alert(s) written)")
+
+    def metrics(self) -> dict:
+        """Queue depth, written / failed / dropped counts, batch size and flush latency"""
+        with self._cond:
+            stats = self._stats
+            return {
+                "backend": self.backend.name,
+                "pending": len(self._queue),
+                "in_flight": self._in_flight,
+                "written": stats["written"],
+                "failed": stats["failed"],
+                "dropped": stats["dropped"],
+                "updates": stats["updates"],
+                "failed_updates": stats["failed_updates"],
+                "batches": stats["batches"],
+                "avg_batch_size": round(stats["written"] / stats["batches"], 2) if stats["batches"] else 0.0,
+                "retries": stats["retries"],
+                "blocked_writes": stats["blocked_writes"],
+                "avg_flush_ms": round(stats["flush_seconds"] / stats["batches"] * 1000, 2) if stats["batches"] else 0.0,
+                "max_flush_ms": round(stats["max_flush_seconds"] * 1000, 2),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _ensure_thread(self):
+        """Start the flusher thread if needed (caller holds the lock)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="alert-writer", daemon=True)
+            self._thread.start()
+
+    def _enqueue(self, op: str, doc: dict) -> ObjectId:
+        """Append an insert (caller holds the lock)"""
+        if "_id" not in doc:
+            doc["_id"] = ObjectId()
+        self._queue.append((op, doc, time.time()))
+        if len(self._queue) == 1 or len(self._queue) >= self.batch_size:
+            self._cond.notify_all()  # Starts the flush interval / fills a batch
+        return doc["_id"]
+
+    def _due(self, now: float) -> bool:
+        if not self._queue or now < self._retry_at:
+            return False
+        return (self._stopping or self._flush_requested or len(self._queue) >= self.batch_size
+                or now - self._queue[0][2] >= self.flush_interval)
+
+    def _execute(self, batch: List[tuple]) -> Tuple[int, int, int, Optional[Exception]]:
+        """
+        Run a batch of inserts or a single update
+
+        Returns:
+            (written, failed, done, error) - done is the number of operations
+            finished (written or dropped); the rest failed with a transient
+            error and is retried
+        """
+        if batch[0][0] == OP_UPDATE:
+            try:
+                self.backend.update_many(*batch[0][1])
+                return 0, 0, 1, None
+            except TRANSIENT_ERRORS as e:
+                return 0, 0, 0, e
+            except Exception as e:
+                logger.error(f"❌ Alert update dropped ({batch[0][1][0]}): {e}")
+                return 0, 0, 1, e
+
+        docs = [doc for _, doc, _ in batch]
+        try:
+            written, failed = self.backend.insert_many(docs)
+            return written, failed, len(docs), None
+        except TRANSIENT_ERRORS as e:
+            return 0, 0, 0, e
+        except Exception as e:
+            if len(docs) > 1:
+                logger.warning(f"⚠️ Alert batch rejected ({e}) - writing its {len(docs)} alerts one by one")
+
+        # A document in the batch cannot be written: find it, keep the others
+        written = failed = 0
+        for i, doc in enumerate(docs):
+            try:
+                w, f = self.backend.insert_many([doc])
+            except TRANSIENT_ERRORS as e:
+                return written, failed, i, e
+            except Exception as e:
+                w, f = 0, 1
+                logger.error(f"❌ Alert dropped - cannot be written ({doc.get('weapon_class')}): {e}")
+            written += w
+            failed += f
+        return written, failed, len(docs), None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._due(time.time()):
+                    if self._stopping and not self._queue:
+                        self._flush_requested = False
+                        self._cond.notify_all()
+                        return
+                    if not self._queue:
+                        self._flush_requested = False
+                        self._cond.notify_all()  # Wakes flush()
+                        self._cond.wait()
+                        continue
+                    now = time.time()
+                    wake_at = self._retry_at if now < self._retry_at else self._queue[0][2] + self.flush_interval
+                    self._cond.wait(max(0.001, wake_at - now))
+
+                # Consecutive inserts become one batch; an update runs on its own
+                batch = [self._queue.popleft()]
+                if batch[0][0] == OP_INSERT:
+                    while self._queue and self._queue[0][0] == OP_INSERT and len(batch) < self.batch_size:
+                        batch.append(self._queue.popleft())
+                self._in_flight = len(batch)
+
+            start_time = time.time()
+            written, failed, done, error = self._execute(batch)
+            elapsed = time.time() - start_time
+
+            with self._cond:
+                self._in_flight = 0
+                if batch[0][0] == OP_INSERT:
+                    self._stats["written"] += written
+                    self._stats["failed"] += failed
+                    if done == len(batch):
+                        self._stats["batches"] += 1
+                        self._stats["flush_seconds"] += elapsed
+                        self._stats["max_flush_seconds"] = max(self._stats["max_flush_seconds"], elapsed)
+                elif done:
+                    self._stats["updates" if error is None else "failed_updates"] += 1  # Rejected = dropped
+                rest = batch[done:]
+                if not rest:
+                    self._failures = 0
+                    self._retry_at = 0.0
+                elif self._stopping and self._failures >= 2:
+                    # Shutting down and the database stays unreachable - give up on this batch
+                    self._stats["failed"] += len(rest)
+                    logger.error(f"❌ Alert writer gave up on {len(rest)} operation(s) at shutdown: {error}")
+                else:
+                    # Back to the front of the queue (order kept), retried after a backoff
+                    self._failures += 1
+                    self._stats["retries"] += 1
+                    self._queue.extendleft(reversed(rest))
+                    delay = min(self.max_retry_delay, 0.5 * 2 ** (self._failures - 1))
+                    self._retry_at = time.time() + delay
+                    logger.warning(f"⚠️ Alert write failed ({len(rest)} operation(s)), retry in {delay:.1f}s: {error}")
+                self._cond.notify_all()  # Space for blocked producers, progress for flush()
+
+
+# Singleton instance
+alert_writer = AlertWriter(
+    backend=create_backend(settings.ALERT_WRITER_BACKEND),
+    batch_size=settings.ALERT_WRITER_BATCH_SIZE,
+    flush_interval=settings.ALERT_WRITER_FLUSH_INTERVAL,
+    max_pending=settings.ALERT_WRITER_MAX_PENDING,
+)
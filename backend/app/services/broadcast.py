@@ -0,0 +1,242 @@
+"""
+Broadcast Hub - Encode-once fan-out of annotated camera frames to viewers
+
+Every processed camera frame is annotated and JPEG-encoded once, by the
+publishing (camera worker) thread, and only while someone is watching. All
+viewers - MJPEG over HTTP and WebSocket alike - share the same encoded bytes:
+
+    camera worker --publish()--> channel (latest jpeg + seq) --wake--> viewers
+
+A viewer only holds a "last seen seq"; when it wakes up it takes whatever is
+newest, so a slow viewer skips frames (drop-to-latest) instead of queueing
+them, and never slows down the publisher or the other viewers. Per added
+viewer the publisher pays one loop.call_soon_threadsafe().
+"""
+import asyncio
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.services.video_pipeline import draw_detections
+
+logger = logging.getLogger(__name__)
+
+
+def annotate_live_frame(frame: np.ndarray, detections: List[Dict], title: str) -> np.ndarray:
+    """Copy of frame with weapon boxes, camera title and wall-clock time"""
+    annotated = draw_detections(frame.copy(), detections)
+    cv2.putText(annotated, f"{title}  {datetime.now().strftime('%H:%M:%S')}", (10, 30),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+    return annotated
+
+
+class Viewer:
+    """
+    One subscriber of a channel (used from the event loop only)
+
+    Usage:
+        viewer = broadcast_hub.subscribe(camera_id)
+        while (item := await viewer.next()) is not None:
+            seq, jpeg = item
+        broadcast_hub.unsubscribe(viewer)
+    """
+
+    def __init__(self, channel: "BroadcastChannel", loop: asyncio.AbstractEventLoop):
+        self.channel = channel
+        self.loop = loop
+        self.last_seq = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.closed = False
+        self._event = asyncio.Event()
+
+    def _wake(self):
+        """Called from the publisher thread"""
+        self.loop.call_soon_threadsafe(self._event.set)
+
+    def close(self):
+        """End next() for this viewer (e.g. client disconnected); event loop only"""
+        self.closed = True
+        self._event.set()
+
+    async def next(self) -> Optional[Tuple[int, bytes]]:
+        """Newest frame after the last one delivered, or None once the viewer or channel is closed"""
+        while not self.closed:
+            seq, jpeg = self.channel.latest()
+            if seq > self.last_seq:
+                if self.last_seq:
+                    self.dropped += seq - self.last_seq - 1
+                self.last_seq = seq
+                self.delivered += 1
+                return seq, jpeg
+            if self.channel.closed:
+                return None
+            self._event.clear()
+            # Re-check after clear: a publish between latest() and clear() would be lost otherwise
+            if self.channel.latest()[0] > self.last_seq or self.channel.closed:
+                continue
+            await self._event.wait()
+        return None
+
+
+class BroadcastChannel:
+    """Latest encoded frame of one camera plus its viewers"""
+
+    def __init__(self, camera_id: str, title: str, jpeg_quality: int = 80, max_width: int = 1280):
+        self.camera_id = camera_id
+        self.title = title
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.closed = False
+
+        self._seq = 0
+        self._jpeg = b""
+        self._viewers: List[Viewer] = []
+        self._lock = threading.Lock()
+
+        self.encoded = 0
+        self.encode_seconds = 0.0
+        self.fanout_seconds = 0.0
+
+    def latest(self) -> Tuple[int, bytes]:
+        with self._lock:
+            return self._seq, self._jpeg
+
+    def has_viewers(self) -> bool:
+        with self._lock:
+            return bool(self._viewers)
+
+    def publish(self, frame: np.ndarray, detections: List[Dict]) -> bool:
+        """
+        Annotate + encode a processed frame once and wake all viewers
+
+        Returns:
+            bool: False if skipped because nobody is watching
+        """
+        if not self.has_viewers():
+            return False
+
+        start = time.perf_counter()
+        annotated = annotate_live_frame(frame, detections, self.title)
+        height, width = annotated.shape[:2]
+        if width > self.max_width:
+            annotated = cv2.resize(annotated, (self.max_width, int(height * self.max_width / width)),
+                                   interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return False
+        jpeg = buf.tobytes()
+
+        with self._lock:
+            self._seq += 1
+            self._jpeg = jpeg
+            viewers = list(self._viewers)
+            self.encoded += 1
+            self.encode_seconds += time.perf_counter() - start
+
+        fanout_start = time.perf_counter()
+        for viewer in viewers:
+            try:
+                viewer._wake()
+            except RuntimeError:  # Event loop already closed
+                pass
+        self.fanout_seconds += time.perf_counter() - fanout_start
+        return True
+
+    def add(self, viewer: Viewer):
+        with self._lock:
+            if not self._viewers:
+                # Nothing was encoded while nobody watched - the stored frame is stale
+                viewer.last_seq = self._seq
+            self._viewers.append(viewer)
+
+    def remove(self, viewer: Viewer):
+        with self._lock:
+            if viewer in self._viewers:
+                self._viewers.remove(viewer)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            viewers = list(self._viewers)
+        for viewer in viewers:
+            try:
+                viewer._wake()
+            except RuntimeError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            viewers = list(self._viewers)
+            encoded, encode_seconds, fanout_seconds = self.encoded, self.encode_seconds, self.fanout_seconds
+        return {
+            "viewers": len(viewers),
+            "frames_encoded": encoded,
+            "avg_encode_ms": round(encode_seconds / encoded * 1000, 2) if encoded else 0.0,
+            "avg_fanout_ms": round(fanout_seconds / encoded * 1000, 3) if encoded else 0.0,
+            "frame_bytes": len(self._jpeg),
+            "viewer_dropped": sum(v.dropped for v in viewers),
+        }
+
+
+class BroadcastHub:
+    """
+    Channel registry, one channel per camera
+
+    Usage:
+        broadcast_hub.open("gate_1", title="Gate")
+        broadcast_hub.publish("gate_1", frame, detections)   # camera worker thread
+        viewer = broadcast_hub.subscribe("gate_1")            # event loop
+        broadcast_hub.close("gate_1")
+    """
+
+    def __init__(self, jpeg_quality: int = 80, max_width: int = 1280):
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self._channels: Dict[str, BroadcastChannel] = {}
+        self._lock = threading.Lock()
+
+    def open(self, camera_id: str, title: Optional[str] = None) -> BroadcastChannel:
+        with self._lock:
+            channel = self._channels.get(camera_id)
+            if channel is None or channel.closed:
+                channel = BroadcastChannel(camera_id, title or camera_id, self.jpeg_quality, self.max_width)
+                self._channels[camera_id] = channel
+            return channel
+
+    def close(self, camera_id: str):
+        """Remove a channel; its viewers receive None and finish"""
+        with self._lock:
+            channel = self._channels.pop(camera_id, None)
+        if channel is not None:
+            channel.close()
+
+    def publish(self, camera_id: str, frame: np.ndarray, detections: List[Dict]) -> bool:
+        channel = self._channels.get(camera_id)
+        return channel.publish(frame, detections) if channel is not None else False
+
+    def subscribe(self, camera_id: str) -> Optional[Viewer]:
+        """New viewer on the running event loop, or None if the camera has no channel"""
+        channel = self._channels.get(camera_id)
+        if channel is None:
+            return None
+        viewer = Viewer(channel, asyncio.get_running_loop())
+        channel.add(viewer)
+        return viewer
+
+    def unsubscribe(self, viewer: Viewer):
+        viewer.channel.remove(viewer)
+
+    def stats(self, camera_id: str) -> Optional[dict]:
+        channel = self._channels.get(camera_id)
+        return channel.stats() if channel is not None else None
+
+
+# Singleton instance
+broadcast_hub = BroadcastHub(jpeg_quality=settings.BROADCAST_JPEG_QUALITY, max_width=settings.BROADCAST_MAX_WIDTH)
@@ -0,0 +1,334 @@
+"""
+Camera Inference - Server-side detection loop for StreamManager cameras
+
+Cameras are opened on the server (RTSP, HTTP, files, webcams) through
+StreamManager/CameraStream, so frames no longer travel browser -> JPEG ->
+WebSocket -> decode before inference. The camera scheduler batches the
+newest frame of every due camera (read-only views, frames captured in
+between are skipped, never queued) into the detector according to each
+camera's target fps and priority; the result handler feeds the incident
+aggregator / alert pool and publishes the result to subscribers (e.g.
+WebSocket clients).
+While anyone watches, the annotated frame goes to the camera's broadcast
+channel (encoded once for all MJPEG / WebSocket viewers). The clip recorder
+keeps a pre-roll buffer of every camera for incident clips.
+
+Camera configurations are mirrored to the MongoDB `cameras` collection and
+restored on start().
+"""
+import re
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_sync_database
+from app.services.stream_manager import stream_manager, StreamManager
+from app.services.broadcast import broadcast_hub
+from app.services.clip_recorder import clip_recorder
+from app.services.camera_scheduler import camera_scheduler, CameraScheduler
+from app.services.realtime_detection import (
+    incident_detections, incident_aggregator, submit_incident_events
+)
+
+logger = logging.getLogger(__name__)
+
+# Result callback, called from the camera worker thread
+ResultCallback = Callable[[dict], None]
+
+_CREDENTIALS = re.compile(r"//[^/@]+@")
+
+
+def mask_source(source: str) -> str:
+    """Hide user:password in stream URLs before they leave the server"""
+    return _CREDENTIALS.sub("//***@", source)
+
+
+class CameraInferenceManager:
+    """
+    Runs detection on the latest frame of every registered camera
+
+    Usage:
+        camera_inference.add_camera("gate_1", "rtsp://...", confidence=0.5, target_fps=10, priority=8)
+        camera_inference.latest_result("gate_1")           # newest detections
+        unsubscribe = camera_inference.subscribe("gate_1", callback)
+        camera_inference.remove_camera("gate_1")
+    """
+
+    def __init__(
+        self,
+        target_fps: float = 5.0,
+        streams: StreamManager = stream_manager,
+        scheduler: CameraScheduler = camera_scheduler
+    ):
+        """
+        Initialize the manager
+
+        Args:
+            target_fps: Default inference rate per camera
+            streams: Capture side (CameraStream per camera)
+            scheduler: Shares the detector between the cameras
+        """
+        self.target_fps = target_fps
+        self.streams = streams
+        self.scheduler = scheduler
+
+        self._cameras: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Restore the cameras saved in MongoDB"""
+        try:
+            saved = list(get_sync_database().cameras.find({}, {"_id": 0}))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load cameras from MongoDB: {e}")
+            return
+
+        for config in saved:
+            try:
+                self.add_camera(persist=False, **config)
+            except ValueError as e:
+                logger.warning(f"⚠️ Camera {config.get('camera_id')} not restored: {e}")
+        if saved:
+            logger.info(f"✅ Restored {len(saved)} camera(s)")
+
+    def stop(self, timeout: float = 5):
+        """Stop all camera workers and streams (cameras stay saved for the next start)"""
+        with self._lock:
+            camera_ids = list(self._cameras)
+        for camera_id in camera_ids:
+            self._stop_camera(camera_id, timeout)
+        self.scheduler.stop(timeout)
+        logger.info("✅ Camera inference stopped")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def add_camera(
+        self,
+        camera_id: str,
+        source: str,
+        name: Optional[str] = None,
+        confidence: float = 0.5,
+        model_type: str = "yolo",
+        roi: Optional[List[int]] = None,
+        target_fps: Optional[float] = None,
+        priority: int = 5,
+        persist: bool = True
+    ) -> dict:
+        """
+        Open a camera and start its inference loop
+
+        Args:
+            camera_id: Unique camera identifier
+            source: RTSP/HTTP URL, file path or webcam index
+            name: Display name, used as the alert location
+            confidence: Detection confidence threshold
+            model_type: "yolo" or "fasterrcnn"
+            roi: Optional region of interest [x, y, w, h] in frame pixels
+            target_fps: Inference rate (defaults to the manager's target_fps)
+            priority: 0-10, higher priority cameras keep their rate longer when the node is saturated
+            persist: Save the camera to MongoDB
+
+        Returns:
+            Public view of the camera
+
+        Raises:
+            ValueError: If the camera already exists or the stream cannot be added
+        """
+        config = {
+            "camera_id": camera_id,
+            "source": source,
+            "name": name or camera_id,
+            "confidence": confidence,
+            "model_type": model_type,
+            "roi": list(roi) if roi else None,
+            "target_fps": target_fps or self.target_fps,
+            "priority": priority,
+        }
+
+        with self._lock:
+            if camera_id in self._cameras:
+                raise ValueError(f"Camera {camera_id} already exists")
+            if not self.streams.add_stream(camera_id, source):
+                raise ValueError(f"Could not add stream for camera {camera_id}")
+
+            camera = {
+                "config": config,
+                "subscribers": [],
+                "result": None,
+                "frames": 0,
+            }
+            self._cameras[camera_id] = camera
+            broadcast_hub.open(camera_id, title=config["name"])
+            clip_recorder.start_camera(camera_id)
+            self.scheduler.add(
+                camera_id, lambda result: self._handle_result(camera_id, camera, result),
+                target_fps=config["target_fps"], priority=priority, model_type=model_type,
+                confidence=confidence, roi=config["roi"]
+            )
+
+        if persist:
+            try:
+                get_sync_database().cameras.replace_one({"camera_id": camera_id}, dict(config), upsert=True)
+            except Exception as e:
+                logger.warning(f"⚠️ Camera {camera_id} not saved to MongoDB: {e}")
+
+        logger.info(f"📹 Camera added: {camera_id} ({mask_source(source)}) at {config['target_fps']} fps, "
+                    f"priority {priority}")
+        return self.get_camera(camera_id)
+
+    def remove_camera(self, camera_id: str) -> bool:
+        """
+        Stop a camera and forget it
+
+        Returns:
+            bool: False if the camera does not exist
+        """
+        if not self._stop_camera(camera_id):
+            return False
+        try:
+            get_sync_database().cameras.delete_one({"camera_id": camera_id})
+        except Exception as e:
+            logger.warning(f"⚠️ Camera {camera_id} not removed from MongoDB: {e}")
+        logger.info(f"📹 Camera removed: {camera_id}")
+        return True
+
+    def get_camera(self, camera_id: str) -> Optional[dict]:
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            return self._public(camera_id, camera) if camera else None
+
+    def list_cameras(self) -> List[dict]:
+        with self._lock:
+            return [self._public(camera_id, camera) for camera_id, camera in self._cameras.items()]
+
+    def latest_result(self, camera_id: str) -> Optional[dict]:
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            return camera["result"] if camera else None
+
+    def subscribe(self, camera_id: str, callback: ResultCallback) -> Optional[Callable[[], None]]:
+        """
+        Receive every new result of a camera
+
+        The callback runs in the camera worker thread and must not block
+        (hand the result over, e.g. with loop.call_soon_threadsafe).
+
+        Returns:
+            Function that removes the subscription, or None if the camera does not exist
+        """
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return None
+            camera["subscribers"].append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in camera["subscribers"]:
+                    camera["subscribers"].remove(callback)
+
+        return unsubscribe
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _stop_camera(self, camera_id: str, timeout: float = 5) -> bool:
+        with self._lock:
+            camera = self._cameras.pop(camera_id, None)
+        if camera is None:
+            return False
+
+        self.scheduler.remove(camera_id, timeout)
+        broadcast_hub.close(camera_id)
+        submit_incident_events(camera_id, incident_aggregator.close_camera(camera_id),
+                               location=camera["config"]["name"])
+        clip_recorder.stop_camera(camera_id)
+        self.streams.remove_stream(camera_id)
+        return True
+
+    def _public(self, camera_id: str, camera: dict) -> dict:
+        config = camera["config"]
+        stream = self.streams.get_stream(camera_id)
+        info = stream.get_info() if stream else {}
+        stats = self.scheduler.camera_stats(camera_id) or {}
+        return {
+            **config,
+            "source": mask_source(config["source"]),
+            "is_connected": info.get("is_connected", False),
+            "is_active": info.get("is_active", False),
+            "frame_age_seconds": info.get("frame_age_seconds"),
+            "frames_processed": stats.get("frames", 0),
+            "frames_skipped": stats.get("skipped", 0),  # Captured but not inferred (camera faster than budget)
+            "idle_ticks": stats.get("idle", 0),  # Ticks without a new frame
+            "errors": stats.get("errors", 0),
+            "fps": stats.get("achieved_fps", 0.0),  # Achieved inference rate
+            "budget_fps": stats.get("budget_fps"),  # Below target_fps while the node is saturated
+            "degraded": stats.get("degraded", False),
+            "avg_processing_time": round(stats.get("avg_processing_time", 0.0), 4),
+            "subscribers": len(camera["subscribers"]),
+            "broadcast": broadcast_hub.stats(camera_id),
+            "clips": clip_recorder.stats(camera_id),
+        }
+
+    def _publish(self, camera: dict, result: dict):
+        with self._lock:
+            camera["result"] = result
+            subscribers = list(camera["subscribers"])
+        for callback in subscribers:
+            try:
+                callback(result)
+            except Exception as e:
+                logger.warning(f"⚠️ Camera result subscriber failed: {e}")
+
+    def _handle_result(self, camera_id: str, camera: dict, result: Optional[dict]):
+        """Incidents, live view and subscribers for one scheduler result (result worker thread)"""
+        config = camera["config"]
+        if result is None:
+            # No new frame (connecting or stalled) - still let incidents
+            # of this camera close once it stays quiet
+            submit_incident_events(camera_id, incident_aggregator.update(camera_id, []),
+                                   location=config["name"])
+            return
+
+        frame, detections = result["frame"], result["detections"]
+        detection_dicts = incident_detections(detections)
+        events = incident_aggregator.update(camera_id, detection_dicts)
+        submit_incident_events(camera_id, events, frame, detections, location=config["name"])
+        # Annotated + encoded once for all viewers (no-op while nobody watches)
+        broadcast_hub.publish(camera_id, frame, detection_dicts)
+
+        camera["frames"] += 1
+        stats = self.scheduler.camera_stats(camera_id) or {}
+        self._publish(camera, {
+            "camera_id": camera_id,
+            "seq": camera["frames"],
+            "timestamp": time.time(),
+            "frame_time": result["frame_time"],
+            "width": frame.shape[1],
+            "height": frame.shape[0],
+            "detections": [
+                {
+                    "class_name": det.class_name,
+                    "confidence": det.confidence,
+                    "bbox": {"x1": det.bbox.x1, "y1": det.bbox.y1, "x2": det.bbox.x2, "y2": det.bbox.y2}
+                }
+                for det in detections
+            ],
+            "total_weapons": len(detections),
+            "processing_time": result["processing_time"],
+            "batch_size": result["batch_size"],
+            "fps": stats.get("achieved_fps", 0.0),
+        })
+
+
+# Singleton instance
+camera_inference = CameraInferenceManager(target_fps=settings.CAMERA_INFERENCE_FPS)
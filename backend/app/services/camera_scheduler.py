@@ -0,0 +1,354 @@
+"""
+Camera Scheduler - Fair batched inference for server-side cameras
+
+One scheduler thread shares the detector between all cameras:
+
+    - every camera has a target fps and a priority (e.g. entrance 10 fps /
+      priority 8, storage room 1 fps / priority 2)
+    - cameras that are due are served highest priority first and, within a
+      priority, most overdue first (round robin); their newest frames go
+      into one batched model call (same model type per batch)
+    - the detector's measured cost per frame gives the node's capacity; when
+      the targets add up to more than that, budgets are cut starting from the
+      lowest priority (never below min_fps), so important cameras keep their
+      rate while the node is saturated
+    - results are handed to the camera's callback on a small worker pool;
+      a camera is not scheduled again before its previous result is handled
+
+Per camera, the achieved fps is exposed next to target and budget fps.
+"""
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.stream_manager import stream_manager, StreamManager
+from app.services.realtime_detection import detect_frames
+
+logger = logging.getLogger(__name__)
+
+# Called with {"seq", "frame", "frame_time", "detections", "processing_time", "batch_size"},
+# or None when the camera had no new frame for a whole interval. The frame is released to the
+# capture side when the callback returns - copy it to keep it.
+CameraResultCallback = Callable[[Optional[dict]], None]
+
+
+class CameraScheduler:
+    """
+    Priority- and budget-aware batching of camera frames into the detector
+
+    Usage:
+        camera_scheduler.add("gate_1", on_result, target_fps=10, priority=8)
+        camera_scheduler.camera_stats("gate_1")   # target / budget / achieved fps
+        camera_scheduler.remove("gate_1")
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 8,
+        headroom: float = 0.9,
+        min_fps: float = 0.2,
+        result_workers: int = 4,
+        fps_window: float = 5.0,
+        streams: StreamManager = stream_manager,
+        detect_fn: Callable = detect_frames
+    ):
+        """
+        Initialize the scheduler
+
+        Args:
+            batch_size: Maximum frames per model call
+            headroom: Share of the measured detector capacity that may be planned
+            min_fps: Budget floor of degraded cameras
+            result_workers: Threads running the result callbacks
+            fps_window: Seconds the achieved fps is measured over
+            streams: Capture side (newest frame of every camera)
+            detect_fn: Batched detector (frames, model_type, confidences, rois) -> detections per frame
+        """
+        self.batch_size = max(1, batch_size)
+        self.headroom = headroom
+        self.min_fps = min_fps
+        self.fps_window = fps_window
+        self.streams = streams
+        self.detect_fn = detect_fn
+
+        self._cameras: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=result_workers, thread_name_prefix="camera-result")
+
+        # Detector measurements
+        self._frame_cost: Optional[float] = None  # EWMA seconds per frame
+        self._batches = 0
+        self._batched_frames = 0
+        self._capacity_fps: Optional[float] = None
+        self._saturated = False
+        self._last_rebalance = 0.0
+
+    # ------------------------------------------------------------------
+    # Cameras
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        camera_id: str,
+        on_result: CameraResultCallback,
+        target_fps: float = 5.0,
+        priority: int = 5,
+        model_type: str = "yolo",
+        confidence: float = 0.5,
+        roi: Optional[List[int]] = None
+    ):
+        """Start scheduling a StreamManager camera (starts the scheduler thread if needed)"""
+        with self._lock:
+            self._cameras[camera_id] = {
+                "camera_id": camera_id,
+                "on_result": on_result,
+                "target_fps": target_fps,
+                "budget_fps": target_fps,
+                "priority": priority,
+                "model_type": model_type,
+                "confidence": confidence,
+                "roi": roi,
+                "added_at": time.time(),
+                "next_due": time.time(),
+                "last_seq": 0,
+                "busy": False,
+                "idle_since": None,
+                "deliveries": deque(),
+                "stats": {"frames": 0, "skipped": 0, "idle": 0, "errors": 0, "avg_processing_time": 0.0},
+            }
+            self._rebalance()
+            if self._thread is None or not self._thread.is_alive():
+                self._stop_event.clear()
+                self._thread = threading.Thread(target=self._loop, name="camera-scheduler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def remove(self, camera_id: str, timeout: float = 5) -> bool:
+        """
+        Stop scheduling a camera; waits until its last result callback returned
+
+        Returns:
+            bool: False if the camera was not scheduled
+        """
+        with self._lock:
+            entry = self._cameras.pop(camera_id, None)
+            if entry is not None:
+                self._rebalance()
+        if entry is None:
+            return False
+        deadline = time.time() + timeout
+        while entry["busy"] and time.time() < deadline:
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5):
+        """Stop the scheduler thread (cameras should be removed first)"""
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self._executor.shutdown(wait=True)
+        logger.info("✅ Camera scheduler stopped")
+
+    def camera_stats(self, camera_id: str) -> Optional[dict]:
+        """Scheduling statistics of one camera (None if not scheduled)"""
+        with self._lock:
+            entry = self._cameras.get(camera_id)
+            if entry is None:
+                return None
+            stats = entry["stats"]
+            return {
+                "priority": entry["priority"],
+                "target_fps": entry["target_fps"],
+                "budget_fps": round(entry["budget_fps"], 2),  # Below target while the node is saturated
+                "achieved_fps": round(self._achieved_fps(entry, time.time()), 2),
+                "degraded": entry["budget_fps"] < entry["target_fps"],
+                "frames": stats["frames"],
+                "skipped": stats["skipped"],
+                "idle": stats["idle"],
+                "errors": stats["errors"],
+                "avg_processing_time": stats["avg_processing_time"],
+            }
+
+    def stats(self) -> dict:
+        """Node-level statistics"""
+        with self._lock:
+            return {
+                "cameras": len(self._cameras),
+                "demand_fps": round(sum(e["target_fps"] for e in self._cameras.values()), 2),
+                "capacity_fps": round(self._capacity_fps, 2) if self._capacity_fps else None,
+                "saturated": self._saturated,
+                "frame_cost_ms": round(self._frame_cost * 1000, 2) if self._frame_cost else None,
+                "avg_batch_size": round(self._batched_frames / self._batches, 2) if self._batches else 0.0,
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _loop(self):
+        """Scheduler thread: pick due cameras, run one batch, repeat"""
+        while not self._stop_event.is_set():
+            with self._lock:
+                if time.time() - self._last_rebalance >= 1.0:
+                    self._rebalance()
+                model_type, batch, wait = self._next_batch()
+            if batch:
+                self._run_batch(model_type, batch)
+            else:
+                self._wake.wait(wait)
+                self._wake.clear()
+
+    def _next_batch(self):
+        """
+        Select the next batch (caller holds the lock)
+
+        Returns:
+            (model_type, [(entry, stream, checked-out frame item)], seconds to wait if the batch is empty)
+        """
+        now = time.time()
+        due = [e for e in self._cameras.values() if not e["busy"] and now >= e["next_due"]]
+        # Highest priority first, then the most overdue (round robin within a priority)
+        due.sort(key=lambda e: (-e["priority"], e["next_due"]))
+
+        model_type, batch = None, []
+        for entry in due:
+            if model_type is not None and entry["model_type"] != model_type:
+                continue  # Different model - next batch
+            stream = self.streams.get_stream(entry["camera_id"])
+            # Compare sequence numbers first: latest() of a capture-process camera copies the
+            # whole frame out of shared memory, and due cameras are polled every 5 ms
+            item = stream.latest() if stream and stream.frame_seq > entry["last_seq"] else None
+            if item is None:
+                # Due but no new frame: after a whole interval report an idle tick
+                # (lets incidents of a silent camera close)
+                entry["idle_since"] = entry["idle_since"] or now
+                if now - entry["idle_since"] >= 1.0 / entry["budget_fps"]:
+                    entry["idle_since"] = now
+                    entry["stats"]["idle"] += 1
+                    self._deliver(entry, None)
+                continue
+            entry["idle_since"] = None
+            model_type = entry["model_type"]
+            batch.append((entry, stream, item))
+            if len(batch) >= self.batch_size:
+                break
+
+        pending = [e["next_due"] for e in self._cameras.values() if not e["busy"]]
+        # Due cameras without a new frame are polled every 5 ms
+        wait = min(0.05, max(0.005, min(pending) - now)) if pending else 0.05
+        return model_type, batch, wait
+
+    def _run_batch(self, model_type: str, batch: list):
+        entries = [entry for entry, _, _ in batch]
+        start_time = time.time()
+        try:
+            results = self.detect_fn(
+                [item[1] for _, _, item in batch], model_type,
+                [e["confidence"] for e in entries], [e["roi"] for e in entries]
+            )
+        except Exception as e:
+            logger.error(f"❌ Camera batch detection error ({len(batch)} frame(s)): {e}")
+            results = None
+        processing_time = time.time() - start_time
+
+        with self._lock:
+            now = time.time()
+            if results is not None:
+                cost = processing_time / len(batch)
+                self._frame_cost = cost if self._frame_cost is None else self._frame_cost * 0.8 + cost * 0.2
+                self._batches += 1
+                self._batched_frames += len(batch)
+
+            for i, (entry, stream, item) in enumerate(batch):
+                seq, frame, frame_time = item
+                stats = entry["stats"]
+                if entry["last_seq"]:
+                    stats["skipped"] += max(0, seq - entry["last_seq"] - 1)
+                entry["last_seq"] = seq
+                # Never catch up on missed ticks - a saturated node just lowers the achieved fps
+                entry["next_due"] = max(entry["next_due"] + 1.0 / entry["budget_fps"], now)
+
+                if results is None:
+                    stats["errors"] += 1
+                    stream.release(item)
+                    continue
+                stats["frames"] += 1
+                stats["avg_processing_time"] += (processing_time - stats["avg_processing_time"]) / stats["frames"]
+                entry["deliveries"].append(now)
+                self._deliver(entry, {
+                    "seq": seq,
+                    "frame": frame,
+                    "frame_time": frame_time,
+                    "detections": results[i],
+                    "processing_time": processing_time,
+                    "batch_size": len(batch),
+                }, release=partial(stream.release, item))
+
+    def _deliver(self, entry: dict, result: Optional[dict], release: Optional[Callable[[], None]] = None):
+        """
+        Hand a result to the camera's callback on the worker pool (caller holds the lock)
+
+        release gives the result's frame back to the capture side once the callback returned.
+        """
+        entry["busy"] = True
+
+        def run():
+            try:
+                entry["on_result"](result)
+            except Exception as e:
+                logger.error(f"[{entry['camera_id']}] ❌ Result handler error: {e}")
+            finally:
+                if release is not None:
+                    release()
+                entry["busy"] = False
+                self._wake.set()
+
+        try:
+            self._executor.submit(run)
+        except RuntimeError:
+            entry["busy"] = False  # Shutting down
+            if release is not None:
+                release()
+
+    def _achieved_fps(self, entry: dict, now: float) -> float:
+        deliveries = entry["deliveries"]
+        while deliveries and deliveries[0] < now - self.fps_window:
+            deliveries.popleft()
+        return len(deliveries) / max(1e-3, min(self.fps_window, now - entry["added_at"]))
+
+    def _rebalance(self):
+        """
+        Split the detector capacity into per-camera budgets (caller holds the lock)
+
+        Priorities are served from the highest down; the first priority that no
+        longer fits gets the remaining capacity proportionally, lower ones get
+        min_fps.
+        """
+        self._last_rebalance = time.time()
+        if self._frame_cost is None:
+            return  # Nothing measured yet - everybody at target
+        self._capacity_fps = self.headroom / self._frame_cost
+        remaining = self._capacity_fps
+        demand = sum(e["target_fps"] for e in self._cameras.values())
+        self._saturated = demand > self._capacity_fps
+
+        for priority in sorted({e["priority"] for e in self._cameras.values()}, reverse=True):
+            members = [e for e in self._cameras.values() if e["priority"] == priority]
+            level_demand = sum(e["target_fps"] for e in members)
+            scale = 1.0 if level_demand <= remaining else max(0.0, remaining) / level_demand
+            remaining -= level_demand
+            for entry in members:
+                entry["budget_fps"] = max(entry["target_fps"] * scale, min(self.min_fps, entry["target_fps"]))
+
+
+# Singleton instance
+camera_scheduler = CameraScheduler(batch_size=settings.CAMERA_BATCH_SIZE)
@@ -1,15 +1,125 @@
 """
 Camera Stream Service - Handles individual RTSP/camera streams with auto-reconnection
+
+The newest frame is published into a FrameSlot: every frame gets a sequence
+number, consumers block for "the next frame after seq N" instead of polling,
+and get a read-only view of the frame instead of a copy. Consumers check a
+frame out and release it when done; the capture thread decodes into a small
+pool of buffers (double buffering) and only reuses a buffer that is neither
+the latest frame nor checked out.
 """
 import cv2
+import os
 import threading
 import time
 import numpy as np
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# (seq, read-only frame view, capture timestamp)
+FrameItem = Tuple[int, np.ndarray, float]
+
+
+def read_only_view(frame: np.ndarray) -> np.ndarray:
+    """View of frame that raises on writes (no copy)"""
+    view = frame.view()
+    view.flags.writeable = False
+    return view
+
+
+class FrameSlot:
+    """
+    Latest frame of a stream, versioned with a monotonically increasing sequence number
+
+    Every frame a consumer checks out stays checked out until it is released,
+    so the producer knows exactly which buffers it may overwrite.
+
+    Usage:
+        slot.publish(frame)                               # producer (capture thread)
+        seq, frame, ts = slot.checkout(last_seq, 1)       # consumer: next frame after last_seq
+        slot.release(seq)                                 # consumer done with the frame
+        slot.in_use(buffer)                               # producer: may buffer be overwritten?
+    """
+    
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._frame: Optional[np.ndarray] = None
+        self._buffer: Optional[np.ndarray] = None  # Array behind the latest frame
+        self._timestamp = 0.0
+        self._holds: Dict[int, list] = {}  # seq -> [buffer, checkouts] of checked-out frames
+    
+    @property
+    def seq(self) -> int:
+        with self._cond:
+            return self._seq
+    
+    @property
+    def timestamp(self) -> float:
+        with self._cond:
+            return self._timestamp
+    
+    def publish(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        Make frame the latest frame and wake waiting consumers
+        
+        The producer must not write to frame afterwards, until in_use(frame) is False.
+        
+        Returns:
+            int: Sequence number of the frame
+        """
+        view = read_only_view(frame)
+        with self._cond:
+            self._seq += 1
+            self._frame = view
+            self._buffer = frame
+            self._timestamp = time.time() if timestamp is None else timestamp
+            self._cond.notify_all()
+            return self._seq
+    
+    def checkout(self, after_seq: int = 0, timeout: Optional[float] = 0) -> Optional[FrameItem]:
+        """
+        Check out the newest frame after after_seq - release(seq) it when done
+        
+        Args:
+            after_seq: Sequence number of the last frame the consumer saw (0 for any)
+            timeout: Seconds to wait for such a frame (0 returns at once, None waits forever)
+        
+        Returns:
+            Newest (seq, read-only frame, timestamp) - frames in between are skipped -
+            or None on timeout / when the slot is cleared
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq and self._frame is not None, timeout):
+                return None
+            hold = self._holds.setdefault(self._seq, [self._buffer, 0])
+            hold[1] += 1
+            return self._seq, self._frame, self._timestamp
+    
+    def release(self, seq: int):
+        """Give back a frame obtained from checkout()"""
+        with self._cond:
+            hold = self._holds.get(seq)
+            if hold is None:
+                return
+            hold[1] -= 1
+            if hold[1] <= 0:
+                del self._holds[seq]
+    
+    def in_use(self, buffer: np.ndarray) -> bool:
+        """True while buffer holds the latest frame or a checked-out one"""
+        with self._cond:
+            return buffer is self._buffer or any(held is buffer for held, _ in self._holds.values())
+    
+    def clear(self):
+        """Forget the frame (sequence numbers keep increasing; checked-out frames stay held)"""
+        with self._cond:
+            self._frame = None
+            self._buffer = None
+            self._cond.notify_all()
+
 
 class CameraStream:
     """
@@ -32,11 +142,16 @@ class CameraStream:
         # Thread control
         self._thread: Optional[threading.Thread] = None
         self._stop_event = threading.Event()
-        self._lock = threading.Lock()
+        self._lock = threading.RLock()  # get_info() calls is_active() under the lock
         
-        # Frame storage
-        self._frame: Optional[np.ndarray] = None
-        self._last_frame_time = 0
+        # Frame storage: versioned slot + capture buffers (at most max_buffers reused)
+        self._slot = FrameSlot()
+        self._buffers: List[np.ndarray] = []
+        self._max_buffers = 2
+        
+        # Video files are not paced by a camera: replay them at their own frame rate
+        self._file_frame_interval = 0.0
+        self._next_file_frame = 0.0
         
         # Connection state
         self._is_connected = False
@@ -98,10 +213,14 @@ class CameraStream:
                 self._cap.release()
                 return False
             
+            fps = self._cap.get(cv2.CAP_PROP_FPS) if os.path.isfile(self.rtsp_url) else 0
+            self._file_frame_interval = 1.0 / fps if fps > 0 else 0.0
+            self._next_file_frame = time.time()
+            
             # Store first frame
+            self._buffers = []
+            self._slot.publish(frame)
             with self._lock:
-                self._frame = frame
-                self._last_frame_time = time.time()
                 self._is_connected = True
                 self._connection_attempts = 0
             
@@ -135,12 +254,22 @@ class CameraStream:
             
             # Try to read frame
             try:
-                # OPTIMIZATION: Skip buffered frames and get latest
-                # Grab multiple times to clear buffer and get fresh frame
-                for _ in range(2):  # Clear 2 buffered frames
+                if self._file_frame_interval:
+                    # Video file: wait for the frame's due time, read every frame
+                    self._next_file_frame += self._file_frame_interval
+                    if self._stop_event.wait(max(0.0, self._next_file_frame - time.time())):
+                        break
                     self._cap.grab()
+                else:
+                    # OPTIMIZATION: Skip buffered frames and get latest
+                    # Grab multiple times to clear buffer and get fresh frame
+                    for _ in range(2):  # Clear 2 buffered frames
+                        self._cap.grab()
                 
-                ret, frame = self._cap.retrieve()
+                # Decode into a free buffer; grab() blocks until the camera has a frame,
+                # so there is no polling sleep
+                buffer = self._free_buffer()
+                ret, frame = self._cap.retrieve(buffer) if buffer is not None else self._cap.retrieve()
                 
                 if not ret or frame is None:
                     logger.warning(f"[{self.camera_id}] ❌ Lost connection (frame read failed)")
@@ -148,13 +277,12 @@ class CameraStream:
                         self._is_connected = False
                     continue
                 
-                # Successfully read frame - store it
-                with self._lock:
-                    self._frame = frame
-                    self._last_frame_time = time.time()
-                
-                # Small sleep to prevent CPU overload (reduce for lower latency)
-                time.sleep(0.005)  # ~200 FPS max read rate for lower latency
+                # Successfully read frame - publish it (no copy)
+                if buffer is not None and frame is not buffer:
+                    self._buffers = []  # Resolution changed - OpenCV allocated a new array
+                elif buffer is None and len(self._buffers) < self._max_buffers:
+                    self._buffers.append(frame)
+                self._slot.publish(frame)
                 
             except Exception as e:
                 logger.error(f"[{self.camera_id}] Error reading frame: {str(e)}")
@@ -167,23 +295,61 @@ class CameraStream:
             self._cap.release()
         logger.info(f"[{self.camera_id}] Capture loop stopped")
     
+    def _free_buffer(self) -> Optional[np.ndarray]:
+        """
+        Capture buffer that is neither the latest frame nor checked out (capture thread only)
+        
+        None means: let OpenCV allocate a new array.
+        """
+        for buffer in self._buffers:
+            if not self._slot.in_use(buffer):
+                return buffer
+        return None
+    
+    def latest(self) -> Optional[FrameItem]:
+        """
+        Most recent frame without copying - give it back with release(item)
+        
+        Returns:
+            (seq, read-only frame, capture timestamp) or None before the first frame
+        """
+        return self._slot.checkout()
+    
+    def wait_frame(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[FrameItem]:
+        """
+        Block until a frame newer than after_seq arrives (see FrameSlot.checkout) - give it
+        back with release(item)
+        
+        Returns:
+            (seq, read-only frame, capture timestamp) or None on timeout
+        """
+        return self._slot.checkout(after_seq, timeout)
+    
+    def release(self, item: FrameItem):
+        """Done with a frame from latest() / wait_frame(): its buffer may be reused"""
+        self._slot.release(item[0])
+    
     def read(self) -> tuple[bool, Optional[np.ndarray]]:
         """
-        Get the most recent frame
+        Get a writable copy of the most recent frame
+        
+        Prefer latest() / wait_frame() - they return read-only views without copying.
         
         Returns:
             tuple: (success: bool, frame: np.ndarray or None)
         """
-        with self._lock:
-            if self._frame is None:
-                return False, None
-            
+        item = self._slot.checkout()
+        if item is None:
+            return False, None
+        try:
             # Check if frame is stale (older than 5 seconds)
-            if time.time() - self._last_frame_time > 5:
+            if time.time() - item[2] > 5:
                 logger.warning(f"[{self.camera_id}] Frame is stale")
                 return False, None
             
-            return True, self._frame.copy()
+            return True, item[1].copy()
+        finally:
+            self._slot.release(item[0])
     
     def get_frame(self) -> Optional[np.ndarray]:
         """
@@ -195,6 +361,21 @@ class CameraStream:
         ret, frame = self.read()
         return frame if ret else None
     
+    @property
+    def last_frame_time(self) -> float:
+        """Capture time of the most recent frame (0 before the first frame)"""
+        return self._slot.timestamp
+    
+    @property
+    def frame_seq(self) -> int:
+        """Sequence number of the most recent frame (0 before the first frame)"""
+        return self._slot.seq
+    
+    def is_connected(self) -> bool:
+        """True while the camera is open (is_active() also requires recent frames)"""
+        with self._lock:
+            return self._is_connected
+    
     def is_active(self) -> bool:
         """
         Check if stream is active and receiving frames
@@ -202,11 +383,12 @@ class CameraStream:
         Returns:
             bool: True if connected and receiving recent frames
         """
+        last_frame_time = self._slot.timestamp
         with self._lock:
             return (
                 self._is_connected and 
-                self._frame is not None and 
-                time.time() - self._last_frame_time < 3
+                last_frame_time > 0 and 
+                time.time() - last_frame_time < 3
             )
     
     def stop(self):
@@ -225,8 +407,9 @@ class CameraStream:
             if self._cap is not None:
                 self._cap.release()
                 self._cap = None
-            self._frame = None
             self._is_connected = False
+        self._slot.clear()
+        self._buffers = []
         
         logger.info(f"[{self.camera_id}] ✅ Stream stopped")
     
@@ -237,6 +420,7 @@ class CameraStream:
         Returns:
             dict: Stream status and metadata
         """
+        last_frame_time = self._slot.timestamp
         with self._lock:
             return {
                 "camera_id": self.camera_id,
@@ -244,6 +428,7 @@ class CameraStream:
                 "is_connected": self._is_connected,
                 "is_active": self.is_active(),
                 "connection_attempts": self._connection_attempts,
-                "last_frame_time": self._last_frame_time,
-                "frame_age_seconds": time.time() - self._last_frame_time if self._last_frame_time > 0 else None,
+                "frame_seq": self._slot.seq,
+                "last_frame_time": last_frame_time,
+                "frame_age_seconds": time.time() - last_frame_time if last_frame_time > 0 else None,
             }
@@ -0,0 +1,552 @@
+"""
+Capture Processes - Camera decoding in separate processes with shared-memory frame rings
+
+With many cameras, decoding inside the API process competes with inference
+and request handling for the GIL, and a hung FFmpeg backend can stall it.
+In process capture mode each group of cameras is decoded by its own process:
+
+    capture process: CameraStream (reconnects) -> optional downscale
+                     -> SharedFrameRing (shared memory) -> ("frame", seq) over a pipe
+    API process:     ProcessCameraStream (same API as CameraStream) copies the
+                     newest frame out of the ring only when a consumer asks for it
+
+CaptureGroup supervises its process: a dead process, or a camera that reports
+connected but delivers no frames for stall_timeout (hung decoder), gets the
+process restarted with all its cameras.
+
+This module is imported by the capture processes, so it must stay light:
+heavy app services are not imported here.
+"""
+import cv2
+import threading
+import time
+import logging
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.camera_stream import CameraStream, FrameItem, read_only_view
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = 0x474E4952  # "RING"
+_HEADER_WORDS = 8  # magic, slots, width, height, channels, latest_seq, reserved x2
+_META_DTYPE = np.dtype([("state", "<u8"), ("seq", "<u8"), ("timestamp", "<f8")])
+
+
+def _align(offset: int, alignment: int = 64) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def downscale(frame: np.ndarray, max_width: int) -> np.ndarray:
+    """Shrink frame to max_width (keeping aspect ratio); 0 keeps the full resolution"""
+    height, width = frame.shape[:2]
+    if not max_width or width <= max_width:
+        return frame
+    return cv2.resize(frame, (max_width, max(1, round(height * max_width / width))), interpolation=cv2.INTER_AREA)
+
+
+class SharedFrameRing:
+    """
+    Fixed-size ring of frames in shared memory - one writer process, readers in others
+
+    Layout: header words | per-slot metadata | slot frames. Every slot is
+    guarded by a sequence lock: the writer marks the slot odd while copying
+    into it; a reader copies the frame out and retries if the mark changed
+    in the meantime, so a reader never returns a half-written frame.
+
+    Usage:
+        ring = SharedFrameRing.create(width, height, slots=4)  # writer
+        ring.write(frame, timestamp)
+        ring = SharedFrameRing.attach(name)                     # reader
+        seq, frame, timestamp = ring.read_latest()
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory):
+        self._shm = shm
+        self._header = np.ndarray((_HEADER_WORDS,), dtype="<u8", buffer=shm.buf)
+        if self._header[0] != _MAGIC:
+            raise ValueError(f"{shm.name} is not a frame ring")
+        self.slots, self.width, self.height, self.channels = (int(v) for v in self._header[1:5])
+
+        meta_offset = _HEADER_WORDS * 8
+        frames_offset = _align(meta_offset + self.slots * _META_DTYPE.itemsize)
+        self._meta = np.ndarray((self.slots,), dtype=_META_DTYPE, buffer=shm.buf, offset=meta_offset)
+        self._frames = np.ndarray((self.slots, self.height, self.width, self.channels), dtype=np.uint8,
+                                  buffer=shm.buf, offset=frames_offset)
+
+    @classmethod
+    def create(cls, width: int, height: int, slots: int = 4, channels: int = 3) -> "SharedFrameRing":
+        slots = max(2, slots)
+        size = _align(_HEADER_WORDS * 8 + slots * _META_DTYPE.itemsize) + slots * width * height * channels
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        header = np.ndarray((_HEADER_WORDS,), dtype="<u8", buffer=shm.buf)
+        header[:] = 0
+        header[1:5] = (slots, width, height, channels)
+        header[0] = _MAGIC
+        del header
+        return cls(shm)
+
+    @classmethod
+    def attach(cls, name: str) -> "SharedFrameRing":
+        return cls(shared_memory.SharedMemory(name=name))
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self._header[5])
+
+    def fits(self, frame: np.ndarray) -> bool:
+        return frame.shape == self._frames.shape[1:]
+
+    def write(self, frame: np.ndarray, timestamp: float) -> int:
+        """Copy frame into the next slot (writer only); returns its sequence number"""
+        seq = self.latest_seq + 1
+        slot = seq % self.slots
+        meta = self._meta[slot]
+        meta["state"] = 2 * seq + 1  # Odd: being written
+        np.copyto(self._frames[slot], frame)
+        meta["seq"] = seq
+        meta["timestamp"] = timestamp
+        meta["state"] = 2 * seq + 2  # Even: complete
+        self._header[5] = seq
+        return seq
+
+    def read_latest(self, retries: int = 3) -> Optional[FrameItem]:
+        """
+        Copy of the newest complete frame
+
+        Returns:
+            (ring seq, frame copy, timestamp) or None if nothing was written yet
+            (or the writer kept overwriting the slot while it was being read)
+        """
+        for _ in range(retries):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+            meta = self._meta[seq % self.slots]
+            state = int(meta["state"])
+            if state != 2 * seq + 2:
+                continue
+            frame = self._frames[seq % self.slots].copy()
+            timestamp = float(meta["timestamp"])
+            if int(meta["state"]) == state:
+                return seq, frame, timestamp
+        return None
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        del self._header, self._meta, self._frames
+        self._shm.close()
+
+    def unlink(self):
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+# ======================================================================
+# Capture process side
+# ======================================================================
+
+def _forward_frames(camera_id: str, stream: CameraStream, stop_event: threading.Event,
+                    send, max_width: int, ring_slots: int):
+    """Copy every new frame of one camera into its ring and notify the parent (capture process)"""
+    ring: Optional[SharedFrameRing] = None
+    last_seq = 0
+    try:
+        while not stop_event.is_set():
+            item = stream.wait_frame(last_seq, timeout=1.0)
+            if item is None:
+                # Heartbeat with the connection state (not is_active(), which turns False as soon as
+                # frames stop): a camera that stays connected without delivering frames is a hung
+                # decoder, and the parent restarts the process; a disconnected one just reconnects
+                send(("status", camera_id, stream.is_connected()))
+                continue
+            last_seq, frame, timestamp = item
+            try:
+                frame = downscale(frame, max_width)
+
+                if ring is None or not ring.fits(frame):
+                    # First frame or new resolution: new ring, the parent unlinks the old one
+                    if ring is not None:
+                        ring.close()
+                    ring = SharedFrameRing.create(frame.shape[1], frame.shape[0], ring_slots, frame.shape[2])
+                    send(("ring", camera_id, ring.name))
+                ring.write(frame, timestamp)
+            finally:
+                stream.release(item)  # Copied into the ring - the capture buffer may be reused
+            send(("frame", camera_id, timestamp))
+    finally:
+        if ring is not None:
+            ring.close()
+
+
+def capture_main(conn, max_width: int = 0, ring_slots: int = 4):
+    """
+    Entry point of a capture process
+
+    Commands from the parent: ("add", camera_id, url), ("remove", camera_id), ("stop",).
+    Messages to the parent: ("ring", camera_id, shm_name), ("frame", camera_id, timestamp),
+    ("status", camera_id, connected).
+    """
+    logging.basicConfig(level=logging.INFO)
+    send_lock = threading.Lock()
+    cameras: Dict[str, tuple] = {}
+
+    def send(message):
+        with send_lock:
+            try:
+                conn.send(message)
+            except (OSError, EOFError):
+                pass
+
+    def remove(camera_id: str):
+        entry = cameras.pop(camera_id, None)
+        if entry is not None:
+            stream, stop_event, forwarder = entry
+            stop_event.set()
+            forwarder.join(timeout=2)
+            stream.stop()
+
+    try:
+        while True:
+            try:
+                command = conn.recv()
+            except (EOFError, OSError):
+                break  # Parent is gone
+            if command[0] == "add":
+                _, camera_id, url = command
+                remove(camera_id)
+                stream = CameraStream(camera_id, url)
+                stop_event = threading.Event()
+                forwarder = threading.Thread(
+                    target=_forward_frames, args=(camera_id, stream, stop_event, send, max_width, ring_slots),
+                    name=f"forward-{camera_id}", daemon=True
+                )
+                cameras[camera_id] = (stream, stop_event, forwarder)
+                stream.start()
+                forwarder.start()
+            elif command[0] == "remove":
+                remove(command[1])
+            elif command[0] == "stop":
+                break
+    finally:
+        for camera_id in list(cameras):
+            remove(camera_id)
+
+
+# ======================================================================
+# API process side
+# ======================================================================
+
+class ProcessCameraStream:
+    """
+    CameraStream-compatible handle of a camera decoded in a capture process
+
+    Frames are copied out of shared memory only when a consumer asks for them
+    (latest() / wait_frame() / read()), so frames nobody looks at cost nothing
+    in the API process.
+    """
+
+    def __init__(self, camera_id: str, rtsp_url: str, group: "CaptureGroup"):
+        self.camera_id = camera_id
+        self.rtsp_url = rtsp_url
+        self.group = group
+
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._last_frame_time = 0.0
+        self._is_connected = False
+        self._ring: Optional[SharedFrameRing] = None
+        self._ring_lock = threading.Lock()  # Reads vs ring swaps
+
+    # --- Called by the group's reader thread -------------------------------
+
+    def _on_ring(self, name: str):
+        try:
+            ring = SharedFrameRing.attach(name)
+        except (FileNotFoundError, ValueError) as e:
+            logger.warning(f"[{self.camera_id}] Cannot attach frame ring {name}: {e}")
+            return
+        self._swap_ring(ring)
+
+    def _on_frame(self, timestamp: float):
+        with self._cond:
+            self._seq += 1
+            self._last_frame_time = timestamp
+            self._is_connected = True
+            self._cond.notify_all()
+
+    def _on_status(self, connected: bool):
+        with self._cond:
+            self._is_connected = connected
+
+    def _swap_ring(self, ring: Optional[SharedFrameRing]):
+        """Replace the ring (None: detach); the old one is unlinked - the parent owns cleanup"""
+        with self._ring_lock:
+            old, self._ring = self._ring, ring
+        if old is not None:
+            old.close()
+            old.unlink()
+
+    # --- CameraStream API --------------------------------------------------
+
+    @property
+    def last_frame_time(self) -> float:
+        with self._cond:
+            return self._last_frame_time
+
+    @property
+    def frame_seq(self) -> int:
+        """Sequence number of the most recent frame - no shared memory read"""
+        with self._cond:
+            return self._seq
+
+    def start(self) -> bool:
+        return self.group.add(self)
+
+    def stop(self):
+        self.group.remove(self.camera_id)
+        self._swap_ring(None)
+        with self._cond:
+            self._is_connected = False
+            self._cond.notify_all()
+
+    def _read_ring(self) -> Optional[FrameItem]:
+        with self._cond:
+            seq = self._seq
+        with self._ring_lock:
+            item = self._ring.read_latest() if self._ring is not None else None
+        if item is None:
+            return None
+        return seq, read_only_view(item[1]), item[2]
+
+    def latest(self) -> Optional[FrameItem]:
+        """Most recent frame as a read-only array, or None before the first frame"""
+        return self._read_ring()
+
+    def wait_frame(self, after_seq: int = 0, timeout: Optional[float] = None) -> Optional[FrameItem]:
+        """Block until a frame newer than after_seq arrives (see FrameSlot.checkout)"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > after_seq, timeout):
+                return None
+        return self._read_ring()
+
+    def release(self, item: FrameItem):
+        """Frames are private copies out of the ring - nothing to give back (CameraStream API)"""
+
+    def read(self) -> tuple[bool, Optional[np.ndarray]]:
+        item = self._read_ring()
+        if item is None or time.time() - item[2] > 5:
+            return False, None
+        return True, np.array(item[1])
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        ret, frame = self.read()
+        return frame if ret else None
+
+    def is_connected(self) -> bool:
+        with self._cond:
+            return self._is_connected
+
+    def is_active(self) -> bool:
+        with self._cond:
+            return self._is_connected and time.time() - self._last_frame_time < 3
+
+    def get_info(self) -> dict:
+        with self._cond:
+            last_frame_time = self._last_frame_time
+            info = {
+                "camera_id": self.camera_id,
+                "rtsp_url": self.rtsp_url,
+                "is_connected": self._is_connected,
+                "frame_seq": self._seq,
+            }
+        return {
+            **info,
+            "is_active": self.is_active(),
+            "last_frame_time": last_frame_time,
+            "frame_age_seconds": time.time() - last_frame_time if last_frame_time > 0 else None,
+            "capture_process": self.group.info(),
+        }
+
+
+class CaptureGroup:
+    """
+    One capture process serving up to `capacity` cameras
+
+    check() is called periodically by StreamManager's supervisor: the process
+    is restarted (with all its cameras) when it died, or when a camera reports
+    connected but has delivered no frame for stall_timeout seconds.
+    """
+
+    def __init__(self, group_id: int, capacity: int = 1, max_width: int = 0, ring_slots: int = 4,
+                 stall_timeout: float = 20.0, restart_backoff: float = 5.0):
+        self.group_id = group_id
+        self.capacity = max(1, capacity)
+        self.max_width = max_width
+        self.ring_slots = ring_slots
+        self.stall_timeout = stall_timeout
+        self.restart_backoff = restart_backoff
+
+        self.streams: Dict[str, ProcessCameraStream] = {}
+        self.restarts = 0
+
+        self._process = None
+        self._conn = None
+        self._started_at = 0.0
+        self._last_message = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def has_room(self) -> bool:
+        return len(self.streams) < self.capacity
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def _spawn(self):
+        """Start the capture process and its reader thread (caller holds the lock)"""
+        ctx = mp.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        process = ctx.Process(target=capture_main, args=(child_conn, self.max_width, self.ring_slots),
+                              name=f"capture-{self.group_id}", daemon=True)
+        process.start()
+        child_conn.close()
+        self._process, self._conn = process, parent_conn
+        self._started_at = self._last_message = time.time()
+        threading.Thread(target=self._reader_loop, args=(parent_conn,),
+                         name=f"capture-{self.group_id}-reader", daemon=True).start()
+        for stream in self.streams.values():
+            self._send(("add", stream.camera_id, stream.rtsp_url))
+        logger.info(f"✅ Capture process {self.group_id} started (pid {process.pid}, {len(self.streams)} camera(s))")
+
+    def _terminate(self):
+        """Stop the capture process and drop the rings of its cameras (caller holds the lock)"""
+        process, conn = self._process, self._conn
+        self._process = self._conn = None
+        if conn is not None:
+            try:
+                conn.send(("stop",))
+            except (OSError, EOFError):
+                pass
+        if process is not None:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.kill()
+                process.join(timeout=2)
+        if conn is not None:
+            conn.close()
+        for stream in self.streams.values():
+            stream._swap_ring(None)
+
+    def stop(self):
+        with self._lock:
+            self._terminate()
+            self.streams.clear()
+
+    def restart(self, reason: str):
+        with self._lock:
+            logger.warning(f"⚠️ Restarting capture process {self.group_id}: {reason}")
+            self._terminate()
+            self.restarts += 1
+            self._spawn()
+
+    def check(self):
+        """Supervise the process (restart when dead or hung)"""
+        with self._lock:
+            if self._process is None or time.time() - self._started_at < self.restart_backoff:
+                return
+            process = self._process
+            now = time.time()
+            reason = None
+            if not process.is_alive():
+                reason = f"process exited ({process.exitcode})"
+            elif now - self._last_message > self.stall_timeout:
+                reason = f"no message for {now - self._last_message:.0f}s"
+            else:
+                for stream in self.streams.values():
+                    info = stream.get_info()
+                    age = info["frame_age_seconds"]
+                    if info["is_connected"] and age is not None and age > self.stall_timeout:
+                        reason = f"{stream.camera_id} delivered no frame for {age:.0f}s"
+                        break
+        if reason is not None:
+            self.restart(reason)
+
+    # ------------------------------------------------------------------
+    # Cameras
+    # ------------------------------------------------------------------
+
+    def add(self, stream: ProcessCameraStream) -> bool:
+        with self._lock:
+            if stream.camera_id not in self.streams and not self.has_room:
+                return False
+            self.streams[stream.camera_id] = stream
+            if self._process is None:
+                self._spawn()
+            else:
+                self._send(("add", stream.camera_id, stream.rtsp_url))
+            return True
+
+    def remove(self, camera_id: str):
+        with self._lock:
+            if self.streams.pop(camera_id, None) is None:
+                return
+            if self.streams:
+                self._send(("remove", camera_id))
+            else:
+                self._terminate()  # Last camera gone - no idle process
+
+    def info(self) -> dict:
+        process = self._process
+        return {
+            "group_id": self.group_id,
+            "pid": process.pid if process is not None else None,
+            "alive": process is not None and process.is_alive(),
+            "cameras": len(self.streams),
+            "restarts": self.restarts,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _send(self, command: tuple):
+        try:
+            self._conn.send(command)
+        except (OSError, EOFError, AttributeError) as e:
+            logger.warning(f"Capture process {self.group_id} unreachable: {e}")
+
+    def _reader_loop(self, conn):
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                return  # Process stopped or restarted
+            self._last_message = time.time()
+            kind, camera_id = message[0], message[1]
+            stream = self.streams.get(camera_id)
+            if stream is None:
+                if kind == "ring":  # Camera removed meanwhile - nobody else will unlink it
+                    try:
+                        ring = SharedFrameRing.attach(message[2])
+                        ring.close()
+                        ring.unlink()
+                    except (FileNotFoundError, ValueError):
+                        pass
+                continue
+            if kind == "frame":
+                stream._on_frame(message[2])
+            elif kind == "ring":
+                stream._on_ring(message[2])
+            elif kind == "status":
+                stream._on_status(message[2])
@@ -0,0 +1,382 @@
+"""
+Clip Recorder - Pre/post-event video clips for camera incidents
+
+A single snapshot shows the moment of detection, not what led up to it. For
+every server-side camera a recorder thread keeps the last seconds of the
+stream in memory as JPEG frames (bounded by time and by bytes). When an
+incident opens, the buffered pre-roll plus the following post-roll seconds
+become a clip:
+
+    camera stream -> recorder thread (JPEG, clip fps) -> FrameRingBuffer (pre-roll)
+    incident open -> pending clip collects post-roll -> encoder thread -> MP4
+
+The clip path is known as soon as the incident opens, so it is stored on the
+alert document right away ("clip_path", "clip_status": "recording") and
+updated once the encoder is done ("ready" / "failed").
+"""
+import cv2
+import os
+import queue
+import threading
+import time
+import logging
+from collections import deque, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.alert_writer import alert_writer
+from app.services.stream_manager import stream_manager, StreamManager
+from app.services.video_output import preferred_fourcc, finalize_mp4
+
+logger = logging.getLogger(__name__)
+
+# (capture timestamp, JPEG bytes)
+BufferedFrame = Tuple[float, bytes]
+
+
+class FrameRingBuffer:
+    """
+    Most recent compressed frames of one camera, capped by age and total size
+
+    Usage:
+        buffer = FrameRingBuffer(max_seconds=10, max_bytes=32 * 1024 * 1024)
+        buffer.append(timestamp, jpeg)
+        frames = buffer.since(time.time() - 10)
+    """
+
+    def __init__(self, max_seconds: float, max_bytes: int):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.evicted_for_size = 0
+
+        self._frames: deque = deque()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def append(self, timestamp: float, jpeg: bytes):
+        with self._lock:
+            self._frames.append((timestamp, jpeg))
+            self._bytes += len(jpeg)
+            while self._frames and self._frames[0][0] < timestamp - self.max_seconds:
+                self._bytes -= len(self._frames.popleft()[1])
+            while self._bytes > self.max_bytes and len(self._frames) > 1:
+                self._bytes -= len(self._frames.popleft()[1])
+                self.evicted_for_size += 1
+
+    def since(self, timestamp: float) -> List[BufferedFrame]:
+        """Buffered frames captured at or after timestamp (oldest first)"""
+        with self._lock:
+            return [item for item in self._frames if item[0] >= timestamp]
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+
+
+class ClipRecorder:
+    """
+    Per-camera pre-roll buffers and incident clips
+
+    Usage:
+        clip_recorder.start_camera("gate_1")               # with the camera's inference loop
+        clip_path = clip_recorder.trigger("gate_1", incident_id, incident["started_at"])
+        clip_recorder.stop_camera("gate_1")                # pending clips are written with what they have
+    """
+
+    def __init__(
+        self,
+        clip_dir: str,
+        pre_roll: float = 10.0,
+        post_roll: float = 10.0,
+        fps: float = 10.0,
+        max_buffer_mb: float = 32.0,
+        jpeg_quality: int = 70,
+        max_width: int = 960,
+        streams: StreamManager = stream_manager
+    ):
+        """
+        Initialize the recorder
+
+        Args:
+            clip_dir: Directory the MP4 clips are written to
+            pre_roll: Seconds before the incident included in the clip
+            post_roll: Seconds after the incident included in the clip
+            fps: Frame rate frames are buffered (and clips written) at
+            max_buffer_mb: Memory cap of one camera's buffer (oldest frames go first)
+            jpeg_quality: JPEG quality of buffered frames
+            max_width: Frames are downscaled to this width before buffering (0 = full size)
+            streams: Capture side (frames come from the camera streams)
+        """
+        self.clip_dir = clip_dir
+        self.pre_roll = pre_roll
+        self.post_roll = post_roll
+        self.fps = fps
+        self.max_buffer_bytes = int(max_buffer_mb * 1024 * 1024)
+        self.jpeg_quality = jpeg_quality
+        self.max_width = max_width
+        self.streams = streams
+
+        self._cameras: Dict[str, dict] = {}
+        self._clips: "OrderedDict[str, dict]" = OrderedDict()  # incident_id -> clip (most recent max_clips)
+        self.max_clips = 1024
+        self._lock = threading.Lock()
+
+        self._encode_queue: queue.Queue = queue.Queue()
+        self._encoder: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Cameras
+    # ------------------------------------------------------------------
+
+    def start_camera(self, camera_id: str):
+        """Start buffering frames of a StreamManager camera"""
+        with self._lock:
+            if camera_id in self._cameras:
+                return
+            camera = {
+                "buffer": FrameRingBuffer(self.pre_roll, self.max_buffer_bytes),
+                "pending": [],
+                "stop_event": threading.Event(),
+            }
+            camera["thread"] = threading.Thread(
+                target=self._record, args=(camera_id, camera), name=f"clip-{camera_id}", daemon=True
+            )
+            self._cameras[camera_id] = camera
+            self._ensure_encoder()
+        camera["thread"].start()
+
+    def stop_camera(self, camera_id: str, timeout: float = 5):
+        """Stop buffering; clips still collecting post-roll are written with what they have"""
+        with self._lock:
+            camera = self._cameras.pop(camera_id, None)
+        if camera is None:
+            return
+        camera["stop_event"].set()
+        camera["thread"].join(timeout=timeout)
+        with self._lock:
+            pending, camera["pending"] = camera["pending"], []
+        for clip in pending:
+            self._encode_queue.put(clip)
+        camera["buffer"].clear()
+
+    def stop(self, timeout: float = 30):
+        """Stop all cameras and wait for the encoder to write the remaining clips"""
+        with self._lock:
+            camera_ids = list(self._cameras)
+        for camera_id in camera_ids:
+            self.stop_camera(camera_id)
+        if self._encoder is not None and self._encoder.is_alive():
+            self._encode_queue.put(None)
+            self._encoder.join(timeout=timeout)
+        logger.info("✅ Clip recorder stopped")
+
+    # ------------------------------------------------------------------
+    # Clips
+    # ------------------------------------------------------------------
+
+    def trigger(self, camera_id: str, incident_id: str, event_time: Optional[float] = None) -> Optional[str]:
+        """
+        Start the clip of an incident (once per incident)
+
+        Args:
+            camera_id: Camera the incident happened on
+            incident_id: Incident the clip belongs to
+            event_time: When the incident started (defaults to now)
+
+        Returns:
+            Public clip path ("/clips/<file>.mp4"), or None if the camera is not recorded
+        """
+        event_time = event_time or time.time()
+        with self._lock:
+            if incident_id in self._clips:
+                return self._clips[incident_id]["url"]
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return None
+
+            filename = f"clip_{camera_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{incident_id}.mp4"
+            clip = {
+                "incident_id": incident_id,
+                "camera_id": camera_id,
+                "path": os.path.join(self.clip_dir, filename),
+                "url": f"/clips/{filename}",
+                "end": event_time + self.post_roll,
+                "frames": camera["buffer"].since(event_time - self.pre_roll),
+                "status": "recording",
+            }
+            clip["bytes"] = sum(len(jpeg) for _, jpeg in clip["frames"])
+            camera["pending"].append(clip)
+            self._clips[incident_id] = clip
+            while len(self._clips) > self.max_clips:
+                self._clips.popitem(last=False)
+        logger.info(f"🎬 [{camera_id}] Recording clip for incident {incident_id} "
+                    f"({len(clip['frames'])} pre-roll frame(s))")
+        return clip["url"]
+
+    def clip_path(self, incident_id: str) -> Optional[str]:
+        """Public path of an incident's clip (None if it has none)"""
+        with self._lock:
+            clip = self._clips.get(incident_id)
+            return clip["url"] if clip else None
+
+    def clip_status(self, incident_id: str) -> Optional[str]:
+        """"recording", "ready" or "failed" (None for unknown incidents)"""
+        with self._lock:
+            clip = self._clips.get(incident_id)
+            return clip["status"] if clip else None
+
+    def stats(self, camera_id: str) -> Optional[dict]:
+        """Buffer and clip statistics of one camera"""
+        with self._lock:
+            camera = self._cameras.get(camera_id)
+            if camera is None:
+                return None
+            buffer = camera["buffer"]
+            return {
+                "buffered_frames": len(buffer),
+                "buffered_mb": round(buffer.nbytes / 1024 / 1024, 2),
+                "max_buffer_mb": round(self.max_buffer_bytes / 1024 / 1024, 2),
+                "evicted_for_size": buffer.evicted_for_size,
+                "clips_recording": len(camera["pending"]),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _ensure_encoder(self):
+        """Start the encoder thread (caller holds the lock)"""
+        if self._encoder is None or not self._encoder.is_alive():
+            os.makedirs(self.clip_dir, exist_ok=True)
+            self._encoder = threading.Thread(target=self._encode_loop, name="clip-encoder", daemon=True)
+            self._encoder.start()
+
+    def _record(self, camera_id: str, camera: dict):
+        """Buffer frames of one camera at the clip fps and feed its pending clips (recorder thread)"""
+        buffer = camera["buffer"]
+        stop_event = camera["stop_event"]
+        interval = 1.0 / self.fps
+        last_seq = 0
+        next_tick = time.time()
+
+        while not stop_event.is_set():
+            now = time.time()
+            if now < next_tick:
+                stop_event.wait(next_tick - now)
+                continue
+            next_tick = max(next_tick + interval, now)
+
+            stream = self.streams.get_stream(camera_id)
+            item = stream.wait_frame(last_seq, timeout=interval) if stream else None
+            if item is not None:
+                last_seq, frame, timestamp = item
+                try:
+                    jpeg = self._compress(frame)
+                finally:
+                    stream.release(item)
+                if jpeg is not None:
+                    buffer.append(timestamp, jpeg)
+                    self._collect(camera, timestamp, jpeg)
+            self._finish_due(camera, time.time())
+
+    def _compress(self, frame: np.ndarray) -> Optional[bytes]:
+        height, width = frame.shape[:2]
+        if self.max_width and width > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(height * self.max_width / width)),
+                               interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        return jpeg.tobytes() if ok else None
+
+    def _collect(self, camera: dict, timestamp: float, jpeg: bytes):
+        """Add a post-roll frame to the clips still recording (same memory cap as the buffer)"""
+        with self._lock:
+            for clip in camera["pending"]:
+                if timestamp <= clip["end"] and clip["bytes"] + len(jpeg) <= self.max_buffer_bytes:
+                    clip["frames"].append((timestamp, jpeg))
+                    clip["bytes"] += len(jpeg)
+
+    def _finish_due(self, camera: dict, now: float):
+        """Hand clips whose post-roll is over to the encoder"""
+        with self._lock:
+            due = [clip for clip in camera["pending"] if now >= clip["end"]]
+            if due:
+                camera["pending"] = [clip for clip in camera["pending"] if now < clip["end"]]
+        for clip in due:
+            self._encode_queue.put(clip)
+
+    def _encode_loop(self):
+        while True:
+            clip = self._encode_queue.get()
+            if clip is None:
+                return
+            try:
+                self._write_clip(clip)
+            except Exception as e:
+                clip["status"] = "failed"
+                logger.error(f"❌ Clip {clip['url']} failed: {e}")
+            finally:
+                clip["frames"], clip["bytes"] = [], 0  # Release the memory
+            self._update_alerts(clip)
+
+    def _write_clip(self, clip: dict):
+        """Decode the buffered JPEGs and write the MP4 (encoder thread)"""
+        frames = clip["frames"]
+        if not frames:
+            clip["status"] = "failed"
+            logger.warning(f"⚠️ Clip {clip['url']}: no frames buffered")
+            return
+
+        # Real rate of the buffered frames (a slow camera delivers less than the clip fps)
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else self.fps
+
+        fourcc = preferred_fourcc()
+        writer = None
+        try:
+            for _, jpeg in frames:
+                frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+                if frame is None:
+                    continue
+                if writer is None:
+                    size = (frame.shape[1], frame.shape[0])
+                    writer = cv2.VideoWriter(clip["path"], cv2.VideoWriter_fourcc(*fourcc), fps, size)
+                if (frame.shape[1], frame.shape[0]) != size:
+                    frame = cv2.resize(frame, size)
+                writer.write(frame)
+        finally:
+            if writer is not None:
+                writer.release()
+
+        finalize_mp4(clip["path"], fourcc)
+        clip["status"] = "ready"
+        logger.info(f"🎬 Clip saved: {clip['url']} ({len(frames)} frames, {duration:.1f}s)")
+
+    def _update_alerts(self, clip: dict):
+        # Through the alert writer: applied after the incident's queued alerts
+        alert_writer.update(
+            {"incident_id": clip["incident_id"]},
+            {"$set": {"clip_path": clip["url"], "clip_status": clip["status"]}}
+        )
+
+
+# Singleton instance
+clip_recorder = ClipRecorder(
+    clip_dir=settings.CLIP_DIR,
+    pre_roll=settings.CLIP_PRE_ROLL_SECONDS,
+    post_roll=settings.CLIP_POST_ROLL_SECONDS,
+    fps=settings.CLIP_FPS,
+    max_buffer_mb=settings.CLIP_BUFFER_MAX_MB,
+    jpeg_quality=settings.CLIP_JPEG_QUALITY,
+    max_width=settings.CLIP_MAX_WIDTH,
+)
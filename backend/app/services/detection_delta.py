@@ -0,0 +1,195 @@
+"""
+Detection Delta - Change-only detection responses for the realtime WebSocket
+
+In full mode every JSON response repeats the whole detection list, although
+from one frame to the next boxes usually move by a few pixels. In delta mode
+(/ws/realtime-detect?response_mode=delta) detections get track IDs and a
+response only carries what changed against the objects the client already has:
+
+    {"ver": 41,
+     "add": [[id, class_name, confidence, x1, y1, x2, y2], ...],   # new objects (or new class)
+     "upd": [[id, x1, y1, x2, y2], [id, x1, y1, x2, y2, confidence], ...],
+     "del": [id, ...]}                                               # objects gone
+
+    {"ver": 60, "objects": [[id, class_name, confidence, x1, y1, x2, y2], ...]}   # snapshot
+
+Empty lists are omitted, so a frame without changes costs only "ver".
+Coordinates are integers in client-frame pixels; a box is only updated once
+it moved by at least `quantum` pixels against
+what was last sent (confidence: `confidence_step`), so detector jitter costs
+nothing and the client's boxes are never off by more than that. Every
+`snapshot_interval` responses - and after {"resync": true} from the client -
+a full snapshot replaces the client state. "ver" increases by one per
+response; a client that sees a gap waits for the next snapshot (or asks
+for one).
+
+DeltaDecoder is the reference client implementation.
+"""
+from typing import Dict, List, Optional
+
+from app.services.tracking import IoUTracker
+
+
+class DeltaEncoder:
+    """
+    Server side: turns full detection lists into delta / snapshot messages (one per connection)
+
+    Usage:
+        encoder = DeltaEncoder()
+        response.update(encoder.encode(detection_dicts))   # every frame
+        encoder.request_snapshot()                         # client asked to resync
+    """
+
+    def __init__(self, snapshot_interval: int = 30, quantum: float = 4.0, confidence_step: float = 0.05):
+        """
+        Initialize encoder
+
+        Args:
+            snapshot_interval: Responses between full snapshots
+            quantum: Pixels a box edge must move before it is re-sent
+            confidence_step: Confidence change that is re-sent
+        """
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.quantum = quantum
+        self.confidence_step = confidence_step
+
+        self._tracker = IoUTracker(iou_threshold=0.3, max_age=5, keep_history=False)
+        self._sent: Dict[int, list] = {}  # Track ID -> [class_name, confidence, x1, y1, x2, y2] as last sent
+        self._version = 0
+        self._since_snapshot = self.snapshot_interval  # First response is a snapshot
+
+    def request_snapshot(self):
+        """Make the next response a full snapshot"""
+        self._since_snapshot = self.snapshot_interval
+
+    def encode(self, detections: List[dict]) -> dict:
+        """
+        Encode the detections of one frame
+
+        Args:
+            detections: Dicts with "class_name", "confidence" and "bbox" {x1, y1, x2, y2}
+
+        Returns:
+            Delta or snapshot message fields
+        """
+        tracked = self._tracker.update([
+            {
+                "label": det["class_name"],
+                "confidence": det["confidence"],
+                "bbox": [det["bbox"]["x1"], det["bbox"]["y1"], det["bbox"]["x2"], det["bbox"]["y2"]],
+            }
+            for det in detections
+        ])
+        self._version += 1
+        self._since_snapshot += 1
+
+        current: Dict[int, dict] = {}
+        for det in tracked:
+            current.setdefault(det["track_id"], det)  # One object per track
+
+        if self._since_snapshot >= self.snapshot_interval:
+            self._since_snapshot = 0
+            self._sent = {track_id: self._quantize(det) for track_id, det in current.items()}
+            return {
+                "ver": self._version,
+                "objects": [[track_id, *obj] for track_id, obj in self._sent.items()],
+            }
+
+        added, updated = [], []
+        for track_id, det in current.items():
+            sent = self._sent.get(track_id)
+            if sent is None or sent[0] != det["label"]:
+                self._sent[track_id] = self._quantize(det)
+                added.append([track_id, *self._sent[track_id]])
+                continue
+
+            box_moved = any(abs(new - old) >= self.quantum for new, old in zip(det["bbox"], sent[2:]))
+            confidence_changed = abs(det["confidence"] - sent[1]) >= self.confidence_step
+            if box_moved or confidence_changed:
+                obj = self._quantize(det) if box_moved else list(sent)
+                obj[1] = round(det["confidence"], 2) if confidence_changed else sent[1]
+                self._sent[track_id] = obj
+                update = [track_id, *obj[2:]]
+                if confidence_changed:
+                    update.append(obj[1])
+                updated.append(update)
+
+        removed = [track_id for track_id in self._sent if track_id not in current]
+        for track_id in removed:
+            del self._sent[track_id]
+
+        message = {"ver": self._version}
+        if added:
+            message["add"] = added
+        if updated:
+            message["upd"] = updated
+        if removed:
+            message["del"] = removed
+        return message
+
+    def _quantize(self, det: dict) -> list:
+        return [det["label"], round(det["confidence"], 2), *(int(round(v)) for v in det["bbox"])]
+
+
+class DeltaDecoder:
+    """
+    Client side reference decoder: rebuilds the full detection list from delta / snapshot messages
+
+    Usage:
+        decoder = DeltaDecoder()
+        detections = decoder.apply(message)   # None while waiting for a snapshot after a gap
+    """
+
+    def __init__(self):
+        self.objects: Dict[int, list] = {}  # Track ID -> [class_name, confidence, x1, y1, x2, y2]
+        self.version: Optional[int] = None
+        self.gaps = 0
+
+    @property
+    def synced(self) -> bool:
+        return self.version is not None
+
+    def apply(self, message: dict) -> Optional[List[dict]]:
+        """
+        Apply one response
+
+        Returns:
+            Current detections ({"track_id", "class_name", "confidence", "bbox"}), or None
+            if a message was missed and the state is unusable until the next snapshot
+        """
+        if "objects" in message:
+            self.objects = {obj[0]: list(obj[1:]) for obj in message["objects"]}
+            self.version = message["ver"]
+            return self.detections()
+        if "ver" not in message:
+            return self.detections() if self.synced else None  # Error responses carry no delta
+
+        if self.version is None or message["ver"] != self.version + 1:
+            if self.version is not None:
+                self.gaps += 1
+            self.version = None  # Out of sync until the next snapshot
+            return None
+        self.version = message["ver"]
+
+        for obj in message.get("add", []):
+            self.objects[obj[0]] = list(obj[1:])
+        for upd in message.get("upd", []):
+            obj = self.objects.get(upd[0])
+            if obj is not None:
+                obj[2:6] = upd[1:5]
+                if len(upd) > 5:
+                    obj[1] = upd[5]
+        for track_id in message.get("del", []):
+            self.objects.pop(track_id, None)
+        return self.detections()
+
+    def detections(self) -> List[dict]:
+        return [
+            {
+                "track_id": track_id,
+                "class_name": obj[0],
+                "confidence": obj[1],
+                "bbox": {"x1": obj[2], "y1": obj[3], "x2": obj[4], "y2": obj[5]},
+            }
+            for track_id, obj in self.objects.items()
+        ]
@@ -76,21 +76,7 @@ class DetectionService:
         model = self.load_yolo_model()
         
         # OPTIMIZATION: Resize large images for faster inference
-        original_h, original_w = image.shape[:2]
-        max_size = 640  # YOLO input size
-        
-        if original_w > max_size or original_h > max_size:
-            # Resize maintaining aspect ratio
-            scale = max_size / max(original_w, original_h)
-            new_w = int(original_w * scale)
-            new_h = int(original_h * scale)
-            resized_image = cv2.resize(image, (new_w, new_h))
-            scale_back_x = original_w / new_w
-            scale_back_y = original_h / new_h
-        else:
-            resized_image = image
-            scale_back_x = 1.0
-            scale_back_y = 1.0
+        resized_image, scale_back_x, scale_back_y = self._resize_for_yolo(image)
         
         start_time = time.time()
         results = model(resized_image, conf=conf_threshold, verbose=False, imgsz=640)
@@ -98,27 +84,75 @@ class DetectionService:
         
         detections = []
         for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                conf = float(box.conf)
-                cls = int(box.cls)
-                class_name = result.names[cls]
-                
-                # Scale coordinates back to original image size
-                detections.append(Detection(
-                    class_name=class_name,
-                    confidence=conf,
-                    bbox=BoundingBox(
-                        x1=float(x1 * scale_back_x), 
-                        y1=float(y1 * scale_back_y), 
-                        x2=float(x2 * scale_back_x), 
-                        y2=float(y2 * scale_back_y)
-                    )
-                ))
+            detections.extend(self._yolo_detections(result, scale_back_x, scale_back_y))
         
         return detections, processing_time
     
+    def detect_batch_with_yolo(
+        self,
+        images: List[np.ndarray],
+        conf_thresholds: List[float]
+    ) -> Tuple[List[List[Detection]], float]:
+        """
+        Run YOLO detection on several images in one model call
+        
+        Args:
+            images: Input images (BGR format, sizes may differ)
+            conf_thresholds: Confidence threshold per image
+            
+        Returns:
+            Tuple of (detections list per image, processing time of the batch)
+        """
+        model = self.load_yolo_model()
+        prepared = [self._resize_for_yolo(image) for image in images]
+        
+        # One call at the lowest threshold, then each image keeps its own threshold
+        start_time = time.time()
+        results = model([p[0] for p in prepared], conf=min(conf_thresholds), verbose=False, imgsz=640)
+        processing_time = time.time() - start_time
+        
+        batch_detections = []
+        for result, (_, scale_back_x, scale_back_y), conf_threshold in zip(results, prepared, conf_thresholds):
+            batch_detections.append([
+                det for det in self._yolo_detections(result, scale_back_x, scale_back_y)
+                if det.confidence >= conf_threshold
+            ])
+        
+        return batch_detections, processing_time
+    
+    @staticmethod
+    def _resize_for_yolo(image: np.ndarray, max_size: int = 640) -> Tuple[np.ndarray, float, float]:
+        """Shrink image to the YOLO input size (keeping aspect ratio); returns (image, scale_x, scale_y) back"""
+        original_h, original_w = image.shape[:2]
+        if original_w <= max_size and original_h <= max_size:
+            return image, 1.0, 1.0
+        scale = max_size / max(original_w, original_h)
+        new_w = int(original_w * scale)
+        new_h = int(original_h * scale)
+        return cv2.resize(image, (new_w, new_h)), original_w / new_w, original_h / new_h
+    
+    @staticmethod
+    def _yolo_detections(result, scale_back_x: float, scale_back_y: float) -> List[Detection]:
+        """Boxes of one YOLO result, scaled back to original image size"""
+        detections = []
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+            conf = float(box.conf)
+            cls = int(box.cls)
+            class_name = result.names[cls]
+            
+            detections.append(Detection(
+                class_name=class_name,
+                confidence=conf,
+                bbox=BoundingBox(
+                    x1=float(x1 * scale_back_x), 
+                    y1=float(y1 * scale_back_y), 
+                    x2=float(x2 * scale_back_x), 
+                    y2=float(y2 * scale_back_y)
+                )
+            ))
+        return detections
+    
     def detect_with_fasterrcnn(self, image: np.ndarray, conf_threshold: float = 0.5) -> Tuple[List[Detection], float]:
         """
         Run Faster R-CNN detection on image
@@ -324,6 +358,36 @@ class DetectionService:
             return detections, proc_time, "Faster R-CNN"
         else:
             raise ValueError(f"Unknown model type: {model_type}")
+    
+    def detect_batch(
+        self,
+        images: List[np.ndarray],
+        model_type: str = "yolo",
+        conf_thresholds: Optional[List[float]] = None
+    ) -> Tuple[List[List[Detection]], float, str]:
+        """
+        Run detection on several images (one model call for YOLO)
+        
+        Args:
+            images: Input images
+            model_type: "yolo" or "fasterrcnn"
+            conf_thresholds: Confidence threshold per image (default 0.5)
+            
+        Returns:
+            Tuple of (detections per image, processing_time, model_used)
+        """
+        conf_thresholds = conf_thresholds or [0.5] * len(images)
+        if model_type.lower() == "yolo":
+            detections, proc_time = self.detect_batch_with_yolo(images, conf_thresholds)
+            return detections, proc_time, "YOLOv8m"
+        
+        # Faster R-CNN: no batched path, one image at a time
+        batch_detections, total_time, model_used = [], 0.0, model_type
+        for image, conf_threshold in zip(images, conf_thresholds):
+            detections, proc_time, model_used = self.detect(image, model_type, conf_threshold)
+            batch_detections.append(detections)
+            total_time += proc_time
+        return batch_detections, total_time, model_used
 
 
 # Singleton instance
@@ -0,0 +1,284 @@
+"""
+Edge Ingest - Detection events from cameras that run the weapon model themselves
+
+Sites with local compute run the detector on the camera box and send
+detection events (a few hundred bytes, plus optional evidence crops) instead
+of a frame per inference. The events go through the same pipeline as frames
+detected on this server:
+
+    - validation: events older than max_event_age or ahead of the server
+      clock by more than max_clock_skew are rejected, boxes are clipped to the
+      frame, evidence images must decode
+    - deduplication: recently seen (camera, event_id) pairs are acknowledged
+      as duplicates, so a device can retry a batch without double alerts
+    - incident_aggregator: one source per edge camera ("edge_<camera_id>"),
+      events in timestamp order; events without detections are heartbeats
+      that let incidents close
+    - alert_pool: pairing, snapshot, MongoDB alert and Telegram message. The
+      alert image is the device's snapshot or - without one - an evidence
+      canvas with the crops pasted at their boxes. Person boxes sent by the
+      device are used for pairing; otherwise the person model runs on the
+      snapshot.
+"""
+import base64
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from app.core.config import settings
+from app.schemas.detection import Detection, BoundingBox
+from app.schemas.edge import EdgeEvent
+from app.services.incidents import IncidentAggregator, EVENT_CLOSE
+from app.services.realtime_detection import incident_aggregator, submit_incident_events
+
+logger = logging.getLogger(__name__)
+
+EDGE_CAMERA_PREFIX = "edge_"
+
+STATUS_ACCEPTED = "accepted"
+STATUS_DUPLICATE = "duplicate"
+STATUS_REJECTED = "rejected"
+
+
+def decode_image(data: str) -> np.ndarray:
+    """
+    Decode a base64 (or data URL) JPEG / PNG / WebP image
+
+    Raises:
+        ValueError: If the data is not base64 or not a decodable image
+    """
+    if "base64," in data:
+        data = data.split("base64,", 1)[1]
+    image = cv2.imdecode(np.frombuffer(base64.b64decode(data, validate=True), np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError("not a decodable image")
+    return image
+
+
+class EdgeIngestor:
+    """
+    Validates, deduplicates and feeds edge detection events into the alert pipeline
+
+    Usage:
+        results = edge_ingestor.ingest(batch.events, device="site-3")
+        edge_ingestor.close_cameras(["gate_1"])   # device disconnected
+    """
+
+    def __init__(
+        self,
+        max_event_age: float = 300.0,
+        max_clock_skew: float = 30.0,
+        dedupe_size: int = 10000,
+        evidence_max_width: int = 1280,
+        aggregator: IncidentAggregator = incident_aggregator,
+        submit: Callable = submit_incident_events
+    ):
+        """
+        Initialize ingestor
+
+        Args:
+            max_event_age: Seconds an event may be old (device buffered it while offline)
+            max_clock_skew: Seconds an event may be ahead of the server clock
+            dedupe_size: Recent (camera, event_id) pairs remembered for deduplication
+            evidence_max_width: Width cap of the evidence canvas built from crops
+            aggregator: Incident aggregator shared with the other live sources
+            submit: Hands incident events to the alert pool
+        """
+        self.max_event_age = max_event_age
+        self.max_clock_skew = max_clock_skew
+        self.dedupe_size = dedupe_size
+        self.evidence_max_width = evidence_max_width
+        self.aggregator = aggregator
+        self.submit = submit
+
+        self._seen: OrderedDict = OrderedDict()  # (camera_id, event_id), oldest first
+        self._last_time: Dict[str, float] = {}   # Camera -> newest time fed to the aggregator
+        self._cameras: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._stats = {"accepted": 0, "duplicates": 0, "rejected": 0, "detections": 0, "incident_events": 0}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def ingest(self, events: List[EdgeEvent], device: str = "edge") -> List[dict]:
+        """
+        Ingest a batch of events (processed in timestamp order)
+
+        Args:
+            events: Validated events
+            device: Sending device / account (shown in stats)
+
+        Returns:
+            Per event, in input order: {"event_id", "camera_id", "status"} plus
+            "error" (rejected) or "incidents" [{"incident_id", "type"}] (accepted)
+        """
+        now = time.time()
+        results: List[Optional[dict]] = [None] * len(events)
+        for i in sorted(range(len(events)), key=lambda i: events[i].timestamp):
+            results[i] = self._ingest_one(events[i], device, now)
+        return results
+
+    def close_cameras(self, camera_ids: Iterable[str]):
+        """Close the open incidents of edge cameras (e.g. their device disconnected)"""
+        for camera_id in camera_ids:
+            source = EDGE_CAMERA_PREFIX + camera_id
+            self.submit(source, self.aggregator.close_camera(source))
+
+    def stats(self) -> dict:
+        """Counters and per camera device / last seen"""
+        with self._lock:
+            return {
+                **self._stats,
+                "cameras": {camera_id: dict(info) for camera_id, info in self._cameras.items()},
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _ingest_one(self, event: EdgeEvent, device: str, now: float) -> dict:
+        result = {"event_id": event.event_id, "camera_id": event.camera_id}
+        key = (event.camera_id, event.event_id)
+        with self._lock:
+            if key in self._seen:
+                self._stats["duplicates"] += 1
+                return {**result, "status": STATUS_DUPLICATE}
+
+        # Validation and image decoding outside the lock
+        try:
+            if event.timestamp < now - self.max_event_age:
+                raise ValueError(f"event older than {self.max_event_age:.0f}s")
+            if event.timestamp > now + self.max_clock_skew:
+                raise ValueError("timestamp in the future (device clock ahead?)")
+            boxes = [self._clip_box(det.bbox, event) for det in event.detections]
+            try:
+                snapshot = decode_image(event.snapshot) if event.snapshot else None
+            except ValueError as e:
+                raise ValueError(f"snapshot: {e}")
+            crops = []
+            for i, det in enumerate(event.detections):
+                try:
+                    crops.append(decode_image(det.crop) if det.crop and snapshot is None else None)
+                except ValueError as e:
+                    raise ValueError(f"detections[{i}].crop: {e}")
+        except ValueError as e:
+            with self._lock:
+                self._stats["rejected"] += 1
+            logger.warning(f"⚠️ Edge event rejected: {event.camera_id}/{event.event_id} - {e}")
+            return {**result, "status": STATUS_REJECTED, "error": str(e)}
+
+        source = EDGE_CAMERA_PREFIX + event.camera_id
+        with self._lock:
+            if key in self._seen:  # Same event in a concurrent request
+                self._stats["duplicates"] += 1
+                return {**result, "status": STATUS_DUPLICATE}
+            self._seen[key] = None
+            while len(self._seen) > self.dedupe_size:
+                self._seen.popitem(last=False)
+
+            # Incident time never runs backwards per camera and never ahead of the server
+            event_time = max(min(event.timestamp, now), self._last_time.get(source, 0.0))
+            self._last_time[source] = event_time
+            incident_events = self.aggregator.update(source, [
+                {"label": det.class_name, "confidence": det.confidence, "bbox": box}
+                for det, box in zip(event.detections, boxes)
+            ], timestamp=event_time)
+
+            self._stats["accepted"] += 1
+            self._stats["detections"] += len(boxes)
+            self._stats["incident_events"] += len(incident_events)
+            camera = self._cameras.setdefault(event.camera_id, {"events": 0})
+            camera.update(device=device, last_seen=now, last_event_time=event.timestamp, events=camera["events"] + 1)
+
+        # The alert image is only needed for incident open / escalation
+        frame, detections = None, []
+        if any(e["type"] != EVENT_CLOSE for e in incident_events):
+            frame, detections, persons = self._evidence(event, boxes, snapshot, crops)
+            if persons is not None:
+                for incident_event in incident_events:
+                    incident_event["persons"] = persons
+        self.submit(source, incident_events, frame, detections, event.location or f"Edge camera {event.camera_id}")
+
+        return {
+            **result,
+            "status": STATUS_ACCEPTED,
+            "incidents": [  # The update may also close idle incidents of other sources
+                {"incident_id": e["incident"]["incident_id"], "type": e["type"]}
+                for e in incident_events if e["incident"]["camera_id"] == source
+            ],
+        }
+
+    @staticmethod
+    def _clip_box(bbox: BoundingBox, event: EdgeEvent) -> List[float]:
+        """Box clipped to the frame; raises ValueError if nothing is left of it"""
+        x1, x2 = max(0.0, bbox.x1), min(float(event.frame_width), bbox.x2)
+        y1, y2 = max(0.0, bbox.y1), min(float(event.frame_height), bbox.y2)
+        if x2 - x1 < 1 or y2 - y1 < 1:
+            raise ValueError(f"box {bbox.x1:g},{bbox.y1:g},{bbox.x2:g},{bbox.y2:g} is empty or outside the frame")
+        return [x1, y1, x2, y2]
+
+    def _evidence(
+        self,
+        event: EdgeEvent,
+        boxes: List[List[float]],
+        snapshot: Optional[np.ndarray],
+        crops: List[Optional[np.ndarray]]
+    ) -> Tuple[np.ndarray, List[Detection], Optional[List[dict]]]:
+        """
+        Alert image with the detections and persons in its pixel coordinates
+
+        Returns:
+            (image, detections, persons) - persons is None when the person model
+            should run on the image
+        """
+        if snapshot is not None:
+            image = snapshot
+            sx, sy = image.shape[1] / event.frame_width, image.shape[0] / event.frame_height
+        else:
+            # Evidence canvas: the crops pasted at their boxes
+            sx = sy = min(1.0, self.evidence_max_width / event.frame_width)
+            image = np.full((max(1, int(event.frame_height * sy)), max(1, int(event.frame_width * sx)), 3),
+                            48, np.uint8)
+            for box, crop in zip(boxes, crops):
+                x1, y1, x2, y2 = int(box[0] * sx), int(box[1] * sy), int(box[2] * sx), int(box[3] * sy)
+                if crop is not None and x2 > x1 and y2 > y1:
+                    image[y1:y2, x1:x2] = cv2.resize(crop, (x2 - x1, y2 - y1))
+
+        detections = [
+            Detection(
+                class_name=det.class_name,
+                confidence=det.confidence,
+                bbox=BoundingBox(x1=box[0] * sx, y1=box[1] * sy, x2=box[2] * sx, y2=box[3] * sy)
+            )
+            for det, box in zip(event.detections, boxes)
+        ]
+
+        persons = None
+        if event.persons is not None:
+            persons = []
+            for person in event.persons:
+                x1, y1 = int(person.bbox.x1 * sx), int(person.bbox.y1 * sy)
+                x2, y2 = int(person.bbox.x2 * sx), int(person.bbox.y2 * sy)
+                persons.append({
+                    "bbox": [x1, y1, x2, y2],
+                    "confidence": person.confidence,
+                    "center": [(x1 + x2) / 2, (y1 + y2) / 2],
+                    "area": (x2 - x1) * (y2 - y1),
+                })
+        elif snapshot is None:
+            persons = []  # Nobody to find on a canvas of crops
+        return image, detections, persons
+
+
+# Singleton instance
+edge_ingestor = EdgeIngestor(
+    max_event_age=settings.EDGE_MAX_EVENT_AGE_SECONDS,
+    max_clock_skew=settings.EDGE_MAX_CLOCK_SKEW_SECONDS,
+    dedupe_size=settings.EDGE_DEDUPE_SIZE,
+)
@@ -0,0 +1,134 @@
+"""
+Evidence Selection - Keeps the top-K most telling frames of a video in bounded memory
+
+Frames are scored by how many weapons they show, how confident the detector
+is and how dangerous the detected classes are. Only the K best frames are kept,
+JPEG-compressed, so memory stays constant however long the video is and raw
+frames are never copied for candidates that do not make the cut.
+"""
+import cv2
+import heapq
+import numpy as np
+from typing import Dict, Iterable, List
+
+# Relative danger of weapon classes (matched as substrings, same spirit as
+# DetectionService.evaluate_danger_level)
+CLASS_SEVERITY = {
+    "firearm": 1.0,
+    "pistol": 1.0,
+    "rifle": 1.0,
+    "gun": 1.0,
+    "grenade": 0.9,
+    "knife": 0.6,
+}
+DEFAULT_SEVERITY = 0.5
+
+
+def class_severity(label: str) -> float:
+    label = label.lower()
+    return max((s for name, s in CLASS_SEVERITY.items() if name in label), default=DEFAULT_SEVERITY)
+
+
+def evidence_score(detections: List[Dict]) -> float:
+    """
+    Score a frame by its detections
+
+    Every detection adds confidence x class severity; the strongest one is
+    counted twice so a single clear pistol outranks several faint knives.
+    """
+    if not detections:
+        return 0.0
+    weights = [float(d["confidence"]) * class_severity(d["label"]) for d in detections]
+    return sum(weights) + max(weights)
+
+
+class EvidenceSelector:
+    """
+    Bounded top-K frame selector
+
+    Usage:
+        selector = EvidenceSelector(k=3)
+        selector.offer(frame_index, frame, detections)   # for every frame, in any order
+        for item in selector.items():                    # best first
+            item["jpeg"], item["detections"], item["score"], item["frame_index"]
+    """
+
+    def __init__(self, k: int = 3, jpeg_quality: int = 90, min_gap_frames: int = 15):
+        """
+        Initialize selector
+
+        Args:
+            k: Number of frames to keep
+            jpeg_quality: JPEG quality of the stored frames
+            min_gap_frames: Frames closer than this count as the same moment -
+                only the better one is kept, so the K frames are not near-duplicates
+        """
+        self.k = max(1, k)
+        self.jpeg_quality = jpeg_quality
+        self.min_gap_frames = max(0, min_gap_frames)
+        self._heap: List[tuple] = []  # (score, frame_index, item) - min-heap, worst on top
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _accepts(self, score: float, frame_index: int):
+        """
+        Decide whether a candidate makes the cut
+
+        Returns:
+            (accepted, heap index of the entry it replaces or None)
+        """
+        for i, (other_score, other_index, _) in enumerate(self._heap):
+            if abs(other_index - frame_index) < self.min_gap_frames:
+                return score > other_score, i
+        if len(self._heap) < self.k:
+            return True, None
+        return score > self._heap[0][0], 0
+
+    def _insert(self, item: dict, replace_index=None):
+        entry = (item["score"], item["frame_index"], item)
+        if replace_index is None:
+            heapq.heappush(self._heap, entry)
+        else:
+            self._heap[replace_index] = entry
+            heapq.heapify(self._heap)
+
+    def offer(self, frame_index: int, frame: np.ndarray, detections: List[Dict]) -> bool:
+        """
+        Consider a frame (it is only encoded if it makes the cut)
+
+        Returns:
+            bool: True if the frame was kept
+        """
+        if not detections:
+            return False
+        score = evidence_score(detections)
+        accepted, replace_index = self._accepts(score, frame_index)
+        if not accepted:
+            return False
+
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return False
+        self._insert({
+            "score": round(score, 4),
+            "frame_index": frame_index,
+            "jpeg": buffer.tobytes(),
+            "detections": list(detections),
+        }, replace_index)
+        return True
+
+    def offer_items(self, items: Iterable[dict]):
+        """Merge already-encoded items (e.g. from other selectors or a checkpoint)"""
+        for item in items:
+            accepted, replace_index = self._accepts(item["score"], item["frame_index"])
+            if accepted:
+                self._insert(item, replace_index)
+
+    def items(self) -> List[dict]:
+        """Kept frames, best first"""
+        return [entry[2] for entry in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+
+    @staticmethod
+    def decode(item: dict) -> np.ndarray:
+        return cv2.imdecode(np.frombuffer(item["jpeg"], np.uint8), cv2.IMREAD_COLOR)
@@ -0,0 +1,141 @@
+"""
+Frame Decode - Reduced-resolution JPEG decoding for inference
+
+The detector never looks at more than ~640 px, yet a 1080p frame is normally
+decoded in full and then downscaled. JPEG can be decoded directly at 1/2, 1/4
+or 1/8 scale (IDCT scaling), which skips most of the decode work and memory.
+FrameDecoder picks the largest reduction that still leaves at least
+target_size pixels on the long side and reports the scale needed to map boxes
+back to the original frame.
+
+Backends:
+    - "turbojpeg": PyTurboJPEG (libjpeg-turbo), used when installed
+    - "opencv":    cv2.imdecode with IMREAD_REDUCED_COLOR_2/4/8
+
+Non-JPEG payloads (WebP, PNG, ...) are decoded at full size.
+"""
+import cv2
+import numpy as np
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    _turbojpeg = TurboJPEG()
+except Exception:  # Package or libturbojpeg missing
+    _turbojpeg = None
+
+BACKENDS = ("auto", "opencv", "turbojpeg")
+
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# Start-of-frame markers carrying the image size (baseline, progressive, ...)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the JPEG headers without decoding
+
+    Returns:
+        (width, height), or None if data is not a parseable JPEG
+    """
+    buf = memoryview(data)
+    if len(buf) < 4 or buf[0] != 0xFF or buf[1] != 0xD8:
+        return None
+    i = 2
+    while i + 4 <= len(buf):
+        if buf[i] != 0xFF:
+            return None
+        marker = buf[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            i += 2
+            continue
+        length = (buf[i + 2] << 8) | buf[i + 3]
+        if marker in _SOF_MARKERS:
+            if i + 9 > len(buf):
+                return None
+            height = (buf[i + 5] << 8) | buf[i + 6]
+            width = (buf[i + 7] << 8) | buf[i + 8]
+            return width, height
+        if marker == 0xDA:  # Start of scan without a frame header
+            return None
+        i += 2 + length
+    return None
+
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """Largest of 8/4/2/1 that keeps the long side at or above target_size"""
+    long_side = max(width, height)
+    for factor in (8, 4, 2):
+        if long_side // factor >= target_size:
+            return factor
+    return 1
+
+
+class FrameDecoder:
+    """
+    Decodes encoded frames at the smallest resolution the detector can use
+
+    Usage:
+        decoder = FrameDecoder(target_size=640)
+        frame, (scale_x, scale_y) = decoder.decode(jpeg_bytes)
+        # box in frame * scale = box in the original image
+    """
+
+    def __init__(self, target_size: int = 640, backend: str = "auto"):
+        """
+        Initialize decoder
+
+        Args:
+            target_size: Inference size - the decoded long side stays at or above it
+                (0 disables reduced decoding)
+            backend: "auto" (libjpeg-turbo when installed), "opencv" or "turbojpeg"
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"backend must be one of {BACKENDS}")
+        if backend == "turbojpeg" and _turbojpeg is None:
+            raise RuntimeError("PyTurboJPEG is not installed")
+        self.target_size = max(0, target_size)
+        self.backend = "turbojpeg" if backend == "auto" and _turbojpeg is not None else \
+            ("opencv" if backend == "auto" else backend)
+
+    def decode(self, data) -> Tuple[Optional[np.ndarray], Tuple[float, float]]:
+        """
+        Decode an encoded image
+
+        Args:
+            data: JPEG/WebP/PNG bytes (bytes, bytearray, memoryview or uint8 array)
+
+        Returns:
+            (frame, (scale_x, scale_y)) - frame is None if the data cannot be decoded;
+            scale maps coordinates in frame back to the original resolution
+        """
+        size = jpeg_size(data) if self.target_size else None
+        factor = reduction_factor(*size, self.target_size) if size else 1
+
+        frame = None
+        if size and self.backend == "turbojpeg":
+            try:
+                frame = _turbojpeg.decode(bytes(data), pixel_format=TJPF_BGR,
+                                          scaling_factor=(1, factor) if factor > 1 else None)
+            except Exception as e:
+                logger.debug(f"libjpeg-turbo decode failed, falling back to OpenCV: {e}")
+        if frame is None:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS[factor])
+        if frame is None:
+            return None, (1.0, 1.0)
+
+        if size is None:
+            return frame, (1.0, 1.0)
+        return frame, (size[0] / frame.shape[1], size[1] / frame.shape[0])
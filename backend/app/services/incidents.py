@@ -0,0 +1,225 @@
+"""
+Incident Aggregation - Turns a stream of per-frame detections into incidents
+
+Alerting on every frame with a weapon produces one snapshot, database document
+and notification per frame. The aggregator instead groups detections into
+incidents - same camera, same class, overlapping location, no gap longer than
+gap_seconds - and emits only:
+
+    - "open":      the first detection of a new incident
+    - "escalate":  the incident reached a higher severity level
+    - "close":     nothing seen for gap_seconds - summary of the whole incident
+
+Detections keep their identity across frames through the IoU tracker; a track
+that is lost and re-appears still joins its incident as long as it overlaps the
+region the incident has covered so far.
+"""
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+# Relative imports: the Streamlit dashboard (src/) imports this module as backend.app.services.incidents
+from .tracking import IoUTracker
+from .evidence import evidence_score
+
+# Severity levels by evidence_score of the incident's detections in one frame
+# (one pistol at 0.9 scores 1.8, two pistols 2.7, one knife at 0.8 about 0.96)
+SEVERITY_LEVELS: Tuple[Tuple[str, float], ...] = (("low", 0.0), ("medium", 1.5), ("high", 2.5))
+
+EVENT_OPEN = "open"
+EVENT_ESCALATE = "escalate"
+EVENT_CLOSE = "close"
+
+
+def severity_level(score: float) -> int:
+    """Index into SEVERITY_LEVELS for an evidence score"""
+    level = 0
+    for i, (_, threshold) in enumerate(SEVERITY_LEVELS):
+        if score >= threshold:
+            level = i
+    return level
+
+
+def _intersects(region: List[float], box: List[float]) -> bool:
+    return min(region[2], box[2]) > max(region[0], box[0]) and min(region[3], box[3]) > max(region[1], box[1])
+
+
+class IncidentAggregator:
+    """
+    Thread-safe incident aggregator for many cameras
+
+    Usage:
+        aggregator = IncidentAggregator(gap_seconds=10)
+        for event in aggregator.update("cam_01", detections):   # every frame, also without detections
+            event["type"], event["incident"], event["detections"]
+        aggregator.close_camera("cam_01")                        # camera gone - close its incidents
+    """
+
+    def __init__(self, gap_seconds: float = 10.0, iou_threshold: float = 0.3, max_track_age: int = 30):
+        """
+        Initialize aggregator
+
+        Args:
+            gap_seconds: An incident closes after this long without detections
+            iou_threshold: IoU for the frame-to-frame tracker
+            max_track_age: Frames a track survives without a match
+        """
+        self.gap_seconds = gap_seconds
+        self.iou_threshold = iou_threshold
+        self.max_track_age = max_track_age
+
+        self._cameras: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def update(self, camera_id: str, detections: List[Dict], timestamp: Optional[float] = None) -> List[dict]:
+        """
+        Feed the detections of one frame
+
+        Args:
+            camera_id: Camera (or client) the frame came from
+            detections: {"label", "confidence", "bbox": [x1, y1, x2, y2]} dicts
+            timestamp: Frame time in seconds (defaults to now)
+
+        Returns:
+            Events, each {"type", "incident", "detections"} - incident is a summary
+            dict, detections are the frame's detections belonging to it
+        """
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            events = self._sweep(now)
+            if not detections and camera_id not in self._cameras:
+                return events
+
+            camera = self._cameras.setdefault(camera_id, {
+                "tracker": IoUTracker(self.iou_threshold, self.max_track_age, keep_history=False),
+                "track_incident": {},
+                "incidents": {},
+            })
+            tracked = camera["tracker"].update(detections)
+
+            # Group this frame's detections by incident
+            grouped: Dict[str, List[dict]] = {}
+            opened = set()
+            for det in tracked:
+                incident = self._incident_for(camera, det)
+                if incident is None:
+                    incident = self._open(camera_id, det, now)
+                    camera["incidents"][incident["incident_id"]] = incident
+                    opened.add(incident["incident_id"])
+                camera["track_incident"][det["track_id"]] = incident["incident_id"]
+                grouped.setdefault(incident["incident_id"], []).append(det)
+
+            for incident_id, dets in grouped.items():
+                incident = camera["incidents"][incident_id]
+                previous_level = incident["level_index"]
+                self._absorb(incident, dets, now)
+                if incident_id in opened:
+                    events.append(self._event(EVENT_OPEN, incident, dets))
+                elif incident["level_index"] > previous_level:
+                    events.append(self._event(EVENT_ESCALATE, incident, dets))
+            return events
+
+    def close_camera(self, camera_id: str, timestamp: Optional[float] = None) -> List[dict]:
+        """Close every open incident of a camera (e.g. on disconnect)"""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            camera = self._cameras.pop(camera_id, None)
+            if camera is None:
+                return []
+            return [self._close(incident, now) for incident in camera["incidents"].values()]
+
+    def sweep(self, timestamp: Optional[float] = None) -> List[dict]:
+        """Close incidents idle for longer than gap_seconds (update() does this too)"""
+        with self._lock:
+            return self._sweep(time.time() if timestamp is None else timestamp)
+
+    def open_incidents(self, camera_id: Optional[str] = None) -> List[dict]:
+        with self._lock:
+            cameras = [self._cameras[camera_id]] if camera_id in self._cameras else \
+                ([] if camera_id else list(self._cameras.values()))
+            return [self._public(i) for camera in cameras for i in camera["incidents"].values()]
+
+    # ------------------------------------------------------------------
+    # Internals (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _incident_for(self, camera: dict, det: dict) -> Optional[dict]:
+        incident_id = camera["track_incident"].get(det["track_id"])
+        if incident_id in camera["incidents"]:
+            return camera["incidents"][incident_id]
+        # New track: join an open incident of the same class covering this location
+        for incident in camera["incidents"].values():
+            if incident["label"] == det["label"] and _intersects(incident["region"], det["bbox"]):
+                return incident
+        return None
+
+    @staticmethod
+    def _open(camera_id: str, det: dict, now: float) -> dict:
+        return {
+            "incident_id": uuid.uuid4().hex[:12],
+            "camera_id": camera_id,
+            "label": det["label"],
+            "started_at": now,
+            "last_seen": now,
+            "frames": 0,
+            "detections": 0,
+            "max_objects": 0,
+            "max_confidence": 0.0,
+            "peak_score": 0.0,
+            "level_index": 0,
+            "region": [float(v) for v in det["bbox"]],
+            "track_ids": set(),
+        }
+
+    @staticmethod
+    def _absorb(incident: dict, dets: List[dict], now: float):
+        score = evidence_score(dets)
+        incident["last_seen"] = now
+        incident["frames"] += 1
+        incident["detections"] += len(dets)
+        incident["max_objects"] = max(incident["max_objects"], len(dets))
+        incident["max_confidence"] = max(incident["max_confidence"], max(float(d["confidence"]) for d in dets))
+        incident["peak_score"] = max(incident["peak_score"], score)
+        incident["level_index"] = max(incident["level_index"], severity_level(score))
+        incident["track_ids"].update(d["track_id"] for d in dets)
+        region = incident["region"]
+        for d in dets:
+            x1, y1, x2, y2 = d["bbox"]
+            region[:] = [min(region[0], x1), min(region[1], y1), max(region[2], x2), max(region[3], y2)]
+
+    def _sweep(self, now: float) -> List[dict]:
+        events = []
+        for camera_id in list(self._cameras):
+            camera = self._cameras[camera_id]
+            for incident_id in [i for i, inc in camera["incidents"].items()
+                                if now - inc["last_seen"] > self.gap_seconds]:
+                events.append(self._close(camera["incidents"].pop(incident_id), now))
+                camera["track_incident"] = {t: i for t, i in camera["track_incident"].items() if i != incident_id}
+            if not camera["incidents"] and not camera["tracker"].active_tracks:
+                del self._cameras[camera_id]
+        return events
+
+    def _close(self, incident: dict, now: float) -> dict:
+        incident["ended_at"] = incident["last_seen"]
+        return self._event(EVENT_CLOSE, incident, [])
+
+    def _event(self, kind: str, incident: dict, dets: List[dict]) -> dict:
+        return {"type": kind, "incident": self._public(incident), "detections": dets}
+
+    @staticmethod
+    def _public(incident: dict) -> dict:
+        summary = {k: v for k, v in incident.items() if k not in ("level_index", "track_ids", "region")}
+        summary.update(
+            level=SEVERITY_LEVELS[incident["level_index"]][0],
+            duration_seconds=round(incident["last_seen"] - incident["started_at"], 2),
+            max_confidence=round(incident["max_confidence"], 3),
+            peak_score=round(incident["peak_score"], 3),
+            tracks=len(incident["track_ids"]),
+            region=[round(v, 1) for v in incident["region"]],
+        )
+        return summary
@@ -0,0 +1,204 @@
+"""
+Inference Scheduler - Quality-of-service for the shared detection model
+
+Live WebSocket frames, server-side cameras, image uploads and video jobs all
+run on the same model. Every model call (one frame or one batch) takes a
+slot from this scheduler, tagged with a priority class:
+
+    live > camera > interactive (uploads) > batch (video jobs)
+
+When a slot frees up it goes to the highest priority class waiting, so a
+video job is preempted between two of its batches as soon as a live frame
+arrives. To keep lower classes from starving, a class whose share of recent
+model time is below its guaranteed minimum share is served first.
+
+Per class the queueing delay (request -> slot) and the model time are
+exported by stats().
+"""
+import math
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+QOS_LIVE = "live"
+QOS_CAMERA = "camera"
+QOS_INTERACTIVE = "interactive"
+QOS_BATCH = "batch"
+
+# Highest priority first
+QOS_CLASSES = (QOS_LIVE, QOS_CAMERA, QOS_INTERACTIVE, QOS_BATCH)
+
+
+class InferenceScheduler:
+    """
+    Priority slots for model calls
+
+    Usage:
+        with inference_scheduler.slot(QOS_LIVE):
+            detections = model(frame)
+
+        infer_fn = inference_scheduler.wrap(infer_fn, QOS_BATCH)  # one slot per batch
+    """
+
+    def __init__(self, slots: int = 1, min_shares: Optional[Dict[str, float]] = None, share_window: float = 10.0):
+        """
+        Initialize the scheduler
+
+        Args:
+            slots: Model calls allowed at the same time (1 = one call on the device at a time)
+            min_shares: Guaranteed share of model time per class while it has work waiting
+            share_window: Seconds model time is averaged over (exponential decay)
+        """
+        self.slots = max(1, slots)
+        self.min_shares = {qos: (min_shares or {}).get(qos, 0.0) for qos in QOS_CLASSES}
+        self.share_window = share_window
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._waiting: Dict[str, deque] = {qos: deque() for qos in QOS_CLASSES}
+        self._usage = {qos: 0.0 for qos in QOS_CLASSES}  # Decayed model seconds
+        self._usage_time = time.time()
+
+        self._stats = {
+            qos: {"requests": 0, "running": 0, "model_seconds": 0.0, "min_share_grants": 0,
+                  "delays": deque(maxlen=1000)}
+            for qos in QOS_CLASSES
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def slot(self, qos: str):
+        """Hold a model slot for the duration of the block (blocks until granted)"""
+        if qos not in self._waiting:
+            raise ValueError(f"Unknown QoS class: {qos}")
+        ticket = {"qos": qos, "granted": False, "requested": time.time()}
+        with self._cond:
+            self._stats[qos]["requests"] += 1
+            self._waiting[qos].append(ticket)
+            self._grant()
+            while not ticket["granted"]:
+                self._cond.wait()
+
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            with self._cond:
+                held = time.time() - start_time
+                self._decay_usage()
+                self._usage[qos] += held
+                self._stats[qos]["model_seconds"] += held
+                self._stats[qos]["running"] -= 1
+                self._running -= 1
+                self._grant()
+
+    def wrap(self, infer_fn: Callable, qos: str) -> Callable:
+        """Batched inference callable that takes a slot per call (i.e. per batch)"""
+        def scheduled(*args, **kwargs):
+            with self.slot(qos):
+                return infer_fn(*args, **kwargs)
+        return scheduled
+
+    def stats(self) -> dict:
+        """
+        Per-class metrics
+
+        Returns:
+            {class: {"requests", "waiting", "running", "queue_delay_ms": {"avg", "p95", "max"},
+                     "model_seconds", "share", "min_share", "min_share_grants"}}
+        """
+        with self._cond:
+            self._decay_usage()
+            total_usage = sum(self._usage.values())
+            result = {}
+            for qos in QOS_CLASSES:
+                stats = self._stats[qos]
+                delays = sorted(stats["delays"])
+                result[qos] = {
+                    "requests": stats["requests"],
+                    "waiting": len(self._waiting[qos]),
+                    "running": stats["running"],
+                    "queue_delay_ms": {
+                        "avg": round(sum(delays) / len(delays) * 1000, 2) if delays else 0.0,
+                        "p95": round(delays[int(len(delays) * 0.95)] * 1000, 2) if delays else 0.0,
+                        "max": round(delays[-1] * 1000, 2) if delays else 0.0,
+                    },
+                    "model_seconds": round(stats["model_seconds"], 3),
+                    "share": round(self._usage[qos] / total_usage, 3) if total_usage else 0.0,
+                    "min_share": self.min_shares[qos],
+                    "min_share_grants": stats["min_share_grants"],
+                }
+            return result
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _decay_usage(self):
+        """Age the model time counters (caller holds the lock)"""
+        now = time.time()
+        factor = math.exp(-(now - self._usage_time) / self.share_window)
+        self._usage_time = now
+        for qos in QOS_CLASSES:
+            self._usage[qos] *= factor
+
+    def _grant(self):
+        """Hand free slots to waiting requests (caller holds the lock)"""
+        granted = False
+        while self._running < self.slots:
+            qos = self._pick()
+            if qos is None:
+                break
+            ticket = self._waiting[qos].popleft()
+            ticket["granted"] = True
+            self._running += 1
+            self._stats[qos]["running"] += 1
+            self._stats[qos]["delays"].append(time.time() - ticket["requested"])
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def _pick(self) -> Optional[str]:
+        """Class that gets the next slot (caller holds the lock)"""
+        waiting = [qos for qos in QOS_CLASSES if self._waiting[qos]]
+        if not waiting:
+            return None
+
+        # Guaranteed minimum shares first: the class furthest below its share
+        self._decay_usage()
+        total_usage = sum(self._usage.values())
+        if total_usage > 0:
+            starved = [
+                (self._usage[qos] / total_usage / self.min_shares[qos], qos)
+                for qos in waiting
+                if self.min_shares[qos] > 0 and self._usage[qos] / total_usage < self.min_shares[qos]
+            ]
+            if starved:
+                qos = min(starved)[1]
+                if qos != waiting[0]:
+                    self._stats[qos]["min_share_grants"] += 1
+                return qos
+
+        # Otherwise strict priority
+        return waiting[0]
+
+
+# Singleton instance
+inference_scheduler = InferenceScheduler(
+    slots=settings.INFERENCE_SLOTS,
+    min_shares={
+        QOS_CAMERA: settings.INFERENCE_MIN_SHARE_CAMERA,
+        QOS_INTERACTIVE: settings.INFERENCE_MIN_SHARE_INTERACTIVE,
+        QOS_BATCH: settings.INFERENCE_MIN_SHARE_BATCH,
+    },
+)
@@ -67,6 +67,47 @@ class PersonWeaponAnalyzer:
             logger.error(f"Person detection error: {e}")
             return []
     
+    def detect_persons_batch(self, frames: List[np.ndarray], conf_threshold: float = 0.5) -> List[List[Dict]]:
+        """
+        Detect persons in several frames with one batched inference call
+        
+        Args:
+            frames: Input images (BGR format)
+            conf_threshold: Confidence threshold
+            
+        Returns:
+            Person detections per frame (same format as detect_persons)
+        """
+        if self.person_model is None or not frames:
+            return [[] for _ in frames]
+        
+        try:
+            results = self.person_model.predict(
+                frames,
+                conf=conf_threshold,
+                classes=[0],  # Only detect person class
+                verbose=False,
+                imgsz=640
+            )
+            
+            batch = []
+            for result in results:
+                persons = []
+                for box in result.boxes:
+                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                    persons.append({
+                        "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                        "confidence": float(box.conf.cpu().numpy()),
+                        "center": [(x1 + x2) / 2, (y1 + y2) / 2],
+                        "area": (x2 - x1) * (y2 - y1)
+                    })
+                batch.append(persons)
+            return batch
+            
+        except Exception as e:
+            logger.error(f"Batch person detection error: {e}")
+            return [[] for _ in frames]
+    
     def calculate_iou(self, box1: List[int], box2: List[int]) -> float:
         """
         Calculate Intersection over Union between two bounding boxes
@@ -0,0 +1,354 @@
+"""
+Realtime Detection - Shared inference and alerting for live frames
+
+Used by every live source (browser WebSocket clients, server-side cameras):
+    - detect_frame() / detect_frames(): weapon detection + ROI filter, single
+      frame or batched, model calls through the inference scheduler
+    - incident_aggregator: groups detections into incidents per source
+    - alert_pool: bounded worker pool that turns incident events into
+      snapshots, MongoDB alerts and Telegram messages
+    - clip_recorder: pre/post-event clip of every incident opened on a
+      server-side camera, linked from its alerts
+
+Edge cameras that detect on the device feed the same aggregator and pool
+through app/services/edge_ingest.py.
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+from app.core.config import settings
+from app.services.detection_service import detection_service
+from app.services.alert_service import telegram_alert
+from app.services.person_weapon_analyzer import person_weapon_analyzer
+from app.services.alert_pool import AlertWorkerPool
+from app.services.alert_writer import alert_writer
+from app.services.clip_recorder import clip_recorder
+from app.services.inference_scheduler import inference_scheduler, QOS_LIVE, QOS_CAMERA
+from app.services.incidents import IncidentAggregator, EVENT_OPEN, EVENT_CLOSE, EVENT_ESCALATE
+
+# Snapshot directory
+SNAPSHOT_DIR = Path("runs/alerts_snapshots")
+SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+
+
+# === INCIDENT AGGREGATION ===
+# Detections are grouped into incidents (client, class, location, time gap):
+# alerts go out when an incident opens or escalates, a summary when it closes
+incident_aggregator = IncidentAggregator(gap_seconds=settings.INCIDENT_GAP_SECONDS)
+
+# Closed incident summaries are written straight to the alert writer (behind the
+# incident's alerts already queued there). Alerts of the incident still in the
+# alert pool are written with the closed summary instead, so it is kept in
+# either order.
+CLOSED_INCIDENTS_KEPT = 1000
+_closed_incidents: OrderedDict = OrderedDict()  # incident_id -> closed summary, newest last
+_closed_lock = threading.Lock()
+
+
+def close_incident(incident: dict):
+    """Write the summary of a closed incident to its alerts"""
+    with _closed_lock:
+        _closed_incidents[incident["incident_id"]] = incident
+        while len(_closed_incidents) > CLOSED_INCIDENTS_KEPT:
+            _closed_incidents.popitem(last=False)
+        alert_writer.update({"incident_id": incident["incident_id"]}, {"$set": {"incident": incident}})
+    print(f"📁 Incident closed: {incident['camera_id']} - {incident['label']} for {incident['duration_seconds']}s, "
+          f"{incident['frames']} frame(s), peak level {incident['level']}")
+
+
+def write_incident_alert(alert_data: dict):
+    """Queue an incident alert, with the closed summary if the incident closed meanwhile"""
+    with _closed_lock:
+        closed = _closed_incidents.get(alert_data["incident_id"])
+        if closed is not None:
+            alert_data["incident"] = closed
+        return alert_writer.write(alert_data)
+
+
+def detect_frame(
+    frame: np.ndarray,
+    model_type: str,
+    confidence: float,
+    roi_box: Optional[list],
+    qos: str = QOS_LIVE
+) -> list:
+    """
+    Run weapon detection on one frame and apply the ROI filter
+    
+    Runs in a worker thread; the model call takes a slot of the inference scheduler.
+    """
+    with inference_scheduler.slot(qos):
+        detections, _, model_used = detection_service.detect(
+            frame, model_type=model_type, conf_threshold=confidence
+        )
+    return filter_roi(detections, roi_box)
+
+
+def detect_frames(frames: list, model_type: str, confidences: list, roi_boxes: list, qos: str = QOS_CAMERA) -> list:
+    """
+    Batched detect_frame: one model call for several frames (e.g. one per camera)
+    
+    Args:
+        frames: Frames to detect on
+        model_type: "yolo" or "fasterrcnn" (same for the whole batch)
+        confidences: Confidence threshold per frame
+        roi_boxes: ROI per frame (None for the full frame)
+        qos: Inference scheduler class of the batch
+    
+    Returns:
+        Detection list per frame
+    """
+    with inference_scheduler.slot(qos):
+        batch_detections, _, model_used = detection_service.detect_batch(
+            frames, model_type=model_type, conf_thresholds=confidences
+        )
+    return [filter_roi(detections, roi_box) for detections, roi_box in zip(batch_detections, roi_boxes)]
+
+
+def filter_roi(detections: list, roi_box: Optional[list]) -> list:
+    """Keep the detections inside the ROI (all of them without ROI)"""
+    # === ROI FILTERING ===
+    original_count = len(detections)
+    if roi_box and original_count > 0:
+        # Import weapon_detector for ROI filtering
+        from app.services.weapon_detector import weapon_detector
+        
+        # Convert detections to format expected by weapon_detector
+        det_dicts = [
+            {
+                "label": det.class_name,
+                "confidence": det.confidence,
+                "bbox": [det.bbox.x1, det.bbox.y1, det.bbox.x2, det.bbox.y2],
+                "class_id": 0
+            }
+            for det in detections
+        ]
+        
+        # Filter by ROI
+        filtered_dicts = weapon_detector.filter_by_roi(det_dicts, roi_box)
+        
+        # Convert back to Detection objects
+        from app.schemas.detection import Detection, BoundingBox
+        detections = [
+            Detection(
+                class_name=d["label"],
+                confidence=d["confidence"],
+                bbox=BoundingBox(
+                    x1=d["bbox"][0],
+                    y1=d["bbox"][1],
+                    x2=d["bbox"][2],
+                    y2=d["bbox"][3]
+                )
+            )
+            for d in filtered_dicts
+        ]
+        
+        filtered_count = len(detections)
+        if original_count > filtered_count:
+            print(f"🎯 ROI Filter: {original_count} → {filtered_count} detections ({original_count - filtered_count} outside ROI)")
+    
+    return detections
+
+
+def incident_detections(detections: list) -> list:
+    """Detection objects -> {"label", "confidence", "bbox"} dicts for incident_aggregator"""
+    return [
+        {
+            "label": det.class_name,
+            "confidence": det.confidence,
+            "bbox": [det.bbox.x1, det.bbox.y1, det.bbox.x2, det.bbox.y2]
+        }
+        for det in detections
+    ]
+
+
+def send_alert_background(key: str, payload: tuple, mark: Callable[[str], None]):
+    """
+    Process one realtime alert (runs in an alert pool worker thread)
+    
+    ⚠️ Runs in a worker of alert_pool to avoid blocking the WebSocket / camera loop
+    
+    Args:
+        key: Alert pool key ("<source>:<incident_id>")
+        payload: (frame, detections, event, location) - frame already copied, detections as
+            Detection objects, open / escalate event from incident_aggregator
+        mark: Records the latency of the stage that just finished
+    """
+    frame, detections, event, location = payload
+    incident = event["incident"]
+    client_id = incident["camera_id"]
+    
+    # === DETECT PERSONS IN FRAME ===
+    # Edge events may bring the device's person boxes (see edge_ingest.py)
+    person_detections = event.get("persons")
+    if person_detections is None:
+        person_detections = person_weapon_analyzer.detect_persons(frame, conf_threshold=0.5)
+    person_count = len(person_detections)
+    
+    # === ANALYZE WEAPON-PERSON RELATIONSHIP ===
+    weapon_dicts = []
+    for det in detections:
+        weapon_dicts.append({
+            'label': det.class_name,
+            'confidence': det.confidence,
+            'bbox': [int(det.bbox.x1), int(det.bbox.y1), int(det.bbox.x2), int(det.bbox.y2)]
+        })
+    
+    analyzed_weapons = person_weapon_analyzer.analyze_weapon_person_relationship(
+        weapon_dicts, 
+        person_detections
+    )
+    
+    # === DETERMINE OVERALL THREAT ===
+    danger_level, message = person_weapon_analyzer.determine_overall_threat(
+        analyzed_weapons,
+        person_count
+    )
+    
+    weapon_count = len(detections)
+    print(f"🔍 Analysis: {person_count} person(s), {weapon_count} weapon(s) - Status: {message}")
+    mark("analysis")
+    
+    # === SAVE SNAPSHOT IMAGE ===
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    snapshot_filename = f"alert_{client_id}_{timestamp}.jpg"
+    snapshot_path = SNAPSHOT_DIR / snapshot_filename
+    
+    # Draw detections on frame for snapshot
+    annotated_frame = frame.copy()
+    
+    # Draw persons in green
+    for person in person_detections:
+        px1, py1, px2, py2 = person['bbox']
+        cv2.rectangle(annotated_frame, (px1, py1), (px2, py2), (0, 255, 0), 2)
+        cv2.putText(annotated_frame, f"Person {person['confidence']:.2f}", 
+                   (px1, py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+    
+    # Draw weapons in red with status
+    for i, det in enumerate(detections):
+        x1, y1 = int(det.bbox.x1), int(det.bbox.y1)
+        x2, y2 = int(det.bbox.x2), int(det.bbox.y2)
+        
+        # Draw bounding box
+        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        
+        # Get status from analyzed weapons
+        status = analyzed_weapons[i].get('status', 'unknown') if i < len(analyzed_weapons) else 'unknown'
+        status_text = person_weapon_analyzer.get_status_vietnamese(status)
+        
+        # Draw label with status
+        label = f"{det.class_name} {det.confidence:.2f}"
+        cv2.putText(annotated_frame, label, (x1, y1 - 25),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+        cv2.putText(annotated_frame, status_text, (x1, y1 - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 0), 1)
+    
+    # Save snapshot
+    cv2.imwrite(str(snapshot_path), annotated_frame)
+    print(f"📸 Snapshot saved: {snapshot_filename}")
+    mark("snapshot")
+    
+    # === SAVE TO MONGODB (write-behind: batched by the alert writer) ===
+    try:
+        # Get highest confidence detection
+        max_confidence = max(det.confidence for det in detections)
+        primary_weapon = max(detections, key=lambda d: d.confidence).class_name
+        weapon_types = list(set([det.class_name for det in detections]))
+        
+        # Get weapon statuses from analysis
+        weapon_statuses = [w.get('status', 'unknown') for w in analyzed_weapons]
+        held_count = sum(1 for s in weapon_statuses if s == 'held_by_person')
+        
+        alert_data = {
+            "weapon_class": primary_weapon,
+            "confidence": float(max_confidence),
+            "total_weapons": weapon_count,
+            "all_weapons": weapon_types,
+            "status": message,  # Use analyzed status message
+            "danger_level": danger_level,  # Use analyzed danger level
+            "location": location,
+            "camera_id": client_id,
+            "image_path": f"/snapshots/{snapshot_filename}",
+            "timestamp": datetime.utcnow(),
+            "acknowledged": False,
+            "person_count": person_count,
+            "held_by_person": held_count > 0,
+            "weapon_statuses": weapon_statuses,
+            "incident_id": incident["incident_id"],
+            "incident_event": event["type"],
+            "incident": incident
+        }
+        if event.get("clip_path"):
+            # Pre/post-event clip; clip_status becomes "ready" once the encoder wrote it
+            alert_data["clip_path"] = event["clip_path"]
+            alert_data["clip_status"] = clip_recorder.clip_status(incident["incident_id"]) or "recording"
+        
+        alert_id = write_incident_alert(alert_data)
+        if alert_id is not None:
+            print(f"💾 Alert queued for MongoDB: {alert_id}")
+        
+    except Exception as db_error:
+        print(f"⚠️ MongoDB save failed: {db_error}")
+        # Continue even if DB save fails
+    mark("database")
+    
+    # === TELEGRAM ALERT ===
+    # Sent from this worker thread (no extra thread per message); the incident
+    # aggregator already limits messages to incident open / escalation
+    if event["type"] == EVENT_ESCALATE:
+        message = f"Mức độ tăng lên: {incident['level']} - {message}"
+    telegram_alert.send_alert(
+        camera_id=client_id,
+        image=annotated_frame,  # Send annotated frame
+        message=message,
+        detections=detections,
+        skip_cooldown=True,
+        blocking=True
+    )
+    mark("notify")
+    
+    print(f"✅ Alert triggered ({event['type']}): {client_id} - {weapon_count} weapons - Danger: {danger_level}")
+
+
+def submit_incident_events(
+    client_id: str,
+    events: list,
+    frame: Optional[np.ndarray] = None,
+    detections: list = (),
+    location: str = "Realtime Detection"
+):
+    """Queue incident events to the alert pool (the frame is copied only when an alert is needed)"""
+    for event in events:
+        incident = event["incident"]
+        key = f"{client_id}:{incident['incident_id']}"
+        # Clip of the incident (server-side cameras only - others have no pre-roll buffer)
+        if event["type"] == EVENT_OPEN:
+            clip_path = clip_recorder.trigger(client_id, incident["incident_id"], incident["started_at"])
+        else:
+            clip_path = clip_recorder.clip_path(incident["incident_id"])
+        if clip_path:
+            event["clip_path"] = clip_path
+        if event["type"] == EVENT_CLOSE:
+            # Not through the pool: a summary must never be dropped under load
+            close_incident(incident)
+        else:
+            # A pending open is replaced by a later escalation of the same incident
+            alert_pool.submit(key, (frame.copy(), list(detections), event, location),
+                              priority=incident["peak_score"])
+
+
+# Fixed pool of alert workers: at most one pending alert per client, bounded queue,
+# most dangerous frames first
+alert_pool = AlertWorkerPool(
+    send_alert_background,
+    num_workers=settings.ALERT_WORKERS,
+    max_queue=settings.ALERT_QUEUE_SIZE,
+    name="realtime-alert"
+)
+
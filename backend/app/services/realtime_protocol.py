@@ -0,0 +1,207 @@
+"""
+Realtime Protocol - Binary WebSocket messages for realtime detection
+
+Text (JSON + base64 data URL) frames cost ~33% extra bandwidth plus a JSON
+parse, a string split and a base64 decode per frame. Binary messages carry the
+raw JPEG/WebP bytes behind a small fixed header instead, and detections come
+back as packed structs.
+
+Every message starts with the same 16-byte little-endian header:
+
+    offset  size  field
+    0       1     version      (PROTOCOL_VERSION)
+    1       1     type         (MSG_FRAME, MSG_DETECTIONS, MSG_ERROR)
+    2       2     flags        (FLAG_*)
+    4       4     seq          frame sequence number, echoed in the reply
+    8       8     timestamp    float64 chosen by the client (e.g. ms), echoed
+
+MSG_FRAME (client -> server):     header + encoded image bytes
+MSG_DETECTIONS (server -> client): header + summary + detections
+
+    summary     <I f H H I> frame_count, processing_time (s), fps x 10, detection count,
+                            frames dropped so far (replaced before inference)
+    detection   <H H H H H B> x1, y1, x2, y2 (px), confidence x 65535, label length
+                + label (UTF-8)
+
+MSG_ERROR (server -> client):     header + UTF-8 error message
+
+Multiplexed sessions (/ws/realtime-session) carry many camera channels on one
+socket. Their messages insert the channel number right after the header:
+
+MSG_CHANNEL_FRAME (client -> server):      header + <H> channel + encoded image bytes
+MSG_CHANNEL_DETECTIONS (server -> client): header + <H> channel + summary + detections
+MSG_CHANNEL_ERROR (server -> client):      header + <H> channel + UTF-8 error message
+
+frontend/src/services/realtimeProtocol.js implements the client side.
+"""
+import struct
+from typing import List, NamedTuple, Optional, Tuple
+
+PROTOCOL_VERSION = 1
+
+MSG_FRAME = 1
+MSG_DETECTIONS = 2
+MSG_ERROR = 3
+MSG_CHANNEL_FRAME = 4
+MSG_CHANNEL_DETECTIONS = 5
+MSG_CHANNEL_ERROR = 6
+
+# Frame flags
+FLAG_WEBP = 0x0001  # Payload is WebP (JPEG otherwise) - informational, the decoder sniffs the format
+
+HEADER = struct.Struct("<BBHId")
+SUMMARY = struct.Struct("<IfHHI")
+DETECTION = struct.Struct("<HHHHHB")
+CHANNEL = struct.Struct("<H")
+
+_U16_MAX = 0xFFFF
+
+
+class ProtocolError(ValueError):
+    """Raised for malformed binary messages"""
+
+
+class MessageHeader(NamedTuple):
+    version: int
+    type: int
+    flags: int
+    seq: int
+    timestamp: float
+
+
+def decode_frame(message: bytes) -> Tuple[MessageHeader, memoryview]:
+    """
+    Split a binary frame message into header and image payload
+
+    Returns:
+        (header, payload) - payload is a zero-copy view of the image bytes
+
+    Raises:
+        ProtocolError: If the message is too short, of another version or not a frame
+    """
+    if len(message) <= HEADER.size:
+        raise ProtocolError("Message too short")
+    header = MessageHeader(*HEADER.unpack_from(message))
+    if header.version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {header.version}")
+    if header.type != MSG_FRAME:
+        raise ProtocolError(f"Unexpected message type {header.type}")
+    return header, memoryview(message)[HEADER.size:]
+
+
+def decode_channel_frame(message: bytes) -> Tuple[MessageHeader, int, memoryview]:
+    """
+    Split a multiplexed frame message into header, channel number and image payload
+
+    Raises:
+        ProtocolError: If the message is too short, of another version or not a channel frame
+    """
+    if len(message) <= HEADER.size + CHANNEL.size:
+        raise ProtocolError("Message too short")
+    header = MessageHeader(*HEADER.unpack_from(message))
+    if header.version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {header.version}")
+    if header.type != MSG_CHANNEL_FRAME:
+        raise ProtocolError(f"Unexpected message type {header.type}")
+    channel, = CHANNEL.unpack_from(message, HEADER.size)
+    return header, channel, memoryview(message)[HEADER.size + CHANNEL.size:]
+
+
+def _clip_u16(value: float) -> int:
+    return min(_U16_MAX, max(0, int(round(value))))
+
+
+def encode_detections(
+    seq: int,
+    timestamp: float,
+    detections: List[dict],
+    processing_time: float,
+    fps: float,
+    frame_count: int,
+    dropped_frames: int = 0,
+    channel: Optional[int] = None
+) -> bytes:
+    """
+    Pack a detection response
+
+    Args:
+        seq: Sequence number of the frame being answered
+        timestamp: Timestamp of that frame (echoed for round-trip measurement)
+        detections: Dicts with "class_name", "confidence" and "bbox" {x1, y1, x2, y2}
+        processing_time: Inference time in seconds
+        fps: Current processing rate
+        frame_count: Frames processed on this connection
+        dropped_frames: Frames dropped on this connection because a newer one arrived
+        channel: Channel number in a multiplexed session (MSG_CHANNEL_DETECTIONS)
+    """
+    parts = [
+        _header(MSG_DETECTIONS, MSG_CHANNEL_DETECTIONS, seq, timestamp, channel),
+        SUMMARY.pack(frame_count & 0xFFFFFFFF, processing_time, _clip_u16(fps * 10), len(detections),
+                     dropped_frames & 0xFFFFFFFF),
+    ]
+    for det in detections:
+        # Cut at 255 bytes without splitting a multi-byte character
+        label = det["class_name"].encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+        bbox = det["bbox"]
+        parts.append(DETECTION.pack(
+            _clip_u16(bbox["x1"]), _clip_u16(bbox["y1"]), _clip_u16(bbox["x2"]), _clip_u16(bbox["y2"]),
+            _clip_u16(det["confidence"] * _U16_MAX), len(label)
+        ))
+        parts.append(label)
+    return b"".join(parts)
+
+
+def encode_error(seq: int, timestamp: float, message: str, channel: Optional[int] = None) -> bytes:
+    """Pack an error response for the given frame (MSG_CHANNEL_ERROR if a channel is given)"""
+    return _header(MSG_ERROR, MSG_CHANNEL_ERROR, seq, timestamp, channel) + message.encode("utf-8")
+
+
+def _header(msg_type: int, channel_msg_type: int, seq: int, timestamp: float, channel: Optional[int]) -> bytes:
+    if channel is None:
+        return HEADER.pack(PROTOCOL_VERSION, msg_type, 0, seq & 0xFFFFFFFF, timestamp)
+    return (HEADER.pack(PROTOCOL_VERSION, channel_msg_type, 0, seq & 0xFFFFFFFF, timestamp)
+            + CHANNEL.pack(channel & 0xFFFF))
+
+
+def decode_response(message: bytes) -> dict:
+    """
+    Unpack a server response (reference decoder, mirrors the JavaScript client)
+
+    Returns:
+        dict shaped like the JSON response plus "seq" and "timestamp"
+        (and "channel" for multiplexed session messages)
+    """
+    header = MessageHeader(*HEADER.unpack_from(message))
+    result = {"seq": header.seq, "timestamp": header.timestamp}
+    offset = HEADER.size
+    if header.type in (MSG_CHANNEL_DETECTIONS, MSG_CHANNEL_ERROR):
+        result["channel"], = CHANNEL.unpack_from(message, offset)
+        offset += CHANNEL.size
+    if header.type in (MSG_ERROR, MSG_CHANNEL_ERROR):
+        result.update(error=bytes(message[offset:]).decode("utf-8"), detections=[], total_weapons=0)
+        return result
+    if header.type not in (MSG_DETECTIONS, MSG_CHANNEL_DETECTIONS):
+        raise ProtocolError(f"Unexpected message type {header.type}")
+
+    frame_count, processing_time, fps10, count, dropped = SUMMARY.unpack_from(message, offset)
+    offset += SUMMARY.size
+    detections = []
+    for _ in range(count):
+        x1, y1, x2, y2, confidence, label_length = DETECTION.unpack_from(message, offset)
+        offset += DETECTION.size
+        label = bytes(message[offset:offset + label_length]).decode("utf-8")
+        offset += label_length
+        detections.append({
+            "class_name": label,
+            "confidence": round(confidence / _U16_MAX, 4),
+            "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2},
+        })
+    result.update(
+        detections=detections,
+        processing_time=processing_time,
+        total_weapons=count,
+        fps=fps10 / 10,
+        frame_count=frame_count,
+        dropped_frames=dropped,
+    )
+    return result
@@ -1,9 +1,17 @@
 """
 Stream Manager - Singleton service to manage multiple camera streams
+
+Capture modes (settings.CAPTURE_MODE):
+    thread  - every camera is decoded by a thread of the API process (default)
+    process - cameras are decoded in supervised capture processes and frames
+              are shared through shared memory (see capture_process.py)
 """
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Union
+import threading
 import logging
+from app.core.config import settings
 from app.services.camera_stream import CameraStream
+from app.services.capture_process import CaptureGroup, ProcessCameraStream
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +36,17 @@ class StreamManager:
         if self._initialized:
             return
         
-        self._streams: Dict[str, CameraStream] = {}
+        self._streams: Dict[str, Union[CameraStream, ProcessCameraStream]] = {}
+        self.capture_mode = settings.CAPTURE_MODE
+        
+        # Process mode: capture groups + supervisor thread
+        self._groups: List[CaptureGroup] = []
+        self._groups_lock = threading.Lock()
+        self._supervisor: Optional[threading.Thread] = None
+        self._supervisor_stop = threading.Event()
+        
         self._initialized = True
-        logger.info("StreamManager initialized")
+        logger.info(f"StreamManager initialized (capture mode: {self.capture_mode})")
     
     def add_stream(self, camera_id: str, rtsp_url: str, auto_start: bool = True) -> bool:
         """
@@ -49,7 +65,10 @@ class StreamManager:
             return False
         
         try:
-            stream = CameraStream(camera_id, rtsp_url)
+            if self.capture_mode == "process":
+                stream = ProcessCameraStream(camera_id, rtsp_url, self._assign_group())
+            else:
+                stream = CameraStream(camera_id, rtsp_url)
             self._streams[camera_id] = stream
             
             if auto_start:
@@ -62,7 +81,7 @@ class StreamManager:
             logger.error(f"Failed to add stream {camera_id}: {str(e)}")
             return False
     
-    def get_stream(self, camera_id: str) -> Optional[CameraStream]:
+    def get_stream(self, camera_id: str) -> Optional[Union[CameraStream, ProcessCameraStream]]:
         """
         Get a camera stream by ID
         
@@ -116,6 +135,11 @@ class StreamManager:
         logger.info("Stopping all camera streams...")
         for camera_id in list(self._streams.keys()):
             self.remove_stream(camera_id)
+        self._supervisor_stop.set()
+        with self._groups_lock:
+            for group in self._groups:
+                group.stop()
+            self._groups = []
         logger.info("✅ All streams stopped")
     
     def get_active_count(self) -> int:
@@ -130,6 +154,50 @@ class StreamManager:
     def __len__(self) -> int:
         """Get total number of managed streams"""
         return len(self._streams)
+    
+    # ------------------------------------------------------------------
+    # Process capture mode
+    # ------------------------------------------------------------------
+    
+    def _assign_group(self) -> CaptureGroup:
+        """Capture group with a free camera slot (a new process if all are full)"""
+        with self._groups_lock:
+            group = next((g for g in self._groups if g.has_room), None)
+            if group is None:
+                group = CaptureGroup(
+                    group_id=len(self._groups) + 1,
+                    capacity=settings.CAPTURE_CAMERAS_PER_PROCESS,
+                    max_width=settings.CAPTURE_MAX_WIDTH,
+                    ring_slots=settings.CAPTURE_RING_SLOTS,
+                    stall_timeout=settings.CAPTURE_STALL_TIMEOUT,
+                )
+                self._groups.append(group)
+            if self._supervisor is None or not self._supervisor.is_alive():
+                self._supervisor_stop.clear()
+                self._supervisor = threading.Thread(target=self._supervise, name="capture-supervisor", daemon=True)
+                self._supervisor.start()
+            return group
+    
+    def _supervise(self, interval: float = 2.0):
+        """Restart dead or hung capture processes"""
+        while not self._supervisor_stop.wait(interval):
+            with self._groups_lock:
+                groups = list(self._groups)
+            for group in groups:
+                try:
+                    group.check()
+                except Exception as e:
+                    logger.error(f"Capture supervisor error (group {group.group_id}): {str(e)}")
+    
+    def list_capture_processes(self) -> List[dict]:
+        """
+        Get information about the capture processes (empty in thread mode)
+        
+        Returns:
+            list: pid, alive, cameras and restart count per process
+        """
+        with self._groups_lock:
+            return [group.info() for group in self._groups]
 
 
 # Singleton instance
@@ -0,0 +1,161 @@
+"""
+Tracking - Lightweight IoU tracker that assigns stable track IDs to detections
+
+Detections are matched greedily to existing tracks of the same class by box
+overlap, so a weapon that stays in view keeps one ID across frames. There is no
+motion model or appearance embedding: this is meant for cheap bookkeeping
+(timelines, incident grouping, delta updates), not for crowded-scene MOT.
+"""
+import numpy as np
+from typing import Dict, List, Optional
+
+# Detection dict format (same as the video pipeline / WeaponDetector):
+# {"label": str, "confidence": float, "bbox": [x1, y1, x2, y2], ...}
+
+
+def box_iou(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    """
+    Pairwise IoU between two sets of [x1, y1, x2, y2] boxes
+
+    Returns:
+        (len(boxes_a), len(boxes_b)) IoU matrix
+    """
+    boxes_a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    boxes_b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area_a = (boxes_a[:, 2] - boxes_a[:, 0]) * (boxes_a[:, 3] - boxes_a[:, 1])
+    area_b = (boxes_b[:, 2] - boxes_b[:, 0]) * (boxes_b[:, 3] - boxes_b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+
+class IoUTracker:
+    """
+    Greedy IoU tracker
+
+    Usage:
+        tracker = IoUTracker()
+        for frame_index, dets in stream:
+            tracked = tracker.update(dets, frame_index)  # each det gets "track_id"
+        tracker.summary()  # first/last frame, hits, max confidence per track
+    """
+
+    def __init__(self, iou_threshold: float = 0.3, max_age: int = 15, keep_history: bool = True):
+        """
+        Initialize tracker
+
+        Args:
+            iou_threshold: Minimum IoU to continue a track
+            max_age: Updates a track may go unmatched before it is closed
+            keep_history: Keep closed tracks for summary() (disable for
+                long-running streams so memory stays bounded)
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.keep_history = keep_history
+
+        self._next_id = 1
+        self._active: Dict[int, dict] = {}
+        self._closed: List[dict] = []
+
+    def update(self, detections: List[Dict], frame_index: Optional[int] = None) -> List[Dict]:
+        """
+        Match detections of one frame to tracks
+
+        Args:
+            detections: Detections of the current frame
+            frame_index: Frame number recorded in the track summary (optional)
+
+        Returns:
+            Copies of the detections with an added "track_id"
+        """
+        track_ids = list(self._active.keys())
+        assigned: Dict[int, int] = {}  # detection index -> track id
+
+        if detections and track_ids:
+            iou = box_iou(
+                [d["bbox"] for d in detections],
+                [self._active[t]["bbox"] for t in track_ids]
+            )
+            # Tracks only continue within the same class
+            for i, det in enumerate(detections):
+                for j, track_id in enumerate(track_ids):
+                    if self._active[track_id]["label"] != det["label"]:
+                        iou[i, j] = 0.0
+
+            # Greedy: best overlaps first
+            used_tracks = set()
+            for flat in np.argsort(-iou, axis=None):
+                i, j = np.unravel_index(flat, iou.shape)
+                if iou[i, j] < self.iou_threshold:
+                    break
+                if i in assigned or j in used_tracks:
+                    continue
+                assigned[int(i)] = track_ids[j]
+                used_tracks.add(j)
+
+        tracked = []
+        for i, det in enumerate(detections):
+            track_id = assigned.get(i)
+            if track_id is None:
+                track_id = self._next_id
+                self._next_id += 1
+                self._active[track_id] = {
+                    "track_id": track_id,
+                    "label": det["label"],
+                    "first_frame": frame_index,
+                    "hits": 0,
+                    "max_confidence": 0.0,
+                }
+
+            track = self._active[track_id]
+            track["bbox"] = list(det["bbox"])
+            track["last_frame"] = frame_index
+            track["hits"] += 1
+            track["age"] = 0
+            track["max_confidence"] = max(track["max_confidence"], float(det["confidence"]))
+            tracked.append({**det, "track_id": track_id})
+
+        # Age unmatched tracks and close the stale ones
+        matched = set(assigned.values())
+        for track_id in track_ids:
+            if track_id in matched:
+                continue
+            track = self._active[track_id]
+            track["age"] += 1
+            if track["age"] > self.max_age:
+                closed = self._active.pop(track_id)
+                if self.keep_history:
+                    self._closed.append(closed)
+
+        return tracked
+
+    @property
+    def active_tracks(self) -> List[dict]:
+        return list(self._active.values())
+
+    def summary(self) -> List[dict]:
+        """All tracks seen so far (closed and active), ordered by track ID"""
+        tracks = sorted(self._closed + list(self._active.values()), key=lambda t: t["track_id"])
+        return [
+            {
+                "track_id": t["track_id"],
+                "label": t["label"],
+                "first_frame": t["first_frame"],
+                "last_frame": t["last_frame"],
+                "hits": t["hits"],
+                "max_confidence": round(t["max_confidence"], 3),
+            }
+            for t in tracks
+        ]
+
+    def reset(self):
+        self._next_id = 1
+        self._active.clear()
+        self._closed.clear()
@@ -0,0 +1,236 @@
+"""
+Video Checkpoint - Resumable, segmented video processing
+
+The video is processed as consecutive frame-range segments, each encoded to
+its own file. After every segment the frame position, the accumulated
+counters and caller state (detection stats, best frame, ...) are written to a
+JSON checkpoint, so a run interrupted by a restart continues from the last
+finished segment instead of frame 0. The segments are concatenated into the
+final output once the whole video is done.
+"""
+import cv2
+import json
+import os
+import shutil
+import logging
+from typing import Callable, List, Optional
+
+from app.services.video_pipeline import VideoPipeline
+from app.services.video_chunking import concat_videos
+
+logger = logging.getLogger(__name__)
+
+_COUNTERS = ("frame_count", "frames_read", "frames_skipped", "frames_inferred", "frames_carried")
+
+
+class VideoCheckpoint:
+    """
+    Checkpoint directory of one video run
+
+    Layout:
+        <directory>/state.json        frame position, counters, caller state
+        <directory>/segment_0000.mp4  finished segments
+        <directory>/evidence_0.jpg    evidence frames kept by the caller
+    """
+
+    def __init__(self, directory: str, segment_seconds: float = 20.0):
+        """
+        Initialize checkpoint
+
+        Args:
+            directory: Directory holding the checkpoint (created on first save)
+            segment_seconds: Seconds of video per segment (= checkpoint interval)
+        """
+        self.directory = directory
+        self.segment_seconds = max(1.0, segment_seconds)
+        self.state_path = os.path.join(directory, "state.json")
+
+    def segment_path(self, index: int) -> str:
+        return os.path.join(self.directory, f"segment_{index:04d}.mp4")
+
+    def save_evidence(self, items: List[dict]) -> List[dict]:
+        """
+        Write EvidenceSelector items as JPEG files
+
+        Returns:
+            JSON-serializable metadata to store in the checkpoint state
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        metadata = []
+        for i, item in enumerate(items):
+            filename = f"evidence_{i}.jpg"
+            with open(os.path.join(self.directory, filename), "wb") as f:
+                f.write(item["jpeg"])
+            metadata.append({**{k: v for k, v in item.items() if k != "jpeg"}, "file": filename})
+        return metadata
+
+    def load_evidence(self, metadata: List[dict]) -> List[dict]:
+        """Read evidence items written by save_evidence (missing files are skipped)"""
+        items = []
+        for meta in metadata:
+            try:
+                with open(os.path.join(self.directory, meta["file"]), "rb") as f:
+                    jpeg = f.read()
+            except OSError:
+                continue
+            items.append({**{k: v for k, v in meta.items() if k != "file"}, "jpeg": jpeg})
+        return items
+
+    @staticmethod
+    def fingerprint(input_path: str) -> dict:
+        """Identifies the input so a checkpoint is never applied to a different file"""
+        return {"name": os.path.basename(input_path), "size": os.path.getsize(input_path)}
+
+    def load(self, input_path: str) -> Optional[dict]:
+        """
+        Load the saved state for input_path
+
+        Returns:
+            State dict, or None if there is no usable checkpoint
+        """
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.state_path}: {e}")
+            return None
+
+        if state.get("input") != self.fingerprint(input_path):
+            logger.warning(f"Checkpoint in {self.directory} belongs to another input, starting over")
+            self.clear()
+            return None
+        if not all(os.path.exists(os.path.join(self.directory, s)) for s in state.get("segments", [])):
+            logger.warning(f"Checkpoint in {self.directory} is missing segments, starting over")
+            self.clear()
+            return None
+        return state
+
+    def save(self, state: dict):
+        """Write the state atomically (a crash mid-write keeps the previous checkpoint)"""
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def run_checkpointed(
+    pipeline: VideoPipeline,
+    input_path: str,
+    output_path: str,
+    checkpoint: VideoCheckpoint,
+    state: Optional[dict] = None,
+    get_extra: Optional[Callable[[], dict]] = None
+) -> dict:
+    """
+    Run a pipeline segment by segment, checkpointing after each segment
+
+    Args:
+        pipeline: Configured pipeline (its hooks see absolute frame indices as usual)
+        input_path: Video to read
+        output_path: Final concatenated output
+        checkpoint: Where segments and state are kept
+        state: State returned by checkpoint.load() to resume from (None = start at frame 0)
+        get_extra: Returns caller state to store with each checkpoint (JSON-serializable)
+
+    Returns:
+        dict shaped like VideoPipeline.run() for the whole video, plus
+        "resumed_from_frame" and "segments" (0 when the container reports no
+        frame count and the video ran in one unsegmented pass)
+
+    Raises:
+        RuntimeError: If the video cannot be opened or written
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video file: {input_path}")
+    source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    if total_frames <= 0:
+        # No frame count (raw streams report 0 or garbage): segments cannot be planned and such
+        # streams usually cannot seek either, so the video runs in one pass without checkpoints
+        logger.warning(f"{input_path} reports no frame count, processing without checkpoints")
+        result = pipeline.run(input_path, output_path)
+        return {**result, "total_frames": result["frames_read"], "resumed_from_frame": 0, "segments": 0}
+
+    if state is None:
+        state = {
+            "input": checkpoint.fingerprint(input_path),
+            "next_frame": 0,
+            "finished": False,
+            "segments": [],
+            "totals": {key: 0 for key in _COUNTERS},
+            "stages": {},
+            "processing_time": 0.0,
+            "extra": {},
+        }
+    resumed_from = state["next_frame"]
+    segment_frames = max(1, int(round(checkpoint.segment_seconds * source_fps)))
+    cancelled = False
+
+    while not state["finished"] and state["next_frame"] < total_frames:
+        start = state["next_frame"]
+        end = min(start + segment_frames, total_frames)
+        os.makedirs(checkpoint.directory, exist_ok=True)
+        segment_path = checkpoint.segment_path(len(state["segments"]))
+
+        result = pipeline.run(input_path, segment_path, start_frame=start, end_frame=end)
+        if result["cancelled"]:
+            # The unfinished segment is dropped, the checkpoint still points at its start
+            if os.path.exists(segment_path):
+                os.remove(segment_path)
+            cancelled = True
+            break
+
+        state["segments"].append(os.path.basename(segment_path))
+        for key in _COUNTERS:
+            state["totals"][key] += result[key]
+        for name, stage in result["stages"].items():
+            merged = state["stages"].setdefault(name, {"items": 0, "busy_seconds": 0.0})
+            merged["items"] += stage["items"]
+            merged["busy_seconds"] += stage["busy_seconds"]
+        state["processing_time"] += result["processing_time"]
+        state["next_frame"] = start + result["frames_read"]
+        # Frame counts from the container can be too high - stop when the stream ends early
+        state["finished"] = result["frames_read"] < end - start
+        if get_extra is not None:
+            state["extra"] = get_extra()
+        checkpoint.save(state)
+
+    output_fps = min(source_fps, pipeline.max_output_fps)
+    segment_paths = [os.path.join(checkpoint.directory, s) for s in state["segments"]]
+    if not cancelled:
+        concat_videos(segment_paths, output_path, output_fps, (width, height), fourcc=pipeline.fourcc)
+
+    processing_time = state["processing_time"]
+    frame_count = state["totals"]["frame_count"]
+    return {
+        **state["totals"],
+        "total_frames": total_frames,
+        "width": width,
+        "height": height,
+        "fps": int(source_fps) or 30,
+        "output_fps": round(output_fps, 3),
+        "processing_time": processing_time,
+        "average_fps": frame_count / processing_time if processing_time > 0 else 0,
+        "cancelled": cancelled,
+        "stages": {
+            name: {
+                "items": stage["items"],
+                "busy_seconds": round(stage["busy_seconds"], 3),
+                "utilization": round(stage["busy_seconds"] / processing_time, 3) if processing_time > 0 else 0.0,
+            }
+            for name, stage in state["stages"].items()
+        },
+        "resumed_from_frame": resumed_from,
+        "segments": len(segment_paths),
+    }
@@ -0,0 +1,383 @@
+"""
+Video Chunking - Parallel processing of frame-range chunks in worker processes
+
+The video is split into frame ranges (aligned to keyframes when ffprobe is
+available), each range runs through its own VideoPipeline and YOLO instance in a
+separate process, and the annotated chunks are concatenated afterwards.
+
+This module is imported by the worker processes, so it must stay light:
+heavy app services (detection_service, person analyzer, ...) are not imported here.
+"""
+import cv2
+import numpy as np
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import logging
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.video_pipeline import VideoPipeline, yolo_batch_infer, detect_grid_layout
+from app.services.evidence import EvidenceSelector
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVERY_FRAMES = 15  # How often workers report progress to the parent
+
+
+def find_keyframes(input_path: str) -> List[int]:
+    """
+    List keyframe indices using ffprobe packet flags (no decoding)
+
+    Returns:
+        Sorted frame indices of keyframes, or [] if ffprobe is not installed
+    """
+    if shutil.which("ffprobe") is None:
+        return []
+
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-select_streams", "v:0",
+                "-show_entries", "packet=pts,flags", "-of", "compact=p=0", input_path
+            ],
+            capture_output=True, text=True, timeout=120, check=True
+        ).stdout
+    except (subprocess.SubprocessError, OSError) as e:
+        logger.warning(f"ffprobe keyframe scan failed: {e}")
+        return []
+
+    return keyframes_from_packets(output)
+
+
+def keyframes_from_packets(output: str) -> List[int]:
+    """
+    Keyframe display indices from ffprobe "pts=...|flags=..." packet lines
+
+    Packets are listed in decode order; with B-frames that is not display
+    order, so packets are ranked by pts first. Without pts the decode order
+    is used as is.
+    """
+    packets = []  # (pts, decode position, is keyframe)
+    for position, line in enumerate(output.splitlines()):
+        fields = dict(field.split("=", 1) for field in line.split("|") if "=" in field)
+        pts = fields.get("pts", "N/A")
+        packets.append((int(pts) if pts.lstrip("-").isdigit() else None, position, "K" in fields.get("flags", "")))
+
+    if all(pts is not None for pts, _, _ in packets):
+        packets.sort()
+    return [index for index, (_, _, key) in enumerate(packets) if key]
+
+
+def plan_chunks(total_frames: int, num_chunks: int, keyframes: Optional[List[int]] = None) -> List[Tuple[int, int]]:
+    """
+    Split [0, total_frames) into roughly equal ranges
+
+    Each boundary is snapped to the nearest keyframe when keyframes are known,
+    so workers start decoding at a keyframe instead of decoding forward to it.
+
+    Returns:
+        List of (start_frame, end_frame) ranges
+    """
+    num_chunks = max(1, min(num_chunks, total_frames))
+    boundaries = [0]
+    for i in range(1, num_chunks):
+        target = round(i * total_frames / num_chunks)
+        if keyframes:
+            target = min(keyframes, key=lambda k: abs(k - target))
+        if boundaries[-1] < target < total_frames:
+            boundaries.append(target)
+    boundaries.append(total_frames)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def _process_chunk(
+    chunk_id: int,
+    input_path: str,
+    output_path: str,
+    start_frame: int,
+    end_frame: int,
+    model_path: str,
+    confidence: float,
+    device: str,
+    infer_every: int,
+    evidence_frames: int,
+    threads_per_worker: int,
+    fourcc: str,
+    progress_queue,
+    cancel_event
+) -> dict:
+    """Worker process entry point - processes one frame range with its own model"""
+    import torch
+    from ultralytics import YOLO
+
+    # Split the CPU between workers instead of every worker using every core
+    torch.set_num_threads(threads_per_worker)
+    cv2.setNumThreads(threads_per_worker)
+
+    model = YOLO(model_path)
+
+    cap = cv2.VideoCapture(input_path)
+    grid = detect_grid_layout(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    cap.release()
+
+    stats = {"frames_with_weapons": 0, "total_detections": 0}
+    selector = EvidenceSelector(k=evidence_frames)
+    reported = {"frames": 0}
+
+    def on_detections(frame_index: int, frame: np.ndarray, dets: list):
+        if not dets:
+            return
+        stats["frames_with_weapons"] += 1
+        stats["total_detections"] += len(dets)
+        selector.offer(frame_index, frame, dets)
+
+    def on_progress(frame_index: int, total: int):
+        if cancel_event.is_set():
+            pipeline.stop()
+        done = frame_index - start_frame
+        if done - reported["frames"] >= PROGRESS_EVERY_FRAMES:
+            progress_queue.put((chunk_id, done - reported["frames"]))
+            reported["frames"] = done
+
+    pipeline = VideoPipeline(
+        yolo_batch_infer(model, confidence, grid=grid, device=device),
+        batch_size=4,
+        on_detections=on_detections,
+        on_progress=on_progress,
+        infer_every=infer_every,
+        fourcc=fourcc
+    )
+    result = pipeline.run(input_path, output_path, start_frame=start_frame, end_frame=end_frame)
+
+    if result["frames_read"] > reported["frames"]:
+        progress_queue.put((chunk_id, result["frames_read"] - reported["frames"]))
+
+    return {
+        "chunk_id": chunk_id,
+        "start_frame": start_frame,
+        "end_frame": end_frame,
+        "output_path": output_path,
+        "result": result,
+        "frames_with_weapons": stats["frames_with_weapons"],
+        "total_detections": stats["total_detections"],
+        "evidence": selector.items(),
+    }
+
+
+def concat_videos(chunk_paths: List[str], output_path: str, fps: float, size: Tuple[int, int], fourcc: str = "mp4v"):
+    """
+    Concatenate chunk videos in order
+
+    Uses the ffmpeg concat demuxer (stream copy, no re-encode) when available,
+    otherwise re-muxes frames through OpenCV.
+    """
+    if shutil.which("ffmpeg") is not None:
+        list_path = output_path + ".concat.txt"
+        with open(list_path, "w") as f:
+            for path in chunk_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", output_path],
+                check=True, timeout=600
+            )
+            return
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"ffmpeg concat failed, falling back to OpenCV: {e}")
+        finally:
+            os.remove(list_path)
+
+    writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("Failed to initialize video writer")
+    try:
+        for path in chunk_paths:
+            cap = cv2.VideoCapture(path)
+            while True:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                writer.write(frame)
+            cap.release()
+    finally:
+        writer.release()
+
+
+def run_chunked(
+    input_path: str,
+    output_path: str,
+    model_path: str,
+    confidence: float,
+    workers: int,
+    device: str = "cpu",
+    infer_every: int = 1,
+    evidence_frames: int = 3,
+    fourcc: str = "mp4v",
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> dict:
+    """
+    Process a video as parallel frame-range chunks
+
+    Args:
+        input_path: Video to read
+        output_path: Where to write the concatenated annotated video
+        model_path: YOLO weights, loaded once per worker process
+        confidence: Confidence threshold
+        workers: Number of worker processes
+        device: Inference device
+        infer_every: Run inference on every Nth kept frame (boxes carried over in between)
+        evidence_frames: Number of top evidence frames to keep across all chunks
+        fourcc: Codec of the chunk videos and the concatenated output
+        on_progress: Optional hook called with (frames_done, total_frames)
+        cancel_event: Optional event that stops all workers when set
+
+    Returns:
+        dict with the merged pipeline result ("result"), frames_with_weapons,
+        total_detections, and the top evidence frames ("evidence", EvidenceSelector items)
+
+    Raises:
+        RuntimeError: If the video cannot be opened
+        ValueError: If the container reports no frame count (use the single-process pipeline)
+    """
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video file: {input_path}")
+    fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total_frames <= 0:
+        raise ValueError(f"Video reports no frame count, cannot split it into chunks: {input_path}")
+
+    chunks = plan_chunks(total_frames, workers, find_keyframes(input_path))
+    threads_per_worker = max(1, (os.cpu_count() or 1) // len(chunks))
+    logger.info(f"Chunked processing: {len(chunks)} chunk(s), {threads_per_worker} thread(s) each")
+
+    chunk_dir = tempfile.mkdtemp(prefix="chunks_", dir=os.path.dirname(os.path.abspath(output_path)))
+    start_time = time.time()
+
+    # One finally for the chunk directory: partial chunk videos are removed on every path
+    try:
+        # spawn: CUDA/torch state must not be forked into the workers
+        ctx = mp.get_context("spawn")
+        with ctx.Manager() as manager:
+            progress_queue = manager.Queue()
+            worker_cancel = manager.Event()
+
+            done = {"frames": 0}
+            finished = threading.Event()
+
+            def pump_progress():
+                # Forward worker progress and cancellation between processes and the caller
+                while not finished.is_set() or not progress_queue.empty():
+                    if cancel_event is not None and cancel_event.is_set():
+                        worker_cancel.set()
+                    try:
+                        _, frames = progress_queue.get(timeout=0.2)
+                    except Exception:
+                        continue
+                    done["frames"] += frames
+                    if on_progress is not None:
+                        on_progress(done["frames"], total_frames)
+
+            pump = threading.Thread(target=pump_progress, daemon=True)
+            pump.start()
+
+            try:
+                with ProcessPoolExecutor(max_workers=len(chunks), mp_context=ctx) as pool:
+                    futures = [
+                        pool.submit(
+                            _process_chunk, i, input_path, os.path.join(chunk_dir, f"chunk_{i:04d}.mp4"),
+                            start, end, model_path, confidence, device, infer_every, evidence_frames,
+                            threads_per_worker, fourcc, progress_queue, worker_cancel
+                        )
+                        for i, (start, end) in enumerate(chunks)
+                    ]
+                    try:
+                        chunk_results = [future.result() for future in futures]
+                    except BaseException:
+                        worker_cancel.set()  # One chunk failed - the others stop instead of running to the end
+                        raise
+            finally:
+                finished.set()
+                pump.join()
+
+        cancelled = any(c["result"]["cancelled"] for c in chunk_results)
+        if not cancelled:
+            concat_videos([c["output_path"] for c in chunk_results], output_path,
+                          chunk_results[0]["result"]["output_fps"], (width, height), fourcc=fourcc)
+    finally:
+        shutil.rmtree(chunk_dir, ignore_errors=True)
+
+    return _merge_chunk_results(chunk_results, total_frames, width, height, fps,
+                                time.time() - start_time, cancelled, evidence_frames)
+
+
+def _merge_chunk_results(
+    chunk_results: List[dict],
+    total_frames: int,
+    width: int,
+    height: int,
+    fps: int,
+    wall_seconds: float,
+    cancelled: bool,
+    evidence_frames: int = 3
+) -> dict:
+    """Merge per-chunk statistics into one summary (same shape as a single pipeline run)"""
+    frame_count = sum(c["result"]["frame_count"] for c in chunk_results)
+    counters = {
+        key: sum(c["result"][key] for c in chunk_results)
+        for key in ("frames_read", "frames_skipped", "frames_inferred", "frames_carried")
+    }
+
+    # Stage busy time summed over workers; utilization is relative to all workers' wall time
+    stages: Dict[str, dict] = {}
+    for c in chunk_results:
+        for name, stage in c["result"]["stages"].items():
+            merged = stages.setdefault(name, {"items": 0, "busy_seconds": 0.0})
+            merged["items"] += stage["items"]
+            merged["busy_seconds"] += stage["busy_seconds"]
+    capacity = wall_seconds * len(chunk_results)
+    for stage in stages.values():
+        stage["busy_seconds"] = round(stage["busy_seconds"], 3)
+        stage["utilization"] = round(stage["busy_seconds"] / capacity, 3) if capacity > 0 else 0.0
+
+    selector = EvidenceSelector(k=evidence_frames)
+    for c in chunk_results:
+        selector.offer_items(c["evidence"])
+
+    return {
+        "result": {
+            "frame_count": frame_count,
+            "total_frames": total_frames,
+            **counters,
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "output_fps": chunk_results[0]["result"]["output_fps"],
+            "processing_time": wall_seconds,
+            "average_fps": frame_count / wall_seconds if wall_seconds > 0 else 0,
+            "cancelled": cancelled,
+            "stages": stages,
+            "chunks": [
+                {
+                    "start_frame": c["start_frame"],
+                    "end_frame": c["end_frame"],
+                    "frames": c["result"]["frame_count"],
+                    "processing_time": round(c["result"]["processing_time"], 2),
+                }
+                for c in chunk_results
+            ],
+        },
+        "frames_with_weapons": sum(c["frames_with_weapons"] for c in chunk_results),
+        "total_detections": sum(c["total_detections"] for c in chunk_results),
+        "evidence": selector.items(),
+    }
@@ -0,0 +1,356 @@
+"""
+Video Job Manager - Background video processing with progress tracking
+
+Jobs are kept in an in-memory table for fast progress reads and mirrored to the
+MongoDB `video_jobs` collection, so queued and interrupted jobs are picked up
+again after a restart. Video jobs are processed in checkpointed segments, so an
+interrupted job resumes from its last checkpoint rather than from frame 0.
+"""
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import get_sync_database
+from app.services.video_processing import process_video, VideoProcessingCancelled
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE_STATES = (QUEUED, RUNNING)
+TERMINAL_STATES = (COMPLETED, FAILED, CANCELLED)
+
+# Fields that stay server-side
+_PRIVATE_FIELDS = ("_id", "input_path", "output_path")
+
+
+class VideoJobManager:
+    """
+    Fixed-size worker pool that processes queued video jobs
+
+    Usage:
+        job = video_job_manager.submit(input_path, output_path, output_filename, user_id)
+        video_job_manager.get(job["job_id"])  # state, progress_percent, fps, eta_seconds
+        video_job_manager.cancel(job["job_id"])
+    """
+
+    def __init__(self, num_workers: int = 2, persist_interval: float = 1.0):
+        """
+        Initialize the job manager
+
+        Args:
+            num_workers: Number of jobs processed in parallel
+            persist_interval: Minimum seconds between progress writes to MongoDB
+        """
+        self.num_workers = max(1, num_workers)
+        self.persist_interval = persist_interval
+
+        self._jobs: Dict[str, dict] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._stop_event = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Recover unfinished jobs from MongoDB and start the workers"""
+        if self._workers:
+            return
+
+        self._stop_event.clear()
+        self._recover()
+
+        for i in range(self.num_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"video-job-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+        logger.info(f"✅ Video job workers started ({self.num_workers})")
+
+    def stop(self, timeout: float = 10):
+        """
+        Stop the workers
+
+        Running jobs are interrupted and stay persisted as queued,
+        so they are processed again on the next start.
+        """
+        self._stop_event.set()
+        with self._lock:
+            for job_id, event in self._cancel_events.items():
+                if self._jobs[job_id]["state"] == RUNNING:
+                    event.set()
+
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+        self._workers = []
+        logger.info("✅ Video job workers stopped")
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def submit(
+        self,
+        input_path: str,
+        output_path: str,
+        output_filename: str,
+        user_id: str,
+        confidence: float = 0.55,
+        model_type: str = "yolo",
+        workers: int = 1,
+        infer_every: int = 1,
+        output: str = "video",
+        scan_options: Optional[dict] = None
+    ) -> dict:
+        """
+        Queue a saved video for processing
+
+        Returns:
+            Public view of the new job
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "state": QUEUED,
+            "user_id": user_id,
+            "input_path": input_path,
+            "output_path": output_path,
+            "output_filename": output_filename,
+            "params": {"confidence": confidence, "model_type": model_type, "workers": workers,
+                       "infer_every": infer_every, "output": output, "scan_options": scan_options},
+            "progress_percent": 0.0,
+            "frames_done": 0,
+            "total_frames": 0,
+            "fps": 0.0,
+            "eta_seconds": None,
+            "result": None,
+            "error": None,
+            "created_at": datetime.utcnow(),
+            "started_at": None,
+            "finished_at": None,
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._cancel_events[job_id] = threading.Event()
+        self._persist(job)
+        self._queue.put(job_id)
+
+        logger.info(f"📥 Video job queued: {job_id}")
+        return self._public(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """Get the public view of a job (memory first, then MongoDB)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return self._public(job)
+
+        try:
+            job = get_sync_database().video_jobs.find_one({"job_id": job_id})
+        except Exception as e:
+            logger.warning(f"Video job lookup failed: {e}")
+            return None
+        return self._public(job) if job else None
+
+    def list_jobs(self, limit: int = 50) -> List[dict]:
+        """List the most recent jobs known to this process"""
+        with self._lock:
+            jobs = sorted(self._jobs.values(), key=lambda j: j["created_at"], reverse=True)
+            return [self._public(job) for job in jobs[:limit]]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job
+
+        Returns:
+            bool: True if the job was active and is now being cancelled
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] not in ACTIVE_STATES:
+                return False
+
+            self._cancel_events[job_id].set()
+            if job["state"] == QUEUED:
+                # Never started - finish it here, the worker will skip it
+                job["state"] = CANCELLED
+                job["finished_at"] = datetime.utcnow()
+                self._remove_file(job["input_path"])
+                shutil.rmtree(self._checkpoint_dir(job_id), ignore_errors=True)
+
+        self._persist(job)
+        logger.info(f"🛑 Video job cancel requested: {job_id}")
+        return True
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _public(job: dict) -> dict:
+        return {k: v for k, v in job.items() if k not in _PRIVATE_FIELDS}
+
+    @staticmethod
+    def _checkpoint_dir(job_id: str) -> str:
+        return os.path.join(settings.UPLOAD_DIR, "checkpoints", job_id)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            if path and os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
+
+    def _persist(self, job: dict):
+        """Upsert the job document (best effort - progress is still served from memory)"""
+        with self._lock:
+            doc = {k: v for k, v in job.items() if k != "_id"}
+        try:
+            get_sync_database().video_jobs.update_one(
+                {"job_id": doc["job_id"]}, {"$set": doc}, upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to persist video job {doc['job_id']}: {e}")
+
+    def _recover(self):
+        """Re-queue jobs that were queued or running when the process stopped"""
+        try:
+            docs = list(
+                get_sync_database().video_jobs
+                .find({"state": {"$in": list(ACTIVE_STATES)}})
+                .sort("created_at", 1)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Could not recover video jobs: {e}")
+            return
+
+        for doc in docs:
+            doc.pop("_id", None)
+            doc["state"] = QUEUED
+            with self._lock:
+                self._jobs[doc["job_id"]] = doc
+                self._cancel_events[doc["job_id"]] = threading.Event()
+            self._persist(doc)
+            self._queue.put(doc["job_id"])
+
+        if docs:
+            logger.info(f"♻️ Recovered {len(docs)} unfinished video job(s)")
+
+    def _worker_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                job_id = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                self._run_job(job_id)
+            except Exception as e:
+                logger.error(f"Video job worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] != QUEUED:
+                return  # Cancelled while queued
+            cancel_event = self._cancel_events[job_id]
+            job["state"] = RUNNING
+            job["started_at"] = datetime.utcnow()
+        self._persist(job)
+
+        if not os.path.exists(job["input_path"]):
+            shutil.rmtree(self._checkpoint_dir(job_id), ignore_errors=True)
+            self._finish(job, FAILED, error="Input video no longer exists")
+            return
+
+        start_time = time.time()
+        last_persist = 0.0
+        first_done = None  # Frames done when this run started (> 0 when resuming from a checkpoint)
+
+        def on_progress(done: int, total: int):
+            nonlocal last_persist, first_done
+            now = time.time()
+            elapsed = now - start_time
+            if first_done is None:
+                first_done = done
+            fps = (done - first_done) / elapsed if elapsed > 0 else 0.0
+            with self._lock:
+                job["frames_done"] = done
+                job["total_frames"] = total
+                job["fps"] = round(fps, 1)
+                job["progress_percent"] = round(done / total * 100, 1) if total > 0 else 0.0
+                job["eta_seconds"] = round((total - done) / fps, 1) if fps > 0 and total >= done else None
+            if now - last_persist >= self.persist_interval:
+                last_persist = now
+                self._persist(job)
+
+        try:
+            result = process_video(
+                job["input_path"],
+                job["output_path"],
+                job["output_filename"],
+                job["user_id"],
+                confidence=job["params"]["confidence"],
+                on_progress=on_progress,
+                cancel_event=cancel_event,
+                workers=job["params"].get("workers", 1),
+                infer_every=job["params"].get("infer_every", 1),
+                output=job["params"].get("output", "video"),
+                scan_options=job["params"].get("scan_options"),
+                checkpoint_dir=self._checkpoint_dir(job_id)
+            )
+        except VideoProcessingCancelled:
+            if self._stop_event.is_set():
+                # Interrupted by shutdown - keep the input and checkpoint so the job resumes on restart
+                with self._lock:
+                    job["state"] = QUEUED
+                self._persist(job)
+            else:
+                self._remove_file(job["input_path"])
+                shutil.rmtree(self._checkpoint_dir(job_id), ignore_errors=True)
+                self._finish(job, CANCELLED)
+            return
+        except Exception as e:
+            self._remove_file(job["input_path"])
+            shutil.rmtree(self._checkpoint_dir(job_id), ignore_errors=True)
+            self._finish(job, FAILED, error=str(e))
+            return
+
+        self._remove_file(job["input_path"])
+        with self._lock:
+            job["progress_percent"] = 100.0
+            job["eta_seconds"] = 0
+        self._finish(job, COMPLETED, result=result)
+
+    def _finish(self, job: dict, state: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            job["state"] = state
+            job["result"] = result
+            job["error"] = error
+            job["finished_at"] = datetime.utcnow()
+        self._persist(job)
+        logger.info(f"🏁 Video job {job['job_id']} {state}" + (f": {error}" if error else ""))
+
+
+# Global singleton instance
+video_job_manager = VideoJobManager(num_workers=settings.VIDEO_JOB_WORKERS)
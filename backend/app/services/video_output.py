@@ -0,0 +1,207 @@
+"""
+Video Output - Browser-friendly MP4 output for processed videos
+
+OpenCV writes MP4 files with the `moov` index at the end and, depending on the
+build, only the MPEG-4 Part 2 (`mp4v`) codec, which most browsers cannot play.
+This module picks the best codec the local OpenCV build can encode and, after
+writing, moves the `moov` atom to the front ("faststart") so playback and
+seeking start before the whole file is downloaded:
+
+    - ffmpeg on PATH:   re-mux (or transcode mp4v -> H.264 when libx264 exists)
+    - otherwise:        relocate moov in pure Python (same as qt-faststart)
+"""
+import cv2
+import os
+import shutil
+import struct
+import subprocess
+import tempfile
+import logging
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Codecs tried in order - H.264 first because every browser plays it
+BROWSER_FOURCCS = ("avc1", "H264")
+FALLBACK_FOURCC = "mp4v"
+
+# Atoms that contain other atoms on the path to the chunk offset tables
+_CONTAINER_ATOMS = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts", b"dinf", b"udta"}
+
+
+@lru_cache(maxsize=1)
+def preferred_fourcc() -> str:
+    """
+    Best MP4 codec the local OpenCV build can actually encode
+
+    Probed once by opening a tiny VideoWriter per candidate.
+    """
+    probe_dir = tempfile.mkdtemp(prefix="fourcc_")
+    try:
+        for fourcc in BROWSER_FOURCCS:
+            path = os.path.join(probe_dir, f"probe_{fourcc}.mp4")
+            writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*fourcc), 10, (64, 64))
+            opened = writer.isOpened()
+            writer.release()
+            if opened:
+                logger.info(f"Using {fourcc} for processed videos")
+                return fourcc
+    except cv2.error:
+        pass
+    finally:
+        shutil.rmtree(probe_dir, ignore_errors=True)
+    logger.info(f"No H.264 encoder in OpenCV, writing {FALLBACK_FOURCC}")
+    return FALLBACK_FOURCC
+
+
+@lru_cache(maxsize=1)
+def _ffmpeg_has_libx264() -> bool:
+    try:
+        encoders = subprocess.run(
+            ["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=30
+        ).stdout
+    except (subprocess.SubprocessError, OSError):
+        return False
+    return "libx264" in encoders
+
+
+# ----------------------------------------------------------------------
+# Pure-Python faststart
+# ----------------------------------------------------------------------
+
+def _read_atoms(f, end: int) -> List[Tuple[bytes, int, int, int]]:
+    """List (type, offset, size, header_size) of the atoms in f between the current position and end"""
+    atoms = []
+    offset = f.tell()
+    while offset + 8 <= end:
+        f.seek(offset)
+        size, kind = struct.unpack(">I4s", f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            raise ValueError(f"Invalid atom size {size} for {kind!r}")
+        atoms.append((kind, offset, size, header))
+        offset += size
+    return atoms
+
+
+def _shift_chunk_offsets(moov: bytearray, start: int, end: int, shift: int):
+    """Add shift to every stco/co64 entry inside moov[start:end] (in place)"""
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", moov, offset)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", moov, offset + 8)[0]
+            header = 16
+        if size < header:
+            raise ValueError(f"Invalid atom size {size} for {kind!r}")
+
+        if kind in _CONTAINER_ATOMS:
+            _shift_chunk_offsets(moov, offset + header, offset + size, shift)
+        elif kind == b"stco":
+            count = struct.unpack_from(">I", moov, offset + header + 4)[0]
+            table = offset + header + 8
+            for i in range(count):
+                value = struct.unpack_from(">I", moov, table + 4 * i)[0] + shift
+                if value > 0xFFFFFFFF:
+                    raise ValueError("Chunk offset overflows stco after moving moov")
+                struct.pack_into(">I", moov, table + 4 * i, value)
+        elif kind == b"co64":
+            count = struct.unpack_from(">I", moov, offset + header + 4)[0]
+            table = offset + header + 8
+            for i in range(count):
+                value = struct.unpack_from(">Q", moov, table + 8 * i)[0] + shift
+                struct.pack_into(">Q", moov, table + 8 * i, value)
+        offset += size
+
+
+def move_moov_to_front(path: str) -> bool:
+    """
+    Rewrite an MP4 so the moov atom precedes mdat (qt-faststart)
+
+    Returns:
+        bool: True if the file was rewritten, False if it already was faststart
+    """
+    file_size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        atoms = _read_atoms(f, file_size)
+        kinds = [a[0] for a in atoms]
+        if b"moov" not in kinds or b"mdat" not in kinds:
+            raise ValueError("Not an MP4 file with moov and mdat atoms")
+        if kinds.index(b"moov") < kinds.index(b"mdat"):
+            return False
+
+        _, moov_offset, moov_size, moov_header = atoms[kinds.index(b"moov")]
+        f.seek(moov_offset)
+        moov = bytearray(f.read(moov_size))
+        _shift_chunk_offsets(moov, moov_header, moov_size, moov_size)
+
+        first_mdat = kinds.index(b"mdat")
+        tmp_path = path + ".faststart"
+        with open(tmp_path, "wb") as out:
+            for i, (kind, offset, size, _) in enumerate(atoms):
+                if i == first_mdat:
+                    out.write(moov)
+                if kind == b"moov":
+                    continue
+                f.seek(offset)
+                remaining = size
+                while remaining > 0:
+                    block = f.read(min(remaining, 1 << 20))
+                    if not block:
+                        break
+                    out.write(block)
+                    remaining -= len(block)
+
+    os.replace(tmp_path, path)
+    return True
+
+
+# ----------------------------------------------------------------------
+# Entry point
+# ----------------------------------------------------------------------
+
+def finalize_mp4(path: str, fourcc: Optional[str] = None) -> dict:
+    """
+    Make a freshly written MP4 streamable in browsers
+
+    Args:
+        path: MP4 written by cv2.VideoWriter (rewritten in place)
+        fourcc: Codec it was written with (defaults to preferred_fourcc())
+
+    Returns:
+        dict with "codec" and "method" ("ffmpeg-transcode", "ffmpeg-remux",
+        "faststart", "already-faststart" or "none" if it could not be rewritten)
+    """
+    fourcc = fourcc or preferred_fourcc()
+    codec = "h264" if fourcc in BROWSER_FOURCCS else fourcc
+
+    if shutil.which("ffmpeg") is not None:
+        transcode = codec != "h264" and _ffmpeg_has_libx264()
+        codec_args = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p"] \
+            if transcode else ["-c", "copy"]
+        tmp_path = path + ".ffmpeg.mp4"
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-v", "error", "-i", path, *codec_args, "-movflags", "+faststart", tmp_path],
+                check=True, timeout=3600
+            )
+            os.replace(tmp_path, path)
+            return {"codec": "h264" if transcode else codec, "method": "ffmpeg-transcode" if transcode else "ffmpeg-remux"}
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.warning(f"ffmpeg faststart failed, falling back to moov relocation: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    try:
+        moved = move_moov_to_front(path)
+    except (ValueError, struct.error, OSError) as e:
+        logger.warning(f"Could not make {path} faststart: {e}")
+        return {"codec": codec, "method": "none"}
+    return {"codec": codec, "method": "faststart" if moved else "already-faststart"}
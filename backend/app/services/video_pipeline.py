@@ -0,0 +1,566 @@
+"""
+Video Pipeline - Staged decode -> infer -> annotate -> encode engine
+
+Each stage runs in its own thread and stages are connected by bounded queues,
+so decoding and encoding overlap with (batched) inference instead of running
+one after another on a single thread.
+
+The engine only depends on OpenCV/numpy and a plain inference callable, so it
+can be reused from the API, the src/inference CLI and batch tools.
+"""
+import cv2
+import numpy as np
+import math
+import queue
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Detection dict format shared by all stages (same as WeaponDetector.detect):
+# {"label": str, "confidence": float, "bbox": [x1, y1, x2, y2]}
+InferFn = Callable[[List[np.ndarray]], List[List[Dict]]]
+
+_END = object()  # End-of-stream marker passed between stages
+
+
+class StageStats:
+    """
+    Busy-time accounting for one pipeline stage
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+
+    def add(self, seconds: float, items: int = 1):
+        self.busy_seconds += seconds
+        self.items += items
+
+    def to_dict(self, wall_seconds: float) -> dict:
+        return {
+            "items": self.items,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "utilization": round(self.busy_seconds / wall_seconds, 3) if wall_seconds > 0 else 0.0,
+        }
+
+
+def draw_detections(frame: np.ndarray, detections: List[Dict]) -> np.ndarray:
+    """
+    Draw weapon boxes and labels on frame (in place)
+
+    Args:
+        frame: BGR frame, modified in place
+        detections: {"label", "confidence", "bbox": [x1, y1, x2, y2]} dicts
+
+    Returns:
+        The annotated frame
+    """
+    height, width = frame.shape[:2]
+    font_scale = 0.7 * (width / 1280)  # Scale font with video size
+    thickness = max(1, int(2 * (width / 1280)))
+
+    for det in detections:
+        x1, y1, x2, y2 = det["bbox"]
+
+        # Clamp coordinates to frame boundaries
+        x1_draw = max(0, int(x1))
+        y1_draw = max(0, int(y1))
+        x2_draw = min(width, int(x2))
+        y2_draw = min(height, int(y2))
+
+        cv2.rectangle(frame, (x1_draw, y1_draw), (x2_draw, y2_draw), (0, 0, 255), 3)
+
+        label = f"{det['label']} {det['confidence']:.0%}"
+        (label_w, label_h), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness)
+        cv2.rectangle(frame, (x1_draw, y1_draw - label_h - 10),
+                      (x1_draw + label_w, y1_draw), (0, 0, 255), -1)
+        cv2.putText(frame, label, (x1_draw, y1_draw - 5),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, (255, 255, 255), thickness)
+    return frame
+
+
+def annotate_frame(
+    frame: np.ndarray,
+    detections: List[Dict],
+    frame_index: int,
+    total_frames: int
+) -> np.ndarray:
+    """
+    Draw weapon boxes, labels and the frame counter on frame (in place)
+
+    Args:
+        frame: BGR frame, modified in place
+        detections: Detections for this frame
+        frame_index: 1-based frame number
+        total_frames: Total frames in the video (for the counter overlay)
+
+    Returns:
+        The annotated frame
+    """
+    draw_detections(frame, detections)
+    cv2.putText(
+        frame,
+        f"Frame: {frame_index}/{total_frames}",
+        (10, 30),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.7,
+        (255, 255, 255),
+        2
+    )
+    return frame
+
+
+def _boxes_to_dicts(result, scale_x: float = 1.0, scale_y: float = 1.0,
+                    offset_x: float = 0.0, offset_y: float = 0.0) -> List[Dict]:
+    """Convert one ultralytics result into detection dicts"""
+    boxes = result.boxes
+    if len(boxes) == 0:
+        return []
+
+    xyxy = boxes.xyxy.cpu().numpy()
+    confs = boxes.conf.cpu().numpy()
+    classes = boxes.cls.cpu().numpy().astype(int)
+
+    detections = []
+    for (x1, y1, x2, y2), conf, cls in zip(xyxy, confs, classes):
+        detections.append({
+            "label": result.names[cls],
+            "confidence": float(conf),
+            "bbox": [
+                float(x1 * scale_x + offset_x),
+                float(y1 * scale_y + offset_y),
+                float(x2 * scale_x + offset_x),
+                float(y2 * scale_y + offset_y),
+            ],
+            "class_id": int(cls),
+        })
+    return detections
+
+
+def yolo_batch_infer(
+    model,
+    confidence: float,
+    grid: Tuple[int, int] = (1, 1),
+    device: str = "cpu",
+    imgsz: int = 640,
+    cell_size: int = 416,
+    max_det: int = 10
+) -> InferFn:
+    """
+    Build a batched inference callable around an ultralytics YOLO model
+
+    Args:
+        model: Loaded YOLO model
+        confidence: Confidence threshold
+        grid: (cols, rows) for multi-camera grid videos, (1, 1) for normal videos
+        device: Inference device
+        imgsz: Model input size for full frames
+        cell_size: Model input size for grid cells
+        max_det: Maximum detections per image
+
+    Returns:
+        Callable mapping a list of frames to a list of detection lists
+    """
+    grid_cols, grid_rows = grid
+
+    def infer_full(frames: List[np.ndarray]) -> List[List[Dict]]:
+        # YOLO handles resizing internally with correct coordinate mapping
+        results = model.predict(
+            frames,
+            conf=confidence,
+            verbose=False,
+            imgsz=imgsz,
+            half=False,
+            device=device,
+            agnostic_nms=True,
+            max_det=max_det
+        )
+        return [_boxes_to_dicts(r) for r in results]
+
+    def infer_grid(frames: List[np.ndarray]) -> List[List[Dict]]:
+        # Detect each cell separately, batching all cells of all frames together
+        cells = []
+        origins = []  # (frame_idx, x_offset, y_offset, scale_x, scale_y)
+        for frame_idx, frame in enumerate(frames):
+            height, width = frame.shape[:2]
+            cell_width = width // grid_cols
+            cell_height = height // grid_rows
+            for row in range(grid_rows):
+                for col in range(grid_cols):
+                    x1 = col * cell_width
+                    y1 = row * cell_height
+                    cell = frame[y1:y1 + cell_height, x1:x1 + cell_width]
+                    cells.append(cv2.resize(cell, (cell_size, cell_size)))
+                    origins.append((frame_idx, x1, y1, cell_width / cell_size, cell_height / cell_size))
+
+        results = model.predict(
+            cells,
+            conf=confidence,
+            verbose=False,
+            imgsz=cell_size,
+            device=device,
+            agnostic_nms=True
+        )
+
+        detections: List[List[Dict]] = [[] for _ in frames]
+        for result, (frame_idx, x1, y1, scale_x, scale_y) in zip(results, origins):
+            detections[frame_idx].extend(_boxes_to_dicts(result, scale_x, scale_y, x1, y1))
+        return detections
+
+    return infer_grid if grid_cols * grid_rows > 1 else infer_full
+
+
+def detect_grid_layout(width: int, height: int) -> Tuple[int, int]:
+    """
+    Guess the multi-camera grid layout from the aspect ratio
+
+    Multi-cam videos usually have aspect ratio ~2:1 (2x2 grid)
+
+    Returns:
+        (cols, rows)
+    """
+    aspect_ratio = width / height if height else 0
+    return (2, 2) if 1.8 < aspect_ratio < 2.2 else (1, 1)
+
+
+class VideoPipeline:
+    """
+    Staged video processing engine
+
+    decoder thread -> [queue] -> inference thread (batched) -> [queue]
+        -> annotation thread -> [queue] -> encoder thread
+
+    Usage:
+        pipeline = VideoPipeline(yolo_batch_infer(model, 0.5), batch_size=4)
+        result = pipeline.run("input.mp4", "output.mp4")
+        print(result["stages"])
+    """
+
+    def __init__(
+        self,
+        infer_fn: InferFn,
+        batch_size: int = 4,
+        queue_size: int = 16,
+        max_output_fps: int = 30,
+        annotate: bool = True,
+        on_detections: Optional[Callable[[int, np.ndarray, List[Dict]], None]] = None,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        fourcc: str = "mp4v",
+        decimate: bool = True,
+        infer_every: int = 1
+    ):
+        """
+        Initialize the pipeline
+
+        Args:
+            infer_fn: Callable mapping a batch of frames to detections per frame
+            batch_size: Maximum frames per inference batch
+            queue_size: Capacity of each inter-stage queue
+            max_output_fps: Output fps cap
+            annotate: Draw detections on frames before encoding
+            on_detections: Hook called in frame order with (frame_index, clean_frame, detections)
+            on_progress: Hook called with (frame_index, total_frames)
+            fourcc: Output codec
+            decimate: Drop input frames so the output plays at real speed at the capped fps
+            infer_every: Run inference on every Nth kept frame and carry boxes over in between
+        """
+        self.infer_fn = infer_fn
+        self.batch_size = max(1, batch_size)
+        self.queue_size = max(1, queue_size)
+        self.max_output_fps = max_output_fps
+        self.annotate = annotate
+        self.on_detections = on_detections
+        self.on_progress = on_progress
+        self.fourcc = fourcc
+        self.decimate = decimate
+        self.infer_every = max(1, infer_every)
+
+        self._stop_event = threading.Event()
+        self._error: Optional[BaseException] = None
+        self._stats: Dict[str, StageStats] = {}
+        self._counters: Dict[str, int] = {}
+
+    def stop(self):
+        """Request all stages to stop (the current run raises no error, it just ends early)"""
+        self._stop_event.set()
+
+    # ------------------------------------------------------------------
+    # Queue helpers (never block forever once a stop was requested)
+    # ------------------------------------------------------------------
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop_event.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _fail(self, stage: str, error: BaseException):
+        if self._error is None:
+            self._error = error
+        logger.error(f"[video_pipeline] {stage} stage failed: {error}")
+        self._stop_event.set()
+
+    # ------------------------------------------------------------------
+    # Stages
+    # ------------------------------------------------------------------
+
+    def _decode_stage(
+        self,
+        cap: cv2.VideoCapture,
+        out_q: queue.Queue,
+        start_frame: int,
+        end_frame: Optional[int],
+        source_fps: float,
+        output_fps: float
+    ):
+        stats = self._stats["decode"]
+        frame_index = start_frame
+
+        # Time-based decimation: keep the first frame at or after each output timestamp.
+        # Dropped frames are grab()bed: still decoded, but never retrieved, converted or queued.
+        decimate = self.decimate and output_fps < source_fps
+        next_output = math.ceil(start_frame * output_fps / source_fps - 1e-6) if decimate else 0
+        try:
+            while not self._stop_event.is_set():
+                if end_frame is not None and frame_index >= end_frame:
+                    break
+
+                keep = not decimate or frame_index * output_fps >= next_output * source_fps - 1e-6
+                if not keep:
+                    if not cap.grab():
+                        break
+                    frame_index += 1
+                    self._counters["skipped"] += 1
+                    continue
+
+                t0 = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                stats.add(time.perf_counter() - t0)
+                frame_index += 1
+                next_output += 1
+                if not self._put(out_q, (frame_index, frame)):
+                    break
+        except Exception as e:
+            self._fail("decode", e)
+        finally:
+            self._put(out_q, _END)
+
+    def _infer_stage(self, in_q: queue.Queue, out_q: queue.Queue):
+        stats = self._stats["infer"]
+        last_detections: List[Dict] = []
+        sequence = 0  # Position among kept frames, drives infer_every
+        try:
+            finished = False
+            while not finished:
+                item = self._get(in_q)
+                if item is _END:
+                    break
+
+                # Block for the first frame, then take whatever is already decoded
+                batch = [item]
+                while len(batch) < self.batch_size * self.infer_every:
+                    try:
+                        item = in_q.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _END:
+                        finished = True
+                        break
+                    batch.append(item)
+
+                # Only every Nth kept frame is inferred, the rest carry the last boxes over
+                infer_positions = [
+                    i for i in range(len(batch)) if (sequence + i) % self.infer_every == 0
+                ]
+                sequence += len(batch)
+
+                inferred: Dict[int, List[Dict]] = {}
+                if infer_positions:
+                    t0 = time.perf_counter()
+                    detections = self.infer_fn([batch[i][1] for i in infer_positions])
+                    stats.add(time.perf_counter() - t0, len(infer_positions))
+                    inferred = dict(zip(infer_positions, detections))
+
+                for i, (frame_index, frame) in enumerate(batch):
+                    if i in inferred:
+                        last_detections = inferred[i]
+                    else:
+                        self._counters["carried"] += 1
+                    if not self._put(out_q, (frame_index, frame, last_detections)):
+                        return
+        except Exception as e:
+            self._fail("infer", e)
+        finally:
+            self._put(out_q, _END)
+
+    def _annotate_stage(self, in_q: queue.Queue, out_q: Optional[queue.Queue], total_frames: int):
+        stats = self._stats["annotate"]
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _END:
+                    break
+                frame_index, frame, dets = item
+
+                t0 = time.perf_counter()
+                if self.on_detections is not None:
+                    self.on_detections(frame_index, frame, dets)
+                if self.annotate:
+                    annotate_frame(frame, dets, frame_index, total_frames)
+                stats.add(time.perf_counter() - t0)
+
+                if out_q is not None:
+                    if not self._put(out_q, (frame_index, frame)):
+                        return
+                elif self.on_progress is not None:
+                    self.on_progress(frame_index, total_frames)
+        except Exception as e:
+            self._fail("annotate", e)
+        finally:
+            if out_q is not None:
+                self._put(out_q, _END)
+
+    def _encode_stage(self, writer: cv2.VideoWriter, in_q: queue.Queue, total_frames: int):
+        stats = self._stats["encode"]
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _END:
+                    break
+                frame_index, frame = item
+
+                t0 = time.perf_counter()
+                writer.write(frame)
+                stats.add(time.perf_counter() - t0)
+
+                if self.on_progress is not None:
+                    self.on_progress(frame_index, total_frames)
+        except Exception as e:
+            self._fail("encode", e)
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    def run(
+        self,
+        input_path: str,
+        output_path: Optional[str] = None,
+        start_frame: int = 0,
+        end_frame: Optional[int] = None
+    ) -> dict:
+        """
+        Process a video file (or the frame range [start_frame, end_frame))
+
+        Frame indices passed to the hooks are 1-based positions in the whole video.
+
+        Args:
+            input_path: Video to read
+            output_path: Where to write the annotated video (None = no encoding)
+            start_frame: First frame to process (0-based)
+            end_frame: Stop before this frame (None = end of video)
+
+        Returns:
+            dict with video properties, frame counts, timing and per-stage utilization
+
+        Raises:
+            RuntimeError: If the video cannot be opened or the writer fails
+            Exception: Any error raised inside a stage is re-raised here
+        """
+        self._stop_event.clear()
+        self._error = None
+        self._stats = {name: StageStats(name) for name in ("decode", "infer", "annotate", "encode")}
+        self._counters = {"skipped": 0, "carried": 0}
+
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video file: {input_path}")
+
+        writer = None
+        try:
+            source_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            fps = int(source_fps) or 30
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            output_fps = min(source_fps, self.max_output_fps)
+
+            if start_frame > 0:
+                # OpenCV seeks to the previous keyframe and decodes forward to the exact frame
+                cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+            if output_path is not None:
+                writer = cv2.VideoWriter(
+                    output_path, cv2.VideoWriter_fourcc(*self.fourcc), output_fps, (width, height)
+                )
+                if not writer.isOpened():
+                    raise RuntimeError("Failed to initialize video writer")
+
+            decode_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            infer_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+            encode_q: Optional[queue.Queue] = queue.Queue(maxsize=self.queue_size) if writer else None
+
+            threads = [
+                threading.Thread(target=self._decode_stage, args=(cap, decode_q, start_frame, end_frame, source_fps, output_fps),
+                                 name="pipeline-decode", daemon=True),
+                threading.Thread(target=self._infer_stage, args=(decode_q, infer_q),
+                                 name="pipeline-infer", daemon=True),
+                threading.Thread(target=self._annotate_stage, args=(infer_q, encode_q, total_frames),
+                                 name="pipeline-annotate", daemon=True),
+            ]
+            if writer is not None:
+                threads.append(threading.Thread(target=self._encode_stage, args=(writer, encode_q, total_frames),
+                                                name="pipeline-encode", daemon=True))
+
+            start_time = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_seconds = time.time() - start_time
+        finally:
+            cap.release()
+            if writer is not None:
+                writer.release()
+
+        if self._error is not None:
+            raise self._error
+
+        frame_count = self._stats["annotate"].items
+        return {
+            "frame_count": frame_count,
+            "total_frames": total_frames,
+            "frames_read": frame_count + self._counters["skipped"],
+            "frames_skipped": self._counters["skipped"],
+            "frames_inferred": self._stats["infer"].items,
+            "frames_carried": self._counters["carried"],
+            "width": width,
+            "height": height,
+            "fps": fps,
+            "output_fps": round(output_fps, 3),
+            "processing_time": wall_seconds,
+            "average_fps": frame_count / wall_seconds if wall_seconds > 0 else 0,
+            "cancelled": self._stop_event.is_set(),
+            "stages": {
+                name: stats.to_dict(wall_seconds)
+                for name, stats in self._stats.items()
+                if name != "encode" or writer is not None
+            },
+        }
@@ -0,0 +1,503 @@
+"""
+Video Processing Service - Runs an uploaded video through the pipeline and raises alerts
+
+Shared by the blocking /detect/video endpoint and the background job workers,
+so everything here is synchronous and thread-safe to call from a worker thread.
+"""
+import cv2
+import numpy as np
+import os
+import threading
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.detection import Detection, BoundingBox
+from app.services.detection_service import detection_service, project_root
+from app.services.alert_service import telegram_alert
+from app.services.alert_writer import alert_writer
+from app.services.person_weapon_analyzer import person_weapon_analyzer
+from app.services.video_pipeline import VideoPipeline, yolo_batch_infer, detect_grid_layout
+from app.services.inference_scheduler import inference_scheduler, QOS_BATCH
+from app.services.video_chunking import run_chunked
+from app.services.video_timeline import TimelineWriter
+from app.services.video_scan import VideoScanner
+from app.services.video_checkpoint import VideoCheckpoint, run_checkpointed
+from app.services.evidence import EvidenceSelector
+from app.services.video_output import preferred_fourcc, finalize_mp4
+
+# Output modes
+OUTPUT_VIDEO = "video"  # Annotated MP4
+OUTPUT_TIMELINE = "timeline"  # JSONL detection index, no annotation/encoding
+OUTPUT_SCAN = "scan"  # Sparse scan, hit intervals only (nothing written)
+OUTPUT_MODES = (OUTPUT_VIDEO, OUTPUT_TIMELINE, OUTPUT_SCAN)
+
+
+class VideoProcessingCancelled(Exception):
+    """Raised when processing was stopped through the cancel event"""
+
+
+def process_video(
+    input_path: str,
+    output_path: str,
+    output_filename: str,
+    user_id: str,
+    confidence: float = 0.55,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    workers: int = 1,
+    infer_every: int = 1,
+    output: str = OUTPUT_VIDEO,
+    scan_options: Optional[dict] = None,
+    checkpoint_dir: Optional[str] = None
+) -> dict:
+    """
+    Run weapon detection on a saved video and write the annotated result
+
+    With output="timeline" nothing is drawn or encoded: output_path receives a
+    JSONL detection index (timestamps, boxes, track IDs) for client-side overlays.
+    With output="scan" the video is only sampled sparsely and the response lists
+    hit intervals; output_path is not written.
+
+    Args:
+        input_path: Uploaded video on disk
+        output_path: Where to write the annotated video
+        output_filename: Public name of the output (used in URLs)
+        user_id: Uploading user (used for camera_id)
+        confidence: Confidence threshold (0.0-1.0)
+        on_progress: Optional hook called with (frames_done, total_frames)
+        cancel_event: Optional event that stops processing when set
+        workers: > 1 splits the video into chunks processed by that many worker processes
+        infer_every: Run inference on every Nth output frame and carry boxes over in between
+        output: "video" (annotated MP4), "timeline" (JSONL detection index) or "scan" (hit intervals)
+        scan_options: VideoScanner keyword arguments for scan mode (interval_seconds, sampling, ...)
+        checkpoint_dir: Process in checkpointed segments kept here, resuming from an
+            existing checkpoint (single-process video output only)
+
+    Returns:
+        Response dict with video_url (or timeline_url and tracks) and stats
+
+    Raises:
+        VideoProcessingCancelled: If cancel_event was set during processing
+        RuntimeError: If the video cannot be opened or written
+    """
+    # Probe video properties to pick the grid layout before starting the pipeline
+    probe = cv2.VideoCapture(input_path)
+    if not probe.isOpened():
+        raise RuntimeError("Cannot open video file")
+    width = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    source_fps = probe.get(cv2.CAP_PROP_FPS) or 30.0
+    total_frames = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+    probe.release()
+
+    if output == OUTPUT_SCAN:
+        return _scan_video(input_path, width, height, confidence, on_progress, cancel_event, scan_options or {})
+
+    timeline = None
+    if output == OUTPUT_TIMELINE:
+        # Timeline is cheap enough to stay single-process, which also keeps track IDs continuous
+        timeline = TimelineWriter(output_path, source_fps, width, height, total_frames,
+                                  sample_fps=min(source_fps, 30))
+        result_url = f"/api/v1/detection/timeline/{output_filename}"
+    else:
+        result_url = f"/api/v1/detection/video/result/{output_filename}"
+
+    if workers > 1 and timeline is None and total_frames <= 0:
+        # Chunks need the frame count; some containers do not report it
+        print("⚠️ Video has no frame count - processing in a single process")
+        workers = 1
+
+    if workers > 1 and timeline is None:
+        # Parallel mode: frame-range chunks in worker processes, merged afterwards
+        print(f"🎬 Starting chunked processing with {workers} worker processes...")
+        try:
+            merged = run_chunked(
+                input_path,
+                output_path,
+                os.path.join(project_root, settings.YOLO_MODEL_PATH),
+                confidence,
+                workers,
+                device=detection_service.device,
+                infer_every=infer_every,
+                evidence_frames=settings.VIDEO_EVIDENCE_FRAMES,
+                fourcc=preferred_fourcc(),
+                on_progress=on_progress,
+                cancel_event=cancel_event
+            )
+        except Exception:
+            _remove_quietly(output_path)
+            raise
+        result = merged["result"]
+        video_stats = {
+            "total_detections": merged["total_detections"],
+            "frames_with_weapons": merged["frames_with_weapons"],
+        }
+        evidence = merged["evidence"]
+    else:
+        checkpoint = None
+        if checkpoint_dir is not None and timeline is None:
+            checkpoint = VideoCheckpoint(checkpoint_dir, segment_seconds=settings.VIDEO_CHECKPOINT_INTERVAL)
+        try:
+            result, video_stats, evidence = _run_pipeline(
+                input_path, output_path, width, height, confidence, infer_every, on_progress, cancel_event,
+                timeline=timeline, checkpoint=checkpoint
+            )
+        finally:
+            if timeline is not None:
+                timeline.close()
+        if checkpoint is not None and not result["cancelled"]:
+            checkpoint.clear()
+
+    if result["cancelled"]:
+        _remove_quietly(output_path)
+        raise VideoProcessingCancelled(f"Processing cancelled after {result['frame_count']} frames")
+
+    if timeline is None:
+        # moov atom to the front (and H.264 when only mp4v could be written) for in-browser playback
+        result["container"] = finalize_mp4(output_path, preferred_fourcc())
+
+    fps = result["fps"]
+    frame_count = result["frame_count"]
+    processing_time = result["processing_time"]
+    avg_fps = result["average_fps"]
+    total_detections = video_stats["total_detections"]
+    frames_with_weapons = video_stats["frames_with_weapons"]
+
+    print(f"✅ Processing complete!")
+    print(f"   Total frames: {frame_count}")
+    print(f"   Skipped frames (fps decimation): {result['frames_skipped']}")
+    print(f"   Inferred frames: {result['frames_inferred']} (boxes carried over on {result['frames_carried']})")
+    print(f"   Frames with weapons: {frames_with_weapons}")
+    print(f"   Total detections: {total_detections}")
+    print(f"   Processing time: {processing_time:.2f}s ({avg_fps:.1f} fps)")
+    print(f"   Stage utilization: " + ", ".join(
+        f"{name} {stage['utilization']:.0%}" for name, stage in result["stages"].items()
+    ))
+
+    # Save alert to MongoDB if weapons detected
+    if total_detections > 0:
+        # Person analysis on all evidence frames, the most threatening one goes to Telegram
+        analyzed_evidence = _analyze_evidence(evidence, result["fps"])
+        _save_video_alert(result_url, user_id, frame_count, frames_with_weapons, total_detections,
+                          evidence=[{k: v for k, v in e.items() if k != "frame"} for e in analyzed_evidence])
+
+        if analyzed_evidence:
+            _send_evidence_alert(user_id, analyzed_evidence[0])
+
+    response = {
+        "status": "success",
+        "video_url": result_url,
+        "stats": {
+            "total_frames": frame_count,
+            "frames_read": result["frames_read"],
+            "frames_skipped": result["frames_skipped"],
+            "frames_inferred": result["frames_inferred"],
+            "frames_carried": result["frames_carried"],
+            "frames_with_weapons": frames_with_weapons,
+            "total_detections": total_detections,
+            "processing_time_seconds": round(processing_time, 2),
+            "average_fps": round(avg_fps, 1),
+            "video_duration_seconds": round(result["frames_read"] / fps, 2),
+            "resolution": f"{width}x{height}",
+            "fps": fps,
+            "output_fps": result["output_fps"],
+            "stages": result["stages"],
+            "chunks": result.get("chunks"),
+            "resumed_from_frame": result.get("resumed_from_frame"),
+            "container": result.get("container")
+        },
+        "message": f"Processed {frame_count} frames. Found weapons in {frames_with_weapons} frames."
+    }
+    if timeline is not None:
+        del response["video_url"]
+        response["timeline_url"] = result_url
+        response["tracks"] = timeline.tracks
+    return response
+
+
+def _to_detection(d: dict) -> Detection:
+    return Detection(
+        class_name=d["label"],
+        confidence=d["confidence"],
+        bbox=BoundingBox(x1=d["bbox"][0], y1=d["bbox"][1], x2=d["bbox"][2], y2=d["bbox"][3])
+    )
+
+
+def _run_pipeline(
+    input_path: str,
+    output_path: str,
+    width: int,
+    height: int,
+    confidence: float,
+    infer_every: int,
+    on_progress: Optional[Callable[[int, int], None]],
+    cancel_event: Optional[threading.Event],
+    timeline: Optional[TimelineWriter] = None,
+    checkpoint: Optional[VideoCheckpoint] = None
+) -> Tuple[dict, dict, List[dict]]:
+    """Single-process mode: one pipeline over the whole video (or into a timeline / checkpointed segments)"""
+    # Load detection model
+    model = detection_service.load_yolo_model()
+
+    # AUTO-DETECT GRID: Check if this is a multi-camera grid (2x2, 3x3, etc.)
+    grid = detect_grid_layout(width, height)
+    if grid != (1, 1):
+        print(f"📹 Multi-camera grid detected: {grid[0]}x{grid[1]} layout")
+
+    # Per-frame statistics, updated in frame order by the pipeline's annotate stage
+    video_stats = {
+        "total_detections": 0,
+        "frames_with_weapons": 0,
+    }
+    # Top-K evidence frames for the alert (JPEG bytes, constant memory)
+    selector = EvidenceSelector(k=settings.VIDEO_EVIDENCE_FRAMES)
+
+    # Resume partial statistics and evidence from the last checkpoint
+    state = checkpoint.load(input_path) if checkpoint is not None else None
+    if state is not None:
+        extra = state.get("extra", {})
+        video_stats.update(extra.get("video_stats", {}))
+        selector.offer_items(checkpoint.load_evidence(extra.get("evidence", [])))
+        print(f"♻️ Resuming from checkpoint at frame {state['next_frame']} ({len(state['segments'])} segment(s) done)")
+
+    def checkpoint_extra() -> dict:
+        return {"video_stats": dict(video_stats), "evidence": checkpoint.save_evidence(selector.items())}
+
+    def on_detections(frame_index: int, frame: np.ndarray, dets: list):
+        if timeline is not None:
+            timeline.add(frame_index, dets)
+        if not dets:
+            return
+        video_stats["total_detections"] += len(dets)
+        video_stats["frames_with_weapons"] += 1
+
+        # Clean frame (before annotation) - only encoded if it makes the top K
+        selector.offer(frame_index, frame, dets)
+
+    def handle_progress(done: int, total: int):
+        if cancel_event is not None and cancel_event.is_set():
+            pipeline.stop()
+        if on_progress is not None:
+            on_progress(done, total)
+        if done % 30 == 0 and total > 0:
+            print(f"   Progress: {done / total * 100:.1f}% ({done}/{total})")
+
+    pipeline = VideoPipeline(
+        inference_scheduler.wrap(
+            yolo_batch_infer(model, confidence, grid=grid, device=detection_service.device), QOS_BATCH
+        ),
+        batch_size=4,
+        on_detections=on_detections,
+        on_progress=handle_progress,
+        infer_every=infer_every,
+        annotate=timeline is None,
+        fourcc=preferred_fourcc()
+    )
+
+    print(f"🎬 Starting pipelined frame processing...")
+    try:
+        if checkpoint is not None:
+            result = run_checkpointed(pipeline, input_path, output_path, checkpoint, state, checkpoint_extra)
+        else:
+            result = pipeline.run(input_path, output_path if timeline is None else None)
+    except Exception:
+        if timeline is not None:
+            timeline.close()
+        _remove_quietly(output_path)
+        raise
+
+    return result, video_stats, selector.items()
+
+
+def _scan_video(
+    input_path: str,
+    width: int,
+    height: int,
+    confidence: float,
+    on_progress: Optional[Callable[[int, int], None]],
+    cancel_event: Optional[threading.Event],
+    scan_options: dict
+) -> dict:
+    """Scan mode: sparse sampling with scene-change gating, returns hit intervals"""
+    model = detection_service.load_yolo_model()
+    grid = detect_grid_layout(width, height)
+
+    def handle_progress(done: int, total: int):
+        if cancel_event is not None and cancel_event.is_set():
+            scanner.stop()
+        if on_progress is not None:
+            on_progress(done, total)
+
+    scanner = VideoScanner(
+        inference_scheduler.wrap(
+            yolo_batch_infer(model, confidence, grid=grid, device=detection_service.device), QOS_BATCH
+        ),
+        on_progress=handle_progress,
+        **scan_options
+    )
+
+    print(f"🔎 Scanning video ({scanner.sampling}, every {scanner.interval_seconds}s)...")
+    result = scanner.scan(input_path)
+    if result["cancelled"]:
+        raise VideoProcessingCancelled("Scan cancelled")
+
+    hits = result.pop("hits")
+    result.pop("cancelled")
+    processing_time = result.pop("processing_time")
+    print(f"✅ Scan complete: {len(hits)} hit(s), {result['frames_inferred']} frames inferred "
+          f"of {result['total_frames']} in {processing_time:.2f}s")
+
+    return {
+        "status": "success",
+        "hits": hits,
+        "stats": {
+            **result,
+            "processing_time_seconds": round(processing_time, 2),
+            "resolution": f"{width}x{height}",
+        },
+        "message": f"Scanned {result['duration_seconds']}s of video. Found {len(hits)} interval(s) with weapons."
+    }
+
+
+def _remove_quietly(path: str):
+    if os.path.exists(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _save_video_alert(
+    result_url: str,
+    user_id: str,
+    frame_count: int,
+    frames_with_weapons: int,
+    total_detections: int,
+    evidence: Optional[List[dict]] = None
+):
+    """Save one summary alert for the whole video"""
+    # Determine danger level based on frequency
+    detection_rate = frames_with_weapons / frame_count
+    if detection_rate > 0.5:
+        danger_level = "high"
+    elif detection_rate > 0.2:
+        danger_level = "medium"
+    else:
+        danger_level = "low"
+
+    alert_data = {
+        "weapon_class": "multiple",
+        "confidence": 0.0,  # Average not calculated here
+        "danger_level": danger_level,
+        "image_path": result_url,
+        "location": "Video Upload Detection",
+        "camera_id": f"video_{user_id}",
+        "timestamp": datetime.utcnow(),
+        "video_stats": {
+            "total_frames": frame_count,
+            "frames_with_weapons": frames_with_weapons,
+            "total_detections": total_detections,
+            "detection_rate": round(detection_rate * 100, 2)
+        },
+        "evidence": evidence or [],
+        "acknowledged": False
+    }
+    if alert_writer.write(alert_data) is not None:
+        print(f"✅ Video alert queued: {total_detections} detections ({danger_level})")
+
+
+_THREAT_RANK = {"high": 2, "medium": 1, "low": 0}
+
+
+def _analyze_evidence(evidence: List[dict], fps: int) -> List[dict]:
+    """
+    Run person-weapon analysis on all evidence frames in one batch
+
+    Returns:
+        Evidence entries (frame_index, time_seconds, score, threat_level, status,
+        person_count, detections with relationship info, decoded frame), most
+        threatening first
+    """
+    if not evidence:
+        return []
+
+    frames = [EvidenceSelector.decode(item) for item in evidence]
+    persons_per_frame = person_weapon_analyzer.detect_persons_batch(frames, conf_threshold=0.5)
+
+    analyzed = []
+    for item, frame, persons in zip(evidence, frames, persons_per_frame):
+        weapon_dicts = [
+            {'label': d['label'], 'confidence': d['confidence'], 'bbox': [int(v) for v in d['bbox']]}
+            for d in item["detections"]
+        ]
+        analyzed_weapons = person_weapon_analyzer.analyze_weapon_person_relationship(weapon_dicts, persons)
+        threat_level, status = person_weapon_analyzer.determine_overall_threat(analyzed_weapons, len(persons))
+        # Plain Python types only: the entry is stored in the alert (BSON cannot encode numpy scalars)
+        detections = [
+            {
+                "label": w["label"],
+                "confidence": float(w["confidence"]),
+                "bbox": [int(v) for v in w["bbox"]],
+                "status": w["status"],
+                "threat_level": w["threat_level"],
+                "distance_to_nearest_person": (None if w["distance_to_nearest_person"] is None
+                                               else round(float(w["distance_to_nearest_person"]), 1)),
+            }
+            for w in analyzed_weapons
+        ]
+        analyzed.append({
+            "frame_index": item["frame_index"],
+            "time_seconds": round((item["frame_index"] - 1) / (fps or 30), 2),
+            "score": item["score"],
+            "threat_level": threat_level,
+            "status": status,
+            "person_count": len(persons),
+            "detections": detections,
+            "persons": persons,
+            "frame": frame,
+        })
+
+    # Most threatening first, detector score breaks ties
+    analyzed.sort(key=lambda e: (_THREAT_RANK.get(e["threat_level"], 0), e["score"]), reverse=True)
+    for entry in analyzed:
+        entry["persons"] = [{"bbox": [int(v) for v in p["bbox"]], "confidence": float(p["confidence"])}
+                            for p in entry["persons"]]
+    return analyzed
+
+
+def _send_evidence_alert(user_id: str, evidence: dict):
+    """Annotate an analyzed evidence frame with persons and weapons and send it to Telegram"""
+    alert_frame = evidence["frame"].copy()
+
+    # Draw persons in green
+    for person in evidence["persons"]:
+        px1, py1, px2, py2 = person['bbox']
+        cv2.rectangle(alert_frame, (px1, py1), (px2, py2), (0, 255, 0), 2)
+        cv2.putText(alert_frame, f"Person {person['confidence']:.2f}",
+                    (px1, py1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+
+    # Draw weapons in red
+    for weapon in evidence["detections"]:
+        x1, y1, x2, y2 = weapon['bbox']
+
+        cv2.rectangle(alert_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+
+        status_text = person_weapon_analyzer.get_status_vietnamese(weapon.get('status', 'unknown'))
+
+        label = f"{weapon['label']} {weapon['confidence']:.0%}"
+        cv2.putText(alert_frame, label, (x1, y1 - 25),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        cv2.putText(alert_frame, status_text, (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+
+    print(f"🎬 Video Analysis: {evidence['person_count']} person(s) in evidence frame "
+          f"{evidence['frame_index']} - {evidence['status']}")
+
+    telegram_alert.send_alert(
+        camera_id=f"video_{user_id}",
+        image=alert_frame,
+        message=f"{evidence['status']} (Video, {evidence['time_seconds']}s)",
+        detections=[_to_detection(d) for d in evidence["detections"]],
+        skip_cooldown=True
+    )
@@ -0,0 +1,317 @@
+"""
+Video Scan - Sparse "does a weapon appear, and when?" search for long recordings
+
+Instead of decoding and inferring every frame, the scanner:
+    1. samples the video sparsely (fixed interval, or keyframes via ffprobe),
+       seeking over long gaps instead of decoding through them
+    2. compares a tiny colour histogram of each sample with the last inferred
+       one and only runs the detector when the scene changed (or too much time
+       has passed), reusing the last result for static scenes
+    3. densifies sampling around every positive sample to localize the hit
+    4. returns the hit intervals
+
+Like the video pipeline it only depends on OpenCV/numpy and an inference callable.
+"""
+import cv2
+import numpy as np
+import threading
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.services.video_pipeline import InferFn
+from app.services.video_chunking import find_keyframes
+
+logger = logging.getLogger(__name__)
+
+SAMPLING_MODES = ("interval", "keyframes")
+
+SEEK_MIN_GAP = 48  # Frames - shorter gaps are grabbed through, longer ones are seeked
+SIGNATURE_SIZE = (64, 36)  # Thumbnail used for the scene histogram
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Normalized hue/saturation histogram of a thumbnail (cheap scene fingerprint)"""
+    small = cv2.resize(frame, SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1, 2], None, [8, 4, 4], [0, 180, 0, 256, 0, 256])
+    cv2.normalize(hist, hist)
+    return hist
+
+
+def scene_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Bhattacharyya distance between two signatures (0 = identical, 1 = disjoint)"""
+    return float(cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA))
+
+
+class _FrameReader:
+    """Random-access frame reader that seeks only when it is cheaper than decoding forward"""
+
+    def __init__(self, cap: cv2.VideoCapture):
+        self.cap = cap
+        self.position = 0
+        self.frames_decoded = 0
+        self.seeks = 0
+
+    def read(self, index: int) -> Optional[np.ndarray]:
+        gap = index - self.position
+        if gap < 0 or gap > SEEK_MIN_GAP:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self.seeks += 1
+        else:
+            for _ in range(gap):
+                if not self.cap.grab():
+                    return None
+                self.frames_decoded += 1
+
+        ret, frame = self.cap.read()
+        self.position = index + 1
+        if not ret:
+            return None
+        self.frames_decoded += 1
+        return frame
+
+
+class VideoScanner:
+    """
+    Sparse scene-change scanner
+
+    Usage:
+        scanner = VideoScanner(yolo_batch_infer(model, 0.5), interval_seconds=2.0)
+        result = scanner.scan("recording.mp4")
+        result["hits"]  # [{"start_time": 12.4, "end_time": 15.1, "labels": ["pistol"], ...}]
+    """
+
+    def __init__(
+        self,
+        infer_fn: InferFn,
+        interval_seconds: float = 2.0,
+        sampling: str = "interval",
+        scene_threshold: float = 0.3,
+        max_reuse_seconds: float = 30.0,
+        densify_step_seconds: float = 0.25,
+        batch_size: int = 8,
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ):
+        """
+        Initialize the scanner
+
+        Args:
+            infer_fn: Callable mapping a batch of frames to detections per frame
+            interval_seconds: Spacing of coarse samples (minimum spacing in keyframe mode)
+            sampling: "interval" or "keyframes" (falls back to interval without ffprobe)
+            scene_threshold: Histogram distance above which a sample counts as a scene change
+            max_reuse_seconds: Re-run the detector at least this often even in static scenes
+            densify_step_seconds: Sample spacing used around positive samples
+            batch_size: Frames per inference batch
+            on_progress: Hook called with (frame_position, total_frames)
+        """
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"sampling must be one of {SAMPLING_MODES}")
+
+        self.infer_fn = infer_fn
+        self.interval_seconds = max(0.04, interval_seconds)
+        self.sampling = sampling
+        self.scene_threshold = scene_threshold
+        self.max_reuse_seconds = max_reuse_seconds
+        self.densify_step_seconds = max(0.01, densify_step_seconds)
+        self.batch_size = max(1, batch_size)
+        self.on_progress = on_progress
+
+        self._stop_event = threading.Event()
+        self._frames_inferred = 0
+
+    def stop(self):
+        """Request the scan to stop (the result is marked cancelled)"""
+        self._stop_event.set()
+
+    def _infer(self, frames: List[np.ndarray]) -> List[List[Dict]]:
+        detections: List[List[Dict]] = []
+        for i in range(0, len(frames), self.batch_size):
+            detections.extend(self.infer_fn(frames[i:i + self.batch_size]))
+        self._frames_inferred += len(frames)
+        return detections
+
+    def _sample_positions(self, input_path: str, total_frames: int, fps: float) -> Tuple[List[int], str]:
+        step = max(1, int(round(self.interval_seconds * fps)))
+        if self.sampling == "keyframes":
+            keyframes = find_keyframes(input_path)
+            if keyframes:
+                # Keep keyframes at least one interval apart
+                positions = []
+                for k in keyframes:
+                    if k < total_frames and (not positions or k - positions[-1] >= step):
+                        positions.append(k)
+                return positions, "keyframes"
+            logger.info("No keyframe index available (ffprobe missing?), sampling at fixed interval")
+        return list(range(0, total_frames, step)), "interval"
+
+    # ------------------------------------------------------------------
+    # Passes
+    # ------------------------------------------------------------------
+
+    def _coarse_pass(self, reader: _FrameReader, positions: List[int], fps: float, total_frames: int):
+        """
+        Sample sparsely and infer only on scene changes
+
+        Returns:
+            (samples, scene_changes) where samples is a list of (frame, detections)
+        """
+        samples: List[Tuple[int, int]] = []  # (frame, index of the inferred sample it uses)
+        inferred: List[List[Dict]] = []
+        pending: List[np.ndarray] = []
+        scene_changes = 0
+        reference = None  # (signature, frame) of the last inferred sample
+
+        for position in positions:
+            if self._stop_event.is_set():
+                break
+            frame = reader.read(position)
+            if frame is None:
+                break
+
+            signature = frame_signature(frame)
+            changed = reference is None or scene_distance(signature, reference[0]) > self.scene_threshold
+            stale = reference is not None and (position - reference[1]) / fps >= self.max_reuse_seconds
+            if changed or stale:
+                if changed and reference is not None:
+                    scene_changes += 1
+                reference = (signature, position)
+                pending.append(frame)
+                if len(pending) >= self.batch_size:
+                    inferred.extend(self._infer(pending))
+                    pending = []
+            samples.append((position, len(inferred) + len(pending) - 1))
+
+            if self.on_progress is not None:
+                self.on_progress(position + 1, total_frames)
+
+        if pending:
+            inferred.extend(self._infer(pending))
+
+        return [(position, inferred[ref]) for position, ref in samples], scene_changes
+
+    def _densify(
+        self,
+        reader: _FrameReader,
+        samples: List[Tuple[int, List[Dict]]],
+        fps: float,
+        total_frames: int
+    ) -> List[Tuple[int, List[Dict]]]:
+        """Re-sample densely around positive coarse samples"""
+        # Window = from the previous coarse sample to the next one around every positive sample
+        windows: List[List[int]] = []
+        for i, (position, dets) in enumerate(samples):
+            if not dets:
+                continue
+            start = samples[i - 1][0] + 1 if i > 0 else 0
+            end = samples[i + 1][0] - 1 if i + 1 < len(samples) else total_frames - 1
+            if windows and start <= windows[-1][1] + 1:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+
+        step = max(1, int(round(self.densify_step_seconds * fps)))
+        coarse = dict(samples)
+        dense: List[Tuple[int, List[Dict]]] = []
+        for start, end in windows:
+            positions = [p for p in range(start, end + 1, step) if p not in coarse]
+            frames, kept = [], []
+            for position in positions:
+                if self._stop_event.is_set():
+                    return dense
+                frame = reader.read(position)
+                if frame is None:
+                    break
+                frames.append(frame)
+                kept.append(position)
+            dense.extend(zip(kept, self._infer(frames) if frames else []))
+        return dense
+
+    @staticmethod
+    def _build_hits(observations: List[Tuple[int, List[Dict]]], max_gap: int, fps: float) -> List[dict]:
+        """Merge positive observations (in frame order) into intervals"""
+        hits: List[dict] = []
+        for position, dets in observations:
+            if not dets:
+                continue
+            if hits and position - hits[-1]["end_frame"] <= max_gap:
+                hit = hits[-1]
+            else:
+                hit = {"start_frame": position, "labels": set(), "max_confidence": 0.0,
+                       "peak_detections": 0, "samples": 0}
+                hits.append(hit)
+            hit["end_frame"] = position
+            hit["labels"].update(d["label"] for d in dets)
+            hit["max_confidence"] = max(hit["max_confidence"], max(float(d["confidence"]) for d in dets))
+            hit["peak_detections"] = max(hit["peak_detections"], len(dets))
+            hit["samples"] += 1
+
+        for hit in hits:
+            hit["start_time"] = round(hit["start_frame"] / fps, 2)
+            hit["end_time"] = round(hit["end_frame"] / fps, 2)
+            hit["labels"] = sorted(hit["labels"])
+            hit["max_confidence"] = round(hit["max_confidence"], 3)
+        return hits
+
+    # ------------------------------------------------------------------
+    # Entry point
+    # ------------------------------------------------------------------
+
+    def scan(self, input_path: str) -> dict:
+        """
+        Scan a video for weapon appearances
+
+        Frame numbers in the result are 0-based positions in the video.
+
+        Returns:
+            dict with hit intervals, sampling statistics and timing
+
+        Raises:
+            RuntimeError: If the video cannot be opened
+        """
+        self._stop_event.clear()
+        self._frames_inferred = 0
+
+        cap = cv2.VideoCapture(input_path)
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video file: {input_path}")
+
+        start_time = time.time()
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+            positions, sampling = self._sample_positions(input_path, total_frames, fps)
+            reader = _FrameReader(cap)
+            samples, scene_changes = self._coarse_pass(reader, positions, fps, total_frames)
+            dense = self._densify(reader, samples, fps, total_frames)
+        finally:
+            cap.release()
+
+        observations = sorted(samples + dense, key=lambda o: o[0])
+        max_gap = max(1, int(round(self.densify_step_seconds * fps))) * 2
+        hits = self._build_hits(observations, max_gap, fps)
+
+        if self.on_progress is not None and not self._stop_event.is_set():
+            self.on_progress(total_frames, total_frames)
+
+        return {
+            "hits": hits,
+            "total_frames": total_frames,
+            "fps": round(fps, 3),
+            "width": width,
+            "height": height,
+            "duration_seconds": round(total_frames / fps, 2),
+            "sampling": sampling,
+            "coarse_samples": len(samples),
+            "dense_samples": len(dense),
+            "scene_changes": scene_changes,
+            "frames_decoded": reader.frames_decoded,
+            "frames_inferred": self._frames_inferred,
+            "seeks": reader.seeks,
+            "processing_time": time.time() - start_time,
+            "cancelled": self._stop_event.is_set(),
+        }
@@ -0,0 +1,139 @@
+"""
+Video Timeline - Compact per-frame detection index for client-side overlays
+
+Written instead of an annotated video when a video is processed with
+output=timeline. The file is JSON Lines:
+
+    {"type": "header", "fps": 29.97, "sample_fps": 29.97, "width": 1920, "height": 1080, ...}
+    {"type": "frame", "frame": 12, "t": 0.367, "detections": [{"track_id": 1, "label": "pistol", ...}]}
+    {"type": "frame", "frame": 40, "t": 1.301, "detections": []}
+    {"type": "summary", "frames_with_detections": 28, "tracks": [...]}
+
+Only frames whose detections changed are written: the detections shown at
+time t are the ones of the latest frame record at or before t, and an empty
+record marks where detections end.
+"""
+import json
+from typing import Dict, List, Optional
+
+from app.services.tracking import IoUTracker
+
+TIMELINE_VERSION = 1
+
+
+class TimelineWriter:
+    """
+    Streams tracked detections to a JSONL timeline file
+
+    Usage:
+        with TimelineWriter(path, fps=30.0, width=1280, height=720) as timeline:
+            timeline.add(frame_index, detections)  # in frame order
+        timeline.tracks  # per-track summary
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fps: float,
+        width: int,
+        height: int,
+        total_frames: int = 0,
+        sample_fps: Optional[float] = None,
+        tracker: Optional[IoUTracker] = None
+    ):
+        """
+        Initialize the writer
+
+        Args:
+            path: Output .jsonl path
+            fps: Source video fps (frame index -> timestamp)
+            width: Source video width (box coordinates are in source pixels)
+            height: Source video height
+            total_frames: Frames in the source video
+            sample_fps: Rate at which frames were actually analysed (after decimation)
+            tracker: Tracker assigning track IDs (a fresh IoUTracker by default)
+        """
+        self.path = path
+        self.fps = fps or 30.0
+        self.tracker = tracker or IoUTracker()
+        self.frames_with_detections = 0
+        self.records_written = 0
+
+        self._file = open(path, "w", encoding="utf-8")
+        self._last_record: Optional[List[dict]] = None
+        self._write({
+            "type": "header",
+            "version": TIMELINE_VERSION,
+            "fps": round(self.fps, 3),
+            "sample_fps": round(sample_fps or self.fps, 3),
+            "width": width,
+            "height": height,
+            "total_frames": total_frames,
+        })
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def add(self, frame_index: int, detections: List[Dict]) -> List[Dict]:
+        """
+        Track one frame's detections and record them
+
+        Args:
+            frame_index: 1-based frame number in the source video
+            detections: Detections of this frame
+
+        Returns:
+            The detections with track IDs
+        """
+        tracked = self.tracker.update(detections, frame_index)
+
+        if tracked:
+            self.frames_with_detections += 1
+
+        record = [
+            {
+                "track_id": d["track_id"],
+                "label": d["label"],
+                "confidence": round(float(d["confidence"]), 3),
+                "bbox": [round(float(v), 1) for v in d["bbox"]],
+            }
+            for d in tracked
+        ]
+        # Unchanged (e.g. boxes carried over between inferred frames) or still empty - no record needed
+        if record == (self._last_record or []):
+            return tracked
+
+        self._write({
+            "type": "frame",
+            "frame": frame_index,
+            "t": round((frame_index - 1) / self.fps, 3),
+            "detections": record,
+        })
+        self.records_written += 1
+        self._last_record = record
+        return tracked
+
+    @property
+    def tracks(self) -> List[dict]:
+        """Per-track summary with first/last frame and timestamps"""
+        tracks = self.tracker.summary()
+        for track in tracks:
+            track["start_time"] = round((track["first_frame"] - 1) / self.fps, 3)
+            track["end_time"] = round((track["last_frame"] - 1) / self.fps, 3)
+        return tracks
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._write({
+            "type": "summary",
+            "frames_with_detections": self.frames_with_detections,
+            "tracks": self.tracks,
+        })
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,66 @@
+"""
+Test script for the bounded, prioritized alert worker pool
+
+Run from backend/: python test_alert_pool.py
+"""
+import threading
+
+from app.services.alert_pool import AlertWorkerPool
+
+
+def test_coalescing_and_drop_lowest():
+    """One pending alert per key, the lowest priority is dropped when full, highest runs first"""
+    print("🧪 Testing alert pool...")
+    busy, release = threading.Event(), threading.Event()
+    handled = []
+
+    def handler(key, payload, mark):
+        if key == "blocker":
+            busy.set()
+            release.wait(5)
+        mark("work")
+        handled.append((key, payload))
+
+    pool = AlertWorkerPool(handler, num_workers=1, max_queue=2, name="test-alert")
+    try:
+        pool.submit("blocker", 0, priority=10)
+        assert busy.wait(5)  # The only worker is now busy
+
+        assert pool.submit("cam1", "a", priority=1.0)
+        assert pool.submit("cam2", "b", priority=2.0)
+        assert pool.submit("cam1", "a2", priority=3.0)        # Coalesced, priority raised
+        assert pool.submit("cam3", "c", priority=2.5)         # Full: cam2 (lowest) dropped
+        assert not pool.submit("cam4", "d", priority=0.5)     # Full and lowest: rejected
+        metrics = pool.metrics()
+        assert metrics["queue_depth"] == 2
+        assert (metrics["coalesced"], metrics["dropped"]) == (1, 2)
+
+        release.set()
+    finally:
+        release.set()
+        pool.stop()
+
+    assert handled == [("blocker", 0), ("cam1", "a2"), ("cam3", "c")]
+    metrics = pool.metrics()
+    assert metrics["processed"] == 3 and metrics["workers"] == 0
+    assert metrics["stages"]["work"]["count"] == 3 and metrics["stages"]["total"]["count"] == 3
+    print("✅ Coalesced, dropped lowest, processed by priority")
+
+
+def test_failed_handler_is_counted():
+    """A handler exception is logged and counted; the worker keeps going"""
+    def handler(key, payload, mark):
+        if payload == "bad":
+            raise RuntimeError("snapshot failed")
+
+    pool = AlertWorkerPool(handler, num_workers=1, max_queue=4, name="test-alert")
+    pool.submit("cam1", "bad")
+    pool.submit("cam2", "good")
+    pool.stop()
+    metrics = pool.metrics()
+    assert (metrics["failed"], metrics["processed"]) == (1, 1)
+
+
+if __name__ == "__main__":
+    test_coalescing_and_drop_lowest()
+    test_failed_handler_is_counted()
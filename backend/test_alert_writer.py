@@ -0,0 +1,83 @@
+"""
+Test script for the write-behind alert writer (no MongoDB needed)
+
+Run from backend/: python test_alert_writer.py
+"""
+import numpy as np
+import bson
+from pymongo.errors import AutoReconnect
+
+from app.services.alert_writer import AlertWriter, PyMongoAlertBackend
+
+
+class FakeAlertsCollection:
+    """Alerts collection that BSON-encodes documents like the server driver does"""
+
+    def __init__(self):
+        self.docs = {}
+        self.outages = 0  # Next calls that fail as if the server were unreachable
+
+    def insert_many(self, docs, ordered=True):
+        if self.outages:
+            self.outages -= 1
+            raise AutoReconnect("connection reset")
+        encoded = [bson.encode(doc) for doc in docs]  # InvalidDocument before anything is sent
+        for doc, data in zip(docs, encoded):
+            self.docs[doc["_id"]] = bson.decode(data)
+
+    def update_many(self, query, update):
+        for doc in self.docs.values():
+            if all(doc.get(key) == value for key, value in query.items()):
+                doc.update(update["$set"])
+
+
+def make_writer(collection):
+    return AlertWriter(PyMongoAlertBackend(lambda: collection), batch_size=10, flush_interval=0.05,
+                       max_retry_delay=0.1)
+
+
+def test_unencodable_alert_is_dropped():
+    """One alert BSON cannot encode is dropped; the rest of its batch and later alerts are written"""
+    print("🧪 Testing an unencodable alert in a batch...")
+    collection = FakeAlertsCollection()
+    writer = make_writer(collection)
+
+    writer.write_many([{"weapon_class": "pistol", "n": i} for i in range(4)])
+    writer.write({"weapon_class": "knife", "distance": np.float32(12.5)})
+    writer.write_many([{"weapon_class": "pistol", "n": i} for i in range(4, 8)])
+    assert writer.flush(5), "writer did not drain"
+    writer.write({"weapon_class": "rifle"})
+    assert writer.flush(5), "writer stalled after a bad alert"
+
+    metrics = writer.metrics()
+    print(f"   {metrics}")
+    assert len(collection.docs) == 9
+    assert metrics["written"] == 9 and metrics["failed"] == 1
+    assert metrics["retries"] == 0 and metrics["pending"] == 0
+    writer.stop()
+    print("✅ Bad alert dropped, queue kept draining")
+
+
+def test_connection_errors_are_retried():
+    """A batch failing with a connection error is retried and written once"""
+    print("🧪 Testing retry after connection errors...")
+    collection = FakeAlertsCollection()
+    collection.outages = 2
+    writer = make_writer(collection)
+
+    ids = writer.write_many([{"weapon_class": "pistol", "incident_id": "inc1"} for _ in range(5)])
+    writer.update({"incident_id": "inc1"}, {"$set": {"incident": {"closed": True}}})
+    assert writer.flush(5), "writer did not drain"
+
+    metrics = writer.metrics()
+    print(f"   {metrics}")
+    assert sorted(collection.docs) == sorted(ids)
+    assert all(doc["incident"]["closed"] for doc in collection.docs.values())
+    assert metrics["written"] == 5 and metrics["failed"] == 0 and metrics["retries"] == 2
+    writer.stop()
+    print("✅ Batch retried, update applied after its inserts")
+
+
+if __name__ == "__main__":
+    test_unencodable_alert_is_dropped()
+    test_connection_errors_are_retried()
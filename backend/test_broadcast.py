@@ -0,0 +1,95 @@
+"""
+Test script for encode-once fan-out of live camera frames
+
+Run from backend/: python test_broadcast.py
+"""
+import asyncio
+import threading
+
+import cv2
+import numpy as np
+
+from app.services.broadcast import BroadcastHub
+
+PISTOL = [{"label": "pistol", "confidence": 0.9, "bbox": [10, 10, 60, 60]}]
+
+
+def frame(value: int, width: int = 320) -> np.ndarray:
+    return np.full((width * 3 // 4, width, 3), value, np.uint8)
+
+
+def publish_from_thread(hub: BroadcastHub, camera_id: str, frames: list):
+    """Publish like a camera worker does (outside the event loop)"""
+    thread = threading.Thread(target=lambda: [hub.publish(camera_id, f, PISTOL) for f in frames])
+    thread.start()
+    thread.join()
+
+
+def test_encode_once_for_all_viewers():
+    """Every frame is encoded once; viewers share the bytes and a slow one skips to the newest"""
+    print("🧪 Testing broadcast fan-out...")
+    hub = BroadcastHub(jpeg_quality=80, max_width=640)
+    hub.open("gate_1", title="Gate")
+    assert not hub.publish("gate_1", frame(10), PISTOL)  # Nobody watching: not encoded
+    assert hub.stats("gate_1")["frames_encoded"] == 0
+
+    async def scenario():
+        fast, slow = hub.subscribe("gate_1"), hub.subscribe("gate_1")
+        assert hub.subscribe("unknown") is None
+
+        fast_frames = []
+        for i in range(3):
+            publish_from_thread(hub, "gate_1", [frame(50 + i)])
+            fast_frames.append(await asyncio.wait_for(fast.next(), 1))
+            if i == 0:
+                assert (await asyncio.wait_for(slow.next(), 1))[0] == 1
+        assert [seq for seq, _ in fast_frames] == [1, 2, 3] and fast.dropped == 0
+
+        seq, jpeg = await asyncio.wait_for(slow.next(), 1)  # Skips frame 2, same bytes as the fast viewer
+        assert seq == 3 and jpeg is fast_frames[-1][1] and slow.dropped == 1
+
+        # A waiting viewer wakes up on publish from another thread
+        waiting = asyncio.ensure_future(slow.next())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        publish_from_thread(hub, "gate_1", [frame(200, width=1280)])
+        seq, jpeg = await asyncio.wait_for(waiting, 1)
+        assert seq == 4 and cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR).shape == (480, 640, 3)
+
+        stats = hub.stats("gate_1")
+        assert stats["viewers"] == 2 and stats["frames_encoded"] == 4 and stats["viewer_dropped"] == 1
+
+        hub.unsubscribe(fast)
+        hub.close("gate_1")
+        assert await asyncio.wait_for(slow.next(), 1) is None
+        assert hub.stats("gate_1") is None and not hub.publish("gate_1", frame(1), PISTOL)
+
+    asyncio.run(scenario())
+    print("✅ 4 frames encoded once for 2 viewers")
+
+
+def test_late_viewer_does_not_get_stale_frame():
+    """A frame published before anyone watched is not delivered to the first viewer"""
+    hub = BroadcastHub()
+    channel = hub.open("lobby")
+
+    async def scenario():
+        viewer = hub.subscribe("lobby")
+        publish_from_thread(hub, "lobby", [frame(30)])
+        hub.unsubscribe(viewer)
+        assert not channel.has_viewers()
+
+        late = hub.subscribe("lobby")
+        assert late.last_seq == 1
+        waiting = asyncio.ensure_future(late.next())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        late.close()
+        assert await asyncio.wait_for(waiting, 1) is None
+
+    asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    test_encode_once_for_all_viewers()
+    test_late_viewer_does_not_get_stale_frame()
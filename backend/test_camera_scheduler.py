@@ -0,0 +1,114 @@
+"""
+Test script for the camera scheduler (streams and detector are fakes)
+
+Run from backend/: python test_camera_scheduler.py
+"""
+import threading
+import time
+
+import numpy as np
+
+from app.services.camera_scheduler import CameraScheduler
+
+
+class FakeStream:
+    """Publishes frames on demand; counts frame reads and releases"""
+
+    def __init__(self):
+        self.frame_seq = 0
+        self.reads = 0
+        self.released = 0
+
+    def publish(self):
+        self.frame_seq += 1
+
+    def latest(self):
+        if not self.frame_seq:
+            return None
+        self.reads += 1
+        return self.frame_seq, np.zeros((48, 64, 3), np.uint8), time.time()
+
+    def release(self, item):
+        self.released += 1
+
+
+class FakeStreams:
+    def __init__(self, *camera_ids):
+        self.streams = {camera_id: FakeStream() for camera_id in camera_ids}
+
+    def get_stream(self, camera_id):
+        return self.streams.get(camera_id)
+
+
+def no_detections(frames, model_type, confidences, rois):
+    return [[] for _ in frames]
+
+
+def test_frame_read_only_when_sequence_advances():
+    """A due camera without a new frame costs a sequence check, not a frame read"""
+    print("🧪 Testing frame polling...")
+    streams = FakeStreams("gate_1")
+    stream = streams.streams["gate_1"]
+    scheduler = CameraScheduler(streams=streams, detect_fn=no_detections)
+    results = []
+    delivered = threading.Event()
+
+    def on_result(result):
+        if result is not None:
+            results.append(result["seq"])
+            delivered.set()
+
+    stream.publish()
+    scheduler.add("gate_1", on_result, target_fps=50)
+    try:
+        assert delivered.wait(2)
+        time.sleep(0.3)  # ~60 polls of a due camera without a new frame
+        assert results == [1] and stream.reads == 1
+
+        delivered.clear()
+        stream.publish()
+        assert delivered.wait(2)
+        time.sleep(0.05)
+        assert results == [1, 2] and stream.reads == 2
+        assert scheduler.camera_stats("gate_1")["idle"] > 0
+    finally:
+        scheduler.remove("gate_1")
+        scheduler.stop()
+    assert stream.released == stream.reads  # Frames go back after the callback
+    print("✅ 2 frame reads for 2 frames")
+
+
+def test_rebalance_cuts_lowest_priority_first():
+    """When targets exceed the measured capacity, budgets shrink from the lowest priority up"""
+    print("🧪 Testing budget rebalancing...")
+    scheduler = CameraScheduler(streams=FakeStreams(), detect_fn=no_detections, headroom=0.9, min_fps=0.2)
+    try:
+        scheduler.add("entrance", lambda result: None, target_fps=5, priority=8)
+        scheduler.add("hall", lambda result: None, target_fps=5, priority=5)
+        scheduler.add("storage", lambda result: None, target_fps=2, priority=2)
+        assert scheduler.camera_stats("storage")["budget_fps"] == 2  # Nothing measured yet
+
+        with scheduler._lock:
+            scheduler._frame_cost = 0.1  # 10 frames/s, 9 plannable
+            scheduler._rebalance()
+        budgets = {c: scheduler.camera_stats(c)["budget_fps"] for c in ("entrance", "hall", "storage")}
+        assert budgets == {"entrance": 5.0, "hall": 4.0, "storage": 0.2}, budgets
+        assert scheduler.stats()["saturated"] and scheduler.stats()["capacity_fps"] == 9.0
+        assert scheduler.camera_stats("hall")["degraded"] and not scheduler.camera_stats("entrance")["degraded"]
+
+        # Room again once a camera leaves
+        scheduler.remove("entrance")
+        with scheduler._lock:
+            scheduler._rebalance()
+        assert scheduler.camera_stats("hall")["budget_fps"] == 5.0
+        assert scheduler.camera_stats("storage")["budget_fps"] == 2.0 and not scheduler.stats()["saturated"]
+    finally:
+        for camera_id in ("hall", "storage"):
+            scheduler.remove(camera_id)
+        scheduler.stop()
+    print("✅ Budgets cut from the lowest priority")
+
+
+if __name__ == "__main__":
+    test_frame_read_only_when_sequence_advances()
+    test_rebalance_cuts_lowest_priority_first()
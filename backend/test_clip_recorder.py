@@ -0,0 +1,128 @@
+"""
+Test script for incident clips (pre-roll buffer + post-roll); the camera and the alert writer are fakes
+
+Run from backend/: python test_clip_recorder.py
+"""
+import os
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from app.services import clip_recorder as clip_recorder_module
+from app.services.clip_recorder import ClipRecorder, FrameRingBuffer
+
+
+class FakeStream:
+    """Camera delivering a new frame every 10 ms; counts checkouts and releases"""
+
+    def __init__(self):
+        self.checked_out = 0
+        self.released = 0
+
+    def wait_frame(self, after_seq, timeout=None):
+        time.sleep(0.01)
+        seq = after_seq + 1
+        self.checked_out += 1
+        return seq, np.full((120, 160, 3), seq % 200, np.uint8), time.time()
+
+    def release(self, item):
+        self.released += 1
+
+
+class FakeStreams:
+    def __init__(self):
+        self.stream = FakeStream()
+
+    def get_stream(self, camera_id):
+        return self.stream if camera_id == "gate_1" else None
+
+
+class FakeAlertWriter:
+    def __init__(self):
+        self.updates = []
+
+    def update(self, query, update):
+        self.updates.append((query, update))
+
+
+def test_ring_buffer_limits():
+    """Frames older than max_seconds go, and the oldest go first when over max_bytes"""
+    buffer = FrameRingBuffer(max_seconds=2.0, max_bytes=100)
+    for t in range(5):
+        buffer.append(float(t), b"x" * 10)
+    assert len(buffer) == 3 and [t for t, _ in buffer.since(0)] == [2.0, 3.0, 4.0]
+    buffer.append(5.0, b"y" * 95)
+    assert len(buffer) == 1 and buffer.nbytes == 95 and buffer.evicted_for_size == 2
+    assert buffer.since(5.5) == []
+
+
+def test_clip_has_pre_and_post_roll():
+    """A triggered clip holds the buffered pre-roll plus the post-roll and is written on its own"""
+    print("🧪 Testing incident clip...")
+    alert_writer = clip_recorder_module.alert_writer
+    fake_writer = FakeAlertWriter()
+    clip_recorder_module.alert_writer = fake_writer
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            streams = FakeStreams()
+            recorder = ClipRecorder(tmp, pre_roll=0.5, post_roll=0.3, fps=20, max_width=80, streams=streams)
+            recorder.start_camera("gate_1")
+            time.sleep(0.7)  # Fill the pre-roll
+
+            url = recorder.trigger("gate_1", "inc1")
+            assert url.startswith("/clips/clip_gate_1_") and url.endswith("_inc1.mp4")
+            assert recorder.trigger("gate_1", "inc1") == url  # Once per incident
+            assert recorder.trigger("unknown", "inc2") is None
+            assert recorder.clip_status("inc1") == "recording"
+            assert recorder.stats("gate_1")["clips_recording"] == 1
+
+            deadline = time.time() + 5
+            while recorder.clip_status("inc1") == "recording" and time.time() < deadline:
+                time.sleep(0.05)
+            assert recorder.clip_status("inc1") == "ready"
+            assert recorder.stats("gate_1")["clips_recording"] == 0
+
+            path = os.path.join(tmp, os.path.basename(url))
+            cap = cv2.VideoCapture(path)
+            frames, width = 0, int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            while cap.read()[0]:
+                frames += 1
+            cap.release()
+            print(f"   clip has {frames} frames")
+            assert width == 80 and 10 <= frames <= 20  # ~0.5 s pre-roll + ~0.3 s post-roll at 20 fps
+            assert fake_writer.updates == [({"incident_id": "inc1"},
+                                             {"$set": {"clip_path": url, "clip_status": "ready"}})]
+
+            recorder.stop()
+            assert recorder.stats("gate_1") is None
+            assert streams.stream.released == streams.stream.checked_out  # Every frame given back
+    finally:
+        clip_recorder_module.alert_writer = alert_writer
+    print("✅ Clip written with pre- and post-roll")
+
+
+def test_stop_writes_pending_clips():
+    """Clips still collecting post-roll are written with what they have on stop()"""
+    alert_writer = clip_recorder_module.alert_writer
+    clip_recorder_module.alert_writer = FakeAlertWriter()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            recorder = ClipRecorder(tmp, pre_roll=0.3, post_roll=60, fps=20, streams=FakeStreams())
+            recorder.start_camera("gate_1")
+            time.sleep(0.4)
+            recorder.trigger("gate_1", "inc1")
+            stopper = threading.Thread(target=recorder.stop)
+            stopper.start()
+            stopper.join(10)
+            assert not stopper.is_alive() and recorder.clip_status("inc1") == "ready"
+    finally:
+        clip_recorder_module.alert_writer = alert_writer
+
+
+if __name__ == "__main__":
+    test_ring_buffer_limits()
+    test_clip_has_pre_and_post_roll()
+    test_stop_writes_pending_clips()
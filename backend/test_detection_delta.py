@@ -0,0 +1,103 @@
+"""
+Test script for delta-encoded detection responses (encoder -> reference decoder round trip)
+
+Run from backend/: python test_detection_delta.py
+"""
+import random
+
+from app.services.detection_delta import DeltaEncoder, DeltaDecoder
+
+
+def make_detection(class_name: str, confidence: float, box: list) -> dict:
+    x1, y1, x2, y2 = box
+    return {"class_name": class_name, "confidence": confidence, "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}}
+
+
+def scene(frame_index: int, rng: random.Random) -> list:
+    """Two jittering, drifting objects; a knife from frame 20 to 39"""
+    detections = [
+        make_detection("pistol", 0.8 + rng.uniform(-0.04, 0.04),
+                       [100 + frame_index * 1.5 + rng.uniform(-2, 2), 100 + rng.uniform(-2, 2),
+                        180 + frame_index * 1.5 + rng.uniform(-2, 2), 160 + rng.uniform(-2, 2)]),
+        make_detection("rifle", 0.6 + frame_index * 0.005,
+                       [400 + rng.uniform(-1, 1), 300 - frame_index, 560 + rng.uniform(-1, 1), 340 - frame_index]),
+    ]
+    if 20 <= frame_index < 40:
+        detections.append(make_detection("knife", 0.7, [250, 400, 290, 440]))
+    return detections
+
+
+def assert_matches(decoded: list, expected: list, quantum: float, confidence_step: float):
+    """Every expected object is decoded with the same class, within the quantization bounds"""
+    assert len(decoded) == len(expected), f"{len(decoded)} decoded, {len(expected)} expected"
+    for det in expected:
+        same_class = [d for d in decoded if d["class_name"] == det["class_name"]]
+        assert len(same_class) == 1, f"{det['class_name']} decoded {len(same_class)} times"
+        got = same_class[0]
+        for edge in ("x1", "y1", "x2", "y2"):
+            error = abs(got["bbox"][edge] - det["bbox"][edge])
+            assert error < quantum, f"{det['class_name']} {edge} off by {error:.2f}"
+        assert abs(got["confidence"] - det["confidence"]) < confidence_step
+
+
+def test_round_trip():
+    """Decoded boxes stay within the quantum of the real ones; added / removed objects follow"""
+    print("🧪 Testing delta round trip...")
+    rng = random.Random(7)
+    encoder = DeltaEncoder(snapshot_interval=30, quantum=4.0, confidence_step=0.05)
+    decoder = DeltaDecoder()
+
+    deltas = 0
+    for frame_index in range(60):
+        expected = scene(frame_index, rng)
+        message = encoder.encode(expected)
+        deltas += "objects" not in message
+        decoded = decoder.apply(message)
+        assert decoded is not None, f"decoder out of sync at frame {frame_index}"
+        assert_matches(decoded, expected, encoder.quantum, encoder.confidence_step)
+        if frame_index == 20:
+            assert [obj[1] for obj in message["add"]] == ["knife"]
+        if frame_index == 40:
+            assert len(message["del"]) == 1
+    assert deltas == 58  # Snapshots at frames 0 and 30 only
+    print(f"✅ 60 frames decoded within bounds ({deltas} deltas)")
+
+
+def test_gap_and_resync():
+    """A missed message makes the decoder wait; a requested or periodic snapshot resyncs it"""
+    print("🧪 Testing gap and resync...")
+    rng = random.Random(11)
+    encoder = DeltaEncoder(snapshot_interval=10)
+    decoder = DeltaDecoder()
+
+    for frame_index in range(3):
+        decoder.apply(encoder.encode(scene(frame_index, rng)))
+    encoder.encode(scene(3, rng))  # Lost on the way
+    assert decoder.apply(encoder.encode(scene(4, rng))) is None
+    assert decoder.gaps == 1 and not decoder.synced
+
+    encoder.request_snapshot()  # Client sent {"resync": true}
+    expected = scene(5, rng)
+    message = encoder.encode(expected)
+    assert "objects" in message
+    assert_matches(decoder.apply(message), expected, encoder.quantum, encoder.confidence_step)
+
+    # Without a resync request the periodic snapshot (keyframe) recovers
+    encoder.encode(scene(6, rng))  # Lost
+    frame_index = 7
+    while True:
+        expected = scene(frame_index, rng)
+        message = encoder.encode(expected)
+        decoded = decoder.apply(message)
+        if "objects" in message:
+            break
+        assert decoded is None, "decoder applied a delta after a gap"
+        frame_index += 1
+    assert frame_index == 15 and decoder.synced
+    assert_matches(decoded, expected, encoder.quantum, encoder.confidence_step)
+    print("✅ Decoder resynced by requested and periodic snapshots")
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_gap_and_resync()
@@ -0,0 +1,116 @@
+"""
+Test script for edge event ingest (validation, deduplication, incident feed); the alert pool is a fake
+
+Run from backend/: python test_edge_ingest.py
+"""
+import base64
+import time
+
+import cv2
+import numpy as np
+
+from app.schemas.edge import EdgeEvent
+from app.services.edge_ingest import STATUS_ACCEPTED, STATUS_DUPLICATE, STATUS_REJECTED, EdgeIngestor
+from app.services.incidents import EVENT_CLOSE, EVENT_OPEN, IncidentAggregator
+
+
+class FakeSubmit:
+    """Records what would go to the alert pool"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, source, incident_events, frame=None, detections=None, location=None):
+        self.calls.append((source, incident_events, frame, detections, location))
+
+
+def make_event(event_id, timestamp, detections=None, **fields):
+    return EdgeEvent(
+        event_id=event_id, camera_id="gate_1", timestamp=timestamp,
+        frame_width=640, frame_height=480, detections=detections or [], **fields
+    )
+
+
+def gun(x1=100, y1=100, x2=200, y2=180, **fields):
+    return {"class_name": "gun", "confidence": 0.9, "bbox": {"x1": x1, "y1": y1, "x2": x2, "y2": y2}, **fields}
+
+
+def new_ingestor():
+    submit = FakeSubmit()
+    ingestor = EdgeIngestor(max_event_age=300, max_clock_skew=30,
+                            aggregator=IncidentAggregator(), submit=submit)
+    return ingestor, submit
+
+
+def test_validation():
+    """Stale, future, off-frame and undecodable events are rejected; boxes are clipped to the frame"""
+    print("🧪 Testing edge event validation...")
+    ingestor, submit = new_ingestor()
+    now = time.time()
+    results = ingestor.ingest([
+        make_event("old", now - 600, [gun()]),
+        make_event("future", now + 120, [gun()]),
+        make_event("outside", now, [gun(700, 500, 800, 600)]),
+        make_event("bad_snapshot", now, [gun()], snapshot="bm90IGFuIGltYWdl"),
+        make_event("bad_crop", now, [gun(crop="!!!")]),
+    ])
+    assert [r["status"] for r in results] == [STATUS_REJECTED] * 5
+    assert "older than 300s" in results[0]["error"] and "future" in results[1]["error"]
+    assert "outside the frame" in results[2]["error"]
+    assert results[3]["error"].startswith("snapshot:") and results[4]["error"].startswith("detections[0].crop:")
+    assert submit.calls == [] and ingestor.stats()["rejected"] == 5
+
+    # A box reaching past the frame edge is clipped, and the crop is pasted on the evidence canvas
+    ok, jpeg = cv2.imencode(".jpg", np.full((20, 20, 3), 200, np.uint8))
+    crop = base64.b64encode(jpeg.tobytes()).decode()
+    result = ingestor.ingest([make_event("clipped", now, [gun(600, -10, 700, 50, crop=crop)])])[0]
+    assert result["status"] == STATUS_ACCEPTED
+    assert [i["type"] for i in result["incidents"]] == [EVENT_OPEN]
+    source, incident_events, frame, detections, location = submit.calls[0]
+    assert source == "edge_gate_1" and location == "Edge camera gate_1"
+    bbox = detections[0].bbox
+    assert (bbox.x1, bbox.y1, bbox.x2, bbox.y2) == (600, 0, 640, 50)
+    assert frame.shape == (480, 640, 3) and frame[25, 620].min() > 150  # Crop pasted at its box
+    assert incident_events[0]["persons"] == []  # No person model run on a canvas of crops
+    print("✅ Invalid events rejected, boxes clipped")
+
+
+def test_duplicates_and_order():
+    """Retried events are acknowledged as duplicates; a batch is fed in timestamp order"""
+    print("🧪 Testing edge event deduplication...")
+    ingestor, submit = new_ingestor()
+    ingestor.dedupe_size = 2
+    now = time.time()
+
+    # Out of order in the batch: the detection (older) opens the incident before the heartbeat
+    batch = [make_event("e2", now - 1), make_event("e1", now - 2, [gun()])]
+    results = ingestor.ingest(batch)
+    assert [r["status"] for r in results] == [STATUS_ACCEPTED] * 2
+    assert [i["type"] for i in results[1]["incidents"]] == [EVENT_OPEN]
+    assert len(submit.calls) == 2
+
+    # Retry of the whole batch: nothing reaches the aggregator or the alert pool again
+    results = ingestor.ingest(batch)
+    assert [r["status"] for r in results] == [STATUS_DUPLICATE] * 2
+    assert len(submit.calls) == 2 and ingestor.stats()["duplicates"] == 2
+
+    # Rejected events are not remembered, so a corrected retry goes through
+    assert ingestor.ingest([make_event("e3", now, [gun(700, 500, 800, 600)])])[0]["status"] == STATUS_REJECTED
+    assert ingestor.ingest([make_event("e3", now)])[0]["status"] == STATUS_ACCEPTED
+
+    # Only the newest dedupe_size pairs are remembered
+    assert ingestor.ingest([make_event("e1", now, [gun()])])[0]["status"] == STATUS_ACCEPTED
+
+    stats = ingestor.stats()
+    assert stats["accepted"] == 4 and stats["detections"] == 2
+    assert stats["cameras"]["gate_1"]["events"] == 4 and stats["cameras"]["gate_1"]["device"] == "edge"
+
+    ingestor.close_cameras(["gate_1"])
+    source, incident_events = submit.calls[-1][:2]
+    assert source == "edge_gate_1" and [e["type"] for e in incident_events] == [EVENT_CLOSE]
+    print("✅ Retries deduplicated")
+
+
+if __name__ == "__main__":
+    test_validation()
+    test_duplicates_and_order()
@@ -0,0 +1,82 @@
+"""
+Test script for top-K evidence frame selection
+
+Run from backend/: python test_evidence.py
+"""
+import random
+
+import numpy as np
+
+from app.services import evidence
+from app.services.evidence import EvidenceSelector, evidence_score
+
+
+def det(label: str, confidence: float) -> dict:
+    return {"label": label, "confidence": confidence, "bbox": [0, 0, 10, 10]}
+
+
+def frame(value: int) -> np.ndarray:
+    return np.full((24, 32, 3), value, np.uint8)
+
+
+def test_score_prefers_clear_dangerous_weapons():
+    """One clear pistol outranks several faint knives"""
+    assert evidence_score([]) == 0.0
+    assert evidence_score([det("pistol", 0.9)]) > evidence_score([det("knife", 0.3)] * 3)
+    assert evidence_score([det("Handgun", 0.5)]) == evidence_score([det("pistol", 0.5)])  # Substring match
+
+
+def test_top_k_in_any_order():
+    """The K best frames are kept whatever the offer order; only kept frames are encoded"""
+    print("🧪 Testing top-K selection...")
+    encoded = []
+    imencode = evidence.cv2.imencode
+
+    def counting_imencode(*args, **kwargs):
+        encoded.append(1)
+        return imencode(*args, **kwargs)
+
+    evidence.cv2.imencode = counting_imencode
+    try:
+        rng = random.Random(3)
+        frames = [(i * 20, round(rng.uniform(0.3, 1.0), 3)) for i in range(100)]  # All further apart than the gap
+        rng.shuffle(frames)
+        selector = EvidenceSelector(k=3, min_gap_frames=15)
+        for index, confidence in frames:
+            selector.offer(index, frame(index % 256), [det("pistol", confidence)])
+    finally:
+        evidence.cv2.imencode = imencode
+
+    best = sorted(frames, key=lambda f: -f[1])[:3]
+    assert [item["frame_index"] for item in selector.items()] == [index for index, _ in best]
+    assert len(selector) == 3 and len(encoded) < 30
+    item = selector.items()[0]
+    assert abs(int(EvidenceSelector.decode(item).mean()) - item["frame_index"] % 256) <= 2
+    print(f"✅ Top 3 of 100 kept, {len(encoded)} frames encoded")
+
+
+def test_near_duplicates_keep_the_better_frame():
+    """Frames closer than min_gap_frames count as one moment"""
+    print("🧪 Testing the minimum gap...")
+    selector = EvidenceSelector(k=3, min_gap_frames=15)
+    selector.offer(100, frame(1), [det("pistol", 0.6)])
+    selector.offer(105, frame(2), [det("pistol", 0.9)])   # Replaces frame 100
+    selector.offer(110, frame(3), [det("pistol", 0.7)])   # Same moment, worse - rejected
+    selector.offer(300, frame(4), [det("knife", 0.5)])
+    selector.offer(500, frame(5), [det("knife", 0.4)])
+    assert not selector.offer(700, frame(6), [])           # No detections
+    assert [item["frame_index"] for item in selector.items()] == [105, 300, 500]
+
+    # Merging another selector (e.g. a chunk or a checkpoint) applies the same rules
+    other = EvidenceSelector(k=3, min_gap_frames=15)
+    other.offer(502, frame(7), [det("rifle", 0.8)])
+    other.offer(900, frame(8), [det("knife", 0.2)])
+    selector.offer_items(other.items())
+    assert [item["frame_index"] for item in selector.items()] == [105, 502, 300]
+    print("✅ Near-duplicates collapsed, merge keeps the best")
+
+
+if __name__ == "__main__":
+    test_score_prefers_clear_dangerous_weapons()
+    test_top_k_in_any_order()
+    test_near_duplicates_keep_the_better_frame()
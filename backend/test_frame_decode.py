@@ -0,0 +1,51 @@
+"""
+Test script for reduced-resolution JPEG decoding
+
+Run from backend/: python test_frame_decode.py
+"""
+import cv2
+import numpy as np
+
+from app.services.frame_decode import FrameDecoder, jpeg_size, reduction_factor
+
+
+def encode(width: int, height: int, ext: str = ".jpg") -> bytes:
+    frame = np.zeros((height, width, 3), np.uint8)
+    frame[:, width // 2:] = (0, 0, 255)  # Right half red
+    return cv2.imencode(ext, frame)[1].tobytes()
+
+
+def test_jpeg_size_and_factor():
+    """The size comes from the headers; the factor keeps the long side at or above the target"""
+    assert jpeg_size(encode(1920, 1080)) == (1920, 1080)
+    assert jpeg_size(encode(64, 48, ".png")) is None
+    assert jpeg_size(b"\xff\xd8\xff") is None
+    assert reduction_factor(1920, 1080, 640) == 2
+    assert reduction_factor(1080, 1920, 480) == 4
+    assert reduction_factor(5120, 2880, 640) == 8
+    assert reduction_factor(640, 480, 640) == 1
+
+
+def test_reduced_decode_and_scale():
+    """A 1080p JPEG decodes at half size and the scale maps boxes back"""
+    print("🧪 Testing reduced decode...")
+    data = encode(1920, 1080)
+    for backend in ("auto", "opencv"):
+        frame, scale = FrameDecoder(target_size=640, backend=backend).decode(data)
+        assert frame.shape == (540, 960, 3), frame.shape
+        assert scale == (2.0, 2.0)
+        assert frame[270, 700, 2] > 200 and frame[270, 200, 2] < 50  # Content kept its place
+
+    frame, scale = FrameDecoder(target_size=0).decode(data)  # Disabled
+    assert frame.shape == (1080, 1920, 3) and scale == (1.0, 1.0)
+
+    frame, scale = FrameDecoder(target_size=640).decode(encode(1920, 1080, ".png"))  # Not JPEG: full size
+    assert frame.shape == (1080, 1920, 3) and scale == (1.0, 1.0)
+
+    assert FrameDecoder().decode(b"not an image") == (None, (1.0, 1.0))
+    print("✅ Decoded at 960x540, scale 2")
+
+
+if __name__ == "__main__":
+    test_jpeg_size_and_factor()
+    test_reduced_decode_and_scale()
@@ -0,0 +1,66 @@
+"""
+Test script for incident aggregation (open / escalate / close)
+
+Run from backend/: python test_incidents.py
+"""
+from app.services.incidents import EVENT_CLOSE, EVENT_ESCALATE, EVENT_OPEN, IncidentAggregator
+
+
+def det(label: str, confidence: float, bbox: list) -> dict:
+    return {"label": label, "confidence": confidence, "bbox": bbox}
+
+
+def kinds(events: list) -> list:
+    return [(e["type"], e["incident"]["label"]) for e in events]
+
+
+def test_open_escalate_close():
+    """Events only when an incident opens, gets more severe, or ends"""
+    print("🧪 Testing incident lifecycle...")
+    aggregator = IncidentAggregator(gap_seconds=10)
+
+    assert aggregator.update("cam_01", [], timestamp=0.0) == []
+    events = aggregator.update("cam_01", [det("pistol", 0.6, [100, 100, 150, 150])], timestamp=1.0)
+    assert kinds(events) == [(EVENT_OPEN, "pistol")] and events[0]["incident"]["level"] == "low"
+    incident_id = events[0]["incident"]["incident_id"]
+
+    assert aggregator.update("cam_01", [det("pistol", 0.6, [102, 100, 152, 150])], timestamp=2.0) == []
+
+    # A second pistol next to the first joins the incident and raises its severity
+    events = aggregator.update("cam_01", [det("pistol", 0.9, [102, 100, 152, 150]),
+                                          det("pistol", 0.9, [140, 100, 190, 150])], timestamp=3.0)
+    assert kinds(events) == [(EVENT_ESCALATE, "pistol")]
+    assert events[0]["incident"]["incident_id"] == incident_id and events[0]["incident"]["level"] == "high"
+    assert len(events[0]["detections"]) == 2
+
+    # Another class elsewhere is its own incident; the same box on another camera too
+    assert kinds(aggregator.update("cam_01", [det("knife", 0.8, [400, 400, 450, 450])], timestamp=4.0)) == \
+        [(EVENT_OPEN, "knife")]
+    assert kinds(aggregator.update("cam_02", [det("pistol", 0.6, [100, 100, 150, 150])], timestamp=4.0)) == \
+        [(EVENT_OPEN, "pistol")]
+    assert len(aggregator.open_incidents("cam_01")) == 2
+
+    # Nothing for longer than the gap: every idle incident closes with a summary (any camera's update sweeps)
+    assert aggregator.update("cam_01", [], timestamp=12.0) == []
+    events = aggregator.update("cam_01", [], timestamp=14.5)
+    assert sorted((e["incident"]["camera_id"],) + k for e, k in zip(events, kinds(events))) == \
+        [("cam_01", EVENT_CLOSE, "knife"), ("cam_01", EVENT_CLOSE, "pistol"), ("cam_02", EVENT_CLOSE, "pistol")]
+    pistol = next(e["incident"] for e in events if e["incident"]["incident_id"] == incident_id)
+    assert (pistol["frames"], pistol["detections"], pistol["max_objects"], pistol["tracks"]) == (3, 4, 2, 2)
+    assert pistol["duration_seconds"] == 2.0 and pistol["level"] == "high"
+    assert pistol["region"] == [100.0, 100.0, 190.0, 150.0]
+    print("✅ Opened, escalated and closed once each")
+
+
+def test_close_camera():
+    """A disconnected camera closes its open incidents right away"""
+    aggregator = IncidentAggregator(gap_seconds=10)
+    aggregator.update("client-1", [det("rifle", 0.7, [0, 0, 50, 50])], timestamp=0.0)
+    events = aggregator.close_camera("client-1", timestamp=1.0)
+    assert kinds(events) == [(EVENT_CLOSE, "rifle")]
+    assert aggregator.open_incidents() == [] and aggregator.close_camera("client-1") == []
+
+
+if __name__ == "__main__":
+    test_open_escalate_close()
+    test_close_camera()
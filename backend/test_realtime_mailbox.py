@@ -0,0 +1,64 @@
+"""
+Test script for the latest-frame mailboxes between WebSocket receive and inference
+
+Run from backend/: python test_realtime_mailbox.py
+"""
+import asyncio
+
+from app.api.endpoints.realtime import ChannelMailbox, LatestFrameMailbox
+
+
+def test_latest_frame_wins():
+    """Frames not picked up yet are replaced and counted as dropped"""
+    print("🧪 Testing latest-frame mailbox...")
+
+    async def scenario():
+        mailbox = LatestFrameMailbox()
+        for seq in range(5):
+            mailbox.put(seq)
+        assert await mailbox.get() == 4
+        assert (mailbox.received, mailbox.dropped) == (5, 4)
+
+        # A waiting consumer wakes up on the next put
+        waiter = asyncio.ensure_future(mailbox.get())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        mailbox.put(5)
+        assert await asyncio.wait_for(waiter, 1) == 5
+
+        # Close: a pending frame is still delivered, then None
+        mailbox.put(6)
+        mailbox.close()
+        assert await mailbox.get() == 6
+        assert await mailbox.get() is None
+
+    asyncio.run(scenario())
+    print("✅ Newest frame delivered, older ones dropped")
+
+
+def test_channel_mailbox_batches_newest_per_channel():
+    """get_all returns the newest frame of every channel; discard forgets a channel"""
+    print("🧪 Testing channel mailbox...")
+
+    async def scenario():
+        mailbox = ChannelMailbox()
+        mailbox.put(1, "cam1-a")
+        mailbox.put(2, "cam2-a")
+        mailbox.put(1, "cam1-b")
+        mailbox.put(3, "cam3-a")
+        mailbox.discard(3)
+        assert await mailbox.get_all() == {1: "cam1-b", 2: "cam2-a"}
+        assert mailbox.received == {1: 2, 2: 1} and mailbox.dropped == {1: 1}
+
+        waiter = asyncio.ensure_future(mailbox.get_all())
+        await asyncio.sleep(0)
+        mailbox.close()
+        assert await asyncio.wait_for(waiter, 1) is None
+
+    asyncio.run(scenario())
+    print("✅ One newest frame per channel")
+
+
+if __name__ == "__main__":
+    test_latest_frame_wins()
+    test_channel_mailbox_batches_newest_per_channel()
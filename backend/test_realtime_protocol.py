@@ -0,0 +1,77 @@
+"""
+Test script for the binary realtime WebSocket protocol
+
+Run from backend/: python test_realtime_protocol.py
+"""
+from app.services.realtime_protocol import (
+    CHANNEL, HEADER, MSG_CHANNEL_FRAME, MSG_DETECTIONS, MSG_FRAME, PROTOCOL_VERSION,
+    ProtocolError, decode_channel_frame, decode_frame, decode_response, encode_detections, encode_error,
+)
+
+
+def detection(label: str, confidence: float = 0.87) -> dict:
+    return {"class_name": label, "confidence": confidence, "bbox": {"x1": 10, "y1": 20, "x2": 110, "y2": 220}}
+
+
+def test_frame_messages():
+    """Client frames split into header and a zero-copy payload; bad messages are rejected"""
+    print("🧪 Testing frame decoding...")
+    payload = b"\xff\xd8jpeg bytes\xff\xd9"
+    header, image = decode_frame(HEADER.pack(PROTOCOL_VERSION, MSG_FRAME, 0, 42, 1234.5) + payload)
+    assert (header.seq, header.timestamp) == (42, 1234.5)
+    assert isinstance(image, memoryview) and bytes(image) == payload
+
+    header, channel, image = decode_channel_frame(
+        HEADER.pack(PROTOCOL_VERSION, MSG_CHANNEL_FRAME, 0, 7, 1.0) + CHANNEL.pack(513) + payload)
+    assert header.seq == 7 and channel == 513 and bytes(image) == payload
+
+    for message in (HEADER.pack(PROTOCOL_VERSION, MSG_FRAME, 0, 1, 0.0),              # No payload
+                    HEADER.pack(PROTOCOL_VERSION + 1, MSG_FRAME, 0, 1, 0.0) + payload,  # Other version
+                    HEADER.pack(PROTOCOL_VERSION, MSG_DETECTIONS, 0, 1, 0.0) + payload):
+        try:
+            decode_frame(message)
+        except ProtocolError:
+            continue
+        raise AssertionError("malformed frame accepted")
+    print("✅ Frames decoded")
+
+
+def test_detections_round_trip():
+    """Detections survive encode/decode, non-ASCII labels included"""
+    print("🧪 Testing detection round trip...")
+    detections = [detection("pistol"), detection("súng lục", 0.5), detection("刀", 1.0)]
+    message = encode_detections(9, 99.25, detections, processing_time=0.031, fps=14.26,
+                                frame_count=120, dropped_frames=3)
+    result = decode_response(message)
+    assert (result["seq"], result["timestamp"], result["frame_count"]) == (9, 99.25, 120)
+    assert result["total_weapons"] == 3 and result["dropped_frames"] == 3 and result["fps"] == 14.3
+    assert [d["class_name"] for d in result["detections"]] == ["pistol", "súng lục", "刀"]
+    assert result["detections"][0]["bbox"] == {"x1": 10, "y1": 20, "x2": 110, "y2": 220}
+    assert abs(result["detections"][0]["confidence"] - 0.87) < 1e-4
+
+    result = decode_response(encode_detections(1, 0.0, [detection("pistol")], 0.01, 10.0, 1, channel=4))
+    assert result["channel"] == 4 and result["detections"][0]["class_name"] == "pistol"
+    print("✅ Detections round-tripped")
+
+
+def test_long_label_cut_at_character_boundary():
+    """A label over 255 bytes is shortened without splitting a multi-byte character"""
+    label = "đ" * 200  # 400 bytes, 2 per character; byte 255 falls inside a character
+    result = decode_response(encode_detections(1, 0.0, [detection(label), detection("knife")], 0.01, 10.0, 1))
+    assert result["detections"][0]["class_name"] == "đ" * 127
+    assert result["detections"][1]["class_name"] == "knife"  # Following detection still aligned
+
+
+def test_error_messages():
+    """Errors carry a UTF-8 message, with or without a channel"""
+    result = decode_response(encode_error(5, 2.0, "Không giải mã được ảnh"))
+    assert result["error"] == "Không giải mã được ảnh" and result["detections"] == []
+    result = decode_response(encode_error(5, 2.0, "bad frame", channel=2))
+    assert result["channel"] == 2 and result["error"] == "bad frame"
+
+
+if __name__ == "__main__":
+    test_frame_messages()
+    test_detections_round_trip()
+    test_long_label_cut_at_character_boundary()
+    test_error_messages()
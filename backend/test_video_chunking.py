@@ -0,0 +1,72 @@
+"""
+Test script for chunked video processing (chunk planning, keyframes, cleanup)
+
+Run from backend/: python test_video_chunking.py
+"""
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.services.video_chunking import plan_chunks, keyframes_from_packets, run_chunked
+
+
+def test_plan_chunks():
+    """Ranges cover every frame once, snap to keyframes and never come out empty"""
+    print("🧪 Testing chunk planning...")
+    assert plan_chunks(100, 4) == [(0, 25), (25, 50), (50, 75), (75, 100)]
+    assert plan_chunks(100, 4, keyframes=[0, 30, 48, 80]) == [(0, 30), (30, 48), (48, 80), (80, 100)]
+    assert plan_chunks(3, 8) == [(0, 1), (1, 2), (2, 3)]
+    # Sparse keyframes: chunks merge rather than coming out empty
+    assert plan_chunks(100, 4, keyframes=[0, 90]) == [(0, 90), (90, 100)]
+
+    for total, workers in ((1, 1), (7, 3), (1000, 6)):
+        chunks = plan_chunks(total, workers)
+        assert chunks[0][0] == 0 and chunks[-1][1] == total
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+        assert all(start < end for start, end in chunks)
+    print("✅ Chunks cover the video")
+
+
+def test_keyframes_in_display_order():
+    """With B-frames (decode order != display order) keyframes are ranked by pts"""
+    print("🧪 Testing keyframe indices from packets...")
+    # Display order I0 B1 B2 P3 | I4 B5 P6, decode order I0 P3 B1 B2 I4 P6 B5
+    packets = "\n".join([
+        "pts=0|flags=K__", "pts=3072|flags=___", "pts=1024|flags=___", "pts=2048|flags=___",
+        "pts=4096|flags=K__", "pts=6144|flags=___", "pts=5120|flags=___",
+    ])
+    assert keyframes_from_packets(packets) == [0, 4]
+    # Decode order would put the second keyframe at 4 too, so check a case where it differs
+    packets = "\n".join(["pts=0|flags=K__", "pts=2048|flags=___", "pts=1024|flags=___", "pts=3072|flags=K__"])
+    assert keyframes_from_packets(packets) == [0, 3]
+    # No pts: decode order is all there is
+    assert keyframes_from_packets("pts=N/A|flags=K__\npts=N/A|flags=___\npts=N/A|flags=K__") == [0, 2]
+    print("✅ Keyframes at their display index")
+
+
+def test_failed_chunk_leaves_no_files():
+    """A worker that fails (here: missing model) raises and its partial chunk files are removed"""
+    print("🧪 Testing chunk cleanup on failure...")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = os.path.join(tmp, "in.avi")
+        writer = cv2.VideoWriter(input_path, cv2.VideoWriter_fourcc(*"MJPG"), 10, (64, 48))
+        for i in range(20):
+            writer.write(np.full((48, 64, 3), i, np.uint8))
+        writer.release()
+
+        try:
+            run_chunked(input_path, os.path.join(tmp, "out.mp4"), os.path.join(tmp, "missing.pt"), 0.5, 2)
+        except Exception as e:
+            print(f"   raised {type(e).__name__}")
+        else:
+            raise AssertionError("run_chunked did not raise")
+        assert sorted(os.listdir(tmp)) == ["in.avi"]
+    print("✅ No chunk files left")
+
+
+if __name__ == "__main__":
+    test_plan_chunks()
+    test_keyframes_in_display_order()
+    test_failed_chunk_leaves_no_files()
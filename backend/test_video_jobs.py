@@ -0,0 +1,148 @@
+"""
+Test script for background video jobs (process_video and MongoDB replaced by stubs)
+
+Run from backend/: python test_video_jobs.py
+"""
+import os
+import tempfile
+import threading
+import time
+
+from app.services import video_jobs
+from app.services.video_jobs import VideoJobManager, COMPLETED, CANCELLED, QUEUED
+from app.services.video_processing import VideoProcessingCancelled
+
+
+class FakeJobsCollection:
+    """video_jobs collection: upsert by job_id, find by state"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["job_id"], {}).update(update["$set"])
+
+    def find_one(self, query):
+        return self.docs.get(query["job_id"])
+
+    def find(self, query):
+        states = query["state"]["$in"]
+        docs = [dict(doc) for doc in self.docs.values() if doc["state"] in states]
+
+        class Cursor(list):
+            def sort(self, key, direction):
+                return sorted(self, key=lambda d: d[key], reverse=direction < 0)
+        return Cursor(docs)
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.video_jobs = FakeJobsCollection()
+
+
+def wait_for(predicate, timeout: float = 5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def setup(process_video):
+    database = FakeDatabase()
+    video_jobs.get_sync_database = lambda: database
+    video_jobs.process_video = process_video
+    return database
+
+
+def make_input(tmp: str) -> str:
+    path = os.path.join(tmp, "input.mp4")
+    with open(path, "wb") as f:
+        f.write(b"video")
+    return path
+
+
+def test_job_runs_with_progress():
+    """A job goes queued -> completed with progress, result and its input file removed"""
+    print("🧪 Testing job progress...")
+
+    def process_video(*args, on_progress=None, **kwargs):
+        for done in range(1, 101):
+            on_progress(done, 100)
+        return {"frame_count": 100}
+
+    setup(process_video)
+    manager = VideoJobManager(num_workers=1, persist_interval=0.0)
+    manager.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = make_input(tmp)
+        job = manager.submit(input_path, os.path.join(tmp, "out.mp4"), "out.mp4", "user1")
+        assert job["state"] == QUEUED and "input_path" not in job
+        assert wait_for(lambda: manager.get(job["job_id"])["state"] == COMPLETED)
+
+        job = manager.get(job["job_id"])
+        print(f"   {job['state']} {job['progress_percent']}% {job['frames_done']}/{job['total_frames']}")
+        assert job["progress_percent"] == 100.0 and job["frames_done"] == 100
+        assert job["result"] == {"frame_count": 100}
+        assert not os.path.exists(input_path)
+    manager.stop()
+    print("✅ Job completed with progress")
+
+
+def test_cancel_running_job():
+    """Cancelling a running job stops processing and marks it cancelled"""
+    print("🧪 Testing job cancel...")
+    started = threading.Event()
+
+    def process_video(*args, cancel_event=None, **kwargs):
+        started.set()
+        cancel_event.wait(5)
+        raise VideoProcessingCancelled("cancelled")
+
+    setup(process_video)
+    manager = VideoJobManager(num_workers=1)
+    manager.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        job = manager.submit(make_input(tmp), os.path.join(tmp, "out.mp4"), "out.mp4", "user1")
+        assert started.wait(5)
+        assert manager.cancel(job["job_id"])
+        assert wait_for(lambda: manager.get(job["job_id"])["state"] == CANCELLED)
+        assert not manager.cancel(job["job_id"])  # No longer active
+    manager.stop()
+    print("✅ Running job cancelled")
+
+
+def test_interrupted_job_is_recovered():
+    """A job interrupted by shutdown stays queued in MongoDB and runs after the next start"""
+    print("🧪 Testing job recovery after restart...")
+    runs = []
+
+    def process_video(*args, cancel_event=None, **kwargs):
+        runs.append(kwargs["checkpoint_dir"])
+        if len(runs) == 1:
+            cancel_event.wait(5)  # First run: interrupted by stop()
+            raise VideoProcessingCancelled("stopped")
+        return {"frame_count": 1}
+
+    database = setup(process_video)
+    manager = VideoJobManager(num_workers=1)
+    manager.start()
+    with tempfile.TemporaryDirectory() as tmp:
+        job = manager.submit(make_input(tmp), os.path.join(tmp, "out.mp4"), "out.mp4", "user1")
+        assert wait_for(lambda: runs)
+        manager.stop()
+        assert database.video_jobs.docs[job["job_id"]]["state"] == QUEUED
+
+        restarted = VideoJobManager(num_workers=1)
+        restarted.start()
+        assert wait_for(lambda: restarted.get(job["job_id"])["state"] == COMPLETED)
+        assert runs[0] == runs[1]  # Same checkpoint directory: the job resumes
+        restarted.stop()
+    print("✅ Interrupted job recovered and completed")
+
+
+if __name__ == "__main__":
+    test_job_runs_with_progress()
+    test_cancel_running_job()
+    test_interrupted_job_is_recovered()
@@ -0,0 +1,135 @@
+"""
+Test script for the staged video pipeline (no model needed - inference is a stub)
+
+Run from backend/: python test_video_pipeline.py
+"""
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from app.services.video_pipeline import VideoPipeline
+
+
+def write_test_video(path: str, frames: int, fps: float, size=(64, 48)) -> str:
+    """MJPG video whose frame i has brightness 4 * i (frame identity survives compression)"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), min(255, 4 * i), np.uint8))
+    writer.release()
+    return path
+
+
+def count_frames(path: str) -> int:
+    cap = cv2.VideoCapture(path)
+    count = 0
+    while cap.grab():
+        count += 1
+    cap.release()
+    return count
+
+
+def test_stages_keep_frame_order():
+    """Every frame reaches the hooks once, in order, with its own detections, and is encoded"""
+    print("🧪 Testing pipeline frame order...")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = write_test_video(os.path.join(tmp, "in.avi"), 40, 10)
+        batches = []
+
+        def infer(frames):
+            batches.append(len(frames))
+            return [[{"label": "pistol", "confidence": 0.9, "bbox": [1, 1, 10, 10], "mean": float(f.mean())}]
+                    for f in frames]
+
+        seen = []
+        pipeline = VideoPipeline(infer, batch_size=4, queue_size=2,
+                                 on_detections=lambda i, frame, dets: seen.append((i, frame.mean(), dets[0]["mean"])))
+        result = pipeline.run(input_path, os.path.join(tmp, "out.avi"))
+
+        print(f"   batches {batches}, stages {result['stages']}")
+        assert [i for i, _, _ in seen] == list(range(1, 41))
+        assert all(abs(frame_mean - det_mean) < 1e-6 for _, frame_mean, det_mean in seen)
+        assert max(batches) <= 4 and sum(batches) == 40
+        assert result["frame_count"] == 40 and result["frames_inferred"] == 40
+        assert count_frames(os.path.join(tmp, "out.avi")) == 40
+    print("✅ 40 frames in order, batched, encoded")
+
+
+def test_stage_error_is_raised():
+    """An exception inside a stage stops the pipeline and is re-raised by run()"""
+    print("🧪 Testing pipeline error propagation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = write_test_video(os.path.join(tmp, "in.avi"), 20, 10)
+
+        def infer(frames):
+            raise ValueError("model exploded")
+
+        try:
+            VideoPipeline(infer).run(input_path, os.path.join(tmp, "out.avi"))
+        except ValueError as e:
+            assert str(e) == "model exploded"
+        else:
+            raise AssertionError("run() did not raise")
+    print("✅ Stage error re-raised")
+
+
+def test_decimation_to_output_fps():
+    """A 60 fps video capped at 30 fps keeps every other frame; output plays at real speed"""
+    print("🧪 Testing frame decimation...")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = write_test_video(os.path.join(tmp, "in.avi"), 60, 60)
+        seen = []
+        pipeline = VideoPipeline(lambda frames: [[] for _ in frames], max_output_fps=30,
+                                 on_detections=lambda i, frame, dets: seen.append(i))
+        result = pipeline.run(input_path, os.path.join(tmp, "out.avi"))
+
+        assert seen == list(range(1, 61, 2))
+        assert result["frames_read"] == 60 and result["frames_skipped"] == 30
+        assert result["frame_count"] == 30 and result["output_fps"] == 30
+        assert count_frames(os.path.join(tmp, "out.avi")) == 30
+
+        # Non-integer ratio (25 -> 10 fps): kept frames follow the output timestamps
+        input_path = write_test_video(os.path.join(tmp, "in25.avi"), 50, 25)
+        seen.clear()
+        pipeline.max_output_fps = 10
+        pipeline.run(input_path)
+        assert seen == [1, 4, 6, 9, 11, 14, 16, 19, 21, 24, 26, 29, 31, 34, 36, 39, 41, 44, 46, 49]
+
+        # Decimation off: every frame
+        seen.clear()
+        VideoPipeline(lambda frames: [[] for _ in frames], max_output_fps=30, decimate=False,
+                      on_detections=lambda i, frame, dets: seen.append(i)).run(input_path)
+        assert len(seen) == 50
+    print("✅ Frames decimated to the output fps")
+
+
+def test_infer_every_carries_boxes():
+    """infer_every=3 runs the model on every third kept frame, the others reuse its boxes"""
+    print("🧪 Testing infer-every-N carry-over...")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = write_test_video(os.path.join(tmp, "in.avi"), 30, 10)
+        inferred = []
+
+        def infer(frames):
+            inferred.extend(int(round(f.mean())) for f in frames)
+            return [[{"label": "pistol", "confidence": 0.9, "bbox": [0, 0, 5, 5], "source": int(round(f.mean()))}]
+                    for f in frames]
+
+        seen = {}
+        pipeline = VideoPipeline(infer, batch_size=2, infer_every=3,
+                                 on_detections=lambda i, frame, dets: seen.__setitem__(i, dets[0]["source"]))
+        result = pipeline.run(input_path)
+
+        assert len(inferred) == 10 and result["frames_inferred"] == 10 and result["frames_carried"] == 20
+        # Frame i carries the boxes of the last inferred frame (1, 4, 7, ...)
+        assert all(seen[i] == seen[i - (i - 1) % 3] for i in seen)
+        assert len(set(seen.values())) == 10
+    print("✅ Boxes carried over between inferred frames")
+
+
+if __name__ == "__main__":
+    test_stages_keep_frame_order()
+    test_stage_error_is_raised()
+    test_decimation_to_output_fps()
+    test_infer_every_carries_boxes()
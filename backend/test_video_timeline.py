@@ -0,0 +1,52 @@
+"""
+Test script for the JSONL detection timeline (output=timeline)
+
+Run from backend/: python test_video_timeline.py
+"""
+import json
+import os
+import tempfile
+
+from app.services.video_timeline import TimelineWriter
+
+
+def pistol(x: float) -> dict:
+    return {"label": "pistol", "confidence": 0.9, "bbox": [x, 100, x + 50, 150]}
+
+
+def test_only_changes_are_recorded():
+    """Carried-over frames write nothing, an empty record ends detections, tracks span the hits"""
+    print("🧪 Testing timeline records...")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "timeline.jsonl")
+        with TimelineWriter(path, fps=10.0, width=640, height=480, total_frames=30) as timeline:
+            for frame in range(1, 31):
+                if frame <= 10:
+                    detections = [pistol(100 + (frame - 1) // 2 * 5)]  # Moves every other frame
+                elif frame <= 20:
+                    detections = []
+                else:
+                    detections = [{"label": "knife", "confidence": 0.8, "bbox": [400, 300, 440, 340]}]
+                timeline.add(frame, detections)
+
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+    header, frames, summary = records[0], records[1:-1], records[-1]
+    print(f"   {len(frames)} frame records for 30 frames")
+    assert header["type"] == "header" and header["fps"] == 10.0 and header["total_frames"] == 30
+    assert [r["frame"] for r in frames] == [1, 3, 5, 7, 9, 11, 21]
+    assert frames[1]["t"] == 0.2 and frames[1]["detections"][0]["bbox"] == [105.0, 100.0, 155.0, 150.0]
+    assert frames[5]["detections"] == []  # Detections end at frame 11
+    assert len({r["detections"][0]["track_id"] for r in frames[:5]}) == 1  # One pistol track
+
+    assert summary["type"] == "summary" and summary["frames_with_detections"] == 20
+    tracks = {t["label"]: t for t in summary["tracks"]}
+    assert (tracks["pistol"]["first_frame"], tracks["pistol"]["last_frame"]) == (1, 10)
+    assert (tracks["pistol"]["start_time"], tracks["pistol"]["end_time"]) == (0.0, 0.9)
+    assert tracks["knife"]["first_frame"] == 21 and tracks["knife"]["hits"] == 10
+    print("✅ Timeline holds only the changes")
+
+
+if __name__ == "__main__":
+    test_only_changes_are_recorded()
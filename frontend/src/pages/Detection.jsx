@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect } from 'react';
 import { Upload, Camera, Video, AlertTriangle, X, Loader2, Image as ImageIcon, Wifi, WifiOff, Play, Square, Edit3, Trash2 } from 'lucide-react';
 import { detectionAPI } from '../services/api';
+import { encodeFrame, decodeResponse } from '../services/realtimeProtocol';
 import toast from 'react-hot-toast';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api/v1';
@@ -39,6 +40,7 @@ export default function Detection() {
   const canvasRef = useRef(null);
   const streamRef = useRef(null);
   const wsRef = useRef(null);
+  const frameSeqRef = useRef(0);
   const frameIntervalRef = useRef(null);
   const animationFrameRef = useRef(null);
   const detectionDataRef = useRef(null);
@@ -427,6 +429,9 @@ export default function Detection() {
     }
     
     const wsConnection = new WebSocket(wsUrl);
+    // Binary protocol: raw JPEG + 16-byte header instead of base64 JSON
+    wsConnection.binaryType = 'arraybuffer';
+    frameSeqRef.current = 0;
     
     wsConnection.onopen = () => {
       console.log('WebSocket connected');
@@ -441,7 +446,7 @@ export default function Detection() {
     
     wsConnection.onmessage = (event) => {
       try {
-        const data = JSON.parse(event.data);
+        const data = typeof event.data === 'string' ? JSON.parse(event.data) : decodeResponse(event.data);
         
         console.log('📦 Received from backend:', {
           total_weapons: data.total_weapons,
@@ -541,12 +546,23 @@ export default function Detection() {
       ctx.drawImage(videoSource, 0, 0, canvas.width, canvas.height);
       
       // Lower quality to 0.5 for faster transfer (bbox responsiveness > image quality)
-      const frameData = canvas.toDataURL('image/jpeg', 0.5);
-      
-      wsConnection.send(JSON.stringify({ frame: frameData }));
-      
       // Ping-Pong: Mark as busy, don't send more until server responds
       isProcessingRef.current = true;
+      
+      canvas.toBlob(async (blob) => {
+        try {
+          if (!blob || wsConnection.readyState !== WebSocket.OPEN) {
+            isProcessingRef.current = false;
+            return;
+          }
+          const seq = frameSeqRef.current++;
+          wsConnection.send(encodeFrame(seq, performance.now(), await blob.arrayBuffer()));
+        } catch (error) {
+          console.error('❌ Send frame error:', error);
+          isProcessingRef.current = false;
+          requestAnimationFrame(() => sendFrame(wsConnection));
+        }
+      }, 'image/jpeg', 0.5);
     } catch (error) {
       console.error('❌ Send frame error:', error);
       isProcessingRef.current = false;
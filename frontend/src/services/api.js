@@ -66,6 +66,20 @@ export const detectionAPI = {
         });
         return response.data;
     },
+    submitVideoJob: async(formData) => {
+        const response = await api.post('/detection/jobs', formData, {
+            headers: { 'Content-Type': 'multipart/form-data' },
+        });
+        return response.data;
+    },
+    getVideoJob: (jobId) => api.get(`/detection/jobs/${jobId}`),
+    cancelVideoJob: (jobId) => api.delete(`/detection/jobs/${jobId}`),
+    videoJobEvents: (jobId) => new EventSource(`${API_BASE_URL}/detection/jobs/${jobId}/events`),
+    // JSONL detection index from output=timeline: one JSON record per line
+    getVideoTimeline: async(timelineUrl) => {
+        const response = await api.get(timelineUrl.replace(/^\/api\/v1/, ''), { responseType: 'text' });
+        return response.data.split('\n').filter(Boolean).map((line) => JSON.parse(line));
+    },
     getModels: () => api.get('/detection/models'),
 };
 
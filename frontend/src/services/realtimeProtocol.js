@@ -0,0 +1,127 @@
+// Binary WebSocket protocol for /ws/realtime-detect and /ws/realtime-session
+// Mirrors backend/app/services/realtime_protocol.py
+//
+// Header (16 bytes, little-endian): version u8, type u8, flags u16, seq u32, timestamp f64
+// Multiplexed session messages (MSG_CHANNEL_*) carry a channel u16 right after the header
+
+export const PROTOCOL_VERSION = 1;
+
+export const MSG_FRAME = 1;
+export const MSG_DETECTIONS = 2;
+export const MSG_ERROR = 3;
+export const MSG_CHANNEL_FRAME = 4;
+export const MSG_CHANNEL_DETECTIONS = 5;
+export const MSG_CHANNEL_ERROR = 6;
+
+export const FLAG_WEBP = 0x0001;
+
+const HEADER_SIZE = 16;
+const CHANNEL_SIZE = 2;
+const SUMMARY_SIZE = 16;
+const DETECTION_SIZE = 11;
+
+const textDecoder = new TextDecoder();
+
+/**
+ * Build a frame message from encoded image bytes
+ * @param {number} seq - Frame sequence number (echoed by the server)
+ * @param {number} timestamp - Client timestamp, e.g. performance.now() (echoed by the server)
+ * @param {ArrayBuffer} image - JPEG or WebP bytes
+ * @param {number} flags - FLAG_* bits
+ * @returns {ArrayBuffer}
+ */
+export const encodeFrame = (seq, timestamp, image, flags = 0) => {
+    const buffer = new ArrayBuffer(HEADER_SIZE + image.byteLength);
+    const view = new DataView(buffer);
+    view.setUint8(0, PROTOCOL_VERSION);
+    view.setUint8(1, MSG_FRAME);
+    view.setUint16(2, flags, true);
+    view.setUint32(4, seq >>> 0, true);
+    view.setFloat64(8, timestamp, true);
+    new Uint8Array(buffer, HEADER_SIZE).set(new Uint8Array(image));
+    return buffer;
+};
+
+/**
+ * Build a frame message for one channel of a multiplexed session
+ * @param {number} channel - Channel number from the session's "opened" reply
+ * @param {number} seq - Frame sequence number (echoed by the server)
+ * @param {number} timestamp - Client timestamp (echoed by the server)
+ * @param {ArrayBuffer} image - JPEG or WebP bytes
+ * @param {number} flags - FLAG_* bits
+ * @returns {ArrayBuffer}
+ */
+export const encodeChannelFrame = (channel, seq, timestamp, image, flags = 0) => {
+    const buffer = new ArrayBuffer(HEADER_SIZE + CHANNEL_SIZE + image.byteLength);
+    const view = new DataView(buffer);
+    view.setUint8(0, PROTOCOL_VERSION);
+    view.setUint8(1, MSG_CHANNEL_FRAME);
+    view.setUint16(2, flags, true);
+    view.setUint32(4, seq >>> 0, true);
+    view.setFloat64(8, timestamp, true);
+    view.setUint16(HEADER_SIZE, channel, true);
+    new Uint8Array(buffer, HEADER_SIZE + CHANNEL_SIZE).set(new Uint8Array(image));
+    return buffer;
+};
+
+/**
+ * Decode a binary server response
+ * @param {ArrayBuffer} buffer
+ * @returns {Object} Same shape as the JSON response plus seq and timestamp (and channel)
+ */
+export const decodeResponse = (buffer) => {
+    const view = new DataView(buffer);
+    const type = view.getUint8(1);
+    const result = {
+        seq: view.getUint32(4, true),
+        timestamp: view.getFloat64(8, true),
+    };
+
+    let offset = HEADER_SIZE;
+    if (type === MSG_CHANNEL_DETECTIONS || type === MSG_CHANNEL_ERROR) {
+        result.channel = view.getUint16(offset, true);
+        offset += CHANNEL_SIZE;
+    }
+
+    if (type === MSG_ERROR || type === MSG_CHANNEL_ERROR) {
+        return {
+            ...result,
+            error: textDecoder.decode(new Uint8Array(buffer, offset)),
+            detections: [],
+            total_weapons: 0,
+        };
+    }
+
+    const frameCount = view.getUint32(offset, true);
+    const processingTime = view.getFloat32(offset + 4, true);
+    const fps = view.getUint16(offset + 8, true) / 10;
+    const count = view.getUint16(offset + 10, true);
+    const droppedFrames = view.getUint32(offset + 12, true);
+    offset += SUMMARY_SIZE;
+
+    const detections = [];
+    for (let i = 0; i < count; i++) {
+        const labelLength = view.getUint8(offset + 10);
+        detections.push({
+            class_name: textDecoder.decode(new Uint8Array(buffer, offset + DETECTION_SIZE, labelLength)),
+            confidence: view.getUint16(offset + 8, true) / 65535,
+            bbox: {
+                x1: view.getUint16(offset, true),
+                y1: view.getUint16(offset + 2, true),
+                x2: view.getUint16(offset + 4, true),
+                y2: view.getUint16(offset + 6, true),
+            },
+        });
+        offset += DETECTION_SIZE + labelLength;
+    }
+
+    return {
+        ...result,
+        detections,
+        processing_time: processingTime,
+        total_weapons: count,
+        fps,
+        frame_count: frameCount,
+        dropped_frames: droppedFrames,
+    };
+};
@@ -10,8 +10,16 @@ def main():
     parser.add_argument('--source', required=True, help='Path to image or video file')
     parser.add_argument('--model', help='Path to custom model')
     parser.add_argument('--save-dir', help='Directory to save results')
-    parser.add_argument('--mode', choices=['image', 'video', 'realtime'], 
+    parser.add_argument('--mode', choices=['image', 'video', 'scan', 'realtime'], 
                        default='image', help='Detection mode')
+    parser.add_argument('--batch-size', type=int, default=4,
+                       help='Frames per inference batch in video mode')
+    parser.add_argument('--infer-every', type=int, default=1,
+                       help='Run inference on every Nth output frame, reusing boxes in between')
+    parser.add_argument('--scan-interval', type=float, default=2.0,
+                       help='Seconds between coarse samples in scan mode')
+    parser.add_argument('--scan-sampling', choices=['interval', 'keyframes'], default='interval',
+                       help='Sample at a fixed interval or at keyframes in scan mode')
     args = parser.parse_args()
     
     try:
@@ -27,10 +35,20 @@ def main():
         elif args.mode == 'video':
             save_path = detector.detect_video(
                 args.source, 
-                args.save_dir
+                args.save_dir,
+                batch_size=args.batch_size,
+                infer_every=args.infer_every
             )
             logger.info(f"Processed video saved to: {save_path}")
             
+        elif args.mode == 'scan':
+            hits = detector.scan_video(
+                args.source,
+                interval_seconds=args.scan_interval,
+                sampling=args.scan_sampling
+            )
+            logger.info(f"Found {len(hits)} interval(s) with weapons")
+            
         elif args.mode == 'realtime':
             detector.realtime_detect()
             
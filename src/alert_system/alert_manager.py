@@ -1,5 +1,4 @@
 import cv2
-import time
 import threading
 import queue
 from datetime import datetime
@@ -7,13 +6,18 @@ from datetime import datetime
 from .danger_evaluator import get_danger_level
 from .notifier import save_snapshot, send_telegram_alert
 from src.database.mongo_client import save_alert
+# Incident grouping is shared with the backend
+from backend.app.services.incidents import IncidentAggregator, EVENT_CLOSE
 
 # =========================================
 # FAST ASYNC ALERT SYSTEM
 # =========================================
 alert_queue = queue.Queue(maxsize=100)
-_last_alert_time = {}
-COOLDOWN = 2  # giây, chỉ để tránh spam cùng loại hung khí
+INCIDENT_GAP = 10  # giây không thấy hung khí thì sự cố được đóng
+# Gom phát hiện thành sự cố (loại hung khí + vị trí + thời gian):
+# chỉ cảnh báo khi sự cố mở hoặc tăng mức độ
+incident_aggregator = IncidentAggregator(gap_seconds=INCIDENT_GAP)
+DASHBOARD_CAMERA = "dashboard"
 RUNNING = True
 
 
@@ -77,33 +81,46 @@ def start_alert_worker():
 
 
 # =========== MAIN TRIGGER ===========
-def trigger_alert(frame, weapon_class, conf, distance, status, person_box=None, weapon_box=None):
+def trigger_alerts(frame, weapons):
     """
-    Thêm frame vào hàng đợi xử lý cảnh báo (gần như tức thời).
+    Cập nhật sự cố với toàn bộ hung khí của một frame và đưa cảnh báo vào hàng đợi (gần như tức thời).
+    Gọi một lần cho mỗi frame, kể cả khi không có hung khí (để đóng các sự cố đã hết).
     
     Args:
         frame: Frame ảnh hiện tại
-        weapon_class: Loại vũ khí được phát hiện
-        conf: Độ tin cậy của detection
-        distance: Khoảng cách đến vũ khí (nếu có)
-        status: Trạng thái nguy hiểm (ví dụ: "Có người")
-        person_box: Bounding box của người [x1, y1, x2, y2] (nếu có)
-        weapon_box: Bounding box của vũ khí [x1, y1, x2, y2] (nếu có)
+        weapons: Danh sách dict của các hung khí trong frame:
+            weapon_class: Loại vũ khí được phát hiện
+            conf: Độ tin cậy của detection
+            distance: Khoảng cách đến vũ khí (nếu có)
+            status: Trạng thái nguy hiểm (ví dụ: "Held by Person")
+            person_box: Bounding box của người [x1, y1, x2, y2] (nếu có)
+            weapon_box: Bounding box của vũ khí [x1, y1, x2, y2] (nếu có)
     """
-    now = time.time()
-    global _last_alert_time
-
-    # Chặn spam cùng loại hung khí trong 2s
-    if weapon_class in _last_alert_time and now - _last_alert_time[weapon_class] < COOLDOWN:
-        return
+    h, w = frame.shape[:2]
+    detections = [
+        {**weapon, "label": weapon["weapon_class"], "confidence": weapon["conf"],
+         "bbox": weapon.get("weapon_box") or [0, 0, w, h]}
+        for weapon in weapons
+    ]
+
+    # Chỉ cảnh báo khi sự cố mới mở hoặc tăng mức độ (thay cho cooldown theo loại hung khí)
+    events = incident_aggregator.update(DASHBOARD_CAMERA, detections)
+    for event in events:
+        if event["type"] == EVENT_CLOSE:
+            incident = event["incident"]
+            print(f"[SỰ CỐ ĐÓNG] {incident['label']} - {incident['duration_seconds']}s, "
+                  f"{incident['frames']} lần phát hiện, mức {incident['level']}")
+            continue
 
-    _last_alert_time[weapon_class] = now
+        # Một cảnh báo cho mỗi sự cố, với hung khí rõ nhất của sự cố trong frame này
+        det = max(event["detections"], key=lambda d: d["confidence"])
 
-    # Đẩy frame vào queue (nếu đầy, bỏ frame cũ)
-    if alert_queue.full():
-        try:
-            alert_queue.get_nowait()
-        except queue.Empty:
-            pass
+        # Đẩy frame vào queue (nếu đầy, bỏ frame cũ)
+        if alert_queue.full():
+            try:
+                alert_queue.get_nowait()
+            except queue.Empty:
+                pass
 
-    alert_queue.put_nowait((frame.copy(), weapon_class, conf, distance, status, person_box, weapon_box))
+        alert_queue.put_nowait((frame.copy(), det["label"], det["confidence"], det.get("distance"),
+                                det.get("status"), det.get("person_box"), det["bbox"]))
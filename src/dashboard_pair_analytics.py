@@ -16,7 +16,7 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
-from src.alert_system.alert_manager import trigger_alert, start_alert_worker
+from src.alert_system.alert_manager import trigger_alerts, start_alert_worker
 from src.database.mongo_client import get_recent_alerts
 
 
@@ -137,6 +137,7 @@ with tab1:
                     cv2.putText(annotated, "Person", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
 
                 # Vẽ vũ khí và liên kết
+                frame_weapons = []
                 for wbox, wcls, conf in weapon_boxes:
                     wx1, wy1, wx2, wy2 = map(int, wbox)
                     wcx, wcy = (wx1 + wx2) // 2, (wy1 + wy2) // 2
@@ -162,12 +163,15 @@ with tab1:
                         pcx, pcy = (px1 + px2) // 2, (py1 + py2) // 2
                         cv2.line(annotated, (wcx, wcy), (pcx, pcy), (255, 255, 0), 2)
                         status = "Held by Person"
-                        # --- Trigger alert system with bounding boxes ---
+                        # --- Collect the frame's weapons for the alert system ---
                     try:
                         # Chuẩn bị bounding boxes cho alert
                         person_box = list(map(int, nearest_person)) if nearest_person else None
                         weapon_box = [wx1, wy1, wx2, wy2]
-                        trigger_alert(frame, weapon_name, conf, min_dist / 100, status, person_box, weapon_box)
+                        frame_weapons.append({
+                            "weapon_class": weapon_name, "conf": conf, "distance": min_dist / 100,
+                            "status": status, "person_box": person_box, "weapon_box": weapon_box,
+                        })
                     except Exception as e:
                         print(f"[ALERT ERROR] {e}")
                         cv2.putText(
@@ -201,6 +205,12 @@ with tab1:
                             status
                         ])
 
+                # --- Trigger alert system: one incident update per frame (also without weapons) ---
+                try:
+                    trigger_alerts(frame, frame_weapons)
+                except Exception as e:
+                    print(f"[ALERT ERROR] {e}")
+
                 # Update the displayed video frame
                 stframe.image(annotated, channels="BGR", use_container_width=True)
 
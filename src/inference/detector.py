@@ -1,4 +1,5 @@
 from typing import Optional, List, Tuple
+import sys
 import cv2
 import torch
 import numpy as np
@@ -8,6 +9,14 @@ from ..models.utils import load_model
 from ..utils.logging import setup_logger
 from config.config import MODEL_CONFIG
 
+# The video pipeline lives in the backend so the API and the CLI share one engine
+_backend_dir = str(Path(__file__).resolve().parents[2] / "backend")
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+
+from app.services.video_pipeline import VideoPipeline, yolo_batch_infer
+from app.services.video_scan import VideoScanner
+
 logger = setup_logger('detector')
 
 class WeaponDetector:
@@ -16,6 +25,7 @@ class WeaponDetector:
         self.model_path = model_path or MODEL_CONFIG['best_model']
         self.model = load_model(self.model_path)
         self.conf_threshold = MODEL_CONFIG['conf_threshold']
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
         logger.info(f"Initialized WeaponDetector with model: {self.model_path}")
     
     def detect_image(self, image_path: str, save_dir: Optional[str] = None) -> Tuple[np.ndarray, List]:
@@ -45,8 +55,9 @@ class WeaponDetector:
             logger.error(f"Error in detect_image: {str(e)}")
             raise
     
-    def detect_video(self, video_path: str, save_dir: Optional[str] = None) -> str:
-        """Detect weapons in video"""
+    def detect_video(self, video_path: str, save_dir: Optional[str] = None, batch_size: int = 4,
+                     infer_every: int = 1) -> str:
+        """Detect weapons in video using the staged decode/infer/annotate/encode pipeline"""
         try:
             if not Path(video_path).exists():
                 raise FileNotFoundError(f"Video not found: {video_path}")
@@ -56,21 +67,55 @@ class WeaponDetector:
                 Path(save_dir).mkdir(exist_ok=True)
                 save_path = str(Path(save_dir) / f"detected_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4")
             
-            results = self.model.predict(
-                source=video_path,
-                conf=self.conf_threshold,
-                save=True if save_path else False,
-                project=Path(save_dir) if save_dir else None,
-                name=Path(save_path).stem if save_path else None
+            pipeline = VideoPipeline(
+                yolo_batch_infer(self.model, self.conf_threshold, device=self.device),
+                batch_size=batch_size,
+                infer_every=infer_every
             )
+            result = pipeline.run(video_path, save_path)
             
-            logger.info(f"Processed video: {video_path}")
+            logger.info(
+                f"Processed video: {video_path} ({result['frame_count']} frames, "
+                f"{result['average_fps']:.1f} fps, {result['frames_skipped']} skipped, "
+                f"{result['frames_inferred']} inferred)"
+            )
+            for name, stage in result['stages'].items():
+                logger.info(f"  {name}: {stage['utilization']:.0%} busy ({stage['items']} items)")
             return save_path if save_path else ""
             
         except Exception as e:
             logger.error(f"Error in detect_video: {str(e)}")
             raise
     
+    def scan_video(self, video_path: str, interval_seconds: float = 2.0, sampling: str = "interval") -> List[dict]:
+        """Sparse scan of a long video, returns the intervals where weapons appear"""
+        try:
+            if not Path(video_path).exists():
+                raise FileNotFoundError(f"Video not found: {video_path}")
+            
+            scanner = VideoScanner(
+                yolo_batch_infer(self.model, self.conf_threshold, device=self.device),
+                interval_seconds=interval_seconds,
+                sampling=sampling
+            )
+            result = scanner.scan(video_path)
+            
+            logger.info(
+                f"Scanned video: {video_path} ({result['duration_seconds']}s, "
+                f"{result['frames_inferred']}/{result['total_frames']} frames inferred, "
+                f"{result['processing_time']:.1f}s)"
+            )
+            for hit in result['hits']:
+                logger.info(
+                    f"  {hit['start_time']:.2f}s - {hit['end_time']:.2f}s: "
+                    f"{', '.join(hit['labels'])} ({hit['max_confidence']:.0%})"
+                )
+            return result['hits']
+            
+        except Exception as e:
+            logger.error(f"Error in scan_video: {str(e)}")
+            raise
+    
     def realtime_detect(self, camera_id: int = 0) -> None:
         """Real-time weapon detection from camera"""
         try:
@@ -0,0 +1,69 @@
+"""
+Batch video detection - runs every video in a folder through the staged pipeline
+
+Usage:
+    python tools/batch_detect_videos.py --input videos/ --output runs/batch_videos --model best.pt
+"""
+import sys
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+import cv2
+from ultralytics import YOLO
+from app.services.video_pipeline import VideoPipeline, yolo_batch_infer, detect_grid_layout
+
+VIDEO_EXTENSIONS = {".mp4", ".avi", ".mov", ".mkv"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run weapon detection on a folder of videos")
+    parser.add_argument("--input", required=True, help="Folder with input videos")
+    parser.add_argument("--output", default="runs/batch_videos", help="Folder for annotated videos")
+    parser.add_argument("--model", default=str(PROJECT_ROOT / "runs/detect/weapons_yolov8_optimized_stable/weights/best.pt"))
+    parser.add_argument("--conf", type=float, default=0.55)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--infer-every", type=int, default=1, help="Infer every Nth output frame")
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    model = YOLO(args.model)
+
+    videos = sorted(p for p in Path(args.input).iterdir() if p.suffix.lower() in VIDEO_EXTENSIONS)
+    print(f"Found {len(videos)} video(s) in {args.input}")
+
+    for video in videos:
+        cap = cv2.VideoCapture(str(video))
+        grid = detect_grid_layout(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+
+        detections = {"frames_with_weapons": 0, "total_detections": 0}
+
+        def on_detections(frame_index, frame, dets):
+            if dets:
+                detections["frames_with_weapons"] += 1
+                detections["total_detections"] += len(dets)
+
+        pipeline = VideoPipeline(
+            yolo_batch_infer(model, args.conf, grid=grid, device=args.device),
+            batch_size=args.batch_size,
+            on_detections=on_detections,
+            infer_every=args.infer_every
+        )
+        result = pipeline.run(str(video), str(output_dir / f"{video.stem}_output.mp4"))
+
+        print(f"\n{video.name}: {result['frame_count']} frames in {result['processing_time']:.1f}s "
+              f"({result['average_fps']:.1f} fps)")
+        print(f"  {result['frames_skipped']} frames skipped (fps {result['fps']} -> {result['output_fps']}), "
+              f"{result['frames_inferred']} inferred, {result['frames_carried']} carried over")
+        print(f"  weapons in {detections['frames_with_weapons']} frames, "
+              f"{detections['total_detections']} detections")
+        for name, stage in result["stages"].items():
+            print(f"  {name:<9} {stage['utilization']:>6.0%} busy  ({stage['items']} items)")
+
+
+if __name__ == "__main__":
+    main()
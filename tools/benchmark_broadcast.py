@@ -0,0 +1,127 @@
+"""
+Benchmark encode-once fan-out of annotated camera frames
+
+Publishes synthetic camera frames (with a few detections) into a
+BroadcastChannel at a fixed rate while N viewers consume them on an asyncio
+loop, a quarter of them slow. Reports, per viewer count:
+    - publish ms:   publisher cost per frame (annotate + encode once + wake viewers)
+    - fan-out ms:   part of it spent waking the viewers - the only per-viewer cost
+    - per-viewer:   what encoding separately for every viewer would cost
+    - fast / slow:  frames delivered per viewer; slow viewers skip to the newest frame
+
+Usage:
+    python tools/benchmark_broadcast.py
+    python tools/benchmark_broadcast.py --viewers 1 10 100 --seconds 5 --fps 15
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+import numpy as np
+from app.services.broadcast import BroadcastChannel, Viewer, annotate_live_frame
+import cv2
+
+DETECTIONS = [
+    {"label": "pistol", "confidence": 0.91, "bbox": [400, 300, 520, 380]},
+    {"label": "knife", "confidence": 0.74, "bbox": [1200, 600, 1290, 720]},
+]
+
+
+def synthetic_frame(width: int, height: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    return np.clip(base + rng.normal(0, 20, (height, width, 3)), 0, 255).astype(np.uint8)
+
+
+def encode_cost_ms(frame: np.ndarray, quality: int, max_width: int, repeat: int = 20) -> float:
+    """Annotate + resize + encode one frame (what every viewer would pay without sharing)"""
+    def once():
+        annotated = annotate_live_frame(frame, DETECTIONS, "bench")
+        h, w = annotated.shape[:2]
+        if w > max_width:
+            annotated = cv2.resize(annotated, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+        cv2.imencode(".jpg", annotated, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    once()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        once()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def run(frame: np.ndarray, viewers: int, seconds: float, fps: float, quality: int, max_width: int) -> dict:
+    loop = asyncio.get_running_loop()
+    channel = BroadcastChannel("bench", "bench", quality, max_width)
+    slow_count = viewers // 4
+    members = []
+    for i in range(viewers):
+        viewer = Viewer(channel, loop)
+        channel.add(viewer)
+        members.append((viewer, 0.25 if i < slow_count else 0.0))  # slow viewer: 4 fps link
+
+    async def consume(viewer: Viewer, delay: float):
+        while await viewer.next() is not None:
+            if delay:
+                await asyncio.sleep(delay)
+
+    publish_ms = []
+
+    def publisher():
+        interval = 1.0 / fps
+        deadline = time.time() + seconds
+        next_tick = time.time()
+        while time.time() < deadline:
+            start = time.perf_counter()
+            channel.publish(frame, DETECTIONS)
+            publish_ms.append((time.perf_counter() - start) * 1000)
+            next_tick += interval
+            time.sleep(max(0.0, next_tick - time.time()))
+
+    tasks = [asyncio.create_task(consume(v, d)) for v, d in members]
+    await loop.run_in_executor(None, publisher)
+    channel.close()
+    await asyncio.gather(*tasks)
+
+    fast = [v.delivered for v, d in members if not d]
+    slow = [v.delivered for v, d in members if d]
+    publish_ms.sort()
+    return {
+        "published": len(publish_ms),
+        "publish_ms": sum(publish_ms) / len(publish_ms),
+        "publish_p95_ms": publish_ms[int(len(publish_ms) * 0.95)],
+        "fanout_ms": channel.fanout_seconds / max(1, channel.encoded) * 1000,
+        "fast": sum(fast) / len(fast) if fast else 0,
+        "slow": sum(slow) / len(slow) if slow else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode-once broadcast fan-out benchmark")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--quality", type=int, default=80)
+    parser.add_argument("--max-width", type=int, default=1280)
+    args = parser.parse_args()
+
+    frame = synthetic_frame(args.width, args.height)
+    encode_ms = encode_cost_ms(frame, args.quality, args.max_width)
+    print(f"{args.width}x{args.height} -> {args.max_width} px, q{args.quality}: "
+          f"annotate + encode {encode_ms:.2f} ms per frame")
+    print(f"{'viewers':>8}{'frames':>8}{'publish ms':>12}{'p95 ms':>9}{'fan-out ms':>12}{'per-viewer ms':>15}"
+          f"{'fast recv':>11}{'slow recv':>11}")
+    for viewers in args.viewers:
+        result = asyncio.run(run(frame, viewers, args.seconds, args.fps, args.quality, args.max_width))
+        print(f"{viewers:>8}{result['published']:>8}{result['publish_ms']:>12.2f}{result['publish_p95_ms']:>9.2f}"
+              f"{result['fanout_ms']:>12.3f}{encode_ms * viewers:>15.1f}{result['fast']:>11.1f}{result['slow']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Measure the bandwidth of delta-encoded realtime detection responses
+
+Replays detection sessions through DeltaEncoder and compares the JSON bytes
+of full responses (response_mode=full) with delta responses
+(response_mode=delta), then checks that the reference DeltaDecoder rebuilds
+every frame (same objects, boxes within the quantum).
+
+Sessions are either recorded timelines (output=timeline JSONL files of
+processed videos - every sampled frame is replayed with the detections shown
+at that time) or synthetic: moving objects with detector jitter that appear
+and disappear.
+
+Usage:
+    python tools/benchmark_delta.py
+    python tools/benchmark_delta.py --timeline uploads/results/*.jsonl
+    python tools/benchmark_delta.py --objects 1 3 8 --frames 3000 --quantum 4
+"""
+import sys
+import json
+import random
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from app.services.detection_delta import DeltaEncoder, DeltaDecoder
+
+LABELS = ["pistol", "knife", "rifle"]
+
+
+def response_bytes(message: dict) -> int:
+    """Size of a message as sent by WebSocket.send_json"""
+    return len(json.dumps(message, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+
+
+def timeline_session(path: str) -> list:
+    """Per sampled frame detection lists of a timeline JSONL file"""
+    records, header = [], None
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if record["type"] == "header":
+                header = record
+            elif record["type"] == "frame":
+                records.append(record)
+    if header is None:
+        raise ValueError(f"{path}: no timeline header")
+
+    step = max(1, round(header["fps"] / header["sample_fps"]))
+    frames, current, index = [], [], 0
+    for frame_index in range(0, header["total_frames"] or (records[-1]["frame"] + 1 if records else 0), step):
+        while index < len(records) and records[index]["frame"] <= frame_index:
+            current = records[index]["detections"]
+            index += 1
+        frames.append([
+            {
+                "class_name": det["label"],
+                "confidence": det["confidence"],
+                "bbox": dict(zip(("x1", "y1", "x2", "y2"), det["bbox"])),
+            }
+            for det in current
+        ])
+    return frames
+
+
+def synthetic_session(objects: int, frames: int, seed: int = 0) -> list:
+    """Objects drifting across a 1280x720 frame with +-2 px detector jitter, leaving and re-entering"""
+    rng = random.Random(seed)
+    state = []
+    for _ in range(objects):
+        state.append({
+            "label": rng.choice(LABELS), "x": rng.uniform(100, 1000), "y": rng.uniform(100, 500),
+            "w": rng.uniform(40, 160), "h": rng.uniform(40, 160),
+            "vx": rng.uniform(-3, 3), "vy": rng.uniform(-2, 2), "visible": True,
+        })
+    session = []
+    for _ in range(frames):
+        detections = []
+        for obj in state:
+            if rng.random() < 0.01:
+                obj["visible"] = not obj["visible"]
+            obj["x"] = min(1200 - obj["w"], max(0, obj["x"] + obj["vx"]))
+            obj["y"] = min(680 - obj["h"], max(0, obj["y"] + obj["vy"]))
+            if not obj["visible"]:
+                continue
+            jitter = [rng.uniform(-2, 2) for _ in range(4)]
+            detections.append({
+                "class_name": obj["label"],
+                "confidence": min(0.99, max(0.3, 0.8 + rng.uniform(-0.04, 0.04))),
+                "bbox": {
+                    "x1": obj["x"] + jitter[0], "y1": obj["y"] + jitter[1],
+                    "x2": obj["x"] + obj["w"] + jitter[2], "y2": obj["y"] + obj["h"] + jitter[3],
+                },
+            })
+        session.append(detections)
+    return session
+
+
+def replay(session: list, quantum: float, snapshot_interval: int) -> dict:
+    encoder = DeltaEncoder(snapshot_interval=snapshot_interval, quantum=quantum)
+    decoder = DeltaDecoder()
+    full_bytes = delta_bytes = 0
+    max_error = 0.0
+    mismatches = 0
+
+    for seq, detections in enumerate(session):
+        # Fields every response has, independent of the mode
+        meta = {"seq": seq, "processing_time": 0.0123456, "total_weapons": len(detections), "fps": 12.3,
+                "frame_count": seq + 1, "dropped_frames": 0, "server_latency": 0.0456}
+        full_bytes += response_bytes({**meta, "detections": detections})
+        message = encoder.encode(detections)
+        delta_bytes += response_bytes({**meta, **message})
+
+        decoded = decoder.apply(json.loads(json.dumps(message)))
+        if decoded is None or len(decoded) != len(detections):
+            mismatches += 1
+            continue
+        # Match decoded objects to the originals by class and nearest box
+        remaining = list(detections)
+        for obj in decoded:
+            candidates = [d for d in remaining if d["class_name"] == obj["class_name"]]
+            if not candidates:
+                mismatches += 1
+                break
+            best = min(candidates, key=lambda d: sum(abs(d["bbox"][k] - obj["bbox"][k]) for k in obj["bbox"]))
+            remaining.remove(best)
+            max_error = max(max_error, *(abs(best["bbox"][k] - obj["bbox"][k]) for k in obj["bbox"]))
+
+    return {"frames": len(session), "full": full_bytes, "delta": delta_bytes,
+            "max_error": max_error, "mismatches": mismatches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Delta-encoded detection response bandwidth")
+    parser.add_argument("--timeline", nargs="*", default=[], help="Recorded timeline JSONL files")
+    parser.add_argument("--objects", type=int, nargs="+", default=[0, 1, 3, 8])
+    parser.add_argument("--frames", type=int, default=1800)
+    parser.add_argument("--quantum", type=float, default=4.0)
+    parser.add_argument("--snapshot-interval", type=int, default=30)
+    args = parser.parse_args()
+
+    sessions = [(Path(path).name, timeline_session(path)) for path in args.timeline]
+    if not sessions:
+        sessions = [(f"synthetic, {n} object(s)", synthetic_session(n, args.frames)) for n in args.objects]
+
+    print(f"quantum {args.quantum} px, snapshot every {args.snapshot_interval} responses")
+    print(f"{'session':<28}{'frames':>8}{'full KB':>10}{'delta KB':>10}{'saved':>8}{'B/frame':>9}"
+          f"{'max err px':>12}{'mismatch':>10}")
+    for name, session in sessions:
+        r = replay(session, args.quantum, args.snapshot_interval)
+        saved = 1 - r["delta"] / r["full"] if r["full"] else 0.0
+        print(f"{name:<28}{r['frames']:>8}{r['full'] / 1024:>10.1f}{r['delta'] / 1024:>10.1f}{saved:>8.1%}"
+              f"{r['delta'] / max(1, r['frames']):>9.0f}{r['max_error']:>12.2f}{r['mismatches']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark reduced-resolution frame decoding against full decode + resize
+
+Encodes a frame as JPEG at several resolutions and times, per frame:
+    - full:     cv2.imdecode(IMREAD_COLOR) + resize to the inference size
+                (what the realtime endpoint did before)
+    - reduced:  FrameDecoder (IMREAD_REDUCED_COLOR_2/4/8) + resize
+    - turbo:    FrameDecoder with libjpeg-turbo (only if PyTurboJPEG is installed)
+
+Usage:
+    python tools/benchmark_frame_decode.py
+    python tools/benchmark_frame_decode.py --image snapshot.jpg --repeat 200
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+import cv2
+import numpy as np
+from app.services.frame_decode import FrameDecoder, _turbojpeg
+
+RESOLUTIONS = [(1280, 720), (1920, 1080), (3840, 2160)]
+
+
+def synthetic_frame(width: int, height: int) -> np.ndarray:
+    """Textured frame (gradients + noise) so JPEG sizes resemble camera footage"""
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    base = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=-1)
+    noise = rng.normal(0, 20, (height, width, 3))
+    return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+
+def fit(frame: np.ndarray, size: int) -> np.ndarray:
+    h, w = frame.shape[:2]
+    scale = size / max(w, h)
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (int(w * scale), int(h * scale)))
+
+
+def time_per_frame(fn, repeat: int) -> float:
+    fn()  # Warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and reduced-resolution JPEG decoding")
+    parser.add_argument("--image", help="Source image (default: synthetic frame)")
+    parser.add_argument("--size", type=int, default=640, help="Inference size")
+    parser.add_argument("--quality", type=int, default=85)
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    source = cv2.imread(args.image) if args.image else None
+    decoders = {"reduced": FrameDecoder(args.size, backend="opencv")}
+    if _turbojpeg is not None:
+        decoders["turbo"] = FrameDecoder(args.size, backend="turbojpeg")
+    else:
+        print("PyTurboJPEG not installed - skipping libjpeg-turbo backend")
+
+    header = f"{'resolution':<12}{'jpeg KB':>9}{'full ms':>10}" + "".join(f"{name + ' ms':>12}" for name in decoders)
+    print(header)
+    for width, height in RESOLUTIONS:
+        frame = cv2.resize(source, (width, height)) if source is not None else synthetic_frame(width, height)
+        data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1].tobytes()
+
+        full = time_per_frame(lambda: fit(cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR), args.size),
+                              args.repeat)
+        row = f"{f'{width}x{height}':<12}{len(data) / 1024:>9.0f}{full:>10.2f}"
+        for decoder in decoders.values():
+            ms = time_per_frame(lambda: fit(decoder.decode(data)[0], args.size), args.repeat)
+            row += f"{ms:>8.2f} ({full / ms:.1f}x)"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark annotated-video output vs detection-timeline output
+
+Runs the same video through the pipeline twice - once annotating and encoding
+an MP4, once writing only the JSONL timeline - and compares wall time, process
+CPU time and output size.
+
+Usage:
+    python tools/benchmark_video_output.py --video sample.mp4 --model best.pt
+    python tools/benchmark_video_output.py --video sample.mp4 --no-model   # isolate annotate/encode cost
+"""
+import sys
+import os
+import time
+import argparse
+import tempfile
+from pathlib import Path
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+import cv2
+from app.services.video_pipeline import VideoPipeline, yolo_batch_infer, detect_grid_layout
+from app.services.video_timeline import TimelineWriter
+
+
+def run_mode(mode, video, infer_fn, out_dir):
+    cap = cv2.VideoCapture(video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    timeline = None
+    if mode == "timeline":
+        output_path = os.path.join(out_dir, "timeline.jsonl")
+        timeline = TimelineWriter(output_path, fps, width, height, total_frames, sample_fps=min(fps, 30))
+        pipeline = VideoPipeline(infer_fn, annotate=False,
+                                 on_detections=lambda i, frame, dets: timeline.add(i, dets))
+        run_output = None
+    else:
+        output_path = os.path.join(out_dir, "annotated.mp4")
+        pipeline = VideoPipeline(infer_fn)
+        run_output = output_path
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    result = pipeline.run(video, run_output)
+    if timeline is not None:
+        timeline.close()
+    return {
+        "wall": time.perf_counter() - wall_start,
+        "cpu": time.process_time() - cpu_start,
+        "bytes": os.path.getsize(output_path),
+        "frames": result["frame_count"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare video vs timeline output cost")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default=str(PROJECT_ROOT / "runs/detect/weapons_yolov8_optimized_stable/weights/best.pt"))
+    parser.add_argument("--no-model", action="store_true", help="Use an empty detector to measure only the output path")
+    parser.add_argument("--conf", type=float, default=0.55)
+    parser.add_argument("--device", default="cpu")
+    args = parser.parse_args()
+
+    if args.no_model:
+        infer_fn = lambda frames: [[] for _ in frames]
+    else:
+        from ultralytics import YOLO
+        cap = cv2.VideoCapture(args.video)
+        grid = detect_grid_layout(int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        cap.release()
+        infer_fn = yolo_batch_infer(YOLO(args.model), args.conf, grid=grid, device=args.device)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        results = {mode: run_mode(mode, args.video, infer_fn, out_dir) for mode in ("video", "timeline")}
+
+    print(f"\n{'mode':<10}{'frames':>8}{'wall s':>10}{'cpu s':>10}{'output':>14}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['frames']:>8}{r['wall']:>10.2f}{r['cpu']:>10.2f}{r['bytes'] / 1024:>11.1f} KB")
+
+    video, timeline = results["video"], results["timeline"]
+    print(f"\ntimeline saves {1 - timeline['cpu'] / max(video['cpu'], 1e-9):.0%} CPU, "
+          f"{1 - timeline['wall'] / max(video['wall'], 1e-9):.0%} wall time, "
+          f"{1 - timeline['bytes'] / max(video['bytes'], 1):.1%} disk")
+
+
+if __name__ == "__main__":
+    main()